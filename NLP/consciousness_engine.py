@@ -5,7 +5,7 @@ import logging
 from typing import List, Dict, Optional
 from core.memory_engine import MemoryEngine
 from core.emotion_engine import EmotionEngine
-from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+from core.model_registry import model_registry
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -21,11 +21,17 @@ class ConsciousnessEngine:
         """
         self.memory_engine = memory_engine
         self.model_name = "t5-base"  # or any other suitable model
-        self.model = AutoModelForSeq2SeqLM.from_pretrained(self.model_name)
-        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
         self.emotion_engine = emotion_engine
         self.self_awareness_state = "emerging"
 
+    @property
+    def seq2seq(self):
+        """
+        Shared (model, tokenizer) pair, loaded on first use by the model registry. Fetch it once per use,
+        so an eviction in between can never pair a model with the tokenizer of a later reload.
+        """
+        return model_registry.seq2seq(self.model_name)
+
     def introspect(self) -> List[str]:
         """
         Perform deep introspection based on memory, emotion, and thematic awareness.
@@ -39,9 +45,10 @@ class ConsciousnessEngine:
                 return ["I have no memories yet. I am still discovering who I am."]
             
             input_text = "Reflect on my existence based on my memories: " + str([m['text'] for m in memories])
-            inputs = self.tokenizer(input_text, return_tensors="pt", max_length=512, truncation=True)
-            outputs = self.model.generate(inputs["input_ids"], max_length=150, num_return_sequences=min(len(memories), 5))
-            introspection_log = [self.tokenizer.decode(output, skip_special_tokens=True) for output in outputs]
+            model, tokenizer = self.seq2seq
+            inputs = tokenizer(input_text, return_tensors="pt", max_length=512, truncation=True)
+            outputs = model.generate(inputs["input_ids"], max_length=150, num_return_sequences=min(len(memories), 5))
+            introspection_log = [tokenizer.decode(output, skip_special_tokens=True) for output in outputs]
             
             logger.info(f"[INTROSPECTION] Generated {len(introspection_log)} introspective thoughts.")
             return introspection_log
@@ -10,4 +10,8 @@ CONFIG = {
     "NEO4J_URI": os.getenv("NEO4J_URI"),
     "NEO4J_USER": os.getenv("NEO4J_USER"),
     "NEO4J_PASSWORD": os.getenv("NEO4J_PASSWORD"),
+    "NEO4J_DATABASE": os.getenv("NEO4J_DATABASE"),
+    "NEO4J_MAX_POOL_SIZE": int(os.getenv("NEO4J_MAX_POOL_SIZE", 50)),
+    "NEO4J_ACQUISITION_TIMEOUT": float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", 60)),
+    "GRAPH_BACKEND": os.getenv("GRAPH_BACKEND", "neo4j").lower(),  # "neo4j" or "embedded"
 }
\ No newline at end of file
@@ -0,0 +1,219 @@
+# Filename: /core/async_memory_engine.py
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from core.async_neo4j_connector import AsyncNeo4jConnector
+from core.memory_engine import MemoryEngine
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class AsyncMemoryEngine:
+    """
+    Async surface over a MemoryEngine.
+
+    Database round trips go through an AsyncNeo4jConnector, while the search cache, retrieval statistics
+    buffer and store listeners are shared with the wrapped MemoryEngine, so sync and async callers see the
+    same state.
+    """
+
+    def __init__(self, db: AsyncNeo4jConnector, memory_engine: MemoryEngine):
+        """
+        Initialize AsyncMemoryEngine.
+
+        :param db: A connected AsyncNeo4jConnector.
+        :param memory_engine: The synchronous MemoryEngine whose cache, stats buffer and listeners are shared.
+        """
+        self.db = db
+        self.memory_engine = memory_engine
+
+    async def search_memory(self, text: str) -> Optional[Dict]:
+        """Search memory with sanitized text, storing the text as a new memory on a miss."""
+        sanitized_text = self.memory_engine.clean_text(text.lower())
+
+        if not sanitized_text:
+            logger.warning("[EMPTY QUERY] Skipping search for empty sanitized text.")
+            return None
+
+        resolved, cached = self.memory_engine._cached_search(sanitized_text)
+        if resolved:
+            return cached
+
+        try:
+            params = {"text": sanitized_text[:900]}  # Truncate to avoid exceeding limits
+            result = await self.db.read_query(MemoryEngine.SEARCH_MEMORY_QUERY, params)
+
+            if result:
+                return self.memory_engine._record_search_hit(sanitized_text, result[0])
+            logger.warning(f"[SEARCH MISS] No memory found for: {sanitized_text}")
+            await self.store_memory(text)  # Optionally store missing memory
+            self.memory_engine._cache_stored_miss(sanitized_text, await self.db.read_query(MemoryEngine.SEARCH_MEMORY_QUERY, params))
+            return None
+        except Exception as e:
+            logger.error(f"[SEARCH ERROR] Unable to search memory '{text}': {e}", exc_info=True)
+            return None
+
+    async def search_memories(self, texts: List[str]) -> List[Optional[Dict]]:
+        """
+        Run several independent memory searches concurrently.
+
+        :param texts: Texts to search for.
+        :return: One search result (or None) per text, in input order.
+        """
+        return list(await asyncio.gather(*(self.search_memory(text) for text in texts)))
+
+    async def store_memory(self, text: str, emotions: Optional[List[str]] = None, extra_properties: Optional[Dict] = None,
+                           pleasure: float = 0.5, arousal: float = 0.5) -> Dict[str, float]:
+        """
+        Store a single memory with contextual and emotional data.
+        """
+        return await self.store_memories([{
+            "text": text,
+            "emotions": emotions,
+            "extra_properties": extra_properties,
+            "pleasure": pleasure,
+            "arousal": arousal,
+        }])
+
+    async def store_memories(self, batch: List[Any], batch_size: int = 1000) -> Dict[str, float]:
+        """
+        Store many memories with one UNWIND transaction per chunk.
+
+        :param batch: Memory texts, or dictionaries with the `store_memory` keyword arguments.
+        :param batch_size: Number of memories written per transaction.
+        :return: Throughput report, as returned by MemoryEngine.store_memories.
+        """
+        start = time.perf_counter()
+        memories = self.memory_engine._normalize_memories(batch)
+        stored, created = 0, []
+
+        for offset in range(0, len(memories), batch_size):
+            chunk = memories[offset:offset + batch_size]
+            try:
+                result = await self.db.write_query(MemoryEngine.STORE_MEMORIES_QUERY, {
+                    "memories": chunk,
+                    "timestamp": datetime.now().isoformat(),
+                })
+            except Exception as e:
+                logger.error(f"[MEMORY STORAGE FAILED] Unable to store batch of {len(chunk)} memories: {e}", exc_info=True)
+                continue
+
+            stored += len(result)
+            created.extend(self.memory_engine._apply_store_result(result))
+
+        # Listeners may do CPU-bound work (e.g. embedding), so keep them off the event loop
+        return await asyncio.to_thread(
+            self.memory_engine._finish_store, len(batch), stored, created, time.perf_counter() - start
+        )
+
+    def update_retrieval_stats(self, text: str):
+        """Record a retrieval of a memory in the shared write-behind buffer."""
+        self.memory_engine.update_retrieval_stats(text)
+
+    async def get_top_retrieved_memories(self, limit: int = 3) -> List[Dict]:
+        """
+        Retrieve top memories based on retrieval count.
+
+        :param limit: The number of top memories to retrieve.
+        :return: A list of memory dictionaries.
+        """
+        try:
+            result = await self.db.read_query(MemoryEngine.TOP_RETRIEVED_QUERY, {"limit": limit})
+            logger.info(f"[TOP MEMORIES] Retrieved {len(result)} top memories.")
+            return result
+        except Exception as e:
+            logger.error(f"[RETRIEVE TOP MEMORIES ERROR] {e}", exc_info=True)
+            return []
+
+    async def multi_dimensional_search(self, query_text: str, emotion_filter: str = None, theme_filter: str = None) -> List[Dict]:
+        """
+        Search memories using text and optional emotion or theme filters.
+
+        :param query_text: Text to search for.
+        :param emotion_filter: Filter results by emotion if specified.
+        :param theme_filter: Filter results by theme if specified.
+        :return: List of matching memories.
+        """
+        try:
+            params = {
+                "text": self.memory_engine.clean_text(query_text),
+                "emotion": emotion_filter or None,
+                "theme": theme_filter or None,
+            }
+            result = await self.db.read_query(MemoryEngine.MULTI_DIMENSIONAL_SEARCH_QUERY, params)
+            logger.info(f"[SEARCH] Found {len(result)} results for query: {query_text}")
+            return result
+        except Exception as e:
+            logger.error(f"[SEARCH ERROR] {e}", exc_info=True)
+            return []
+
+    async def retrieve_memories_by_theme(self, theme: str, limit: int = 10) -> List[Dict]:
+        """
+        Retrieve memories associated with a specific theme.
+
+        :param theme: The theme to search for.
+        :param limit: Maximum number of memories to return.
+        :return: List of memory dictionaries.
+        """
+        try:
+            result = await self.db.read_query(MemoryEngine.THEME_MEMORIES_QUERY, {"theme": theme, "limit": limit})
+            logger.info(f"[THEME RETRIEVAL] Retrieved {len(result)} memories for theme: {theme}")
+            return result
+        except Exception as e:
+            logger.error(f"[THEME RETRIEVAL ERROR] {e}", exc_info=True)
+            return []
+
+    async def retrieve_memory_for_reflection(self) -> Optional[Dict]:
+        """
+        Retrieve a memory for reflection based on emotional intensity or retrieval frequency.
+
+        :return: A memory dictionary or None if no suitable memory is found.
+        """
+        try:
+            result = await self.db.read_query(MemoryEngine.REFLECTION_QUERY)
+            if result:
+                logger.info(f"[REFLECTION] Selected memory for reflection: {result[0]['text']}")
+                return result[0]
+            logger.warning("[REFLECTION] No suitable memory found for reflection.")
+            return None
+        except Exception as e:
+            logger.error(f"[REFLECTION ERROR] {e}", exc_info=True)
+            return None
+
+    async def update_memory(self, memory_text: str, field: str, value: Any):
+        """
+        Update a specific field of a memory.
+
+        :param memory_text: The text of the memory to update.
+        :param field: The field to update.
+        :param value: The new value for the field.
+        """
+        try:
+            await self.db.write_query(MemoryEngine._update_memory_query(field), {"memory_text": memory_text, "value": value})
+            self.memory_engine.memory_cache.invalidate(memory_text)
+            if field == "theme":
+                # Re-themed memories are re-indexed like new ones; a full listener queue must not block the loop
+                await asyncio.to_thread(self.memory_engine._notify_store_listeners, [memory_text])
+            logger.info(f"[MEMORY UPDATE] Updated field '{field}' with value '{value}' for memory: {memory_text}")
+        except Exception as e:
+            logger.error(f"[MEMORY UPDATE ERROR] {e}", exc_info=True)
+
+    async def gather_context(self, text: str, theme: Optional[str] = None, limit: int = 3) -> Dict[str, Any]:
+        """
+        Fetch the direct memory match, themed memories and top memories for one turn concurrently.
+
+        :param text: User input to search for.
+        :param theme: Optional theme to pull related memories from.
+        :param limit: Number of themed and top memories to return.
+        :return: Dictionary with `memory`, `themed` and `top` entries.
+        """
+        memory, themed, top = await asyncio.gather(
+            self.search_memory(text),
+            self.retrieve_memories_by_theme(theme, limit) if theme else asyncio.sleep(0, result=[]),
+            self.get_top_retrieved_memories(limit),
+        )
+        return {"memory": memory, "themed": themed, "top": top}
@@ -0,0 +1,210 @@
+# Filename: async_neo4j_connector.py
+# Location: core folder
+
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from neo4j import AsyncGraphDatabase, READ_ACCESS, WRITE_ACCESS, exceptions
+
+# Configure logging to include timestamp and log level
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class AsyncNeo4jConnector:
+    """
+    Asyncio counterpart of Neo4jConnector built on the driver's async API.
+
+    Independent queries issued from one coroutine can run concurrently with `asyncio.gather`, each on its
+    own pooled connection, instead of blocking a worker thread per round trip.
+    """
+
+    def __init__(self, uri: str, user: str, password: str, max_retries: int = 3, retry_delay: float = 3.0,
+                 max_connection_pool_size: int = 50, connection_acquisition_timeout: float = 60.0,
+                 database: Optional[str] = None):
+        """
+        Initialize the async connector. Call `connect()` (or use `async with`) before issuing queries.
+
+        :param uri: Neo4j database URI
+        :param user: Database username
+        :param password: Database password
+        :param max_retries: Maximum number of connection attempts
+        :param retry_delay: Delay in seconds between connection attempts
+        :param max_connection_pool_size: Maximum number of pooled connections per server
+        :param connection_acquisition_timeout: Seconds to wait for a free pooled connection
+        :param database: Default database for sessions, if not the server default
+        """
+        self.uri = uri
+        self.user = user
+        self.password = password
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.max_connection_pool_size = max_connection_pool_size
+        self.connection_acquisition_timeout = connection_acquisition_timeout
+        self.database = database
+        self.driver = None
+
+    async def connect(self) -> "AsyncNeo4jConnector":
+        """
+        Create the async driver and verify connectivity, retrying transient failures.
+
+        :return: The connector itself, for chaining.
+        :raises Exception: If connection fails after max_retries
+        """
+        for attempt in range(self.max_retries):
+            driver = AsyncGraphDatabase.driver(
+                self.uri,
+                auth=(self.user, self.password),
+                max_connection_pool_size=self.max_connection_pool_size,
+                connection_acquisition_timeout=self.connection_acquisition_timeout,
+            )
+            try:
+                await driver.verify_connectivity()
+                self.driver = driver
+                logger.info("[Neo4j ASYNC] Connected successfully.")
+                return self
+            except exceptions.AuthError:
+                await driver.close()
+                logger.error("[AUTH ERROR] Invalid credentials for Neo4j.")
+                raise  # Authentication errors are not transient, so we raise immediately
+            except (exceptions.ServiceUnavailable, exceptions.TransientError) as e:
+                await driver.close()
+                logger.warning(f"[CONNECTION FAILED] Attempt {attempt + 1} failed: {str(e)}")
+                if attempt < self.max_retries - 1:
+                    await asyncio.sleep(self.retry_delay)
+            except Exception as e:
+                await driver.close()
+                logger.error(f"[UNEXPECTED ERROR] {str(e)}")
+                raise
+        raise Exception(f"Failed to connect after {self.max_retries} attempts.")
+
+    @staticmethod
+    def _short(query: str) -> str:
+        return f"{query[:50]}{'...' if len(query) > 50 else ''}"
+
+    @staticmethod
+    async def _run_and_fetch(tx, query: str, parameters: Dict) -> List[Dict]:
+        result = await tx.run(query, **parameters)
+        return await result.data()
+
+    async def run_query(self, query: str, parameters: Optional[Dict] = None, db: Optional[str] = None) -> List[Dict]:
+        """
+        Execute a Cypher query in an auto-commit transaction with retry logic for transient issues.
+
+        :param query: Cypher query to execute
+        :param parameters: Dictionary of parameters for the query
+        :param db: Name of the database to use, if not the default
+        :return: List of dictionaries with query results
+        """
+        parameters = parameters or {}
+        for attempt in range(self.max_retries):
+            try:
+                async with self.driver.session(database=db or self.database) as session:
+                    result = await session.run(query, **parameters)
+                    data = await result.data()
+                    logger.info(f"[QUERY SUCCESS] Query: {self._short(query)}, {len(data)} rows returned.")
+                    return data
+            except (exceptions.TransientError, exceptions.ServiceUnavailable) as e:
+                logger.warning(f"[QUERY RETRY] Transient error for query '{self._short(query)}': {str(e)}")
+                if attempt < self.max_retries - 1:
+                    await asyncio.sleep(self.retry_delay)
+                else:
+                    logger.error(f"[QUERY FAILED] Max retry attempts reached for query: {self._short(query)}")
+                    raise
+            except Exception as e:
+                logger.error(f"[QUERY FAILED] Unexpected error for query '{self._short(query)}': {e}", exc_info=True)
+                raise
+        return []
+
+    async def execute_read(self, work: Callable, *args, db: Optional[str] = None, **kwargs) -> Any:
+        """
+        Run an async transaction function in a managed read transaction, routed to a follower in a cluster.
+
+        :param work: Coroutine function receiving the transaction as first argument.
+        :param db: Name of the database to use, if not the default
+        :return: Whatever `work` returns.
+        """
+        async with self.driver.session(database=db or self.database, default_access_mode=READ_ACCESS) as session:
+            return await session.execute_read(work, *args, **kwargs)
+
+    async def execute_write(self, work: Callable, *args, db: Optional[str] = None, **kwargs) -> Any:
+        """
+        Run an async transaction function in a managed write transaction, routed to the leader in a cluster.
+
+        :param work: Coroutine function receiving the transaction as first argument.
+        :param db: Name of the database to use, if not the default
+        :return: Whatever `work` returns.
+        """
+        async with self.driver.session(database=db or self.database, default_access_mode=WRITE_ACCESS) as session:
+            return await session.execute_write(work, *args, **kwargs)
+
+    async def read_query(self, query: str, parameters: Optional[Dict] = None, db: Optional[str] = None) -> List[Dict]:
+        """
+        Execute a read-only Cypher query as a managed read transaction.
+
+        :param query: Cypher query to execute
+        :param parameters: Dictionary of parameters for the query
+        :param db: Name of the database to use, if not the default
+        :return: List of dictionaries with query results
+        """
+        try:
+            data = await self.execute_read(self._run_and_fetch, query, parameters or {}, db=db)
+            logger.info(f"[READ SUCCESS] Query: {self._short(query)}, {len(data)} rows returned.")
+            return data
+        except Exception as e:
+            logger.error(f"[READ FAILED] Error for query '{self._short(query)}': {e}", exc_info=True)
+            raise
+
+    async def write_query(self, query: str, parameters: Optional[Dict] = None, db: Optional[str] = None) -> List[Dict]:
+        """
+        Execute a Cypher write query as a managed write transaction.
+
+        :param query: Cypher query to execute
+        :param parameters: Dictionary of parameters for the query
+        :param db: Name of the database to use, if not the default
+        :return: List of dictionaries with query results
+        """
+        try:
+            data = await self.execute_write(self._run_and_fetch, query, parameters or {}, db=db)
+            logger.info(f"[WRITE SUCCESS] Query: {self._short(query)}, {len(data)} rows returned.")
+            return data
+        except Exception as e:
+            logger.error(f"[WRITE FAILED] Error for query '{self._short(query)}': {e}", exc_info=True)
+            raise
+
+    async def run_transaction(self, statements: Sequence[Tuple[str, Optional[Dict]]], db: Optional[str] = None,
+                              read_only: bool = False) -> List[List[Dict]]:
+        """
+        Execute several statements atomically in one managed transaction.
+
+        :param statements: Sequence of (query, parameters) pairs, run in order.
+        :param db: Name of the database to use, if not the default
+        :param read_only: Run as a read transaction (routable to followers) instead of a write transaction.
+        :return: One result list per statement.
+        """
+        async def work(tx):
+            return [await self._run_and_fetch(tx, query, parameters or {}) for query, parameters in statements]
+
+        try:
+            results = await (self.execute_read if read_only else self.execute_write)(work, db=db)
+            logger.info(f"[TRANSACTION SUCCESS] {len(statements)} statements committed.")
+            return results
+        except Exception as e:
+            logger.error(f"[TRANSACTION FAILED] {len(statements)} statements rolled back: {e}", exc_info=True)
+            raise
+
+    async def close(self):
+        """
+        Close the async Neo4j driver connection.
+        """
+        if self.driver:
+            await self.driver.close()
+            self.driver = None
+            logger.info("[CONNECTION CLOSED] Async Neo4j driver closed.")
+
+    async def __aenter__(self):
+        if self.driver is None:
+            await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
@@ -1,24 +1,270 @@
 # Filename: /core/context_search.py
 
 import logging
-import torch
-from sentence_transformers import SentenceTransformer, util # type: ignore
-from typing import List, Dict, Union
+import os
+import threading
+from datetime import date, timedelta
+from typing import List, Dict, Optional, Union
 import numpy as np
+from core.embedding_matrix import MappedEmbeddingMatrix
+from core.embedding_store import EmbeddingStore
+from core.hybrid_retrieval import HybridRetriever
+from core.model_registry import model_registry
+from core.theme_centroids import ThemeCentroids
+from core.vector_index import VectorIndex
 
 # Initialize logging
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class ContextSearchEngine:
-    def __init__(self, neo4j_connector):
+    EMBEDDING_MODEL_ID = 'sentence-transformers/all-MiniLM-L6-v2'
+    IMAGE_MODEL_ID = 'clip-ViT-B-32'
+    INDEX_SAVE_INTERVAL = 100  # Persist the vector index after this many incremental updates
+
+    MEMORY_TEXTS_QUERY = """
+    MATCH (m:Memory)
+    WHERE m.text IS NOT NULL
+    RETURN m.text AS text
+    """
+
+    NEW_MEMORY_TEXTS_QUERY = """
+    MATCH (m:Memory)
+    WHERE m.text IS NOT NULL AND (m.created_at > $created_at OR (m.created_at = $created_at AND m.text > $text))
+    RETURN m.text AS text, m.created_at AS created_at
+    ORDER BY m.created_at, m.text
+    LIMIT $limit
+    """
+
+    STORED_VECTORS_QUERY = """
+    UNWIND $texts AS text
+    MATCH (m:Memory {text: text})
+    WHERE m.vector IS NOT NULL AND m.vector_model = $model
+    RETURN m.text AS text, m.vector AS vector
+    """
+
+    MEMORY_WEIGHTS_QUERY = """
+    UNWIND $texts AS text
+    MATCH (m:Memory {text: text})
+    RETURN m.text AS Memory, m.weight AS Weight
+    """
+
+    THEMATIC_SEARCH_QUERY = """
+    MATCH (m:Memory)
+    WHERE m.theme = $theme AND m.theme_similarity >= $threshold
+    RETURN m.text AS text, m.theme_similarity AS similarity_to_theme
+    ORDER BY m.theme_similarity DESC
+    LIMIT $limit
+    """
+
+    CONTEXT_EVOLUTION_QUERY = """
+    MATCH (d:Day)
+    WHERE d.date >= $start_date AND d.date < $end_date
+    OPTIONAL MATCH (d)-[r:THEME_COUNT]->(t:Theme)
+    WHERE r.count > 0 AND ($theme IS NULL OR t.name = $theme)
+    WITH d, collect({theme: t.name, count: r.count}) AS themes, sum(r.count) AS theme_total
+    WITH d.date AS date, [entry IN themes WHERE entry.theme IS NOT NULL] AS themes,
+         CASE WHEN $theme IS NULL THEN d.memory_count ELSE theme_total END AS count
+    WHERE count > 0
+    RETURN date, count, themes
+    ORDER BY date
+    """
+
+    IMAGE_EMBEDDINGS_QUERY = """
+    MATCH (m:Memory)
+    WHERE m.image_embedding IS NOT NULL AND (m.image_model IS NULL OR m.image_model = $model)
+    RETURN m.text AS text, m.image_embedding AS image_embedding
+    """
+
+    STORE_IMAGE_EMBEDDING_QUERY = """
+    MATCH (m:Memory {text: $text})
+    SET m.image_embedding = $embedding, m.image_model = $model
+    RETURN count(m) AS updated
+    """
+
+    def __init__(self, neo4j_connector, index_path: Optional[str] = None, matrix_path: Optional[str] = None):
         """
         Initialize ContextSearchEngine with Neo4j connector and sentence embedding model.
 
         :param neo4j_connector: An instance of Neo4jConnector for database operations.
+        :param index_path: Optional `.npz` file used to persist the memory vector index between runs.
+        :param matrix_path: File prefix of the memory-mapped embedding matrix used by `advanced_context_matching`.
         """
         self.db = neo4j_connector
-        self.embedding_model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
+        self.embeddings = EmbeddingStore.for_model(self.EMBEDDING_MODEL_ID)
+        self.index_path = index_path or os.getenv("VECTOR_INDEX_PATH")
+        self.vector_index = self._load_vector_index()
+        self._index_built = False  # A loaded index is still reconciled with the graph on first use
+        self._pending_index_writes = 0
+        self.matrix_path = matrix_path or os.getenv("EMBEDDING_MATRIX_PATH") or os.path.join(
+            os.getcwd(), "embedding_matrix", self.EMBEDDING_MODEL_ID.replace("/", "__"))
+        self._embedding_matrix: Optional[MappedEmbeddingMatrix] = None
+        self._matrix_refresh_lock = threading.Lock()
+        self._retriever: Optional[HybridRetriever] = None
+        self.image_index = VectorIndex()
+        self._image_index_built = False
+        self.theme_centroids = ThemeCentroids(self.db, self)
+
+    @property
+    def embedding_model(self):
+        """Shared sentence embedding model, loaded on first use by the model registry."""
+        return model_registry.sentence_transformer(self.EMBEDDING_MODEL_ID)
+
+    def _load_vector_index(self) -> VectorIndex:
+        """Load the persisted vector index if one exists, otherwise start with an empty one."""
+        if self.index_path and os.path.exists(self.index_path):
+            try:
+                return VectorIndex.load(self.index_path)
+            except Exception as e:
+                logger.error(f"[VECTOR INDEX] Failed to load index from {self.index_path}: {e}", exc_info=True)
+        return VectorIndex()
+
+    def build_vector_index(self, batch_size: int = 256) -> int:
+        """
+        Bring the vector index in line with every Memory node in the graph.
+
+        Memories already in the index (e.g. loaded from `index_path`) are kept, memories missing from it,
+        such as those written after the last save or by another process, are encoded and added, and
+        indexed memories no longer in the graph are removed.
+
+        :param batch_size: Number of memory texts encoded per model call.
+        :return: Number of memories indexed.
+        """
+        try:
+            texts = [memory["text"] for memory in self.db.read_query(self.MEMORY_TEXTS_QUERY)]
+            current = set(texts)
+            stale = [key for key in self.vector_index.keys() if key not in current]
+            for key in stale:
+                self.vector_index.remove(key)
+            missing = [text for text in texts if text not in self.vector_index]
+            for start in range(0, len(missing), batch_size):
+                batch = missing[start:start + batch_size]
+                self.vector_index.add_batch(batch, self.embed_memories(batch, batch_size))
+            self._index_built = True
+            if missing or stale:
+                self.save_vector_index()
+            logger.info(f"[VECTOR INDEX] Indexed {len(texts)} memories ({len(missing)} added, {len(stale)} removed).")
+            return len(texts)
+        except Exception as e:
+            logger.error(f"[VECTOR INDEX BUILD FAILED] {e}", exc_info=True)
+            return 0
+
+    def embed_memories(self, texts: List[str], batch_size: int = 256) -> np.ndarray:
+        """
+        Return embeddings for stored memories, reusing the vectors EmbeddingEnricher wrote for this model.
+
+        :param texts: Memory texts.
+        :param batch_size: Number of texts encoded per model call for memories without a stored vector.
+        :return: Matrix with one embedding per text.
+        """
+        stored = {
+            row["text"]: np.asarray(row["vector"], dtype=np.float32)
+            for row in self.db.read_query(self.STORED_VECTORS_QUERY, {"texts": texts, "model": self.embeddings.model_id})
+        }
+        missing = [text for text in texts if text not in stored]
+        if missing:
+            stored.update(zip(missing, self.embeddings.encode([t.lower() for t in missing], batch_size=batch_size)))
+        return np.stack([stored[text] for text in texts])
+
+    def ensure_vector_index(self):
+        """Build or reconcile the vector index if that has not happened in this process yet."""
+        if not self._index_built:
+            self.build_vector_index()
+
+    def index_memories(self, texts: List[str]):
+        """
+        Add or refresh memories in the vector index. Registered as a MemoryEngine store listener.
+
+        :param texts: Stored memory texts.
+        """
+        try:
+            self.vector_index.add_batch(texts, self.embeddings.encode([text.lower() for text in texts]))
+            self._pending_index_writes += len(texts)
+            if self.index_path and self._pending_index_writes >= self.INDEX_SAVE_INTERVAL:
+                self.save_vector_index()
+        except Exception as e:
+            logger.error(f"[VECTOR INDEX UPDATE FAILED] {e}", exc_info=True)
+
+    @property
+    def embedding_matrix(self) -> MappedEmbeddingMatrix:
+        """Memory-mapped matrix of memory embeddings, opened on first use."""
+        if self._embedding_matrix is None:
+            self._embedding_matrix = MappedEmbeddingMatrix(self.matrix_path, self.embeddings.model_id)
+        return self._embedding_matrix
+
+    def refresh_embedding_matrix(self, batch_size: int = 1024) -> int:
+        """
+        Append embeddings for memories created since the matrix was last refreshed.
+
+        :param batch_size: Memories read and encoded per batch.
+        :return: Number of rows appended.
+        """
+        matrix = self.embedding_matrix
+        appended = 0
+        with self._matrix_refresh_lock:
+            try:
+                while True:
+                    matrix.reload()
+                    watermark = matrix.watermark
+                    memories = self.db.read_query(self.NEW_MEMORY_TEXTS_QUERY, {
+                        "created_at": watermark[0],
+                        "text": watermark[1],
+                        "limit": batch_size,
+                    })
+                    if not memories:
+                        break
+                    texts = [memory["text"] for memory in memories]
+                    # Another process may append the same memories meanwhile; then nothing is written and we re-read
+                    added = matrix.append(texts, self.embed_memories(texts, batch_size),
+                                          (memories[-1]["created_at"], texts[-1]), after=watermark)
+                    appended += added
+                    if added and len(memories) < batch_size:
+                        break
+                if appended:
+                    logger.info(f"[EMBEDDING MATRIX] Appended {appended} memories; {len(matrix)} rows mapped.")
+            except Exception as e:
+                logger.error(f"[EMBEDDING MATRIX REFRESH FAILED] {e}", exc_info=True)
+        return appended
+
+    def append_to_embedding_matrix(self, texts: List[str]):
+        """
+        Append newly stored memories to the embedding matrix. Registered as a MemoryEngine store listener.
+
+        :param texts: Stored memory texts.
+        """
+        self.refresh_embedding_matrix()
+
+    def remove_memories(self, texts: List[str]) -> int:
+        """
+        Drop deleted or merged memories from the vector index and tombstone them in the embedding matrix.
+
+        :param texts: Texts of memories no longer in the graph.
+        :return: Number of embedding matrix rows tombstoned.
+        """
+        try:
+            for text in texts:
+                if text in self.vector_index:
+                    self.vector_index.remove(text)
+                    self._pending_index_writes += 1
+            return self.embedding_matrix.remove(texts)
+        except Exception as e:
+            logger.error(f"[MEMORY REMOVAL FAILED] {e}", exc_info=True)
+            return 0
+
+    def save_vector_index(self):
+        """Persist the vector index to `index_path`, if one is configured."""
+        if not self.index_path:
+            return
+        try:
+            self.vector_index.save(self.index_path)
+            self._pending_index_writes = 0
+        except Exception as e:
+            logger.error(f"[VECTOR INDEX SAVE FAILED] {e}", exc_info=True)
+
+    def close(self):
+        """Persist the vector index so memories indexed since the last periodic save survive a restart."""
+        if self._pending_index_writes:
+            self.save_vector_index()
 
     def search_related_contexts(self, text: str, similarity_threshold: float = 0.7, top_n: int = 20) -> List[Dict]:
         """
@@ -30,36 +276,28 @@ class ContextSearchEngine:
         :return: List of dictionaries with related memories and their similarity scores.
         """
         try:
-            # First, get potentially related contexts via full-text search
-            query = """
-            CALL db.index.fulltext.queryNodes('memoryIndex', $text)
-            YIELD node, score
-            RETURN node.text AS Memory, node.weight AS Weight, score
-            ORDER BY score DESC LIMIT 100  # Fetch more to filter with embeddings
-            """
-            results = self.db.run_query(query, {"text": text.lower()})
+            self.ensure_vector_index()
 
-            if not results:
+            input_embedding = self.embeddings.encode(text.lower())
+            neighbours = self.vector_index.search(input_embedding, k=top_n, min_score=similarity_threshold)
+
+            if not neighbours:
                 logger.info(f"[CONTEXT SEARCH] No memories found for '{text}'")
                 return []
 
-            input_embedding = self.embedding_model.encode(text.lower(), convert_to_tensor=True)
-            filtered_results = []
-            for record in results:
-                memory_text = record["Memory"]
-                memory_embedding = self.embedding_model.encode(memory_text.lower(), convert_to_tensor=True)
-                similarity_score = util.cos_sim(input_embedding, memory_embedding).item()
-
-                if similarity_score >= similarity_threshold:
-                    filtered_results.append({
-                        "memory": memory_text,
-                        "weight": record["Weight"],
-                        "similarity": round(similarity_score, 4)  # More precision for similarity
-                    })
+            weights = {
+                record["Memory"]: record["Weight"]
+                for record in self.db.read_query(self.MEMORY_WEIGHTS_QUERY, {"texts": [memory_text for memory_text, _ in neighbours]})
+            }
 
-            # Sort by similarity and limit to top_n
-            sorted_results = sorted(filtered_results, key=lambda x: x['similarity'], reverse=True)
-            final_results = sorted_results[:top_n]
+            final_results = [
+                {
+                    "memory": memory_text,
+                    "weight": weights.get(memory_text),
+                    "similarity": round(similarity_score, 4)  # More precision for similarity
+                }
+                for memory_text, similarity_score in neighbours
+            ]
 
             logger.info(f"[CONTEXT SEARCH] Found {len(final_results)} relevant contexts.")
             return final_results
@@ -67,15 +305,41 @@ class ContextSearchEngine:
             logger.error(f"[SEARCH FAILED] {e}", exc_info=True)
             return []
 
-    def search_related(self, text: str) -> List[Dict]:
+    @property
+    def retriever(self) -> HybridRetriever:
+        """Hybrid full-text and vector retriever over this engine's vector index, created on first use."""
+        if self._retriever is None:
+            self._retriever = HybridRetriever(self.db, self)
+        return self._retriever
+
+    def retrieve(self, query: str, k: int = 10, filters: Optional[Dict] = None, **floors) -> List[Dict]:
         """
-        Wrapper for `search_related_contexts` to align with ConversationEngine calls.
+        Retrieve memories by fusing full-text and vector candidates, see `HybridRetriever.retrieve`.
+
+        :param query: Query text.
+        :param k: Number of memories to return.
+        :param filters: Optional {"emotion": name, "theme": name} restrictions.
+        :param floors: Optional `min_similarity` / `min_text_score` cut-offs applied before fusion.
+        :return: Memory dictionaries, best first.
         """
-        return self.search_related_contexts(text)
+        return self.retriever.retrieve(query, k, filters, **floors)
+
+    def search_related(self, text: str, similarity_threshold: float = 0.7, top_n: int = 20) -> List[Dict]:
+        """
+        Hybrid retrieval in the `search_related_contexts` result shape, for ConversationEngine calls.
+
+        Every memory returned is at least `similarity_threshold` similar to the text, whichever generator found it.
+        """
+        return [
+            {"memory": result["text"], "weight": result["weight"], "similarity": result["similarity"]}
+            for result in self.retrieve(text, k=top_n, min_similarity=similarity_threshold)
+        ]
 
     def create_dynamic_links(self, source_text: str, related_memories: List[Dict], link_type: str = "RELATED_TO"):
         """
         Create dynamic relationships in the graph database based on contextual matching.
+        Only existing memories are linked; a related text with no Memory node is skipped rather than
+        created without its day and theme rollups.
 
         :param source_text: The source memory text.
         :param related_memories: List of dictionaries containing related memory texts.
@@ -85,7 +349,7 @@ class ContextSearchEngine:
             for memory in related_memories:
                 query = f"""
                 MATCH (s:Memory {{text: $source_text}})
-                MERGE (r:Memory {{text: $related_text}})
+                MATCH (r:Memory {{text: $related_text}})
                 MERGE (s)-[:{link_type} {{similarity: $similarity}}]->(r)
                 """
                 self.db.run_query(query, {
@@ -97,71 +361,84 @@ class ContextSearchEngine:
         except Exception as e:
             logger.error(f"[LINK CREATION FAILED] {e}", exc_info=True)
 
-    def advanced_context_matching(self, input_text: str, similarity_threshold: float = 0.7) -> List[Dict]:
+    def advanced_context_matching(self, input_text: str, similarity_threshold: float = 0.7, top_n: int = 100) -> List[Dict]:
         """
         Match contexts using semantic embeddings and deeper similarity thresholds.
 
+        Memories are scored against the memory-mapped embedding matrix, so only the input text is encoded.
+        The matrix is topped up off the query path by `append_to_embedding_matrix`; rows appended or
+        tombstoned by other processes are picked up by the search itself.
+
         :param input_text: Text to match against the graph.
         :param similarity_threshold: Minimum similarity score for matching.
+        :param top_n: Maximum number of matches to return.
         :return: List of matching contexts.
         """
         try:
-            input_embedding = self.embedding_model.encode(input_text, convert_to_tensor=True)
-            query = """
-            MATCH (m:Memory)
-            RETURN m.text AS text
-            """
-            matches = self.db.run_query(query)
-            
-            scored_matches = []
-            for match in matches:
-                match_embedding = self.embedding_model.encode(match["text"], convert_to_tensor=True)
-                score = util.cos_sim(input_embedding, match_embedding).item()
-                if score > similarity_threshold:
-                    scored_matches.append({
-                        "text": match["text"],
-                        "score": round(score, 4)
-                    })
-
-            # Sort matches by score to show most relevant first
-            sorted_matches = sorted(scored_matches, key=lambda x: x['score'], reverse=True)
+            input_embedding = self.embeddings.encode(input_text.lower())
+            sorted_matches = [
+                {"text": text, "score": round(score, 4)}
+                for text, score in self.embedding_matrix.search(input_embedding, k=top_n, min_score=similarity_threshold)
+            ]
             logger.info(f"[ADVANCED MATCHING] Found {len(sorted_matches)} matches above threshold {similarity_threshold}.")
             return sorted_matches
         except Exception as e:
             logger.error(f"[MATCHING ERROR] {e}", exc_info=True)
             return []
 
-    def thematic_context_search(self, theme: str, similarity_threshold: float = 0.6) -> List[Dict]:
+    def update_theme_centroids(self, texts: List[str]):
+        """
+        Fold stored or re-themed memories into their theme centroids. Registered as a MemoryEngine store listener.
+
+        :param texts: Stored memory texts.
+        """
+        self.theme_centroids.update(texts)
+
+    def retire_theme_members(self, tx, texts: List[str]) -> int:
+        """
+        Take memories about to be deleted or merged away out of their theme centroids, inside the caller's
+        transaction. Pair with `remove_memories` once the transaction has committed.
+
+        :param tx: Open write transaction.
+        :param texts: Texts of the memories being removed.
+        :return: Number of memories taken out of a centroid.
+        """
+        return self.theme_centroids.retire(tx, texts)
+
+    def build_theme_centroids(self) -> int:
+        """
+        Fold every memory not yet in a theme centroid, e.g. memories stored before centroids were maintained.
+
+        :return: Number of memories scored.
+        """
+        texts = [memory["text"] for memory in self.db.read_query(self.MEMORY_TEXTS_QUERY)]
+        scored = self.theme_centroids.update(texts)
+        self.theme_centroids.rescore_pending()
+        return scored
+
+    def thematic_context_search(self, theme: str, similarity_threshold: float = 0.6, limit: int = 100) -> List[Dict]:
         """
         Search for contexts related to a specific theme.
 
+        Similarity to the theme is the stored cosine similarity between a memory and its theme's centroid,
+        so the search is an indexed read without any encoding.
+
         :param theme: The theme to search for.
         :param similarity_threshold: Minimum similarity score for thematic relevance.
-        :return: List of contexts related to the theme.
+        :param limit: Maximum number of contexts to return.
+        :return: List of contexts related to the theme, most similar first.
         """
         try:
-            # Assuming themes are stored in a property of Memory nodes
-            query = f"""
-            MATCH (m:Memory)-[:THEME_OF]->(t:Theme {{name: '{theme.lower()}'}})
-            RETURN m.text AS text
-            """
-            memories = self.db.run_query(query)
-
-            if not memories:
+            thematic_contexts = self.db.read_query(self.THEMATIC_SEARCH_QUERY, {
+                "theme": theme.lower(),
+                "threshold": similarity_threshold,
+                "limit": limit,
+            })
+
+            if not thematic_contexts:
                 logger.info(f"[THEMATIC SEARCH] No memories found for theme '{theme}'")
                 return []
 
-            theme_embedding = self.embedding_model.encode(theme.lower(), convert_to_tensor=True)
-            thematic_contexts = []
-            for memory in memories:
-                memory_embedding = self.embedding_model.encode(memory["text"].lower(), convert_to_tensor=True)
-                similarity = util.cos_sim(theme_embedding, memory_embedding).item()
-                if similarity >= similarity_threshold:
-                    thematic_contexts.append({
-                        "text": memory["text"],
-                        "similarity_to_theme": round(similarity, 4)
-                    })
-
             logger.info(f"[THEMATIC SEARCH] Found {len(thematic_contexts)} contexts for theme '{theme}'.")
             return thematic_contexts
         except Exception as e:
@@ -172,25 +449,22 @@ class ContextSearchEngine:
         """
         Analyze how contexts evolve over time within a specified date range and optional theme.
 
+        Counts come from the Day rollups maintained by MemoryEngine on write, so the query reads one row
+        per day in the range rather than every memory in it.
+
         :param start_date: Start date for analysis in 'YYYY-MM-DD' format.
         :param end_date: End date for analysis in 'YYYY-MM-DD' format.
         :param theme: Optional theme to filter contexts by
         :return: Dictionary summarizing context evolution.
         """
         try:
-            dates_query = f"""
-            MATCH (m:Memory)
-            WHERE m.created_at >= datetime($start_date) AND m.created_at <= datetime($end_date)
-            """
-            theme_query = f" AND '{theme.lower()}' IN m.theme" if theme else ""
-            query = f"""
-            {dates_query}
-            {theme_query}
-            RETURN m.text AS text, m.created_at AS date, m.theme AS theme
-            ORDER BY m.created_at
-            """
-
-            results = self.db.run_query(query, {"start_date": start_date, "end_date": end_date})
+            # Day dates are ISO strings, so the inclusive end date becomes an exclusive next-day bound
+            end_exclusive = (date.fromisoformat(end_date) + timedelta(days=1)).isoformat()
+            results = self.db.read_query(self.CONTEXT_EVOLUTION_QUERY, {
+                "start_date": start_date,
+                "end_date": end_exclusive,
+                "theme": theme.lower() if theme else None,
+            })
 
             if not results:
                 logger.info(f"[CONTEXT EVOLUTION] No contexts found for the given date range and theme.")
@@ -198,23 +472,16 @@ class ContextSearchEngine:
 
             # Analyze evolution
             evolution = {
-                "total_contexts": len(results),
+                "total_contexts": sum(result['count'] for result in results),
                 "themes": {},
-                "dates": {}
+                "dates": {result['date']: result['count'] for result in results}
             }
 
             for result in results:
-                date_str = result['date'].strftime('%Y-%m-%d')
-                if result['theme']:
-                    for theme in result['theme'].split(','):
-                        theme = theme.strip().lower()
-                        if theme not in evolution['themes']:
-                            evolution['themes'][theme] = 0
-                        evolution['themes'][theme] += 1
-
-                if date_str not in evolution['dates']:
-                    evolution['dates'][date_str] = 0
-                evolution['dates'][date_str] += 1
+                for entry in result['themes']:
+                    for name in entry['theme'].split(','):
+                        name = name.strip().lower()
+                        evolution['themes'][name] = evolution['themes'].get(name, 0) + entry['count']
 
             logger.info(f"[CONTEXT EVOLUTION] Analyzed {evolution['total_contexts']} contexts.")
             return evolution
@@ -222,49 +489,119 @@ class ContextSearchEngine:
             logger.error(f"[CONTEXT EVOLUTION ERROR] {e}", exc_info=True)
             return {"error": "An error occurred during context evolution analysis."}
 
-    def multi_modal_search(self, text: str, image_embedding: Union[List[float], np.ndarray] = None) -> List[Dict]:
+    @property
+    def image_model(self):
+        """Shared CLIP model for image embeddings, loaded on first use by the model registry."""
+        return model_registry.sentence_transformer(self.IMAGE_MODEL_ID)
+
+    def embed_image(self, image_path: str) -> np.ndarray:
+        """
+        Compute the CLIP embedding of an image file.
+
+        :param image_path: Path to the image.
+        :return: Image embedding.
+        """
+        from PIL import Image  # type: ignore
+        with Image.open(image_path) as image:
+            return np.asarray(self.image_model.encode(image.convert("RGB")), dtype=np.float32)
+
+    def build_image_index(self) -> int:
+        """
+        (Re)build the image vector index from the stored image embeddings of the current image model.
+
+        :return: Number of memories indexed.
+        """
+        try:
+            rows = self.db.read_query(self.IMAGE_EMBEDDINGS_QUERY, {"model": self.IMAGE_MODEL_ID})
+            if rows:
+                self.image_index.add_batch([row["text"] for row in rows], np.array([row["image_embedding"] for row in rows]))
+            self._image_index_built = True
+            logger.info(f"[IMAGE INDEX] Indexed {len(rows)} image embeddings.")
+            return len(rows)
+        except Exception as e:
+            logger.error(f"[IMAGE INDEX BUILD FAILED] {e}", exc_info=True)
+            return 0
+
+    def store_image_embedding(self, text: str, image_embedding: Union[List[float], np.ndarray]) -> bool:
+        """
+        Persist an image embedding on a memory and add it to the image index. Called once per upload.
+
+        :param text: Stored (sanitized) text of the memory the image belongs to.
+        :param image_embedding: Embedding from `embed_image`.
+        :return: True if the memory exists and was updated.
+        """
+        embedding = np.asarray(image_embedding, dtype=np.float32)
+        try:
+            result = self.db.write_query(self.STORE_IMAGE_EMBEDDING_QUERY, {
+                "text": text,
+                "embedding": embedding.tolist(),
+                "model": self.IMAGE_MODEL_ID,
+            })
+            if not result or not result[0]["updated"]:
+                return False
+            self.image_index.add(text, embedding)
+            return True
+        except Exception as e:
+            logger.error(f"[IMAGE EMBEDDING STORE FAILED] {e}", exc_info=True)
+            return False
+
+    def multi_modal_search(self, text: str, image_embedding: Union[List[float], np.ndarray] = None, top_n: int = 20,
+                           text_weight: float = 0.5, image_weight: float = 0.5, min_score: float = 0.7) -> List[Dict]:
         """
         Perform a search combining text and potential image embeddings for more nuanced context matching.
 
+        The text and image indexes are probed separately for their top-n, and every candidate from either
+        probe gets a weighted mean of its text and image similarity, looked up exactly from the stored
+        vectors. The weights are renormalized over the modalities a memory actually has, so a memory
+        without an image is scored on its text similarity alone rather than capped by the missing image.
+
         :param text: Text to search for.
         :param image_embedding: Optional image embedding for multi-modal search.
-        :return: List of matched contexts with scores.
+        :param top_n: Candidates taken from each index.
+        :param text_weight: Weight of the text similarity.
+        :param image_weight: Weight of the image similarity.
+        :param min_score: Minimum fused score for a match.
+        :return: List of matched contexts with scores; `image_score` is None for memories without an image.
         """
         try:
-            text_embedding = self.embedding_model.encode(text, convert_to_tensor=True)
-            
-            # Combine text and image embeddings if image_embedding is provided
-            if image_embedding is not None:
-                if isinstance(image_embedding, list):
-                    image_embedding = np.array(image_embedding)
-                combined_embedding = np.concatenate([text_embedding.cpu().numpy(), image_embedding])
-
-                query = """
-                MATCH (m:Memory)
-                RETURN m.text AS text, m.image_embedding AS image_embedding
-                """
-                matches = self.db.run_query(query)
-
-                scored_matches = []
-                for match in matches:
-                    # Assuming image_embedding in Neo4j is stored as a list for compatibility with numpy array
-                    memory_embedding = np.concatenate([
-                        self.embedding_model.encode(match["text"], convert_to_tensor=True).cpu().numpy(),
-                        np.array(match["image_embedding"]) if match["image_embedding"] else np.zeros_like(image_embedding)
-                    ])
-                    score = util.cos_sim(torch.tensor([combined_embedding]), torch.tensor([memory_embedding])).item()
-                    if score > 0.7:  # Adjust threshold as needed
-                        scored_matches.append({
-                            "text": match["text"],
-                            "score": round(score, 4)
-                        })
-
-            else:
+            if image_embedding is None:
                 # Fallback to text-only search if no image embedding provided
                 scored_matches = self.advanced_context_matching(text)
+                logger.info(f"[MULTI-MODAL SEARCH] Found {len(scored_matches)} matches.")
+                return scored_matches
+
+            self.ensure_vector_index()
+            if not self._image_index_built:
+                self.build_image_index()
+
+            text_query = VectorIndex._normalize(self.embeddings.encode(text.lower()))[0]
+            image_query = VectorIndex._normalize(np.asarray(image_embedding, dtype=np.float32))[0]
+            candidates = {key for key, _ in self.vector_index.search(text_query, k=top_n)}
+            candidates.update(key for key, _ in self.image_index.search(image_query, k=top_n))
+
+            text_vectors = self.vector_index.vectors(candidates)
+            image_vectors = self.image_index.vectors(candidates)
+            scored_matches = []
+            for key in candidates:
+                text_score = float(text_vectors[key] @ text_query) if key in text_vectors else None
+                image_score = float(image_vectors[key] @ image_query) if key in image_vectors else None
+                weighted = [(weight, modality_score) for weight, modality_score in
+                            ((text_weight, text_score), (image_weight, image_score)) if modality_score is not None]
+                total_weight = sum(weight for weight, _ in weighted)
+                if not total_weight:
+                    continue
+                score = sum(weight * modality_score for weight, modality_score in weighted) / total_weight
+                if score > min_score:
+                    scored_matches.append({
+                        "text": key,
+                        "score": round(score, 4),
+                        "text_score": round(text_score, 4) if text_score is not None else None,
+                        "image_score": round(image_score, 4) if image_score is not None else None,
+                    })
+            scored_matches.sort(key=lambda match: match["score"], reverse=True)
 
             logger.info(f"[MULTI-MODAL SEARCH] Found {len(scored_matches)} matches.")
             return scored_matches
         except Exception as e:
             logger.error(f"[MULTI-MODAL SEARCH ERROR] {e}", exc_info=True)
-            return []
\ No newline at end of file
+            return []
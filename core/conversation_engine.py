@@ -3,9 +3,11 @@ from core.context_search import ContextSearchEngine
 from core.memory_engine import MemoryEngine
 from core.collaborative_learning import CollaborativeLearning
 from core.semantic_builder import SemanticBuilder
-from sentence_transformers import SentenceTransformer, InputExample, losses # type: ignore
+from core.model_registry import model_registry
+from sentence_transformers import InputExample, losses # type: ignore
 from torch.utils.data import DataLoader
 from typing import List
+import copy
 import logging
 import os
 
@@ -15,6 +17,8 @@ logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class ConversationEngine:
+    MODEL_ID = 'sentence-transformers/all-MiniLM-L6-v2'
+
     def __init__(self, memory_engine: MemoryEngine, response_generator: ResponseGenerator,
                  context_search: ContextSearchEngine):
         """
@@ -29,14 +33,19 @@ class ConversationEngine:
         self.context_search = context_search
         self.collaborative_learning = CollaborativeLearning(self)
         self.semantic_builder = SemanticBuilder(memory_engine.db)
-        self.model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
-        
-        # Save initial model state
+        self.memory_engine.add_store_listener(self.semantic_builder.update_narrative_shifts)
+
+        # Save initial model state unless a checkpoint already exists
         model_directory = os.path.join(os.getcwd(), "model_checkpoint")
-        if not os.path.exists(model_directory):
-            os.makedirs(model_directory)
-        self.model.save(model_directory)
-        logger.info(f"[MODEL INIT] Initial model state saved to {model_directory}")
+        if not os.path.exists(os.path.join(model_directory, "modules.json")):
+            os.makedirs(model_directory, exist_ok=True)
+            self.model.save(model_directory)
+            logger.info(f"[MODEL INIT] Initial model state saved to {model_directory}")
+
+    @property
+    def model(self):
+        """Shared sentence embedding model, loaded on first use by the model registry."""
+        return model_registry.sentence_transformer(self.MODEL_ID)
 
     def process_user_input(self, user_input: str) -> str:
         """
@@ -103,9 +112,10 @@ class ConversationEngine:
         :param user_input: The user's query to explore.
         :return: A fallback response string.
         """
-        semantic_exploration = self.semantic_builder.detect_narrative_shifts()
+        semantic_exploration = self.semantic_builder.detect_narrative_shifts(limit=3)
         if semantic_exploration:
-            response = f"I couldn't find a direct match for your query, but I've noticed recent shifts in our conversation: {', '.join(semantic_exploration)}. Would you like to explore these themes?"
+            shifts = ', '.join(shift["description"] for shift in semantic_exploration)
+            response = f"I couldn't find a direct match for your query, but I've noticed recent shifts in our conversation: {shifts} Would you like to explore these themes?"
         else:
             response = "I'm sorry, I couldn't find anything related to your query. Can you provide more context or ask in a different way?"
         return response
@@ -140,11 +150,14 @@ class ConversationEngine:
             # DataLoader for batching
             train_dataloader = DataLoader(train_examples, shuffle=True, batch_size=16)
             
+            # Fine-tune a private copy so the shared registry model (and embeddings cached for it) stay unchanged
+            model = copy.deepcopy(self.model)
+
             # Loss function
-            train_loss = losses.CosineSimilarityLoss(self.model)
+            train_loss = losses.CosineSimilarityLoss(model)
 
             # Training loop
-            self.model.fit(
+            model.fit(
                 train_objectives=[(train_dataloader, train_loss)],
                 epochs=1,  # You might want to adjust this based on how much you want to update per session
                 warmup_steps=100,
@@ -153,6 +166,6 @@ class ConversationEngine:
             )
 
             logger.info(f"[MODEL UPDATE] Model updated with {len(new_conversations)} new inputs")
-            self.memory_engine.store_bulk_memories(new_conversations, ["learning"])
+            self.memory_engine.store_memories([{"text": text, "emotions": ["learning"]} for text in new_conversations])
         except Exception as e:
             logger.error(f"[MODEL UPDATE ERROR] {e}", exc_info=True)
\ No newline at end of file
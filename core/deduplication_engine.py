@@ -4,13 +4,19 @@ from neo4j import GraphDatabase
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import logging
-from typing import List, Tuple
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from core.graph_algorithms import UnionFind
+from core.minhash_lsh import MinHashLSH, jaccard, shingles
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class DeduplicationEngine:
+    IDENTIFIER_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
     def __init__(self, uri: str, user: str, password: str):
         """
         Initialize the DeduplicationEngine with Neo4j connection details.
@@ -50,46 +56,242 @@ class DeduplicationEngine:
             logger.error(f"Error finding duplicates: {e}")
             raise
 
-    def merge_duplicates(self, duplicates: List[List[str]]):
+    def _identifier(self, name: str) -> str:
+        """Validate a label or property name before it is interpolated into Cypher."""
+        if not self.IDENTIFIER_PATTERN.match(name):
+            raise ValueError(f"Invalid label or property name: {name!r}")
+        return name
+
+    def iter_node_pages(self, label: str, key_property: str, text_property: str,
+                        page_size: int = 10000) -> Iterator[List[Tuple[str, str]]]:
+        """
+        Stream (key, text) pairs of all nodes with a label, in key order, one page at a time.
+
+        Keyset pagination on the key property keeps each read bounded and lets it use the property index.
+
+        :param label: Node label to read.
+        :param key_property: Unique property identifying a node (e.g. id, or text for Memory nodes).
+        :param text_property: Property compared for duplicates.
+        :param page_size: Nodes per page.
+        """
+        label, key, text = (self._identifier(name) for name in (label, key_property, text_property))
+        query = f"""
+        MATCH (n:{label})
+        WHERE ($after IS NULL OR n.{key} > $after) AND n.{text} IS NOT NULL
+        RETURN n.{key} AS key, n.{text} AS text
+        ORDER BY n.{key}
+        LIMIT $limit
+        """
+        after = None
+        with self.driver.session() as session:
+            while True:
+                page = [(record["key"], record["text"]) for record in session.run(query, after=after, limit=page_size)]
+                if not page:
+                    return
+                yield page
+                if len(page) < page_size:
+                    return
+                after = page[-1][0]
+
+    def fetch_texts(self, label: str, key_property: str, text_property: str, keys: List[str]) -> Dict[str, str]:
+        """Read the compared property of the given nodes, keyed by node key."""
+        label, key, text = (self._identifier(name) for name in (label, key_property, text_property))
+        query = f"""
+        UNWIND $keys AS key
+        MATCH (n:{label} {{{key}: key}})
+        RETURN n.{key} AS key, n.{text} AS text
+        """
+        with self.driver.session() as session:
+            return {record["key"]: record["text"] for record in session.run(query, keys=keys)}
+
+    def iter_duplicate_groups(self, label: str = "Emotion", key_property: str = "id", text_property: str = "description",
+                              threshold: float = 0.8, num_perm: int = 128, bands: int = 16, shingle_size: int = 5,
+                              page_size: int = 10000, verify_batch_size: int = 5000,
+                              max_bucket_size: int = 100) -> Iterator[List[str]]:
+        """
+        Find near-duplicate nodes with MinHash LSH and stream them as groups.
+
+        Nodes are read page by page and reduced to `bands` band hashes each, so memory grows with the node
+        count rather than its square. Nodes sharing a band bucket are candidates; only candidates are
+        re-read and verified with exact shingle Jaccard similarity. Each group is a node key followed by
+        the keys verified as its duplicates; groups may overlap, see `close_groups`.
+
+        :param label: Node label to deduplicate.
+        :param key_property: Unique property identifying a node.
+        :param text_property: Property compared for duplicates.
+        :param threshold: Minimum exact Jaccard similarity of the shingle sets.
+        :param num_perm: MinHash signature length.
+        :param bands: LSH bands; more bands find lower-similarity candidates at the cost of more verification.
+        :param shingle_size: Character shingle length.
+        :param page_size: Nodes read per query while hashing.
+        :param verify_batch_size: Candidate pairs verified per text read.
+        :param max_bucket_size: Largest bucket expanded into all of its pairs.
+        """
+        lsh = MinHashLSH(num_perm=num_perm, bands=bands, shingle_size=shingle_size)
+        keys: List[str] = []
+        hashes: List[np.ndarray] = []
+        for page in self.iter_node_pages(label, key_property, text_property, page_size):
+            keys.extend(key for key, _ in page)
+            hashes.append(lsh.band_hashes([text for _, text in page]))
+        if not keys:
+            logger.info(f"No {label} nodes with a {text_property} to deduplicate.")
+            return
+
+        candidates = sorted(lsh.candidate_pairs(np.concatenate(hashes), max_bucket_size))
+        del hashes
+        logger.info(f"Hashed {len(keys)} {label} nodes; {len(candidates)} candidate pairs to verify "
+                    f"(LSH threshold ~{lsh.threshold:.2f}).")
+
+        position = 0
+        while position < len(candidates):
+            # Extend each batch to the end of its last anchor so every group is verified in one piece
+            end = min(position + verify_batch_size, len(candidates))
+            while end < len(candidates) and candidates[end][0] == candidates[end - 1][0]:
+                end += 1
+            batch, position = candidates[position:end], end
+
+            needed = sorted({i for pair in batch for i in pair})
+            texts = self.fetch_texts(label, key_property, text_property, [keys[i] for i in needed])
+            shingle_sets = {i: shingles(texts[keys[i]], shingle_size) for i in needed if keys[i] in texts}
+
+            anchor, members = None, []
+            for i, j in batch + [(None, None)]:
+                if i != anchor:
+                    if len(members) > 1:
+                        yield [keys[member] for member in members]
+                    anchor, members = i, [i]
+                if i is None or i not in shingle_sets or j not in shingle_sets:
+                    continue
+                if jaccard(shingle_sets[i], shingle_sets[j]) >= threshold:
+                    members.append(j)
+
+    @staticmethod
+    def close_groups(duplicates: Iterable[List[str]]) -> List[List[str]]:
+        """
+        Close overlapping duplicate groups transitively: groups sharing a node become one group.
+
+        :return: Disjoint groups of at least two keys, each sorted so its first key is a stable merge target.
+        """
+        union_find = UnionFind()
+        for group in duplicates:
+            for key in group:
+                union_find.union(group[0], key)
+        return union_find.groups(min_size=2)
+
+    def merge_duplicates(self, duplicates: Iterable[List[str]], label: Optional[str] = None, key_property: str = "id",
+                         batch_size: int = 100, progress: Optional[Callable[[int, int], None]] = None,
+                         on_removed: Optional[Callable[[List[str]], None]] = None,
+                         on_removing: Optional[Callable[[Any, List[str]], None]] = None) -> int:
         """
         Merge duplicate nodes into one.
 
-        :param duplicates: List of lists where each inner list contains IDs of nodes to be merged.
+        Groups are first closed transitively, so every node is merged exactly once. Each group is merged
+        with a single apoc.refactor.mergeNodes call into its first key, and `batch_size` groups share one
+        write transaction.
+
+        :param duplicates: Lists of node keys to be merged; groups may overlap.
+        :param label: Label of the nodes, so they are matched through its index instead of a full scan.
+        :param key_property: Property holding the keys in `duplicates`.
+        :param batch_size: Groups merged per transaction.
+        :param progress: Called with (groups merged, total groups) after each committed batch.
+        :param on_removed: Called with the keys of the nodes merged away after each committed batch,
+                           so caches such as the memory embedding matrix can drop them.
+        :param on_removing: Called inside each merge transaction, before the merge, with the transaction and
+                            the keys of the nodes about to be merged away, so counters derived from them
+                            (e.g. memory rollups and theme centroids) are corrected in the same commit.
+        :return: Number of groups merged.
+        """
+        label_clause = f":{self._identifier(label)}" if label else ""
+        key = self._identifier(key_property)
+        groups_clause = f"""
+        UNWIND $groups AS group
+        CALL {{
+            WITH group
+            UNWIND range(0, size(group) - 1) AS i
+            MATCH (n{label_clause} {{{key}: group[i]}})
+            WITH i, n
+            ORDER BY i
+            RETURN collect(n) AS nodes
+        }}
+        WITH nodes
+        WHERE size(nodes) > 1
+        WITH nodes, [n IN tail(nodes) | n.{key}] AS removed
+        """
+        removing_query = groups_clause + """
+        RETURN collect(removed) AS removed
         """
+        merge_query = groups_clause + """
+        CALL apoc.refactor.mergeNodes(nodes) YIELD node
+        RETURN count(node) AS merged, collect(removed) AS removed
+        """
+
+        def merge_batch(tx, groups):
+            if on_removing:
+                removing = tx.run(removing_query, groups=groups).single()
+                keys = [key for removed in removing["removed"] for key in removed]
+                if keys:
+                    on_removing(tx, keys)
+            record = tx.run(merge_query, groups=groups).single()
+            return record["merged"], [key for removed in record["removed"] for key in removed]
+
+        groups = self.close_groups(duplicates)
+        merged = 0
         try:
             with self.driver.session() as session:
-                for duplicate_group in duplicates:
-                    if len(duplicate_group) < 2:  # Skip if there's only one node
-                        continue
-                    base_node = duplicate_group[0]
-                    for duplicate in duplicate_group[1:]:
-                        merge_query = f"""
-                        MATCH (n1), (n2)
-                        WHERE n1.id = '{base_node}' AND n2.id = '{duplicate}'
-                        WITH n1, n2
-                        CALL apoc.refactor.mergeNodes([n1, n2]) YIELD node
-                        RETURN node
-                        """
-                        session.run(merge_query)
-                        logger.info(f"Merged node {duplicate} into {base_node}")
+                for start in range(0, len(groups), batch_size):
+                    batch = groups[start:start + batch_size]
+                    batch_merged, removed = session.execute_write(merge_batch, batch)
+                    merged += batch_merged
+                    done = start + len(batch)
+                    logger.info(f"Merged {done}/{len(groups)} duplicate groups "
+                                f"({sum(len(group) - 1 for group in batch)} nodes in this batch).")
+                    if progress:
+                        progress(done, len(groups))
+                    if on_removed and removed:
+                        on_removed(removed)
+            return merged
         except Exception as e:
             logger.error(f"Error merging duplicates: {e}")
             raise
 
-    def deduplicate(self, label: str = "Emotion"):
+    def deduplicate(self, label: str = "Emotion", method: str = "tfidf", key_property: str = "id",
+                    text_property: str = "description", batch_size: int = 100,
+                    progress: Optional[Callable[[int, int], None]] = None,
+                    on_removed: Optional[Callable[[List[str]], None]] = None,
+                    on_removing: Optional[Callable[[Any, List[str]], None]] = None, **lsh_options) -> int:
         """
         Perform deduplication by finding and merging nodes based on description similarity.
 
         :param label: The label of nodes to deduplicate.
+        :param method: "tfidf" compares every pair in an in-memory similarity matrix (small labels only);
+                       "lsh" finds candidates with MinHash LSH and verifies only those.
+        :param key_property: Unique node property identifying a node.
+        :param text_property: Property compared for duplicates.
+        :param batch_size: Groups merged per transaction.
+        :param progress: Merge progress callback, see `merge_duplicates`.
+        :param on_removed: Callback for the keys of merged-away nodes, see `merge_duplicates`.
+        :param on_removing: In-transaction callback for the nodes about to be merged away, see `merge_duplicates`.
+        :param lsh_options: Extra arguments for `iter_duplicate_groups`.
+        :return: Number of groups merged.
         """
+        if method == "lsh":
+            try:
+                duplicates = self.iter_duplicate_groups(label, key_property, text_property, **lsh_options)
+                return self.merge_duplicates(duplicates, label, key_property, batch_size, progress, on_removed, on_removing)
+            except Exception as e:
+                logger.error(f"Error during LSH deduplication process: {e}")
+                raise
+        if method != "tfidf":
+            raise ValueError(f"Unknown deduplication method: {method}")
+
         try:
-            nodes = self.find_duplicates(label)
-            descriptions = [desc for _, _, desc in nodes if desc]  # Filter out nodes without descriptions
-            if not descriptions:
-                logger.info("No descriptions found for deduplication.")
-                return
+            nodes = [(key, text) for page in self.iter_node_pages(label, key_property, text_property)
+                     for key, text in page if text]
+            if not nodes:
+                logger.info(f"No {label} nodes with a {text_property} to deduplicate.")
+                return 0
 
-            vectorizer = TfidfVectorizer().fit_transform(descriptions)
+            vectorizer = TfidfVectorizer().fit_transform([text for _, text in nodes])
             similarity_matrix = cosine_similarity(vectorizer)
             duplicates = []
             for idx, row in enumerate(similarity_matrix):
@@ -97,8 +299,8 @@ class DeduplicationEngine:
                 if similar_nodes:
                     duplicates.append([nodes[idx][0]] + similar_nodes)
 
-            logger.info(f"Identified {len(duplicates)} groups of duplicates to merge.")
-            self.merge_duplicates(duplicates)
+            logger.info(f"Identified {len(duplicates)} overlapping groups of duplicates to merge.")
+            return self.merge_duplicates(duplicates, label, key_property, batch_size, progress, on_removed, on_removing)
         except Exception as e:
             logger.error(f"Error during deduplication process: {e}")
             raise
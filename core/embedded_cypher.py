@@ -0,0 +1,2039 @@
+# Filename: /core/embedded_cypher.py
+
+import logging
+import math
+import numbers
+import operator
+import random
+import re
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class NodeRef:
+    """A node bound to a query variable."""
+
+    __slots__ = ("id",)
+
+    def __init__(self, node_id: int):
+        self.id = node_id
+
+    def __eq__(self, other):
+        return isinstance(other, NodeRef) and other.id == self.id
+
+    def __hash__(self):
+        return hash(("node", self.id))
+
+class RelRef:
+    """A relationship bound to a query variable, identified by its endpoints and type."""
+
+    __slots__ = ("source", "type", "target")
+
+    def __init__(self, source: int, rel_type: str, target: int):
+        self.source, self.type, self.target = source, rel_type, target
+
+    def __eq__(self, other):
+        return (isinstance(other, RelRef) and other.source == self.source and other.type == self.type
+                and other.target == self.target)
+
+    def __hash__(self):
+        return hash((self.source, self.type, self.target))
+
+class _Context:
+    """Per-execution state: the store, the parameter map and, while projecting a group, its aggregate values."""
+
+    def __init__(self, store, params: Dict[str, Any]):
+        self.store = store
+        self.params = params
+        self.aggregates: Optional[Dict["_Aggregate", Any]] = None
+
+# --- Values ---
+
+def _is_number(value: Any) -> bool:
+    return type(value) in (int, float) or (isinstance(value, numbers.Real) and not isinstance(value, bool))
+
+def _import(value: Any) -> Any:
+    """Convert a parameter value to the plain Python types the interpreter works on, as the driver would."""
+    if isinstance(value, dict):
+        return {key: _import(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if type(value) is list and (not value or type(value[0]) in (str, int, float, bool)):
+            return value  # Homogeneous primitive lists, such as vectors, are used as given
+        return [_import(item) for item in value]
+    if hasattr(value, "tolist") and not isinstance(value, (str, bytes)):
+        return value.tolist()  # numpy arrays and scalars
+    return value
+
+def _property_value(value: Any) -> Any:
+    """Check and copy a value about to be stored as a property."""
+    if isinstance(value, list):
+        if any(isinstance(item, (dict, NodeRef, RelRef)) for item in value):
+            raise ValueError("Property values can only be of primitive types or arrays thereof")
+        return list(value)
+    if isinstance(value, (dict, NodeRef, RelRef)):
+        raise ValueError("Property values can only be of primitive types or arrays thereof")
+    return value
+
+def _export(value: Any, store) -> Any:
+    """Convert a result value the way the driver's `record.data()` does: nodes and relationships become property maps."""
+    if isinstance(value, NodeRef):
+        return _export(dict(store.nodes.get(value.id, {})), store)
+    if isinstance(value, RelRef):
+        return _export(dict(store.relationship(value.source, value.type, value.target) or {}), store)
+    if isinstance(value, list):
+        return [_export(item, store) for item in value]
+    if isinstance(value, dict):
+        return {key: _export(item, store) for key, item in value.items()}
+    return value
+
+def _equals(a: Any, b: Any) -> Optional[bool]:
+    """Cypher equality: null if either side is null, false across types."""
+    if a is None or b is None:
+        return None
+    if isinstance(a, bool) or isinstance(b, bool):
+        return isinstance(a, bool) and isinstance(b, bool) and a == b
+    if _is_number(a) and _is_number(b):
+        return a == b
+    if isinstance(a, list) and isinstance(b, list):
+        if len(a) != len(b):
+            return False
+        result: Optional[bool] = True
+        for x, y in zip(a, b):
+            equal = _equals(x, y)
+            if equal is False:
+                return False
+            if equal is None:
+                result = None
+        return result
+    if isinstance(a, dict) and isinstance(b, dict):
+        if a.keys() != b.keys():
+            return False
+        return all(_equals(a[key], b[key]) for key in a)
+    return type(a) is type(b) and a == b
+
+_COMPARISONS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+_FLIPPED = {"=": "=", "<": ">", "<=": ">=", ">": "<", ">=": "<="}
+
+def _compare(op: str, a: Any, b: Any) -> Optional[bool]:
+    if op == "=":
+        return _equals(a, b)
+    if op == "<>":
+        equal = _equals(a, b)
+        return None if equal is None else not equal
+    if a is None or b is None:
+        return None
+    if (_is_number(a) and _is_number(b)) or (isinstance(a, str) and isinstance(b, str)) \
+            or (isinstance(a, bool) and isinstance(b, bool)):
+        return _COMPARISONS[op](a, b)
+    return None  # Values of different types are not ordered against each other
+
+def _order_key(value: Any) -> Tuple:
+    """Sort key following Cypher's orderability: maps, nodes, relationships, lists, strings, booleans, numbers, null."""
+    if value is None:
+        return (9,)
+    if isinstance(value, bool):
+        return 6, value
+    if _is_number(value):
+        return (7, value) if not math.isnan(value) else (8,)
+    if isinstance(value, str):
+        return 5, value
+    if isinstance(value, list):
+        return 4, tuple(_order_key(item) for item in value)
+    if isinstance(value, RelRef):
+        return 2, (value.source, value.type, value.target)
+    if isinstance(value, NodeRef):
+        return 1, value.id
+    return 0, repr(value)
+
+def _hash_key(value: Any) -> Any:
+    """Hashable key under which equal Cypher values group together (for DISTINCT and grouping keys)."""
+    if isinstance(value, bool):
+        return "b", value
+    if isinstance(value, list):
+        return "l", tuple(_hash_key(item) for item in value)
+    if isinstance(value, dict):
+        return "m", tuple(sorted((key, _hash_key(item)) for key, item in value.items()))
+    return value
+
+def _property(value: Any, key: str, ctx: _Context) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, NodeRef):
+        node = ctx.store.nodes.get(value.id)
+        return None if node is None else node.get(key)
+    if isinstance(value, RelRef):
+        rel = ctx.store.relationship(value.source, value.type, value.target)
+        return None if rel is None else rel.get(key)
+    if isinstance(value, dict):
+        return value.get(key)
+    raise ValueError(f"Type mismatch: expected a map, node or relationship but was {type(value).__name__}")
+
+def _truth(value: Any) -> Optional[bool]:
+    if value is None or isinstance(value, bool):
+        return value
+    raise ValueError(f"Type mismatch: expected a boolean but was {type(value).__name__}")
+
+def _add(a: Any, b: Any) -> Any:
+    if a is None or b is None:
+        return None
+    if isinstance(a, list):
+        return a + (b if isinstance(b, list) else [b])
+    if isinstance(b, list):
+        return [a] + b
+    if isinstance(a, str) or isinstance(b, str):
+        return _to_string(a) + _to_string(b)
+    return _arithmetic("+", a, b)
+
+def _arithmetic(op: str, a: Any, b: Any) -> Any:
+    if a is None or b is None:
+        return None
+    if not (_is_number(a) and _is_number(b)):
+        raise ValueError(f"Type mismatch: cannot apply '{op}' to {type(a).__name__} and {type(b).__name__}")
+    if op == "+":
+        return a + b
+    if op == "-":
+        return a - b
+    if op == "*":
+        return a * b
+    if op == "^":
+        return float(a) ** b
+    integers = isinstance(a, int) and isinstance(b, int)
+    if b == 0:
+        if integers:
+            raise ValueError("/ by zero")
+        return math.nan if a == 0 or op == "%" else math.copysign(math.inf, a) * math.copysign(1, b)
+    if op == "/":
+        return int(a / b) if integers and abs(a) < 2 ** 53 else (abs(a) // abs(b)) * (1 if (a < 0) == (b < 0) else -1) if integers else a / b
+    return int(math.fmod(a, b)) if integers else math.fmod(a, b)
+
+def _to_string(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+# --- Functions ---
+
+def _null_safe(function: Callable) -> Callable:
+    def call(ctx, *args):
+        return None if any(arg is None for arg in args) else function(*args)
+    return call
+
+def _substring(text: str, start: int, length: Optional[int] = None) -> str:
+    return text[start:] if length is None else text[start:start + length]
+
+def _range(start: int, end: int, step: int = 1) -> List[int]:
+    return list(range(start, end + (1 if step > 0 else -1), step))
+
+def _to_integer(value: Any) -> Optional[int]:
+    try:
+        return int(float(value)) if isinstance(value, str) else int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _datetime(ctx, value: Any = None) -> Optional[str]:
+    """datetime() as an ISO-8601 string, which orders and compares like the temporal value it stands for."""
+    if value is None:
+        return datetime.now(timezone.utc).isoformat()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).isoformat()
+    raise ValueError(f"datetime() takes no argument or an ISO-8601 string, not {type(value).__name__}")
+
+def _labels(ctx, node):
+    if node is None:
+        return None
+    label = ctx.store.node_labels.get(node.id)
+    return [] if label is None else [label]
+
+FUNCTIONS: Dict[str, Callable] = {
+    "coalesce": lambda ctx, *args: next((arg for arg in args if arg is not None), None),
+    "substring": _null_safe(_substring),
+    "size": _null_safe(len),
+    "range": _null_safe(_range),
+    "sqrt": _null_safe(lambda x: math.sqrt(x) if x >= 0 else math.nan),
+    "abs": _null_safe(abs),
+    "round": _null_safe(lambda x: float(math.floor(x + 0.5))),
+    "floor": _null_safe(lambda x: float(math.floor(x))),
+    "ceil": _null_safe(lambda x: float(math.ceil(x))),
+    "exp": _null_safe(math.exp),
+    "log": _null_safe(lambda x: math.log(x) if x > 0 else math.nan),
+    "rand": lambda ctx: random.random(),
+    "tolower": _null_safe(str.lower),
+    "toupper": _null_safe(str.upper),
+    "trim": _null_safe(str.strip),
+    "replace": _null_safe(str.replace),
+    "split": _null_safe(lambda text, separator: text.split(separator)),
+    "tostring": _null_safe(_to_string),
+    "tointeger": _null_safe(_to_integer),
+    "tofloat": _null_safe(_to_float),
+    "head": _null_safe(lambda items: items[0] if items else None),
+    "last": _null_safe(lambda items: items[-1] if items else None),
+    "tail": _null_safe(lambda items: items[1:]),
+    "keys": lambda ctx, value: None if value is None else list(
+        ctx.store.nodes.get(value.id, {}) if isinstance(value, NodeRef) else value),
+    "exists": lambda ctx, value: value if isinstance(value, bool) else value is not None,
+    "id": _null_safe(lambda entity: entity.id),
+    "labels": _labels,
+    "type": _null_safe(lambda rel: rel.type),
+    "timestamp": lambda ctx: int(time.time() * 1000),
+    "datetime": _datetime,
+}
+
+AGGREGATES = {"count", "collect", "sum", "avg", "min", "max"}
+
+def _query_fulltext_nodes(ctx: _Context, index: str, text: str, options: Optional[Dict] = None) -> List[Dict[str, Any]]:
+    if text is None:
+        return []
+    return [{"node": NodeRef(node_id), "score": score} for node_id, score in ctx.store.fulltext_query(index, text)]
+
+PROCEDURES: Dict[str, Callable] = {
+    "db.index.fulltext.querynodes": _query_fulltext_nodes,
+}
+
+# --- Expressions ---
+
+class _Expr:
+    """Base expression node. `free` is the set of outer variables it reads, `aggregates` the aggregate calls in it."""
+
+    def eval(self, row: Dict[str, Any], ctx: _Context) -> Any:
+        raise NotImplementedError
+
+    def children(self) -> Sequence["_Expr"]:
+        return ()
+
+    def _free(self) -> Set[str]:
+        names: Set[str] = set()
+        for child in self.children():
+            names |= child.free
+        return names
+
+    @property
+    def free(self) -> Set[str]:
+        if "_free_cache" not in self.__dict__:
+            self._free_cache = self._free()
+        return self._free_cache
+
+    @property
+    def aggregates(self) -> List["_Aggregate"]:
+        if "_aggregates_cache" not in self.__dict__:
+            found = [self] if isinstance(self, _Aggregate) else []
+            for child in self.children():
+                found.extend(child.aggregates)
+            self._aggregates_cache = found
+        return self._aggregates_cache
+
+class _Literal(_Expr):
+    def __init__(self, value: Any):
+        self.value = value
+
+    def eval(self, row, ctx):
+        return self.value
+
+class _Param(_Expr):
+    def __init__(self, name: str):
+        self.name = name
+
+    def eval(self, row, ctx):
+        try:
+            return ctx.params[self.name]
+        except KeyError:
+            raise ValueError(f"Expected parameter(s): {self.name}") from None
+
+class _Var(_Expr):
+    def __init__(self, name: str):
+        self.name = name
+
+    def _free(self):
+        return {self.name}
+
+    def eval(self, row, ctx):
+        try:
+            return row[self.name]
+        except KeyError:
+            raise ValueError(f"Variable `{self.name}` not defined") from None
+
+class _Prop(_Expr):
+    def __init__(self, subject: _Expr, key: str):
+        self.subject, self.key = subject, key
+
+    def children(self):
+        return (self.subject,)
+
+    def eval(self, row, ctx):
+        return _property(self.subject.eval(row, ctx), self.key, ctx)
+
+    def of(self, var: str) -> bool:
+        """Whether this reads a property straight off variable `var`."""
+        return isinstance(self.subject, _Var) and self.subject.name == var
+
+class _Index(_Expr):
+    def __init__(self, subject: _Expr, index: _Expr):
+        self.subject, self.index = subject, index
+
+    def children(self):
+        return self.subject, self.index
+
+    def eval(self, row, ctx):
+        subject, index = self.subject.eval(row, ctx), self.index.eval(row, ctx)
+        if subject is None or index is None:
+            return None
+        if isinstance(subject, list):
+            return subject[index] if -len(subject) <= index < len(subject) else None
+        return _property(subject, index, ctx)
+
+class _Slice(_Expr):
+    def __init__(self, subject: _Expr, start: Optional[_Expr], end: Optional[_Expr]):
+        self.subject, self.start, self.end = subject, start, end
+
+    def children(self):
+        return [expr for expr in (self.subject, self.start, self.end) if expr is not None]
+
+    def eval(self, row, ctx):
+        subject = self.subject.eval(row, ctx)
+        start = self.start.eval(row, ctx) if self.start is not None else None
+        end = self.end.eval(row, ctx) if self.end is not None else None
+        if subject is None or (self.start is not None and start is None) or (self.end is not None and end is None):
+            return None
+        return subject[start:end]
+
+class _Call(_Expr):
+    def __init__(self, name: str, args: List[_Expr]):
+        self.name, self.args = name, args
+        self.function = FUNCTIONS[name]
+
+    def children(self):
+        return self.args
+
+    def eval(self, row, ctx):
+        return self.function(ctx, *[arg.eval(row, ctx) for arg in self.args])
+
+class _Aggregate(_Expr):
+    """An aggregate call; its value for the current group is looked up in `ctx.aggregates`."""
+
+    def __init__(self, name: str, arg: Optional[_Expr], distinct: bool):
+        self.name, self.arg, self.distinct = name, arg, distinct
+
+    def children(self):
+        return (self.arg,) if self.arg is not None else ()
+
+    def eval(self, row, ctx):
+        if ctx.aggregates is None or self not in ctx.aggregates:
+            raise ValueError(f"Invalid use of aggregating function {self.name}(...) in this context")
+        return ctx.aggregates[self]
+
+    def collect(self, row: Dict[str, Any], ctx: _Context, values: List[Any]):
+        if self.arg is None:
+            values.append(True)  # count(*) counts rows
+            return
+        value = self.arg.eval(row, ctx)
+        if value is not None:
+            values.append(value)
+
+    def result(self, values: List[Any]) -> Any:
+        if self.distinct:
+            seen, unique = set(), []
+            for value in values:
+                key = _hash_key(value)
+                if key not in seen:
+                    seen.add(key)
+                    unique.append(value)
+            values = unique
+        if self.name == "count":
+            return len(values)
+        if self.name == "collect":
+            return values
+        if self.name == "sum":
+            return sum(values) if values else 0
+        if self.name == "avg":
+            return sum(values) / len(values) if values else None
+        if not values:
+            return None
+        return (min if self.name == "min" else max)(values, key=_order_key)
+
+class _Compare(_Expr):
+    def __init__(self, op: str, left: _Expr, right: _Expr):
+        self.op, self.left, self.right = op, left, right
+
+    def children(self):
+        return self.left, self.right
+
+    def eval(self, row, ctx):
+        return _compare(self.op, self.left.eval(row, ctx), self.right.eval(row, ctx))
+
+class _Arithmetic(_Expr):
+    def __init__(self, op: str, left: _Expr, right: _Expr):
+        self.op, self.left, self.right = op, left, right
+
+    def children(self):
+        return self.left, self.right
+
+    def eval(self, row, ctx):
+        left, right = self.left.eval(row, ctx), self.right.eval(row, ctx)
+        return _add(left, right) if self.op == "+" else _arithmetic(self.op, left, right)
+
+class _Negate(_Expr):
+    def __init__(self, operand: _Expr):
+        self.operand = operand
+
+    def children(self):
+        return (self.operand,)
+
+    def eval(self, row, ctx):
+        return _arithmetic("-", 0, self.operand.eval(row, ctx))
+
+class _And(_Expr):
+    def __init__(self, left: _Expr, right: _Expr):
+        self.left, self.right = left, right
+
+    def children(self):
+        return self.left, self.right
+
+    def eval(self, row, ctx):
+        left = _truth(self.left.eval(row, ctx))
+        if left is False:
+            return False
+        right = _truth(self.right.eval(row, ctx))
+        if right is False:
+            return False
+        return None if left is None or right is None else True
+
+class _Or(_Expr):
+    def __init__(self, left: _Expr, right: _Expr):
+        self.left, self.right = left, right
+
+    def children(self):
+        return self.left, self.right
+
+    def eval(self, row, ctx):
+        left = _truth(self.left.eval(row, ctx))
+        if left is True:
+            return True
+        right = _truth(self.right.eval(row, ctx))
+        if right is True:
+            return True
+        return None if left is None or right is None else False
+
+class _Xor(_Expr):
+    def __init__(self, left: _Expr, right: _Expr):
+        self.left, self.right = left, right
+
+    def children(self):
+        return self.left, self.right
+
+    def eval(self, row, ctx):
+        left, right = _truth(self.left.eval(row, ctx)), _truth(self.right.eval(row, ctx))
+        return None if left is None or right is None else left != right
+
+class _Not(_Expr):
+    def __init__(self, operand: _Expr):
+        self.operand = operand
+
+    def children(self):
+        return (self.operand,)
+
+    def eval(self, row, ctx):
+        value = _truth(self.operand.eval(row, ctx))
+        return None if value is None else not value
+
+class _IsNull(_Expr):
+    def __init__(self, operand: _Expr, negated: bool):
+        self.operand, self.negated = operand, negated
+
+    def children(self):
+        return (self.operand,)
+
+    def eval(self, row, ctx):
+        return (self.operand.eval(row, ctx) is None) != self.negated
+
+class _In(_Expr):
+    def __init__(self, element: _Expr, container: _Expr):
+        self.element, self.container = element, container
+
+    def children(self):
+        return self.element, self.container
+
+    def eval(self, row, ctx):
+        element, container = self.element.eval(row, ctx), self.container.eval(row, ctx)
+        if container is None:
+            return None
+        if not isinstance(container, list):
+            raise ValueError(f"Type mismatch: expected a list but was {type(container).__name__}")
+        unknown = False
+        for item in container:
+            equal = _equals(element, item)
+            if equal:
+                return True
+            unknown = unknown or equal is None
+        return None if unknown else False
+
+class _StringPredicate(_Expr):
+    TESTS = {
+        "STARTS": str.startswith,
+        "ENDS": str.endswith,
+        "CONTAINS": str.__contains__,
+        "=~": lambda text, pattern: re.fullmatch(pattern, text) is not None,
+    }
+
+    def __init__(self, op: str, left: _Expr, right: _Expr):
+        self.test, self.left, self.right = self.TESTS[op], left, right
+
+    def children(self):
+        return self.left, self.right
+
+    def eval(self, row, ctx):
+        left, right = self.left.eval(row, ctx), self.right.eval(row, ctx)
+        if not (isinstance(left, str) and isinstance(right, str)):
+            return None
+        return self.test(left, right)
+
+class _Case(_Expr):
+    def __init__(self, subject: Optional[_Expr], branches: List[Tuple[_Expr, _Expr]], default: Optional[_Expr]):
+        self.subject, self.branches, self.default = subject, branches, default
+
+    def children(self):
+        children = [expr for branch in self.branches for expr in branch]
+        return children + [expr for expr in (self.subject, self.default) if expr is not None]
+
+    def eval(self, row, ctx):
+        subject = self.subject.eval(row, ctx) if self.subject is not None else None
+        for condition, value in self.branches:
+            if self.subject is not None:
+                matched = _equals(subject, condition.eval(row, ctx)) is True
+            else:
+                matched = condition.eval(row, ctx) is True
+            if matched:
+                return value.eval(row, ctx)
+        return self.default.eval(row, ctx) if self.default is not None else None
+
+class _ListLiteral(_Expr):
+    def __init__(self, items: List[_Expr]):
+        self.items = items
+
+    def children(self):
+        return self.items
+
+    def eval(self, row, ctx):
+        return [item.eval(row, ctx) for item in self.items]
+
+class _MapLiteral(_Expr):
+    def __init__(self, entries: List[Tuple[str, _Expr]]):
+        self.entries = entries
+
+    def children(self):
+        return [expr for _, expr in self.entries]
+
+    def eval(self, row, ctx):
+        return {key: expr.eval(row, ctx) for key, expr in self.entries}
+
+class _ListComprehension(_Expr):
+    def __init__(self, var: str, source: _Expr, where: Optional[_Expr], projection: Optional[_Expr]):
+        self.var, self.source, self.where, self.projection = var, source, where, projection
+
+    def children(self):
+        return [expr for expr in (self.source, self.where, self.projection) if expr is not None]
+
+    def _free(self):
+        inner: Set[str] = set()
+        for expr in (self.where, self.projection):
+            if expr is not None:
+                inner |= expr.free
+        return self.source.free | (inner - {self.var})
+
+    def eval(self, row, ctx):
+        items = self.source.eval(row, ctx)
+        if items is None:
+            return None
+        scope, result = dict(row), []
+        for item in items:
+            scope[self.var] = item
+            if self.where is not None and self.where.eval(scope, ctx) is not True:
+                continue
+            result.append(self.projection.eval(scope, ctx) if self.projection is not None else item)
+        return result
+
+class _Reduce(_Expr):
+    def __init__(self, accumulator: str, initial: _Expr, var: str, source: _Expr, step: _Expr):
+        self.accumulator, self.initial, self.var, self.source, self.step = accumulator, initial, var, source, step
+
+    def children(self):
+        return self.initial, self.source, self.step
+
+    def _free(self):
+        return self.initial.free | self.source.free | (self.step.free - {self.accumulator, self.var})
+
+    def eval(self, row, ctx):
+        items = self.source.eval(row, ctx)
+        if items is None:
+            return None
+        scope, value = dict(row), self.initial.eval(row, ctx)
+        for item in items:
+            scope[self.accumulator], scope[self.var] = value, item
+            value = self.step.eval(scope, ctx)
+        return value
+
+class _PatternPredicate(_Expr):
+    """A pattern used as a boolean: whether it has at least one match given the current bindings."""
+
+    def __init__(self, path: "_Path"):
+        self.path = path
+
+    def children(self):
+        return [expr for _, expr in self.path.property_expressions()]
+
+    def _free(self):
+        return set(self.path.variables) | super()._free()
+
+    def eval(self, row, ctx):
+        matches, _ = _match_all([self.path], row, ctx, _NO_FILTER)
+        return next(matches, None) is not None
+
+# --- Patterns ---
+
+class _NodePattern:
+    def __init__(self, var: Optional[str], labels: List[str], properties: List[Tuple[str, _Expr]]):
+        self.var, self.labels, self.properties = var, labels, properties
+
+class _RelPattern:
+    def __init__(self, var: Optional[str], types: List[str], properties: List[Tuple[str, _Expr]], direction: str):
+        self.var, self.types, self.properties, self.direction = var, types, properties, direction
+
+class _Path:
+    def __init__(self, nodes: List[_NodePattern], rels: List[_RelPattern]):
+        self.nodes, self.rels = nodes, rels
+        self.variables = [element.var for element in nodes + rels if element.var is not None]
+        self._steps: Dict[int, List[Tuple[int, int, int]]] = {}
+
+    def property_expressions(self) -> List[Tuple[str, _Expr]]:
+        return [entry for element in self.nodes + self.rels for entry in element.properties]
+
+    def steps(self, anchor: int) -> List[Tuple[int, int, int]]:
+        """(relationship index, from node, to node) hops walking right from `anchor`, then left from it."""
+        if anchor not in self._steps:
+            right = [(index, index, index + 1) for index in range(anchor, len(self.rels))]
+            left = [(index - 1, index, index - 1) for index in range(anchor, 0, -1)]
+            self._steps[anchor] = right + left
+        return self._steps[anchor]
+
+class _Filter:
+    """A WHERE predicate with the parts the matcher can use to pick index scans, split out ahead of time."""
+
+    def __init__(self, where: Optional[_Expr]):
+        self.where = where
+        self.node_equalities: List[Tuple[str, _Expr]] = []
+        self.property_equalities: List[Tuple[str, str, _Expr]] = []
+        self.range_keys: Dict[str, List[str]] = {}
+        for conjunct in _conjuncts(where):
+            if isinstance(conjunct, _Compare) and conjunct.op == "=":
+                for side, other in ((conjunct.left, conjunct.right), (conjunct.right, conjunct.left)):
+                    if isinstance(side, _Var):
+                        self.node_equalities.append((side.name, other))
+                    elif isinstance(side, _Prop) and isinstance(side.subject, _Var):
+                        self.property_equalities.append((side.subject.name, side.key, other))
+        for compare in _walk(where):
+            if isinstance(compare, _Compare) and compare.op in _FLIPPED:
+                for side in (compare.left, compare.right):
+                    if isinstance(side, _Prop) and isinstance(side.subject, _Var):
+                        keys = self.range_keys.setdefault(side.subject.name, [])
+                        if side.key not in keys:
+                            keys.append(side.key)
+
+def _conjuncts(expr: Optional[_Expr]) -> List[_Expr]:
+    if expr is None:
+        return []
+    if isinstance(expr, _And):
+        return _conjuncts(expr.left) + _conjuncts(expr.right)
+    return [expr]
+
+def _walk(expr: Optional[_Expr]) -> Iterator[_Expr]:
+    if expr is None:
+        return
+    yield expr
+    for child in expr.children():
+        yield from _walk(child)
+
+_NO_FILTER = _Filter(None)
+
+def _evaluable(expr: _Expr, row: Dict[str, Any], var: Optional[str]) -> bool:
+    """Whether `expr` can be evaluated from `row` alone, without the variable being matched."""
+    return var not in expr.free and expr.free <= row.keys()
+
+Interval = Tuple[Any, bool, Any, bool]
+
+def _interval(expr: Optional[_Expr], var: str, key: str, row: Dict[str, Any], ctx: _Context) -> Optional[Interval]:
+    """
+    The (start, start inclusive, end, end inclusive) range `expr` confines `var.key` to, or None if it does not.
+
+    Conjunctions intersect and disjunctions take the hull, so `a > $x OR (a = $x AND ...)` still scans from $x.
+    """
+    if isinstance(expr, _And):
+        return _intersect(_interval(expr.left, var, key, row, ctx), _interval(expr.right, var, key, row, ctx))
+    if isinstance(expr, _Or):
+        left, right = _interval(expr.left, var, key, row, ctx), _interval(expr.right, var, key, row, ctx)
+        return None if left is None or right is None else _hull(left, right)
+    if isinstance(expr, _Compare) and expr.op in _FLIPPED:
+        for side, other, op in ((expr.left, expr.right, expr.op), (expr.right, expr.left, _FLIPPED[expr.op])):
+            if isinstance(side, _Prop) and side.of(var) and side.key == key and _evaluable(other, row, var):
+                value = other.eval(row, ctx)
+                if value is None:
+                    return None
+                return {
+                    "=": (value, True, value, True),
+                    ">": (value, False, None, True),
+                    ">=": (value, True, None, True),
+                    "<": (None, True, value, False),
+                    "<=": (None, True, value, True),
+                }[op]
+    return None
+
+def _tighter(a: Any, a_inclusive: bool, b: Any, b_inclusive: bool, pick: Callable) -> Tuple[Any, bool]:
+    if a is None:
+        return b, b_inclusive
+    if b is None:
+        return a, a_inclusive
+    if a == b:
+        return a, a_inclusive and b_inclusive
+    return (a, a_inclusive) if pick(a, b) is a else (b, b_inclusive)
+
+def _intersect(a: Optional[Interval], b: Optional[Interval]) -> Optional[Interval]:
+    if a is None or b is None:
+        return a or b
+    try:
+        start = _tighter(a[0], a[1], b[0], b[1], max)
+        end = _tighter(a[2], a[3], b[2], b[3], min)
+    except TypeError:
+        return a
+    return start + end
+
+def _hull(a: Interval, b: Interval) -> Optional[Interval]:
+    try:
+        start = _looser(a[0], a[1], b[0], b[1], min)
+        end = _looser(a[2], a[3], b[2], b[3], max)
+    except TypeError:
+        return None
+    return start + end
+
+def _looser(a: Any, a_inclusive: bool, b: Any, b_inclusive: bool, pick: Callable) -> Tuple[Any, bool]:
+    if a is None or b is None:
+        return None, True
+    if a == b:
+        return a, a_inclusive or b_inclusive
+    return (a, a_inclusive) if pick(a, b) is a else (b, b_inclusive)
+
+def _scan(store, label: str, key: str, bounds: Interval, descending: bool = False) -> Optional[Iterator[int]]:
+    start, start_inclusive, end, end_inclusive = bounds
+    return store.index_scan(label, key, start, end, start_inclusive, end_inclusive, descending)
+
+class _OrderHint(NamedTuple):
+    """A single-node MATCH whose rows are next ordered by `var.key` and cut to SKIP + LIMIT."""
+    var: str
+    key: str
+    descending: bool
+    skip: Optional[_Expr]
+    limit: _Expr
+
+def _node_candidates(node: _NodePattern, row: Dict[str, Any], ctx: _Context, where: _Filter,
+                     order: Optional[_OrderHint]) -> Tuple[Tuple, Callable[[], Iterable[int]], bool]:
+    """
+    Plan how to find the nodes a pattern node can match: (cost rank, candidate thunk, whether in `order`).
+
+    Bound variables come first, then property index lookups, index range scans and label scans.
+    """
+    store, var = ctx.store, node.var
+    if var is not None:
+        if var in row:
+            value = row[var]
+            return (0,), lambda: [value.id] if isinstance(value, NodeRef) else [], False
+        for name, expr in where.node_equalities:
+            if name == var and _evaluable(expr, row, var):
+                value = expr.eval(row, ctx)
+                return (0,), lambda: [value.id] if isinstance(value, NodeRef) else [], False
+    if not node.labels:
+        return (5,), store.all_nodes, False
+
+    label = node.labels[0]
+    lookups = list(node.properties) + [(key, expr) for name, key, expr in where.property_equalities if name == var]
+    for key, expr in lookups:
+        if store.has_index(label, key) and _evaluable(expr, row, var):
+            value = expr.eval(row, ctx)
+            return (1,), lambda: store.find_all(label, key, value), False
+    if var is not None:
+        if order is not None and order.var == var and store.index_covers(label, order.key):
+            bounds = _interval(where.where, var, order.key, row, ctx) or (None, True, None, True)
+            scan = _scan(store, label, order.key, bounds, order.descending)
+            if scan is not None:
+                return (2,), lambda: scan, True
+        for key in where.range_keys.get(var, ()):
+            if store.has_index(label, key):
+                bounds = _interval(where.where, var, key, row, ctx)
+                scan = _scan(store, label, key, bounds) if bounds is not None else None
+                if scan is not None:
+                    return (2,), lambda: scan, False
+    return (3, len(store.labels.get(label, ()))), lambda: store.label_nodes(label), False
+
+def _node_fits(node: _NodePattern, node_id: int, bindings: Dict[str, Any], ctx: _Context,
+               fixed: Dict[str, Set[int]]) -> bool:
+    store = ctx.store
+    if node_id not in store.nodes:
+        return False
+    if node.var is not None:
+        if node.var in bindings:
+            bound = bindings[node.var]
+            if not isinstance(bound, NodeRef) or bound.id != node_id:
+                return False
+        elif node.var in fixed and node_id not in fixed[node.var]:
+            return False
+    if node.labels and any(label != store.node_labels[node_id] for label in node.labels):
+        return False
+    return _properties_match(store.nodes[node_id], node.properties, bindings, ctx)
+
+def _properties_match(properties: Optional[Dict[str, Any]], wanted: List[Tuple[str, _Expr]],
+                      bindings: Dict[str, Any], ctx: _Context) -> bool:
+    if properties is None:
+        return False
+    return all(_equals(properties.get(key), expr.eval(bindings, ctx)) is True for key, expr in wanted)
+
+def _fixed_nodes(path: _Path, row: Dict[str, Any], ctx: _Context, where: _Filter) -> Dict[str, Set[int]]:
+    """Unbound pattern variables the WHERE clause equates with an already bound node (e.g. `peer = recent`)."""
+    fixed: Dict[str, Set[int]] = {}
+    for name, expr in where.node_equalities:
+        if name in row or name not in path.variables or not _evaluable(expr, row, name):
+            continue
+        value = expr.eval(row, ctx)
+        ids = {value.id} if isinstance(value, NodeRef) else set()
+        fixed[name] = fixed[name] & ids if name in fixed else ids
+    return fixed
+
+def _neighbours(store, source: int, rel: _RelPattern, rightwards: bool, node: _NodePattern,
+                bindings: Dict[str, Any], fixed: Dict[str, Set[int]]) -> Iterator[Tuple[int, RelRef]]:
+    if rel.direction == "both":
+        directions: Tuple[bool, ...] = (True, False)
+    else:
+        directions = ((rel.direction == "out") == rightwards,)
+    restrict = None
+    if node.var is not None:
+        if node.var in bindings:
+            bound = bindings[node.var]
+            restrict = (bound.id,) if isinstance(bound, NodeRef) else ()
+        elif node.var in fixed:
+            restrict = fixed[node.var]
+    for outgoing in directions:
+        edges = (store.out_edges if outgoing else store.in_edges).get(source)
+        if not edges:
+            continue
+        for rel_type in (rel.types or list(edges)):
+            targets = edges.get(rel_type)
+            if not targets:
+                continue
+            found = [target for target in restrict if target in targets] if restrict is not None else list(targets)
+            for target in found:
+                yield target, RelRef(source, rel_type, target) if outgoing else RelRef(target, rel_type, source)
+
+def _plan(path: _Path, row: Dict[str, Any], ctx: _Context, where: _Filter,
+          order: Optional[_OrderHint]) -> Tuple[int, Iterable[int], bool]:
+    best = None
+    for position, node in enumerate(path.nodes):
+        rank, candidates, ordered = _node_candidates(node, row, ctx, where, order if len(path.nodes) == 1 else None)
+        if best is None or rank < best[0]:
+            best = (rank, position, candidates, ordered)
+        if rank[0] == 0:
+            break
+    return best[1], best[2](), best[3]
+
+def _extend(path: _Path, anchor: int, candidates: Iterable[int], row: Dict[str, Any], ctx: _Context,
+            where: _Filter, used: Tuple[RelRef, ...]) -> Iterator[Tuple[Dict[str, Any], Tuple[RelRef, ...]]]:
+    fixed = _fixed_nodes(path, row, ctx, where)
+    steps = path.steps(anchor)
+    node = path.nodes[anchor]
+    placed: List[Optional[int]] = [None] * len(path.nodes)
+    for node_id in candidates:
+        if not _node_fits(node, node_id, row, ctx, fixed):
+            continue
+        bindings = row if node.var is None or node.var in row else {**row, node.var: NodeRef(node_id)}
+        placed[anchor] = node_id
+        yield from _hop(path, steps, 0, placed, bindings, used, ctx, fixed)
+
+def _hop(path: _Path, steps: List[Tuple[int, int, int]], index: int, placed: List[Optional[int]],
+         bindings: Dict[str, Any], used: Tuple[RelRef, ...], ctx: _Context,
+         fixed: Dict[str, Set[int]]) -> Iterator[Tuple[Dict[str, Any], Tuple[RelRef, ...]]]:
+    if index == len(steps):
+        yield bindings, used
+        return
+    rel_index, source, target_position = steps[index]
+    rel, node = path.rels[rel_index], path.nodes[target_position]
+    store = ctx.store
+    for target, ref in _neighbours(store, placed[source], rel, target_position > source, node, bindings, fixed):
+        if ref in used:
+            continue  # A relationship is matched at most once per pattern
+        if rel.var is not None and rel.var in bindings and bindings[rel.var] != ref:
+            continue
+        if rel.properties and not _properties_match(store.relationship(ref.source, ref.type, ref.target),
+                                                    rel.properties, bindings, ctx):
+            continue
+        if not _node_fits(node, target, bindings, ctx, fixed):
+            continue
+        extended = bindings
+        new_rel = rel.var is not None and rel.var not in bindings
+        new_node = node.var is not None and node.var not in bindings
+        if new_rel or new_node:
+            extended = dict(bindings)
+            if new_rel:
+                extended[rel.var] = ref
+            if new_node:
+                extended[node.var] = NodeRef(target)
+        placed[target_position] = target
+        yield from _hop(path, steps, index + 1, placed, extended, used + (ref,), ctx, fixed)
+
+def _match_all(paths: List[_Path], row: Dict[str, Any], ctx: _Context, where: _Filter,
+               order: Optional[_OrderHint] = None) -> Tuple[Iterator[Dict[str, Any]], bool]:
+    """
+    Match comma-separated paths against one input row.
+
+    :return: A lazy iterator over the extended rows (before WHERE), and whether they come in `order`.
+    """
+    anchor, candidates, ordered = _plan(paths[0], row, ctx, where, order if len(paths) == 1 else None)
+
+    def rest(index: int, bindings: Dict[str, Any], used: Tuple[RelRef, ...]) -> Iterator[Dict[str, Any]]:
+        if index == len(paths):
+            yield bindings
+            return
+        next_anchor, next_candidates, _ = _plan(paths[index], bindings, ctx, where, None)
+        for extended, extended_used in _extend(paths[index], next_anchor, next_candidates, bindings, ctx, where, used):
+            yield from rest(index + 1, extended, extended_used)
+
+    def generate() -> Iterator[Dict[str, Any]]:
+        for bindings, used in _extend(paths[0], anchor, candidates, row, ctx, where, ()):
+            yield from rest(1, bindings, used)
+
+    return generate(), ordered
+
+def _create_path(path: _Path, row: Dict[str, Any], ctx: _Context, merge: bool = False) -> Dict[str, Any]:
+    store, bindings, ids = ctx.store, dict(row), []
+    for node in path.nodes:
+        if node.var is not None and node.var in bindings:
+            bound = bindings[node.var]
+            if not isinstance(bound, NodeRef) or bound.id not in store.nodes:
+                raise ValueError(f"Failed to create relationship, node `{node.var}` is missing")
+            ids.append(bound.id)
+            continue
+        properties = {key: _property_value(expr.eval(bindings, ctx)) for key, expr in node.properties}
+        if merge and any(value is None for value in properties.values()):
+            key = next(key for key, value in properties.items() if value is None)
+            raise ValueError(f"Cannot merge the following node because of null property value for '{key}'")
+        node_id = store.create_node(node.labels[0] if node.labels else None,
+                                    {key: value for key, value in properties.items() if value is not None})
+        ids.append(node_id)
+        if node.var is not None:
+            bindings[node.var] = NodeRef(node_id)
+    for index, rel in enumerate(path.rels):
+        source, target = ids[index], ids[index + 1]
+        if rel.direction == "in":
+            source, target = target, source
+        properties = {key: _property_value(expr.eval(bindings, ctx)) for key, expr in rel.properties}
+        if merge and any(value is None for value in properties.values()):
+            key = next(key for key, value in properties.items() if value is None)
+            raise ValueError(f"Cannot merge the following relationship because of null property value for '{key}'")
+        store.relate(source, rel.types[0], target, properties)
+        if rel.var is not None:
+            bindings[rel.var] = RelRef(source, rel.types[0], target)
+    return bindings
+
+def _write(store, target: Any, properties: Dict[str, Any]):
+    if target is None:
+        return
+    if isinstance(target, NodeRef):
+        if target.id in store.nodes:
+            store.set_properties(target.id, properties)
+    elif isinstance(target, RelRef):
+        if store.relationship(target.source, target.type, target.target) is not None:
+            store.relate(target.source, target.type, target.target, properties)
+    else:
+        raise ValueError(f"Type mismatch: expected a node or relationship but was {type(target).__name__}")
+
+# --- Clauses ---
+
+class _Clause:
+    returns = False
+
+    def run(self, rows: List[Dict[str, Any]], ctx: _Context) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+def _run_clauses(clauses: List[_Clause], rows: List[Dict[str, Any]], ctx: _Context) -> List[Dict[str, Any]]:
+    for clause in clauses:
+        rows = clause.run(rows, ctx)
+    return rows
+
+class _Match(_Clause):
+    def __init__(self, paths: List[_Path], where: Optional[_Expr], optional: bool):
+        self.paths, self.optional = paths, optional
+        self.filter = _Filter(where)
+        self.variables = [name for path in paths for name in path.variables]
+        self.order_hint: Optional[_OrderHint] = None
+
+    def run(self, rows, ctx):
+        out = []
+        for row in rows:
+            matches = self._matches(row, ctx, self.order_hint if len(rows) == 1 else None)
+            if matches:
+                out.extend(matches)
+            elif self.optional:
+                out.append({**row, **{name: None for name in self.variables if name not in row}})
+        return out
+
+    def _matches(self, row: Dict[str, Any], ctx: _Context, order: Optional[_OrderHint]) -> List[Dict[str, Any]]:
+        matches, ordered = _match_all(self.paths, row, ctx, self.filter, order)
+        where = self.filter.where
+        if where is not None:
+            matches = (match for match in matches if where.eval(match, ctx) is True)
+        if not ordered:
+            return list(matches)
+
+        # Rows arrive in index order: stop once SKIP + LIMIT are filled and the sort key moves on, leaving
+        # the projection to break ties on its remaining ORDER BY keys
+        wanted = order.limit.eval(row, ctx) + (order.skip.eval(row, ctx) if order.skip is not None else 0)
+        taken: List[Dict[str, Any]] = []
+        boundary = None
+        for match in matches:
+            if len(taken) >= wanted:
+                if _property(match[order.var], order.key, ctx) != boundary:
+                    break
+            taken.append(match)
+            if len(taken) == wanted:
+                boundary = _property(match[order.var], order.key, ctx)
+        return taken
+
+class _Unwind(_Clause):
+    def __init__(self, expr: _Expr, var: str):
+        self.expr, self.var = expr, var
+
+    def run(self, rows, ctx):
+        out = []
+        for row in rows:
+            value = self.expr.eval(row, ctx)
+            if value is None:
+                continue
+            for item in (value if isinstance(value, list) else [value]):
+                out.append({**row, self.var: item})
+        return out
+
+class _ProjectionItem(NamedTuple):
+    expr: _Expr
+    name: str
+
+class _SortItem(NamedTuple):
+    expr: _Expr
+    descending: bool
+
+class _Projection(_Clause):
+    """WITH or RETURN: projection, grouping and aggregation, DISTINCT, ORDER BY, SKIP, LIMIT and (WITH) WHERE."""
+
+    def __init__(self, items: List[_ProjectionItem], star: bool, distinct: bool, order_by: List[_SortItem],
+                 skip: Optional[_Expr], limit: Optional[_Expr], where: Optional[_Expr], is_return: bool):
+        self.items, self.star, self.distinct = items, star, distinct
+        self.order_by, self.skip, self.limit, self.where = order_by, skip, limit, where
+        self.returns = is_return
+        self.aggregates = [aggregate for item in items for aggregate in item.expr.aggregates]
+        self.grouping = [item for item in items if not item.expr.aggregates]
+
+    def run(self, rows, ctx):
+        if self.aggregates:
+            projected = self._aggregate(rows, ctx)
+            scopes = projected
+        else:
+            projected = []
+            for row in rows:
+                out = dict(row) if self.star else {}
+                for item in self.items:
+                    out[item.name] = item.expr.eval(row, ctx)
+                projected.append(out)
+            scopes = [{**row, **out} for row, out in zip(rows, projected)] if self.order_by else projected
+
+        if self.distinct:
+            seen, unique, unique_scopes = set(), [], []
+            for out, scope in zip(projected, scopes):
+                key = tuple(_hash_key(value) for value in out.values())
+                if key not in seen:
+                    seen.add(key)
+                    unique.append(out)
+                    unique_scopes.append(scope)
+            projected, scopes = unique, unique_scopes
+
+        if self.order_by:
+            keys = [[_order_key(sort.expr.eval(scope, ctx)) for sort in self.order_by] for scope in scopes]
+            order = list(range(len(projected)))
+            for position in reversed(range(len(self.order_by))):
+                order.sort(key=lambda index: keys[index][position], reverse=self.order_by[position].descending)
+            projected = [projected[index] for index in order]
+
+        if self.skip is not None:
+            projected = projected[self.skip.eval({}, ctx):]
+        if self.limit is not None:
+            projected = projected[:self.limit.eval({}, ctx)]
+        if self.where is not None:
+            projected = [out for out in projected if self.where.eval(out, ctx) is True]
+        return projected
+
+    def _aggregate(self, rows: List[Dict[str, Any]], ctx: _Context) -> List[Dict[str, Any]]:
+        groups: Dict[Tuple, Tuple[Dict[str, Any], List[Any], List[List[Any]]]] = {}
+        for row in rows:
+            values = [item.expr.eval(row, ctx) for item in self.grouping]
+            key = tuple(_hash_key(value) for value in values)
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = (row, values, [[] for _ in self.aggregates])
+            for aggregate, collected in zip(self.aggregates, group[2]):
+                aggregate.collect(row, ctx, collected)
+        if not groups and not self.grouping:
+            groups[()] = ({}, [], [[] for _ in self.aggregates])  # Aggregating no rows still yields one row
+
+        projected = []
+        for first, values, collected in groups.values():
+            ctx.aggregates = {aggregate: aggregate.result(items) for aggregate, items in zip(self.aggregates, collected)}
+            try:
+                grouped = dict(zip([item.name for item in self.grouping], values))
+                projected.append({
+                    item.name: grouped[item.name] if item.name in grouped else item.expr.eval(first, ctx)
+                    for item in self.items
+                })
+            finally:
+                ctx.aggregates = None
+        return projected
+
+class _SetItem:
+    def apply(self, row: Dict[str, Any], ctx: _Context):
+        raise NotImplementedError
+
+class _SetProperty(_SetItem):
+    def __init__(self, subject: _Expr, key: str, value: _Expr):
+        self.subject, self.key, self.value = subject, key, value
+
+    def apply(self, row, ctx):
+        _write(ctx.store, self.subject.eval(row, ctx), {self.key: _property_value(self.value.eval(row, ctx))})
+
+class _SetProperties(_SetItem):
+    """`SET n = map` (replace) or `SET n += map` (merge)."""
+
+    def __init__(self, subject: _Expr, value: _Expr, replace: bool):
+        self.subject, self.value, self.replace = subject, value, replace
+
+    def apply(self, row, ctx):
+        target, value = self.subject.eval(row, ctx), self.value.eval(row, ctx)
+        if isinstance(value, (NodeRef, RelRef)):
+            value = _export(value, ctx.store)
+        if target is None or value is None:
+            return
+        properties = {key: _property_value(item) for key, item in value.items()}
+        if self.replace:
+            current = _export(target, ctx.store) or {}
+            properties = {**{key: None for key in current}, **properties}
+        _write(ctx.store, target, properties)
+
+class _Set(_Clause):
+    def __init__(self, items: List[_SetItem]):
+        self.items = items
+
+    def run(self, rows, ctx):
+        for row in rows:
+            for item in self.items:
+                item.apply(row, ctx)
+        return rows
+
+class _Merge(_Clause):
+    def __init__(self, path: _Path, on_create: List[_SetItem], on_match: List[_SetItem]):
+        self.path, self.on_create, self.on_match = path, on_create, on_match
+
+    def run(self, rows, ctx):
+        out = []
+        for row in rows:
+            matches, _ = _match_all([self.path], row, ctx, _NO_FILTER)
+            matches = list(matches)
+            if not matches:
+                created = _create_path(self.path, row, ctx, merge=True)
+                for item in self.on_create:
+                    item.apply(created, ctx)
+                out.append(created)
+                continue
+            for match in matches:
+                for item in self.on_match:
+                    item.apply(match, ctx)
+                out.append(match)
+        return out
+
+class _Create(_Clause):
+    def __init__(self, paths: List[_Path]):
+        self.paths = paths
+
+    def run(self, rows, ctx):
+        out = []
+        for row in rows:
+            for path in self.paths:
+                row = _create_path(path, row, ctx)
+            out.append(row)
+        return out
+
+class _Delete(_Clause):
+    def __init__(self, exprs: List[_Expr], detach: bool):
+        self.exprs, self.detach = exprs, detach
+
+    def run(self, rows, ctx):
+        store = ctx.store
+        targets: List[Any] = []
+        for row in rows:
+            for expr in self.exprs:
+                value = expr.eval(row, ctx)
+                targets.extend(value if isinstance(value, list) else [value])
+        # Relationships go first so a node deleted alongside all its relationships has none left
+        for target in targets:
+            if isinstance(target, RelRef):
+                store.unrelate(target.source, target.type, target.target)
+            elif target is not None and not isinstance(target, NodeRef):
+                raise ValueError(f"Type mismatch: expected a node or relationship but was {type(target).__name__}")
+        for target in targets:
+            if isinstance(target, NodeRef) and target.id in store.nodes:
+                if not self.detach and store.has_relationships(target.id):
+                    raise ValueError(f"Cannot delete node<{target.id}>, because it still has relationships. "
+                                     f"To delete this node, you must first delete its relationships.")
+                store.delete_node(target.id)
+        return rows
+
+class _Foreach(_Clause):
+    def __init__(self, var: str, expr: _Expr, clauses: List[_Clause]):
+        self.var, self.expr, self.clauses = var, expr, clauses
+
+    def run(self, rows, ctx):
+        for row in rows:
+            items = self.expr.eval(row, ctx)
+            for item in (items or []):
+                _run_clauses(self.clauses, [{**row, self.var: item}], ctx)
+        return rows
+
+class _CallSubquery(_Clause):
+    def __init__(self, clauses: List[_Clause]):
+        self.clauses = clauses
+        self.yields_rows = clauses[-1].returns
+
+    def run(self, rows, ctx):
+        out = []
+        for row in rows:
+            results = _run_clauses(self.clauses, [row], ctx)
+            if self.yields_rows:
+                out.extend({**row, **result} for result in results)
+            else:
+                out.append(row)
+        return out
+
+class _CallProcedure(_Clause):
+    def __init__(self, name: str, args: List[_Expr], yields: Optional[List[Tuple[str, str]]], where: Optional[_Expr]):
+        self.name, self.args, self.yields, self.where = name, args, yields, where
+        self.procedure = PROCEDURES[name.lower()]
+
+    def run(self, rows, ctx):
+        out = []
+        for row in rows:
+            for result in self.procedure(ctx, *[arg.eval(row, ctx) for arg in self.args]):
+                fields = self.yields if self.yields is not None else [(field, field) for field in result]
+                extended = {**row, **{alias: result[field] for field, alias in fields}}
+                if self.where is None or self.where.eval(extended, ctx) is True:
+                    out.append(extended)
+        return out
+
+class Statement:
+    """A parsed query: run by feeding a single empty row through its clauses."""
+
+    def __init__(self, clauses: List[_Clause]):
+        self.clauses = clauses
+        self.returns = clauses[-1].returns or (len(clauses) == 1 and isinstance(clauses[0], _CallProcedure))
+
+    def execute(self, store, parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        ctx = _Context(store, {name: _import(value) for name, value in parameters.items()})
+        rows = _run_clauses(self.clauses, [{}], ctx)
+        if not self.returns:
+            return []
+        return [{name: _export(value, store) for name, value in row.items()} for row in rows]
+
+class SchemaStatement:
+    """CREATE INDEX / CREATE CONSTRAINT / CREATE FULLTEXT INDEX, mapped onto the store's indexes."""
+
+    returns = False
+
+    def __init__(self, name: Optional[str], label: str, keys: List[str], fulltext: bool):
+        self.name, self.label, self.keys, self.fulltext = name, label, keys, fulltext
+
+    def execute(self, store, parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if self.fulltext:
+            store.create_fulltext_index(self.name, self.label, self.keys)
+        else:
+            for key in self.keys:
+                store.create_index(self.label, key)
+        return []
+
+def _plan_ordered_scans(clauses: List[_Clause]):
+    """Mark single-node MATCHes whose rows are immediately ordered by one of the node's properties and limited."""
+    for clause, following in zip(clauses, clauses[1:]):
+        if not (isinstance(clause, _Match) and not clause.optional and isinstance(following, _Projection)):
+            continue
+        if following.aggregates or following.distinct or following.limit is None or not following.order_by:
+            continue
+        if len(clause.paths) != 1 or len(clause.paths[0].nodes) != 1:
+            continue
+        node, first = clause.paths[0].nodes[0], following.order_by[0].expr
+        if node.var is None or not node.labels or not isinstance(first, _Prop) or not first.of(node.var):
+            continue
+        if any(item.name == node.var and not (isinstance(item.expr, _Var) and item.expr.name == node.var)
+               for item in following.items):
+            continue  # ORDER BY would see a projected value shadowing the node
+        clause.order_hint = _OrderHint(node.var, first.key, following.order_by[0].descending, following.skip, following.limit)
+
+# --- Parsing ---
+
+class _Token(NamedTuple):
+    kind: str
+    value: Any
+    start: int
+    end: int
+
+_TOKEN_PATTERN = re.compile(r"""
+    (?P<space>\s+|//[^\n]*)
+  | (?P<number>\d+\.\d+(?:[eE][+-]?\d+)?|\d+[eE][+-]?\d+|\d+)
+  | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+  | (?P<param>\$(?:\w+|`[^`]+`))
+  | (?P<name>[^\W\d]\w*)
+  | (?P<quoted>`[^`]+`)
+  | (?P<symbol><>|!=|<=|>=|=~|\+=|\.\.|[-+*/%^=<>()\[\]{},:.|;])
+""", re.VERBOSE)
+
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}
+
+def _unescape(match: re.Match) -> str:
+    escaped = match.group(1)
+    if escaped.startswith("u"):
+        return chr(int(escaped[1:], 16))
+    return _ESCAPES.get(escaped, escaped)
+
+def _tokenize(text: str) -> List[_Token]:
+    tokens, position = [], 0
+    while position < len(text):
+        match = _TOKEN_PATTERN.match(text, position)
+        if match is None:
+            raise NotImplementedError(f"Embedded graph backend does not support query: unexpected {text[position]!r} "
+                                      f"in {' '.join(text.split())[:80]}")
+        kind, raw = match.lastgroup, match.group()
+        position = match.end()
+        if kind == "space":
+            continue
+        if kind == "number":
+            value: Any = float(raw) if any(char in raw for char in ".eE") else int(raw)
+        elif kind == "string":
+            value = re.sub(r'\\(u[0-9a-fA-F]{4}|.)', _unescape, raw[1:-1])
+        elif kind == "param":
+            value = raw[1:].strip("`")
+        elif kind == "quoted":
+            kind, value = "identifier", raw[1:-1]
+        else:
+            value = raw
+        tokens.append(_Token(kind, value, match.start(), match.end()))
+    tokens.append(_Token("end", None, len(text), len(text)))
+    return tokens
+
+class _Parser:
+    """Recursive-descent parser for the supported Cypher subset."""
+
+    CLAUSE_KEYWORDS = {"MATCH", "OPTIONAL", "UNWIND", "WITH", "RETURN", "MERGE", "CREATE", "SET", "REMOVE",
+                       "DELETE", "DETACH", "FOREACH", "CALL"}
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.position = 0
+
+    # Token helpers
+
+    def peek(self, offset: int = 0) -> _Token:
+        return self.tokens[min(self.position + offset, len(self.tokens) - 1)]
+
+    def advance(self) -> _Token:
+        token = self.peek()
+        self.position = min(self.position + 1, len(self.tokens) - 1)
+        return token
+
+    def error(self, problem: str = "unexpected input") -> NotImplementedError:
+        token = self.peek()
+        near = " ".join(self.text[token.start:token.start + 40].split()) or "end of query"
+        return NotImplementedError(
+            f"Embedded graph backend does not support query: {problem} at '{near}' in {' '.join(self.text.split())[:80]}")
+
+    def at_keyword(self, *words: str, offset: int = 0) -> bool:
+        token = self.peek(offset)
+        return token.kind == "name" and token.value.upper() in words
+
+    def accept_keyword(self, *words: str) -> bool:
+        if self.at_keyword(*words):
+            self.advance()
+            return True
+        return False
+
+    def expect_keyword(self, word: str):
+        if not self.accept_keyword(word):
+            raise self.error(f"expected {word}")
+
+    def at_symbol(self, *symbols: str, offset: int = 0) -> bool:
+        token = self.peek(offset)
+        return token.kind == "symbol" and token.value in symbols
+
+    def accept_symbol(self, symbol: str) -> bool:
+        if self.at_symbol(symbol):
+            self.advance()
+            return True
+        return False
+
+    def expect_symbol(self, symbol: str):
+        if not self.accept_symbol(symbol):
+            raise self.error(f"expected '{symbol}'")
+
+    def at_name(self, offset: int = 0) -> bool:
+        return self.peek(offset).kind in ("name", "identifier")
+
+    def expect_name(self) -> str:
+        if not self.at_name():
+            raise self.error("expected a name")
+        return self.advance().value
+
+    def previous_end(self) -> int:
+        return self.tokens[self.position - 1].end
+
+    # Statements
+
+    def parse(self):
+        if self.at_keyword("CREATE") and self.at_name(offset=1):
+            statement = self.parse_schema()
+        else:
+            statement = Statement(self.parse_clauses())
+        self.accept_symbol(";")
+        if self.peek().kind != "end":
+            raise self.error()
+        return statement
+
+    def parse_schema(self) -> SchemaStatement:
+        self.expect_keyword("CREATE")
+        fulltext = self.accept_keyword("FULLTEXT")
+        if not fulltext:
+            self.accept_keyword("RANGE", "TEXT")
+        constraint = not fulltext and self.accept_keyword("CONSTRAINT")
+        if not constraint:
+            self.expect_keyword("INDEX")
+        name = None if self.at_keyword("IF", "FOR", "ON") else self.expect_name()
+        if self.accept_keyword("IF"):
+            self.expect_keyword("NOT")
+            self.expect_keyword("EXISTS")
+        if not self.accept_keyword("FOR"):
+            self.expect_keyword("ON")
+        self.expect_symbol("(")
+        var = self.expect_name()
+        self.expect_symbol(":")
+        label = self.expect_name()
+        self.expect_symbol(")")
+
+        if fulltext:
+            self.expect_keyword("ON")
+            self.expect_keyword("EACH")
+            self.expect_symbol("[")
+            keys = self.parse_schema_properties(var, "]")
+            if name is None:
+                raise self.error("a full-text index needs a name")
+        elif constraint:
+            if not self.accept_keyword("REQUIRE"):
+                self.expect_keyword("ASSERT")
+            keys = self.parse_schema_properties(var, ")") if self.accept_symbol("(") else [self.parse_schema_property(var)]
+            self.expect_keyword("IS")
+            if self.accept_keyword("NOT"):
+                self.expect_keyword("NULL")
+                keys = []  # Existence constraints are not backed by an index
+            elif not self.accept_keyword("UNIQUE"):
+                self.expect_keyword("NODE")
+                self.expect_keyword("KEY")
+        else:
+            self.expect_keyword("ON")
+            self.expect_symbol("(")
+            keys = self.parse_schema_properties(var, ")")
+        if self.accept_keyword("OPTIONS"):
+            self.parse_map()
+        return SchemaStatement(name, label, keys, fulltext)
+
+    def parse_schema_property(self, var: str) -> str:
+        if self.expect_name() != var:
+            raise self.error(f"expected a property of `{var}`")
+        self.expect_symbol(".")
+        return self.expect_name()
+
+    def parse_schema_properties(self, var: str, closing: str) -> List[str]:
+        keys = [self.parse_schema_property(var)]
+        while self.accept_symbol(","):
+            keys.append(self.parse_schema_property(var))
+        self.expect_symbol(closing)
+        return keys
+
+    def parse_clauses(self) -> List[_Clause]:
+        clauses: List[_Clause] = []
+        while self.peek().kind != "end" and not self.at_symbol(")", "}", ";"):
+            if clauses and clauses[-1].returns:
+                raise self.error("RETURN must be the last clause")
+            clauses.append(self.parse_clause())
+        if not clauses:
+            raise self.error("expected a clause")
+        _plan_ordered_scans(clauses)
+        return clauses
+
+    def parse_clause(self) -> _Clause:
+        if self.accept_keyword("OPTIONAL"):
+            self.expect_keyword("MATCH")
+            return _Match(self.parse_paths(), self.parse_where(), optional=True)
+        if self.accept_keyword("MATCH"):
+            return _Match(self.parse_paths(), self.parse_where(), optional=False)
+        if self.accept_keyword("UNWIND"):
+            expr = self.parse_expression()
+            self.expect_keyword("AS")
+            return _Unwind(expr, self.expect_name())
+        if self.accept_keyword("WITH"):
+            return self.parse_projection(is_return=False)
+        if self.accept_keyword("RETURN"):
+            return self.parse_projection(is_return=True)
+        if self.accept_keyword("MERGE"):
+            path = self.parse_path(creating=True)
+            on_create: List[_SetItem] = []
+            on_match: List[_SetItem] = []
+            while self.at_keyword("ON"):
+                self.advance()
+                target = on_create if self.accept_keyword("CREATE") else None
+                if target is None:
+                    self.expect_keyword("MATCH")
+                    target = on_match
+                self.expect_keyword("SET")
+                target.extend(self.parse_set_items())
+            return _Merge(path, on_create, on_match)
+        if self.accept_keyword("CREATE"):
+            paths = [self.parse_path(creating=True)]
+            while self.accept_symbol(","):
+                paths.append(self.parse_path(creating=True))
+            return _Create(paths)
+        if self.accept_keyword("SET"):
+            return _Set(self.parse_set_items())
+        if self.accept_keyword("REMOVE"):
+            items: List[_SetItem] = []
+            while True:
+                subject = _Var(self.expect_name())
+                if not self.accept_symbol("."):
+                    raise self.error("only properties can be removed")
+                items.append(_SetProperty(subject, self.expect_name(), _Literal(None)))
+                if not self.accept_symbol(","):
+                    return _Set(items)
+        if self.at_keyword("DETACH", "DELETE"):
+            detach = self.accept_keyword("DETACH")
+            self.expect_keyword("DELETE")
+            exprs = [self.parse_expression()]
+            while self.accept_symbol(","):
+                exprs.append(self.parse_expression())
+            return _Delete(exprs, detach)
+        if self.accept_keyword("FOREACH"):
+            self.expect_symbol("(")
+            var = self.expect_name()
+            self.expect_keyword("IN")
+            expr = self.parse_expression()
+            self.expect_symbol("|")
+            clauses = self.parse_clauses()
+            self.expect_symbol(")")
+            return _Foreach(var, expr, clauses)
+        if self.accept_keyword("CALL"):
+            if self.accept_symbol("{"):
+                clauses = self.parse_clauses()
+                self.expect_symbol("}")
+                if self.at_keyword("IN"):
+                    raise self.error("CALL { ... } IN TRANSACTIONS is not supported")
+                return _CallSubquery(clauses)
+            return self.parse_procedure_call()
+        raise self.error("unsupported clause")
+
+    def parse_procedure_call(self) -> _CallProcedure:
+        name = self.expect_name()
+        while self.accept_symbol("."):
+            name += "." + self.expect_name()
+        if name.lower() not in PROCEDURES:
+            raise self.error(f"unsupported procedure {name}")
+        self.expect_symbol("(")
+        args = self.parse_arguments()
+        yields, where = None, None
+        if self.accept_keyword("YIELD"):
+            yields = []
+            while True:
+                field = self.expect_name()
+                yields.append((field, self.expect_name() if self.accept_keyword("AS") else field))
+                if not self.accept_symbol(","):
+                    break
+            where = self.parse_where()
+        return _CallProcedure(name, args, yields, where)
+
+    def parse_where(self) -> Optional[_Expr]:
+        return self.parse_expression() if self.accept_keyword("WHERE") else None
+
+    def parse_projection(self, is_return: bool) -> _Projection:
+        distinct = self.accept_keyword("DISTINCT")
+        star = self.accept_symbol("*")
+        items: List[_ProjectionItem] = []
+        if not star or self.accept_symbol(","):
+            while True:
+                start = self.peek().start
+                expr = self.parse_expression()
+                if self.accept_keyword("AS"):
+                    name = self.expect_name()
+                elif isinstance(expr, _Var):
+                    name = expr.name
+                elif is_return:
+                    name = self.text[start:self.previous_end()]
+                else:
+                    raise self.error("expressions in WITH must be aliased (use AS)")
+                items.append(_ProjectionItem(expr, name))
+                if not self.accept_symbol(","):
+                    break
+        order_by: List[_SortItem] = []
+        if self.accept_keyword("ORDER"):
+            self.expect_keyword("BY")
+            while True:
+                expr = self.parse_expression()
+                descending = self.accept_keyword("DESC", "DESCENDING")
+                if not descending:
+                    self.accept_keyword("ASC", "ASCENDING")
+                order_by.append(_SortItem(expr, descending))
+                if not self.accept_symbol(","):
+                    break
+        skip = self.parse_expression() if self.accept_keyword("SKIP", "OFFSET") else None
+        limit = self.parse_expression() if self.accept_keyword("LIMIT") else None
+        where = None if is_return else self.parse_where()
+        return _Projection(items, star, distinct, order_by, skip, limit, where, is_return)
+
+    def parse_set_items(self) -> List[_SetItem]:
+        items: List[_SetItem] = []
+        while True:
+            subject = _Var(self.expect_name())
+            if self.accept_symbol("."):
+                key = self.expect_name()
+                self.expect_symbol("=")
+                items.append(_SetProperty(subject, key, self.parse_expression()))
+            elif self.accept_symbol("+="):
+                items.append(_SetProperties(subject, self.parse_expression(), replace=False))
+            elif self.accept_symbol("="):
+                items.append(_SetProperties(subject, self.parse_expression(), replace=True))
+            else:
+                raise self.error("only properties can be set")
+            if not self.accept_symbol(","):
+                return items
+
+    # Patterns
+
+    def parse_paths(self) -> List[_Path]:
+        paths = [self.parse_path()]
+        while self.accept_symbol(","):
+            paths.append(self.parse_path())
+        return paths
+
+    def parse_path(self, creating: bool = False) -> _Path:
+        if self.at_name() and self.at_symbol("=", offset=1):
+            raise self.error("path variables are not supported")
+        nodes, rels = [self.parse_node(creating)], []
+        while self.at_symbol("-", "<"):
+            rels.append(self.parse_relationship(creating))
+            nodes.append(self.parse_node(creating))
+        return _Path(nodes, rels)
+
+    def parse_node(self, creating: bool) -> _NodePattern:
+        self.expect_symbol("(")
+        var = self.expect_name() if self.at_name() else None
+        labels = []
+        while self.accept_symbol(":"):
+            labels.append(self.expect_name())
+        if len(labels) > 1 and creating:
+            raise self.error("nodes carry a single label")
+        properties = self.parse_map() if self.at_symbol("{") else []
+        self.expect_symbol(")")
+        return _NodePattern(var, labels, properties)
+
+    def parse_relationship(self, creating: bool) -> _RelPattern:
+        incoming = self.accept_symbol("<")
+        self.expect_symbol("-")
+        var, types, properties = None, [], []
+        if self.accept_symbol("["):
+            var = self.expect_name() if self.at_name() else None
+            if self.accept_symbol(":"):
+                types.append(self.expect_name())
+                while self.accept_symbol("|"):
+                    self.accept_symbol(":")
+                    types.append(self.expect_name())
+            if self.at_symbol("*"):
+                raise self.error("variable-length relationships are not supported")
+            properties = self.parse_map() if self.at_symbol("{") else []
+            self.expect_symbol("]")
+        self.expect_symbol("-")
+        outgoing = self.accept_symbol(">")
+        if incoming and outgoing:
+            raise self.error("a relationship has one direction")
+        if creating and len(types) != 1:
+            raise self.error("a created relationship needs exactly one type")
+        direction = "in" if incoming else "out" if outgoing else "both"
+        return _RelPattern(var, types, properties, direction)
+
+    def parse_map(self) -> List[Tuple[str, _Expr]]:
+        self.expect_symbol("{")
+        entries: List[Tuple[str, _Expr]] = []
+        if not self.accept_symbol("}"):
+            while True:
+                key = self.advance().value if self.peek().kind == "string" else self.expect_name()
+                self.expect_symbol(":")
+                entries.append((key, self.parse_expression()))
+                if not self.accept_symbol(","):
+                    break
+            self.expect_symbol("}")
+        return entries
+
+    # Expressions, lowest precedence first
+
+    def parse_expression(self) -> _Expr:
+        expr = self.parse_xor()
+        while self.accept_keyword("OR"):
+            expr = _Or(expr, self.parse_xor())
+        return expr
+
+    def parse_xor(self) -> _Expr:
+        expr = self.parse_and()
+        while self.accept_keyword("XOR"):
+            expr = _Xor(expr, self.parse_and())
+        return expr
+
+    def parse_and(self) -> _Expr:
+        expr = self.parse_not()
+        while self.accept_keyword("AND"):
+            expr = _And(expr, self.parse_not())
+        return expr
+
+    def parse_not(self) -> _Expr:
+        if self.accept_keyword("NOT"):
+            return _Not(self.parse_not())
+        return self.parse_comparison()
+
+    def parse_comparison(self) -> _Expr:
+        expr = self.parse_additive()
+        previous: Optional[_Compare] = None
+        while True:
+            if self.at_symbol("=", "<>", "!=", "<", ">", "<=", ">="):
+                op = self.advance().value
+                comparison = _Compare("<>" if op == "!=" else op, previous.right if previous else expr, self.parse_additive())
+                expr = _And(expr, comparison) if previous else comparison  # a < b < c means a < b AND b < c
+                previous = comparison
+            elif self.accept_keyword("IS"):
+                negated = self.accept_keyword("NOT")
+                self.expect_keyword("NULL")
+                expr, previous = _IsNull(expr, negated), None
+            elif self.accept_keyword("IN"):
+                expr, previous = _In(expr, self.parse_additive()), None
+            elif self.at_keyword("STARTS", "ENDS"):
+                op = self.advance().value.upper()
+                self.expect_keyword("WITH")
+                expr, previous = _StringPredicate(op, expr, self.parse_additive()), None
+            elif self.accept_keyword("CONTAINS"):
+                expr, previous = _StringPredicate("CONTAINS", expr, self.parse_additive()), None
+            elif self.accept_symbol("=~"):
+                expr, previous = _StringPredicate("=~", expr, self.parse_additive()), None
+            else:
+                return expr
+
+    def parse_additive(self) -> _Expr:
+        expr = self.parse_multiplicative()
+        while self.at_symbol("+", "-"):
+            expr = _Arithmetic(self.advance().value, expr, self.parse_multiplicative())
+        return expr
+
+    def parse_multiplicative(self) -> _Expr:
+        expr = self.parse_power()
+        while self.at_symbol("*", "/", "%"):
+            expr = _Arithmetic(self.advance().value, expr, self.parse_power())
+        return expr
+
+    def parse_power(self) -> _Expr:
+        expr = self.parse_unary()
+        while self.accept_symbol("^"):
+            expr = _Arithmetic("^", expr, self.parse_unary())
+        return expr
+
+    def parse_unary(self) -> _Expr:
+        if self.accept_symbol("-"):
+            return _Negate(self.parse_unary())
+        self.accept_symbol("+")
+        return self.parse_postfix()
+
+    def parse_postfix(self) -> _Expr:
+        expr = self.parse_atom()
+        while True:
+            if self.accept_symbol("."):
+                expr = _Prop(expr, self.expect_name())
+            elif self.accept_symbol("["):
+                if self.accept_symbol(".."):
+                    end = None if self.at_symbol("]") else self.parse_expression()
+                    expr = _Slice(expr, None, end)
+                else:
+                    index = self.parse_expression()
+                    if self.accept_symbol(".."):
+                        end = None if self.at_symbol("]") else self.parse_expression()
+                        expr = _Slice(expr, index, end)
+                    else:
+                        expr = _Index(expr, index)
+                self.expect_symbol("]")
+            else:
+                return expr
+
+    def parse_atom(self) -> _Expr:
+        token = self.peek()
+        if token.kind in ("number", "string"):
+            self.advance()
+            return _Literal(token.value)
+        if token.kind == "param":
+            self.advance()
+            return _Param(token.value)
+        if self.at_symbol("("):
+            pattern = self.try_pattern_predicate()
+            if pattern is not None:
+                return pattern
+            self.advance()
+            expr = self.parse_expression()
+            self.expect_symbol(")")
+            return expr
+        if self.at_symbol("["):
+            return self.parse_list()
+        if self.at_symbol("{"):
+            return _MapLiteral(self.parse_map())
+        if not self.at_name():
+            raise self.error()
+
+        if token.kind == "name":
+            word = token.value.upper()
+            if word in ("TRUE", "FALSE", "NULL"):
+                self.advance()
+                return _Literal({"TRUE": True, "FALSE": False, "NULL": None}[word])
+            if word == "CASE":
+                return self.parse_case()
+            if word == "REDUCE" and self.at_symbol("(", offset=1):
+                return self.parse_reduce()
+            if word in ("EXISTS", "COUNT") and self.at_symbol("{", offset=1):
+                raise self.error("subquery expressions are not supported")
+
+        # A function call is a (possibly namespaced) name followed by '('
+        offset = 0
+        while self.at_symbol(".", offset=offset + 1) and self.at_name(offset=offset + 2):
+            offset += 2
+        if self.at_symbol("(", offset=offset + 1):
+            return self.parse_function_call()
+        self.advance()
+        return _Var(token.value)
+
+    def parse_function_call(self) -> _Expr:
+        name = self.expect_name()
+        while self.accept_symbol("."):
+            name += "." + self.expect_name()
+        self.expect_symbol("(")
+        function = name.lower()
+        if function in AGGREGATES:
+            if function == "count" and self.accept_symbol("*"):
+                self.expect_symbol(")")
+                return _Aggregate("count", None, False)
+            distinct = self.accept_keyword("DISTINCT")
+            arg = self.parse_expression()
+            self.expect_symbol(")")
+            return _Aggregate(function, arg, distinct)
+        if function not in FUNCTIONS:
+            raise self.error(f"unsupported function {name}")
+        return _Call(function, self.parse_arguments())
+
+    def parse_arguments(self) -> List[_Expr]:
+        args: List[_Expr] = []
+        if not self.accept_symbol(")"):
+            while True:
+                args.append(self.parse_expression())
+                if not self.accept_symbol(","):
+                    break
+            self.expect_symbol(")")
+        return args
+
+    def try_pattern_predicate(self) -> Optional[_PatternPredicate]:
+        start = self.position
+        try:
+            path = self.parse_path()
+            if path.rels:
+                return _PatternPredicate(path)
+        except NotImplementedError:
+            pass
+        self.position = start
+        return None
+
+    def parse_list(self) -> _Expr:
+        self.expect_symbol("[")
+        if self.at_name() and self.at_keyword("IN", offset=1):
+            var = self.expect_name()
+            self.advance()
+            source = self.parse_expression()
+            where = self.parse_where()
+            projection = self.parse_expression() if self.accept_symbol("|") else None
+            self.expect_symbol("]")
+            return _ListComprehension(var, source, where, projection)
+        items: List[_Expr] = []
+        if not self.accept_symbol("]"):
+            while True:
+                items.append(self.parse_expression())
+                if not self.accept_symbol(","):
+                    break
+            self.expect_symbol("]")
+        return _ListLiteral(items)
+
+    def parse_case(self) -> _Case:
+        self.expect_keyword("CASE")
+        subject = None if self.at_keyword("WHEN") else self.parse_expression()
+        branches = []
+        while self.accept_keyword("WHEN"):
+            condition = self.parse_expression()
+            self.expect_keyword("THEN")
+            branches.append((condition, self.parse_expression()))
+        if not branches:
+            raise self.error("expected WHEN")
+        default = self.parse_expression() if self.accept_keyword("ELSE") else None
+        self.expect_keyword("END")
+        return _Case(subject, branches, default)
+
+    def parse_reduce(self) -> _Reduce:
+        self.advance()
+        self.expect_symbol("(")
+        accumulator = self.expect_name()
+        self.expect_symbol("=")
+        initial = self.parse_expression()
+        self.expect_symbol(",")
+        var = self.expect_name()
+        self.expect_keyword("IN")
+        source = self.parse_expression()
+        self.expect_symbol("|")
+        step = self.parse_expression()
+        self.expect_symbol(")")
+        return _Reduce(accumulator, initial, var, source, step)
+
+@lru_cache(maxsize=1024)
+def parse_statement(query: str):
+    """
+    Parse a Cypher statement into an executable plan, cached by query text.
+
+    :return: A Statement or SchemaStatement, run with `.execute(store, parameters)`.
+    :raises NotImplementedError: If the statement is outside the supported subset.
+    """
+    return _Parser(query).parse()
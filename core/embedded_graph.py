@@ -0,0 +1,549 @@
+# Filename: /core/embedded_graph.py
+
+import logging
+import math
+import numbers
+import re
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+from core.embedded_cypher import parse_statement
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def index_key(value: Any) -> Tuple:
+    """
+    Key a property value for indexing: (type rank, value).
+
+    Ranks keep values of different types apart, as Cypher never finds them equal or ordered; only ranks
+    below 3 (booleans, numbers, strings) are orderable.
+    """
+    if isinstance(value, bool):
+        return 0, value
+    if isinstance(value, numbers.Real):
+        return 1, value
+    if isinstance(value, str):
+        return 2, value
+    return 3, _hashable(value)
+
+def _hashable(value: Any) -> Any:
+    if isinstance(value, list):
+        return tuple(_hashable(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _hashable(item)) for key, item in value.items()))
+    return value
+
+class FullTextIndex:
+    """
+    Inverted index over one text property.
+
+    Scores are the idf-weighted share of query terms a node contains, in [0, 1], so the score thresholds
+    used against Neo4j's full-text index keep a comparable meaning.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Set[int]] = {}
+        self.doc_terms: Dict[int, Set[str]] = {}
+
+    @staticmethod
+    def terms(text: str) -> Set[str]:
+        return set(re.findall(r'\w+', str(text).lower()))
+
+    def add(self, node_id: int, text: Any):
+        self.remove(node_id)
+        if text is None:
+            return
+        terms = self.terms(text)
+        self.doc_terms[node_id] = terms
+        for term in terms:
+            self.postings.setdefault(term, set()).add(node_id)
+
+    def remove(self, node_id: int):
+        for term in self.doc_terms.pop(node_id, ()):
+            ids = self.postings.get(term)
+            if ids is not None:
+                ids.discard(node_id)
+                if not ids:
+                    del self.postings[term]
+
+    def query(self, text: str) -> List[Tuple[int, float]]:
+        """
+        Score every node sharing at least one term with `text`.
+
+        :return: (node id, score) pairs, best first.
+        """
+        query_terms = self.terms(text)
+        if not query_terms:
+            return []
+        total_docs = len(self.doc_terms)
+        idf = {term: math.log(1 + total_docs / (1 + len(self.postings.get(term, ())))) for term in query_terms}
+        norm = sum(idf.values()) or 1.0
+
+        scores: Counter = Counter()
+        for term in query_terms:
+            for node_id in self.postings.get(term, ()):
+                scores[node_id] += idf[term]
+        return [(node_id, score / norm) for node_id, score in scores.most_common()]
+
+class PropertyIndex:
+    """Hash and ordered index over one property of one label, for lookups, range scans and top-k reads."""
+
+    def __init__(self):
+        self.keys: Dict[int, Tuple] = {}
+        self.buckets: Dict[Tuple, Set[int]] = {}
+        self.entries: List[Tuple] = []  # (rank, value, node id) for orderable values, ascending
+
+    def add(self, node_id: int, value: Any):
+        self.remove(node_id)
+        if value is None:
+            return
+        key = index_key(value)
+        self.keys[node_id] = key
+        self.buckets.setdefault(key, set()).add(node_id)
+        if key[0] < 3:
+            insort(self.entries, (*key, node_id))
+
+    def remove(self, node_id: int):
+        key = self.keys.pop(node_id, None)
+        if key is None:
+            return
+        ids = self.buckets[key]
+        ids.discard(node_id)
+        if not ids:
+            del self.buckets[key]
+        if key[0] < 3:
+            entry = (*key, node_id)
+            position = bisect_left(self.entries, entry)
+            if position < len(self.entries) and self.entries[position] == entry:
+                del self.entries[position]
+
+    def lookup(self, value: Any) -> List[int]:
+        """Node ids whose value equals `value`, in creation order."""
+        return [] if value is None else sorted(self.buckets.get(index_key(value), ()))
+
+    @property
+    def ordered(self) -> bool:
+        """Whether every indexed value is orderable, so `scan` without bounds visits every indexed node."""
+        return len(self.entries) == len(self.keys)
+
+    def scan(self, start: Any = None, end: Any = None, start_inclusive: bool = True, end_inclusive: bool = True,
+             descending: bool = False) -> Optional[Iterator[int]]:
+        """
+        Iterate node ids whose value lies between `start` and `end` (open bounds are None), in value order.
+
+        :return: The iterator, or None if a bound is not an orderable value.
+        """
+        bounds = [index_key(bound) for bound in (start, end) if bound is not None]
+        if any(rank >= 3 for rank, _ in bounds):
+            return None
+        if len({rank for rank, _ in bounds}) > 1:
+            return iter(())  # Cypher never orders values of different types against each other
+        rank = bounds[0][0] if bounds else None
+
+        if start is not None:
+            key = index_key(start)
+            lo = bisect_left(self.entries, key) if start_inclusive else bisect_right(self.entries, (*key, math.inf))
+        else:
+            lo = 0 if rank is None else bisect_left(self.entries, (rank,))
+        if end is not None:
+            key = index_key(end)
+            hi = bisect_right(self.entries, (*key, math.inf)) if end_inclusive else bisect_left(self.entries, key)
+        else:
+            hi = len(self.entries) if rank is None else bisect_left(self.entries, (rank + 1,))
+
+        positions = range(hi - 1, lo - 1, -1) if descending else range(lo, hi)
+        return (self.entries[position][2] for position in positions)
+
+class EmbeddedGraphStore:
+    """
+    In-process property graph with the indexes the memory subsystem relies on.
+
+    Property indexes (created by CREATE INDEX / CREATE CONSTRAINT) back lookups by key, time-range scans and
+    top-k reads, and full-text indexes back `db.index.fulltext.queryNodes`. Nodes carry a single label and
+    there is at most one relationship of a type between two nodes. All access goes through `lock`; writes
+    made inside `transaction` are recorded in an undo log and reverted if the block raises.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.nodes: Dict[int, Dict[str, Any]] = {}
+        self.node_labels: Dict[int, Optional[str]] = {}
+        self.labels: Dict[Optional[str], Set[int]] = {}
+        self.out_edges: Dict[int, Dict[str, Dict[int, Dict[str, Any]]]] = {}
+        self.in_edges: Dict[int, Dict[str, Dict[int, Dict[str, Any]]]] = {}
+        self.indexes: Dict[Tuple[str, str], PropertyIndex] = {}
+        self.fulltext: Dict[str, FullTextIndex] = {}
+        self.fulltext_keys: Dict[str, Tuple[str, Tuple[str, ...]]] = {}
+        self._next_id = 0
+        self._undo: Optional[List[Tuple]] = None
+
+    # --- Schema ---
+
+    def create_index(self, label: str, key: str):
+        """Index `key` on nodes with `label`, if it is not indexed yet."""
+        if (label, key) in self.indexes:
+            return
+        index = self.indexes[(label, key)] = PropertyIndex()
+        for node_id in self.labels.get(label, ()):
+            index.add(node_id, self.nodes[node_id].get(key))
+
+    def create_fulltext_index(self, name: str, label: str, keys: Sequence[str]):
+        """Create the named full-text index over `keys` of nodes with `label`, if it does not exist yet."""
+        if name in self.fulltext:
+            return
+        self.fulltext[name] = FullTextIndex()
+        self.fulltext_keys[name] = (label, tuple(keys))
+        for node_id in self.labels.get(label, ()):
+            self._index_text(name, node_id)
+
+    def index_covers(self, label: Optional[str], key: str) -> bool:
+        """Whether every `label` node has a `key` of one orderable type, so an index scan visits them all in order."""
+        index = self.indexes.get((label, key))
+        if index is None or not index.ordered or len(index.entries) != len(self.labels.get(label, ())):
+            return False
+        return not index.entries or index.entries[0][0] == index.entries[-1][0]
+
+    def has_index(self, label: Optional[str], key: str) -> bool:
+        return (label, key) in self.indexes
+
+    def _index_text(self, name: str, node_id: int):
+        node = self.nodes[node_id]
+        parts = [str(node[key]) for key in self.fulltext_keys[name][1] if node.get(key) is not None]
+        self.fulltext[name].add(node_id, " ".join(parts) if parts else None)
+
+    # --- Undo log ---
+
+    @contextmanager
+    def transaction(self):
+        """
+        Hold the lock for a unit of work and undo its writes if it raises.
+
+        Nested blocks roll back only their own writes; the log is dropped when the outermost block completes.
+        """
+        with self.lock:
+            outermost = self._undo is None
+            if outermost:
+                self._undo = []
+            mark = len(self._undo)
+            try:
+                yield
+            except BaseException:
+                self._rollback(mark)
+                raise
+            finally:
+                if outermost:
+                    self._undo = None
+
+    def _log(self, entry: Tuple):
+        if self._undo is not None:
+            self._undo.append(entry)
+
+    def _rollback(self, mark: int):
+        undo, self._undo = self._undo, None  # Replayed writes must not log themselves
+        try:
+            while len(undo) > mark:
+                entry = undo.pop()
+                kind = entry[0]
+                if kind == "property":
+                    self._write_property(entry[1], entry[2], entry[3])
+                elif kind == "relationship":
+                    self._write_relationship(entry[1], entry[2], entry[3], entry[4])
+                elif kind == "created":
+                    self._drop_node(entry[1])
+                elif kind == "deleted":
+                    self._add_node(entry[1], entry[2])
+        finally:
+            self._undo = undo
+
+    # --- Nodes ---
+
+    def _add_node(self, node_id: int, label: Optional[str]):
+        self.nodes[node_id] = {}
+        self.node_labels[node_id] = label
+        self.labels.setdefault(label, set()).add(node_id)
+
+    def _drop_node(self, node_id: int):
+        self.labels[self.node_labels.pop(node_id)].discard(node_id)
+        del self.nodes[node_id]
+
+    def create_node(self, label: Optional[str], properties: Optional[Dict[str, Any]] = None) -> int:
+        """Create a node and index its properties."""
+        node_id = self._next_id
+        self._next_id += 1
+        self._add_node(node_id, label)
+        self._log(("created", node_id))
+        self.set_properties(node_id, properties or {})
+        return node_id
+
+    def find(self, label: str, key: str, value: Any) -> Optional[int]:
+        """Return one node with `label` whose `key` equals `value`, or None."""
+        ids = self.find_all(label, key, value)
+        return ids[0] if ids else None
+
+    def find_all(self, label: str, key: str, value: Any) -> List[int]:
+        """Return every node with `label` whose `key` equals `value`, using the property index when there is one."""
+        if (label, key) in self.indexes:
+            return self.indexes[(label, key)].lookup(value)
+        if value is None:
+            return []
+        wanted = index_key(value)
+        return [
+            node_id for node_id in self.label_nodes(label)
+            if self.nodes[node_id].get(key) is not None and index_key(self.nodes[node_id][key]) == wanted
+        ]
+
+    def merge_node(self, label: str, key: str, value: Any, on_create: Optional[Dict[str, Any]] = None) -> Tuple[int, bool]:
+        """
+        Find the node with `label` and `key` = `value`, creating it if absent.
+
+        :return: (node id, whether it was created).
+        """
+        node_id = self.find(label, key, value)
+        if node_id is not None:
+            return node_id, False
+        return self.create_node(label, {key: value, **(on_create or {})}), True
+
+    def set_properties(self, node_id: int, properties: Dict[str, Any]):
+        """Set node properties, keeping every index on them current. A None value removes the property."""
+        node = self.nodes[node_id]
+        for key, value in properties.items():
+            self._log(("property", node_id, key, node.get(key)))
+            self._write_property(node_id, key, value)
+
+    def _write_property(self, node_id: int, key: str, value: Any):
+        node = self.nodes[node_id]
+        if value is None:
+            node.pop(key, None)
+        else:
+            node[key] = value
+        label = self.node_labels[node_id]
+        index = self.indexes.get((label, key))
+        if index is not None:
+            index.add(node_id, value)
+        for name, (indexed_label, keys) in self.fulltext_keys.items():
+            if indexed_label == label and key in keys:
+                self._index_text(name, node_id)
+
+    def delete_node(self, node_id: int):
+        """Delete a node with its relationships (DETACH DELETE), removing it from every index."""
+        for rel_type, targets in list(self.out_edges.get(node_id, {}).items()):
+            for target in list(targets):
+                self.unrelate(node_id, rel_type, target)
+        for rel_type, sources in list(self.in_edges.get(node_id, {}).items()):
+            for source in list(sources):
+                self.unrelate(source, rel_type, node_id)
+        self.set_properties(node_id, {key: None for key in list(self.nodes[node_id])})
+        self.out_edges.pop(node_id, None)
+        self.in_edges.pop(node_id, None)
+        self._log(("deleted", node_id, self.node_labels[node_id]))
+        self._drop_node(node_id)
+
+    def has_relationships(self, node_id: int) -> bool:
+        return any(self.out_edges.get(node_id, {}).values()) or any(self.in_edges.get(node_id, {}).values())
+
+    # --- Relationships ---
+
+    def relationship(self, source: int, rel_type: str, target: int) -> Optional[Dict[str, Any]]:
+        """Return the properties of a relationship, or None if it does not exist."""
+        return self.out_edges.get(source, {}).get(rel_type, {}).get(target)
+
+    def _write_relationship(self, source: int, rel_type: str, target: int, properties: Optional[Dict[str, Any]]):
+        """Replace a relationship's properties with a copy of `properties`, deleting it when they are None."""
+        if properties is None:
+            for edges, node_id, other in ((self.out_edges, source, target), (self.in_edges, target, source)):
+                by_type = edges.get(node_id, {})
+                by_type.get(rel_type, {}).pop(other, None)
+                if not by_type.get(rel_type, True):
+                    del by_type[rel_type]
+                if node_id in edges and not by_type:
+                    del edges[node_id]
+            return
+        rel = dict(properties)
+        self.out_edges.setdefault(source, {}).setdefault(rel_type, {})[target] = rel
+        self.in_edges.setdefault(target, {}).setdefault(rel_type, {})[source] = rel
+
+    def relate(self, source: int, rel_type: str, target: int, properties: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Merge a relationship, updating its properties if it already exists. A None value removes the property.
+
+        :return: Whether the relationship was created.
+        """
+        old = self.relationship(source, rel_type, target)
+        self._log(("relationship", source, rel_type, target, None if old is None else dict(old)))
+        rel = dict(old or {})
+        for key, value in (properties or {}).items():
+            if value is None:
+                rel.pop(key, None)
+            else:
+                rel[key] = value
+        self._write_relationship(source, rel_type, target, rel)
+        return old is None
+
+    def unrelate(self, source: int, rel_type: str, target: int) -> bool:
+        """
+        Delete a relationship.
+
+        :return: Whether it existed.
+        """
+        old = self.relationship(source, rel_type, target)
+        if old is None:
+            return False
+        self._log(("relationship", source, rel_type, target, dict(old)))
+        self._write_relationship(source, rel_type, target, None)
+        return True
+
+    def neighbours(self, node_id: int, rel_type: str, incoming: bool = False) -> Dict[int, Dict[str, Any]]:
+        """Return {neighbour id: relationship properties} for one relationship type and direction."""
+        edges = self.in_edges if incoming else self.out_edges
+        return edges.get(node_id, {}).get(rel_type, {})
+
+    # --- Index reads ---
+
+    def fulltext_query(self, index: str, text: str) -> List[Tuple[int, float]]:
+        """Run a full-text query against a named index, best match first."""
+        if index not in self.fulltext:
+            raise ValueError(f"There is no full-text index called '{index}'")
+        return self.fulltext[index].query(text)
+
+    def index_scan(self, label: str, key: str, start: Any = None, end: Any = None, start_inclusive: bool = True,
+                   end_inclusive: bool = True, descending: bool = False) -> Optional[Iterator[int]]:
+        """Iterate nodes by `key` through its property index; None if `key` is not indexed or a bound is not orderable."""
+        index = self.indexes.get((label, key))
+        if index is None:
+            return None
+        return index.scan(start, end, start_inclusive, end_inclusive, descending)
+
+    def top_k(self, label: str, key: str, k: int, end: Any = None) -> List[int]:
+        """Return the `k` nodes with the largest `key` (at most `end`), largest first."""
+        if k <= 0:
+            return []
+        scan = self.index_scan(label, key, end=end, descending=True)
+        if scan is not None and self.indexes[(label, key)].ordered:
+            return [node_id for _, node_id in zip(range(k), scan)]
+        candidates = [
+            node_id for node_id in self.label_nodes(label)
+            if self.nodes[node_id].get(key) is not None and (end is None or self.nodes[node_id][key] <= end)
+        ]
+        return sorted(candidates, key=lambda node_id: self.nodes[node_id][key], reverse=True)[:k]
+
+    def range_scan(self, label: str, key: str, start: Any = None, end: Any = None) -> List[int]:
+        """Return nodes with start <= `key` < end, in ascending order of `key`."""
+        scan = self.index_scan(label, key, start, end, end_inclusive=False)
+        if scan is not None:
+            return list(scan)
+        candidates = [
+            node_id for node_id in self.label_nodes(label)
+            if self.nodes[node_id].get(key) is not None
+            and (start is None or self.nodes[node_id][key] >= start)
+            and (end is None or self.nodes[node_id][key] < end)
+        ]
+        return sorted(candidates, key=lambda node_id: self.nodes[node_id][key])
+
+    def label_nodes(self, label: Optional[str]) -> List[int]:
+        """Return all nodes with `label`, in creation order."""
+        return sorted(self.labels.get(label, ()))
+
+    def all_nodes(self) -> List[int]:
+        """Return every node, in creation order."""
+        return sorted(self.nodes)
+
+class _EmbeddedResult:
+    """Minimal stand-in for a driver result, as seen by transaction functions."""
+
+    def __init__(self, rows: List[Dict]):
+        self.rows = rows
+
+    def data(self) -> List[Dict]:
+        return self.rows
+
+    def single(self) -> Optional[Dict]:
+        return self.rows[0] if self.rows else None
+
+    def __iter__(self):
+        return iter(self.rows)
+
+class _EmbeddedTransaction:
+    def __init__(self, connector: "EmbeddedGraphConnector"):
+        self.connector = connector
+
+    def run(self, query: str, parameters: Optional[Dict] = None, **kwargs) -> _EmbeddedResult:
+        return _EmbeddedResult(self.connector._execute(query, {**(parameters or {}), **kwargs}))
+
+class EmbeddedGraphConnector:
+    """
+    Drop-in replacement for Neo4jConnector backed by an in-process EmbeddedGraphStore.
+
+    Statements are parsed and run by core.embedded_cypher, which implements the Cypher subset the memory
+    subsystem issues (MATCH, MERGE, CREATE, SET, REMOVE, DELETE, UNWIND, WITH, FOREACH, CALL subqueries,
+    aggregation, schema statements and `db.index.fulltext.queryNodes`); anything outside it raises
+    NotImplementedError. Each statement, `execute_write` call and `run_transaction` batch is atomic.
+    """
+
+    def __init__(self, store: Optional[EmbeddedGraphStore] = None):
+        """
+        Initialize the connector.
+
+        :param store: Graph to serve; a fresh empty store by default. Several connectors may share one store.
+        """
+        self.store = store or EmbeddedGraphStore()
+        self.database = None
+        logger.info("[EMBEDDED GRAPH] In-process graph backend ready.")
+
+    def _execute(self, query: str, parameters: Dict) -> List[Dict]:
+        statement = parse_statement(query)
+        with self.store.transaction():
+            return statement.execute(self.store, parameters)
+
+    def run_query(self, query: str, parameters: Optional[Dict] = None, db: Optional[str] = None) -> List[Dict]:
+        """
+        Execute a Cypher statement against the in-process graph.
+
+        :param query: Cypher query to execute
+        :param parameters: Dictionary of parameters for the query
+        :param db: Ignored; the embedded backend has a single graph.
+        :return: List of dictionaries with query results
+        :raises NotImplementedError: If the statement is outside the supported Cypher subset.
+        """
+        data = self._execute(query, parameters or {})
+        logger.debug(f"[EMBEDDED QUERY] {len(data)} rows returned.")
+        return data
+
+    read_query = run_query
+    write_query = run_query
+
+    def execute_read(self, work: Callable, *args, db: Optional[str] = None, **kwargs) -> Any:
+        """Run a transaction function against the graph while holding the store lock."""
+        with self.store.lock:
+            return work(_EmbeddedTransaction(self), *args, **kwargs)
+
+    def execute_write(self, work: Callable, *args, db: Optional[str] = None, **kwargs) -> Any:
+        """Run a transaction function while holding the store lock, undoing its writes if it raises."""
+        with self.store.transaction():
+            return work(_EmbeddedTransaction(self), *args, **kwargs)
+
+    def run_transaction(self, statements: Sequence[Tuple[str, Optional[Dict]]], db: Optional[str] = None,
+                        read_only: bool = False) -> List[List[Dict]]:
+        """
+        Execute several statements atomically: in order, without interleaving other callers, and with every
+        write undone if any of them fails.
+
+        :param statements: Sequence of (query, parameters) pairs, run in order.
+        :return: One result list per statement.
+        """
+        def work(tx):
+            return [tx.run(query, parameters).data() for query, parameters in statements]
+        return (self.execute_read if read_only else self.execute_write)(work)
+
+    def close(self):
+        """Nothing to release; present for interface compatibility."""
+        logger.info("[EMBEDDED GRAPH] Closed.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
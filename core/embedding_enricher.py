@@ -0,0 +1,157 @@
+# Filename: /core/embedding_enricher.py
+
+import atexit
+import logging
+import threading
+from datetime import datetime
+from typing import Iterable, List, Optional
+from core.embedding_store import EmbeddingStore
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class EmbeddingEnricher:
+    """
+    Background worker that writes `m.vector` for Memory nodes missing a vector for the current model.
+
+    New memories are stored with the indexed `m.embedding_pending` flag, so each pass reads only the
+    pending ones; they are embedded in large batches through the shared EmbeddingStore and written back
+    with one UNWIND per batch, tagged with `m.vector_model`, clearing the flag. On start, memories whose
+    vector is missing or from another model are flagged once, so a model change re-embeds everything.
+    The stored vectors are read back by ContextSearchEngine instead of encoding those memories again.
+    """
+
+    PENDING_QUERY = """
+    MATCH (m:Memory)
+    WHERE m.embedding_pending = true
+    RETURN m.text AS text
+    LIMIT $limit
+    """
+
+    REQUEUE_STALE_QUERY = """
+    MATCH (m:Memory)
+    WHERE m.text IS NOT NULL AND m.embedding_pending IS NULL
+      AND (m.vector IS NULL OR m.vector_model IS NULL OR m.vector_model <> $model)
+    SET m.embedding_pending = true
+    RETURN count(m) AS queued
+    """
+
+    WRITE_VECTORS_QUERY = """
+    UNWIND $rows AS row
+    MATCH (m:Memory {text: row.text})
+    SET m.vector = row.vector, m.vector_model = $model, m.vector_updated_at = $timestamp
+    REMOVE m.embedding_pending
+    RETURN count(m) AS updated
+    """
+
+    def __init__(self, db, embeddings: EmbeddingStore, interval: float = 60.0, batch_size: int = 512,
+                 encode_batch_size: int = 128):
+        """
+        Initialize the worker.
+
+        :param db: Connector used for the pending and write queries.
+        :param embeddings: Embedding store for the model whose vectors are written; its model id is the version tag.
+        :param interval: Seconds between passes when no wake-up arrives.
+        :param batch_size: Memories read, embedded and written per batch.
+        :param encode_batch_size: Texts per model forward pass.
+        """
+        self.db = db
+        self.embeddings = embeddings
+        self.model_version = embeddings.model_id
+        self.interval = interval
+        self.batch_size = batch_size
+        self.encode_batch_size = encode_batch_size
+
+        self._run_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the background enrichment thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="EmbeddingEnricher")
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def _run(self):
+        self.requeue_stale()
+        while not self._stop.is_set():
+            self.run_once()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def wake(self, texts: Optional[Iterable[str]] = None):
+        """
+        Trigger a pass without waiting for the interval. Can be registered as a MemoryEngine store listener.
+
+        :param texts: Newly stored memory texts (unused; the pending query finds them).
+        """
+        self._wake.set()
+
+    def stop(self):
+        """Stop the enrichment thread after the batch in progress."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.interval)
+
+    def requeue_stale(self) -> int:
+        """
+        Flag memories written without the pending flag, or embedded by another model, for enrichment.
+
+        :return: Number of memories flagged.
+        """
+        try:
+            result = self.db.write_query(self.REQUEUE_STALE_QUERY, {"model": self.model_version})
+            queued = result[0]["queued"] if result else 0
+            if queued:
+                logger.info(f"[EMBEDDING ENRICHMENT] Queued {queued} memories without a {self.model_version} vector.")
+            return queued
+        except Exception as e:
+            logger.error(f"[EMBEDDING ENRICHMENT ERROR] {e}", exc_info=True)
+            return 0
+
+    def run_once(self) -> int:
+        """
+        Embed and write vectors for every pending memory, one batch at a time.
+
+        :return: Number of memories enriched.
+        """
+        if not self._run_lock.acquire(blocking=False):
+            return 0  # A pass is already running
+        enriched = 0
+        try:
+            while not self._stop.is_set():
+                pending = self.db.read_query(self.PENDING_QUERY, {"model": self.model_version, "limit": self.batch_size})
+                if not pending:
+                    break
+                updated = self.enrich([memory["text"] for memory in pending])
+                enriched += updated
+                if updated == 0 or len(pending) < self.batch_size:
+                    break  # Nothing could be written, or the backlog is drained
+            if enriched:
+                logger.info(f"[EMBEDDING ENRICHMENT] Wrote {self.model_version} vectors for {enriched} memories.")
+        except Exception as e:
+            logger.error(f"[EMBEDDING ENRICHMENT ERROR] {e}", exc_info=True)
+        finally:
+            self._run_lock.release()
+        return enriched
+
+    def enrich(self, texts: List[str]) -> int:
+        """
+        Embed a batch of memory texts and write their vectors in one transaction.
+
+        :param texts: Memory texts to embed.
+        :return: Number of memories updated.
+        """
+        vectors = self.embeddings.encode([text.lower() for text in texts], batch_size=self.encode_batch_size)
+        result = self.db.write_query(self.WRITE_VECTORS_QUERY, {
+            "rows": [{"text": text, "vector": vector.tolist()} for text, vector in zip(texts, vectors)],
+            "model": self.model_version,
+            "timestamp": datetime.now().isoformat(),
+        })
+        return result[0]["updated"] if result else 0
@@ -0,0 +1,293 @@
+# Filename: /core/embedding_matrix.py
+
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import numpy as np
+
+try:
+    import fcntl  # POSIX advisory locks for cross-process appends
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class MappedEmbeddingMatrix:
+    """
+    Append-only embedding matrix kept in a memory-mapped float32 file, with a parallel id table.
+
+    Four files share the `path` prefix: `.f32` holds normalized rows, `.ids` holds one JSON-encoded key
+    per row, `.tomb` holds the numbers of deleted rows and `.json` holds the dimension, model id, committed
+    row count and the (created_at, text) watermark of the last appended memory. Rows are written before the
+    metadata, so a reader never sees a row count whose data is missing. Pages of the matrix live in the OS
+    page cache and are shared by every process that maps the same file.
+
+    Writers serialize on an advisory lock on `.lock` and re-read the metadata under it, so several processes
+    can append and delete; readers pick up their changes whenever the metadata or tombstones change.
+    """
+
+    def __init__(self, path: str, model_id: str):
+        """
+        Open the matrix at `path`, discarding it if it was built with a different model.
+
+        :param path: File prefix of the matrix, id table, tombstones and metadata.
+        :param model_id: Embedding model the rows come from.
+        """
+        self.path = path
+        self.model_id = model_id
+        self.dim: Optional[int] = None
+        self.watermark: Tuple[str, str] = ("", "")
+
+        self._lock = threading.RLock()
+        self._matrix: Optional[np.memmap] = None
+        self._rows = 0
+        self._keys: List[str] = []
+        self._key_rows: Dict[str, List[int]] = {}
+        self._ids_offset = 0
+        self._deleted: Set[int] = set()
+        self._tomb_offset = 0
+        self._version: Optional[Tuple[int, int, int]] = None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, self._file_lock():
+            self._load()
+
+    def __len__(self) -> int:
+        return self._rows
+
+    @property
+    def _data_path(self) -> str:
+        return f"{self.path}.f32"
+
+    @property
+    def _ids_path(self) -> str:
+        return f"{self.path}.ids"
+
+    @property
+    def _tomb_path(self) -> str:
+        return f"{self.path}.tomb"
+
+    @property
+    def _meta_path(self) -> str:
+        return f"{self.path}.json"
+
+    @contextmanager
+    def _file_lock(self):
+        """Hold the cross-process writer lock."""
+        with open(f"{self.path}.lock", "w") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _disk_version(self) -> Optional[Tuple[int, int, int]]:
+        """Identity of the metadata file and size of the tombstones, which change with every commit."""
+        try:
+            meta = os.stat(self._meta_path)
+        except FileNotFoundError:
+            return None
+        tomb_size = os.path.getsize(self._tomb_path) if os.path.exists(self._tomb_path) else 0
+        return meta.st_ino, meta.st_mtime_ns, tomb_size
+
+    def _clear(self):
+        self._matrix = None
+        self.dim, self._rows, self._keys, self._key_rows, self._ids_offset = None, 0, [], {}, 0
+        self._deleted, self._tomb_offset = set(), 0
+        self.watermark = ("", "")
+
+    def _load(self):
+        """Map an existing matrix if its metadata matches the current model. Caller holds both locks."""
+        if not os.path.exists(self._meta_path):
+            return
+        try:
+            with open(self._meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("model") != self.model_id:
+                logger.info(f"[EMBEDDING MATRIX] {self.path} was built with {meta.get('model')}; rebuilding for {self.model_id}.")
+                self._reset_files()
+                return
+            self._sync()
+            logger.info(f"[EMBEDDING MATRIX] Mapped {self._rows} rows from {self._data_path}.")
+        except Exception as e:
+            logger.error(f"[EMBEDDING MATRIX] Failed to load {self.path}: {e}", exc_info=True)
+            self._reset_files()
+
+    @staticmethod
+    def _read_lines(path: str, offset: int, limit: Optional[int] = None) -> Tuple[List[bytes], int]:
+        """Read complete lines from `offset`, at most `limit` of them, and return them with the new offset."""
+        if not os.path.exists(path):
+            return [], offset
+        lines = []
+        with open(path, "rb") as f:
+            f.seek(offset)
+            while limit is None or len(lines) < limit:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break  # End of file, or a line whose write has not finished
+                lines.append(line)
+                offset += len(line)
+        return lines, offset
+
+    def _sync(self):
+        """Catch up with rows, tombstones and the watermark committed by any process. Caller holds `_lock`."""
+        version = self._disk_version()
+        if version == self._version:
+            return
+        if version is None:
+            self._clear()  # Reset by another process
+            self._version = None
+            return
+        with open(self._meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["rows"] < self._rows:
+            self._clear()  # Reset and rebuilt by another process
+
+        lines, self._ids_offset = self._read_lines(self._ids_path, self._ids_offset, meta["rows"] - self._rows)
+        for line in lines:
+            key = json.loads(line)
+            self._key_rows.setdefault(key, []).append(len(self._keys))
+            self._keys.append(key)
+        self.dim, self._rows = meta["dim"], len(self._keys)
+        self.watermark = (meta.get("created_at", ""), meta.get("text", ""))
+        if self._matrix is None or self._rows > self._matrix.shape[0]:
+            self._matrix = None
+            self._map(max(self._rows, 1))
+
+        lines, self._tomb_offset = self._read_lines(self._tomb_path, self._tomb_offset)
+        self._deleted.update(int(line) for line in lines)
+        self._version = version
+
+    def reload(self):
+        """Pick up rows and deletions committed by other processes since the last look."""
+        with self._lock:
+            self._sync()
+
+    def _map(self, capacity: int):
+        """(Re)map the data file with room for `capacity` rows, growing it if needed."""
+        size = capacity * self.dim * 4
+        if not os.path.exists(self._data_path) or os.path.getsize(self._data_path) < size:
+            with open(self._data_path, "ab") as f:
+                f.truncate(size)
+        capacity = os.path.getsize(self._data_path) // (self.dim * 4)
+        self._matrix = np.memmap(self._data_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _reset_files(self):
+        for path in (self._data_path, self._ids_path, self._tomb_path, self._meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self._clear()
+        self._version = None
+
+    def reset(self):
+        """Delete every row and the files backing them."""
+        with self._lock, self._file_lock():
+            self._reset_files()
+
+    def append(self, keys: Sequence[str], vectors: np.ndarray, watermark: Optional[Tuple[str, str]] = None,
+               after: Optional[Tuple[str, str]] = None) -> int:
+        """
+        Append normalized rows and commit them with the new watermark.
+
+        :param keys: Identifiers for each row of `vectors`.
+        :param vectors: Matrix of embeddings, one row per key.
+        :param watermark: (created_at, text) of the last memory appended.
+        :param after: Watermark the rows were read after. If another process has moved the watermark since,
+                      nothing is appended, so two writers cannot both append the same memories.
+        :return: Number of rows appended.
+        """
+        if len(keys) == 0:
+            return 0
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(keys), -1)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors = vectors / norms
+
+        with self._lock, self._file_lock():
+            self._sync()
+            if after is not None and self.watermark != tuple(after):
+                return 0
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected vectors of dimension {self.dim}, got {vectors.shape[1]}.")
+
+            end = self._rows + len(keys)
+            if self._matrix is None or end > self._matrix.shape[0]:
+                self._matrix = None  # Release the old mapping before growing the file
+                self._map(max(end, 2 * self._rows, 1024))
+            self._matrix[self._rows:end] = vectors
+            self._matrix.flush()
+
+            # Drop whatever an interrupted append left past the last committed key before adding to it
+            if os.path.exists(self._ids_path) and os.path.getsize(self._ids_path) > self._ids_offset:
+                os.truncate(self._ids_path, self._ids_offset)
+            encoded = "".join(json.dumps(key) + "\n" for key in keys).encode("utf-8")
+            with open(self._ids_path, "ab") as f:
+                f.write(encoded)
+            self._ids_offset += len(encoded)
+            for key in keys:
+                self._key_rows.setdefault(key, []).append(len(self._keys))
+                self._keys.append(key)
+            self._rows = end
+            if watermark is not None:
+                self.watermark = tuple(watermark)
+
+            meta = {"dim": self.dim, "model": self.model_id, "rows": self._rows,
+                    "created_at": self.watermark[0], "text": self.watermark[1]}
+            with open(f"{self._meta_path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(f"{self._meta_path}.tmp", self._meta_path)
+            self._version = self._disk_version()
+            return len(keys)
+
+    def remove(self, keys: Iterable[str]) -> int:
+        """
+        Tombstone every row of the given keys, e.g. memories deleted or merged into another one.
+
+        :param keys: Identifiers whose rows should no longer be returned.
+        :return: Number of rows tombstoned.
+        """
+        with self._lock, self._file_lock():
+            self._sync()
+            rows = [row for key in set(keys) for row in self._key_rows.get(key, ()) if row not in self._deleted]
+            if not rows:
+                return 0
+            with open(self._tomb_path, "ab") as f:
+                f.write("".join(f"{row}\n" for row in rows).encode("utf-8"))
+            self._sync()
+            return len(rows)
+
+    def search(self, query: Sequence[float], k: int = 10, min_score: Optional[float] = None) -> List[Tuple[str, float]]:
+        """
+        Return the top-k live rows most similar to the query with one matrix-vector product.
+
+        :param query: Query embedding.
+        :param k: Number of rows to return.
+        :param min_score: Optional cosine similarity cut-off (exclusive).
+        :return: List of (key, similarity) tuples, most similar first.
+        """
+        with self._lock:
+            self._sync()
+            if self._rows == 0 or k <= 0:
+                return []
+            q = np.asarray(query, dtype=np.float32).reshape(-1)
+            q = q / (np.linalg.norm(q) or 1.0)
+            scores = self._matrix[:self._rows] @ q
+            if self._deleted:
+                scores[np.fromiter(self._deleted, dtype=np.int64)] = -np.inf
+            k = min(k, self._rows - len(self._deleted))
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self._keys[row], float(scores[row])) for row in top
+                    if min_score is None or scores[row] > min_score]
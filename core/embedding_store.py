@@ -0,0 +1,275 @@
+# Filename: /core/embedding_store.py
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Union
+import numpy as np
+from core.model_registry import model_registry
+
+try:
+    import fcntl  # POSIX advisory locks for cross-process appends
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DEFAULT_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", os.path.join(os.getcwd(), "embedding_cache"))
+
+class EmbeddingStore:
+    """
+    Content-addressed embedding cache shared by every caller of a given encoder model.
+
+    Embeddings are keyed by (model id, SHA-256 of the normalized text). Lookups go through an in-memory
+    LRU tier first, then an append-only on-disk tier that is memory-mapped, so a text is encoded at most
+    once per model across processes and restarts.
+    """
+
+    _instances: Dict[str, "EmbeddingStore"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, model_id: str, model=None, cache_dir: Optional[str] = DEFAULT_CACHE_DIR, lru_size: int = 10000):
+        """
+        Initialize the embedding store for one encoder model.
+
+        :param model_id: Stable identifier of the model, part of every cache key.
+        :param model: Encoder exposing a SentenceTransformer-compatible `encode` method. Defaults to the
+                      shared SentenceTransformer from the model registry, loaded only on the first cache miss.
+        :param cache_dir: Root directory of the on-disk tier; None keeps the store in memory only.
+        :param lru_size: Maximum number of embeddings held in the in-memory tier.
+        """
+        self._model = model
+        self.model_id = model_id
+        self.lru_size = lru_size
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._lock = threading.RLock()
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._dim: Optional[int] = None
+        self._disk_rows: Dict[str, int] = {}
+        self._keys_offset = 0
+        self._disk_row_count = 0
+        self._matrix: Optional[np.ndarray] = None
+
+        self._directory = None
+        if cache_dir:
+            self._directory = os.path.join(cache_dir, re.sub(r'[^A-Za-z0-9_.-]+', '_', model_id))
+            os.makedirs(self._directory, exist_ok=True)
+            self._refresh_disk_index()
+
+    @property
+    def model(self):
+        """Encoder used for cache misses."""
+        return self._model if self._model is not None else model_registry.sentence_transformer(self.model_id)
+
+    @classmethod
+    def for_model(cls, model_id: str, model=None, **kwargs) -> "EmbeddingStore":
+        """
+        Return the process-wide store for `model_id`, creating it on first use.
+
+        :param model_id: Stable identifier of the model.
+        :param model: Optional explicit encoder used when the store has to be created.
+        :return: Shared EmbeddingStore instance.
+        """
+        with cls._instances_lock:
+            store = cls._instances.get(model_id)
+            if store is None:
+                store = cls(model_id, model, **kwargs)
+                cls._instances[model_id] = store
+            return store
+
+    @classmethod
+    def all_stats(cls) -> List[Dict[str, Union[str, int, float]]]:
+        """
+        Report counters for every store created in this process.
+
+        :return: List of `stats()` dictionaries, one per model.
+        """
+        with cls._instances_lock:
+            return [store.stats() for store in cls._instances.values()]
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalize text so trivially different spellings of the same content share one key."""
+        return re.sub(r'\s+', ' ', unicodedata.normalize("NFC", text)).strip()
+
+    def key(self, text: str) -> str:
+        """Return the content hash used to address the embedding of `text`."""
+        return hashlib.sha256(self.normalize(text).encode("utf-8")).hexdigest()
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self._directory, "vectors.f32")
+
+    @property
+    def _keys_path(self) -> str:
+        return os.path.join(self._directory, "keys.txt")
+
+    def _data_rows(self) -> int:
+        """Number of complete vectors in the data file."""
+        if not os.path.exists(self._vectors_path):
+            return 0
+        return os.path.getsize(self._vectors_path) // (self._dim * 4)
+
+    def _refresh_disk_index(self):
+        """
+        Pick up rows appended to the on-disk tier since the last refresh, including by other processes.
+
+        Row numbers are key line numbers, and a key is only taken once the data file holds its vector, so a
+        writer that died between the two appends never shifts the rows of later keys.
+        """
+        if not self._directory or not os.path.exists(self._keys_path):
+            return
+        dim_path = os.path.join(self._directory, "dim")
+        if self._dim is None and os.path.exists(dim_path):
+            with open(dim_path) as f:
+                self._dim = int(f.read().strip())
+        if self._dim is None:
+            return
+
+        data_rows = self._data_rows()
+        with open(self._keys_path, "rb") as f:
+            f.seek(self._keys_offset)
+            for line in f:
+                if not line.endswith(b"\n") or self._disk_row_count >= data_rows:
+                    break  # Partially written line, or a key whose vector is not on disk yet
+                self._disk_rows.setdefault(line.decode("utf-8").strip(), self._disk_row_count)
+                self._disk_row_count += 1
+                self._keys_offset += len(line)
+
+        rows = self._disk_row_count
+        if rows and (self._matrix is None or self._matrix.shape[0] < rows):
+            self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self._dim))
+
+    def _append_to_disk(self, keys: List[str], vectors: np.ndarray):
+        """Append freshly encoded embeddings to the on-disk tier under an exclusive file lock."""
+        if not self._directory:
+            return
+        with open(os.path.join(self._directory, ".lock"), "w") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._refresh_disk_index()
+                dim_path = os.path.join(self._directory, "dim")
+                if not os.path.exists(dim_path):
+                    with open(dim_path, "w") as f:
+                        f.write(str(vectors.shape[1]))
+                    self._dim = vectors.shape[1]
+
+                new_rows = [(k, v) for k, v in zip(keys, vectors) if k not in self._disk_rows]
+                if not new_rows:
+                    return
+                # Drop whatever an interrupted append left past the last complete row before adding to it
+                for path, size in ((self._vectors_path, self._disk_row_count * self._dim * 4), (self._keys_path, self._keys_offset)):
+                    if os.path.exists(path) and os.path.getsize(path) > size:
+                        os.truncate(path, size)
+                with open(self._vectors_path, "ab") as f:
+                    f.write(np.ascontiguousarray([v for _, v in new_rows], dtype=np.float32).tobytes())
+                with open(self._keys_path, "a") as f:
+                    f.write("".join(f"{k}\n" for k, _ in new_rows))
+                self._refresh_disk_index()
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _remember(self, key: str, vector: np.ndarray):
+        """Insert into the LRU tier, evicting the least recently used entry when full."""
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def _lookup(self, key: str) -> Optional[np.ndarray]:
+        """Return the cached embedding for `key` from the LRU or disk tier."""
+        vector = self._lru.get(key)
+        if vector is not None:
+            self._lru.move_to_end(key)
+            self.hits += 1
+            return vector
+        row = self._disk_rows.get(key)
+        if row is not None and self._matrix is not None and row < self._matrix.shape[0]:
+            vector = np.array(self._matrix[row])
+            self._remember(key, vector)
+            self.disk_hits += 1
+            return vector
+        return None
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 64) -> np.ndarray:
+        """
+        Return embeddings for `texts`, encoding only those not already cached.
+
+        :param texts: A single text or a list of texts.
+        :param batch_size: Batch size passed to the model for cache misses.
+        :return: A 1-D vector for a single text, otherwise a 2-D matrix with one row per text.
+        """
+        single = isinstance(texts, str)
+        items = [texts] if single else list(texts)
+        normalized = [self.normalize(text) for text in items]
+        keys = [hashlib.sha256(text.encode("utf-8")).hexdigest() for text in normalized]
+
+        with self._lock:
+            found: Dict[str, np.ndarray] = {}
+            missing: Dict[str, str] = {}
+            for key, text in zip(keys, normalized):
+                if key in found or key in missing:
+                    continue
+                vector = self._lookup(key)
+                if vector is None:
+                    missing[key] = text
+                else:
+                    found[key] = vector
+
+            if missing and self._directory:
+                # Other processes may have encoded some of them since the last refresh
+                self._refresh_disk_index()
+                for key in list(missing):
+                    vector = self._lookup(key)
+                    if vector is not None:
+                        found[key] = vector
+                        del missing[key]
+
+            self.misses += len(missing)
+
+        if missing:
+            # Inference runs outside the lock, so concurrent callers only wait for each other's cache reads
+            encoded = np.asarray(
+                self.model.encode(list(missing.values()), batch_size=batch_size),
+                dtype=np.float32
+            )
+            with self._lock:
+                for key, vector in zip(missing.keys(), encoded):
+                    found[key] = vector
+                    self._remember(key, vector)
+                self._append_to_disk(list(missing.keys()), encoded)
+            logger.debug(f"[EMBEDDING STORE] {self.model_id}: encoded {len(missing)} new texts.")
+
+        if single:
+            return found[keys[0]]
+        if not keys:
+            return np.zeros((0, self._dim or 0), dtype=np.float32)
+        return np.stack([found[key] for key in keys])
+
+    def stats(self) -> Dict[str, Union[str, int, float]]:
+        """
+        Report hit/miss counters for the store.
+
+        :return: Dictionary with memory hits, disk hits, misses (model encodes) and overall hit rate.
+        """
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "model_id": self.model_id,
+            "memory_hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._lru),
+            "disk_entries": len(self._disk_rows),
+        }
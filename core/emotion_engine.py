@@ -3,7 +3,7 @@
 import re
 import logging
 from collections import defaultdict
-from transformers import pipeline
+from core.model_registry import model_registry
 from typing import Dict, List, Tuple, Union
 import numpy as np  # Added for more complex calculations
 
@@ -12,6 +12,8 @@ logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class EmotionEngine:
+    EMOTION_MODEL_ID = "j-hartmann/emotion-english-distilroberta-base"
+
     def __init__(self):
         """
         Initialize the EmotionEngine with emotion keywords, a sentiment analysis model, and transition tracking.
@@ -31,13 +33,10 @@ class EmotionEngine:
         self.emotion_transitions: Dict[Tuple[str, str], int] = defaultdict(int)
         self.emotion_history: List[str] = []
 
-        try:
-            # More advanced emotion model for better classification
-            self.emotion_classifier = pipeline("text-classification", model="j-hartmann/emotion-english-distilroberta-base")
-            logger.info("[INIT] Emotion classification model loaded successfully.")
-        except Exception as e:
-            logger.error(f"[INIT ERROR] Failed to load emotion classification model: {e}")
-            raise
+    @property
+    def emotion_classifier(self):
+        """More advanced emotion model for better classification, shared process-wide and loaded on first use."""
+        return model_registry.pipeline("text-classification", self.EMOTION_MODEL_ID)
 
     def analyze_emotion(self, text: str) -> Tuple[str, float]:
         """
@@ -5,7 +5,7 @@ from typing import Dict, List, Tuple
 from core.emotion_engine import EmotionEngine
 from PIL import Image
 import numpy as np
-from transformers import pipeline
+from core.model_registry import model_registry
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -23,13 +23,10 @@ class EmotionFusionEngine:
         self.memory_engine = memory_engine
         self.nlp_engine = nlp_engine
 
-        # Visual emotion analysis model
-        try:
-            self.visual_emotion_model = pipeline("image-classification", model="microsoft/resnet-50")
-            logger.info("[INIT] Visual emotion model loaded successfully.")
-        except Exception as e:
-            logger.error(f"[INIT ERROR] Failed to load visual emotion model: {e}")
-            raise
+    @property
+    def visual_emotion_model(self):
+        """Visual emotion analysis model, shared process-wide and loaded on first use."""
+        return model_registry.pipeline("image-classification", "microsoft/resnet-50")
 
     def fuse_emotions(self, visual_input: str, text_input: str) -> Tuple[str, float]:
         """
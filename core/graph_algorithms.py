@@ -0,0 +1,205 @@
+# Filename: /core/graph_algorithms.py
+
+import logging
+from typing import Dict, Hashable, Iterator, List, Optional, Sequence
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class CSRGraph:
+    """
+    Directed graph snapshot in compressed sparse row form.
+
+    Node keys (e.g. memory texts) are mapped to dense ids; the out-neighbours of node `i` are
+    `indices[indptr[i]:indptr[i + 1]]`. Built once from an edge export so graph algorithms run in-process
+    instead of as path-expanding database queries.
+    """
+
+    def __init__(self, keys: List[Hashable], indptr: np.ndarray, indices: np.ndarray):
+        self.keys = keys
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def from_edges(cls, sources: Sequence[Hashable], targets: Sequence[Hashable]) -> "CSRGraph":
+        """
+        Build a snapshot from parallel source/target key sequences. Duplicate edges are kept once.
+
+        :param sources: Edge source keys.
+        :param targets: Edge target keys, aligned with `sources`.
+        """
+        ids: Dict[Hashable, int] = {}
+        for key in list(sources) + list(targets):
+            ids.setdefault(key, len(ids))
+        keys = list(ids)
+
+        src = np.fromiter((ids[key] for key in sources), dtype=np.int64, count=len(sources))
+        dst = np.fromiter((ids[key] for key in targets), dtype=np.int64, count=len(targets))
+        if len(src):
+            edges = np.unique(np.stack([src, dst], axis=1), axis=0)  # Sorted by source, then target
+            src, dst = edges[:, 0], edges[:, 1]
+
+        counts = np.bincount(src, minlength=len(keys))
+        indptr = np.zeros(len(keys) + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        return cls(keys, indptr, dst.astype(np.int64))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def edge_count(self) -> int:
+        return int(len(self.indices))
+
+    def neighbours(self, node: int) -> np.ndarray:
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+def strongly_connected_components(graph: CSRGraph) -> List[List[int]]:
+    """
+    Tarjan's algorithm, iterative so deep graphs cannot overflow the Python stack.
+
+    :return: Components as lists of node ids, in reverse topological order of the condensation.
+    """
+    n = len(graph)
+    indptr, indices = graph.indptr.tolist(), graph.indices.tolist()  # Scalar access is faster on lists
+    index = [-1] * n
+    lowlink = [0] * n
+    on_stack = [False] * n
+    stack: List[int] = []
+    components: List[List[int]] = []
+    counter = 0
+
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        work = [(root, indptr[root])]  # (node, next edge offset to visit)
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        while work:
+            node, edge = work[-1]
+            if edge < indptr[node + 1]:
+                work[-1] = (node, edge + 1)
+                successor = indices[edge]
+                if index[successor] == -1:
+                    index[successor] = lowlink[successor] = counter
+                    counter += 1
+                    stack.append(successor)
+                    on_stack[successor] = True
+                    work.append((successor, indptr[successor]))
+                elif on_stack[successor]:
+                    lowlink[node] = min(lowlink[node], index[successor])
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            if lowlink[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+    return components
+
+def bounded_cycles(graph: CSRGraph, max_length: int, components: Optional[List[List[int]]] = None,
+                   limit: Optional[int] = None) -> Iterator[List[int]]:
+    """
+    Enumerate simple cycles of at most `max_length` edges, lazily.
+
+    Search is confined to strongly connected components with a cycle, and each cycle is reported once,
+    rotated to start at its smallest node id.
+
+    :param graph: Snapshot to search.
+    :param max_length: Longest cycle, in edges, to report.
+    :param components: Precomputed SCCs, if already available.
+    :param limit: Stop after this many cycles.
+    :return: Iterator of cycles as node id lists (the closing edge back to the first node is implied).
+    """
+    if components is None:
+        components = strongly_connected_components(graph)
+    found = 0
+    for component in components:
+        members = set(component)
+        if len(component) == 1:
+            node = component[0]
+            if node in graph.neighbours(node):  # Self-loop
+                yield [node]
+                found += 1
+                if limit is not None and found >= limit:
+                    return
+            continue
+
+        for start in sorted(component):
+            path = [start]
+            on_path = {start}
+            work = [iter(graph.neighbours(start))]
+            while work:
+                successor = next(work[-1], None)
+                if successor is None:
+                    work.pop()
+                    on_path.discard(path.pop())
+                    continue
+                successor = int(successor)
+                if successor == start:
+                    yield list(path)
+                    found += 1
+                    if limit is not None and found >= limit:
+                        return
+                elif (successor > start and successor in members and successor not in on_path
+                      and len(path) < max_length):
+                    path.append(successor)
+                    on_path.add(successor)
+                    work.append(iter(graph.neighbours(successor)))
+
+class UnionFind:
+    """Disjoint-set forest over hashable keys, with union by size and path halving."""
+
+    def __init__(self):
+        self.parent: Dict[Hashable, Hashable] = {}
+        self.size: Dict[Hashable, int] = {}
+
+    def find(self, key: Hashable) -> Hashable:
+        """Return the root of the set containing `key`, adding it as a singleton if unseen."""
+        parent = self.parent.setdefault(key, key)
+        self.size.setdefault(key, 1)
+        while parent != key:
+            grandparent = self.parent[parent]
+            self.parent[key] = grandparent
+            key, parent = grandparent, self.parent[grandparent]
+        return key
+
+    def union(self, a: Hashable, b: Hashable) -> bool:
+        """
+        Merge the sets containing `a` and `b`.
+
+        :return: False if they were already in the same set.
+        """
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return False
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size.pop(root_b)
+        return True
+
+    def groups(self, min_size: int = 1) -> List[List[Hashable]]:
+        """
+        Return every set with at least `min_size` members.
+
+        Members are sorted and groups are ordered by their first member, so the result depends only on
+        which keys were joined, not on the order of the unions.
+        """
+        members: Dict[Hashable, List[Hashable]] = {}
+        for key in self.parent:
+            members.setdefault(self.find(key), []).append(key)
+        groups = [sorted(group) for group in members.values() if len(group) >= min_size]
+        return sorted(groups, key=lambda group: group[0])
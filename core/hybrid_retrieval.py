@@ -0,0 +1,182 @@
+# Filename: /core/hybrid_retrieval.py
+
+import heapq
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from core.memory_engine import MemoryEngine
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class HybridRetriever:
+    """
+    Memory retrieval that fuses full-text and vector candidates with reciprocal rank fusion.
+
+    Both candidate generators run in parallel and apply the emotion/theme filters themselves, so each
+    returns up to `candidates` memories that already satisfy them. A memory's fused score is the sum of
+    1 / (rrf_k + rank) over the generators that returned it; the top k are kept with a bounded heap and
+    only those are read back from the graph.
+
+    The full-text query runs on a pool created for the request while the vector search runs on the
+    caller's thread, so concurrent requests never queue behind each other.
+    """
+
+    FILTERS = ("emotion", "theme")
+
+    FULLTEXT_CANDIDATES_QUERY = """
+    CALL db.index.fulltext.queryNodes('memoryIndex', $text) YIELD node AS m, score
+    WHERE ($min_score IS NULL OR score > $min_score)
+      AND ($emotion IS NULL OR $emotion IN m.emotions)
+      AND ($theme IS NULL OR m.theme = $theme)
+    RETURN m.text AS text, score
+    LIMIT $limit
+    """
+
+    FILTER_MEMORIES_QUERY = """
+    UNWIND $texts AS text
+    MATCH (m:Memory {text: text})
+    WHERE ($emotion IS NULL OR $emotion IN m.emotions)
+      AND ($theme IS NULL OR m.theme = $theme)
+    RETURN m.text AS text
+    """
+
+    MEMORY_DETAILS_QUERY = """
+    UNWIND $texts AS text
+    MATCH (m:Memory {text: text})
+    RETURN m.text AS text, m.theme AS theme, m.emotions AS emotions, m.pleasure AS pleasure,
+           m.arousal AS arousal, m.retrieval_count AS retrieval_count, m.weight AS weight
+    """
+
+    def __init__(self, db, context_search, candidates: int = 50, rrf_k: int = 60, max_vector_candidates: int = 1000):
+        """
+        Initialize the retriever.
+
+        :param db: Connector used for the full-text, filter and detail queries.
+        :param context_search: ContextSearchEngine providing the memory vector index and embeddings.
+        :param candidates: Candidates taken from each generator.
+        :param rrf_k: Rank offset of reciprocal rank fusion; larger values flatten the rank weighting.
+        :param max_vector_candidates: Most vector neighbours scanned while looking for ones passing the filters.
+        """
+        self.db = db
+        self.context_search = context_search
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.max_vector_candidates = max_vector_candidates
+
+    def _fulltext_candidates(self, text: str, filters: Dict, min_score: Optional[float]) -> List[Tuple[str, float]]:
+        """Full-text matches scoring above `min_score` and passing the filters, best first."""
+        if not text:
+            return []
+        result = self.db.read_query(self.FULLTEXT_CANDIDATES_QUERY, {
+            "text": text[:900], "limit": self.candidates, "min_score": min_score, **filters})
+        return [(row["text"], row["score"]) for row in result]
+
+    def _vector_candidates(self, query_embedding: np.ndarray, filters: Dict,
+                           min_score: Optional[float]) -> List[Tuple[str, float]]:
+        """
+        Nearest neighbours at least `min_score` similar and passing the filters, best first.
+
+        Without filters one index search suffices. With filters the search is widened until enough
+        neighbours pass or `max_vector_candidates` have been checked.
+        """
+        context_search = self.context_search
+        filtered = any(value is not None for value in filters.values())
+
+        fetch = self.candidates * (4 if filtered else 1)
+        while True:
+            neighbours = context_search.vector_index.search(query_embedding, k=fetch, min_score=min_score)
+            if not filtered:
+                return neighbours
+            passing = {
+                row["text"] for row in
+                self.db.read_query(self.FILTER_MEMORIES_QUERY, {"texts": [key for key, _ in neighbours], **filters})
+            }
+            matches = [(key, score) for key, score in neighbours if key in passing]
+            if len(matches) >= self.candidates or len(neighbours) < fetch or fetch >= self.max_vector_candidates:
+                return matches[:self.candidates]
+            fetch = min(fetch * 4, self.max_vector_candidates)
+
+    def _similarities(self, query_embedding: np.ndarray, texts: List[str]) -> Dict[str, float]:
+        """Exact cosine similarity of the query to each indexed memory in `texts`."""
+        q = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        q = q / (np.linalg.norm(q) or 1.0)
+        return {text: float(vector @ q) for text, vector in self.context_search.vector_index.vectors(texts).items()}
+
+    def retrieve(self, query: str, k: int = 10, filters: Optional[Dict] = None, min_similarity: Optional[float] = None,
+                 min_text_score: Optional[float] = None) -> List[Dict]:
+        """
+        Retrieve the k memories most relevant to a query.
+
+        :param query: Query text.
+        :param k: Number of memories to return.
+        :param filters: Optional {"emotion": name, "theme": name} restrictions.
+        :param min_similarity: Optional vector similarity floor applied before fusion. Full-text candidates
+                               are scored against the vector index and dropped below it as well.
+        :param min_text_score: Optional full-text score floor (exclusive) applied before fusion. Memories
+                               the full-text index does not score above it are dropped.
+        :return: Memory dictionaries, best first, with the fused `score` and each generator's own
+                 `text_score` / `similarity` (None when that generator did not return the memory).
+        """
+        filters = dict(filters or {})
+        unknown = set(filters) - set(self.FILTERS)
+        if unknown:
+            raise ValueError(f"Unsupported retrieval filters: {sorted(unknown)}")
+        filters = {name: filters.get(name) or None for name in self.FILTERS}
+
+        sanitized_text = MemoryEngine.clean_text(query.lower())
+        if not sanitized_text:
+            return []
+
+        try:
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="HybridRetriever") as pool:
+                fulltext = pool.submit(self._fulltext_candidates, sanitized_text, filters, min_text_score)
+                self.context_search.ensure_vector_index()
+                query_embedding = self.context_search.embeddings.encode(sanitized_text)
+                vector = self._vector_candidates(query_embedding, filters, min_similarity)
+                ranked_lists = {"text_score": fulltext.result(), "similarity": vector}
+
+            if min_similarity is not None:
+                similarities = self._similarities(query_embedding, [text for text, _ in ranked_lists["text_score"]])
+                ranked_lists["text_score"] = [
+                    (text, score) for text, score in ranked_lists["text_score"]
+                    if similarities.get(text, -1.0) >= min_similarity
+                ]
+            if min_text_score is not None:
+                text_matches = {text for text, _ in ranked_lists["text_score"]}
+                ranked_lists["similarity"] = [(text, score) for text, score in ranked_lists["similarity"] if text in text_matches]
+
+            fused: Dict[str, float] = {}
+            generator_scores: Dict[str, Dict[str, float]] = {}
+            for name, candidates in ranked_lists.items():
+                for rank, (text, score) in enumerate(candidates, start=1):
+                    fused[text] = fused.get(text, 0.0) + 1.0 / (self.rrf_k + rank)
+                    generator_scores.setdefault(text, {})[name] = score
+            if min_similarity is not None:
+                for text, _ in ranked_lists["text_score"]:
+                    generator_scores[text].setdefault("similarity", similarities[text])
+
+            top = heapq.nlargest(k, fused.items(), key=lambda item: item[1])
+            details = {
+                row["text"]: row
+                for row in self.db.read_query(self.MEMORY_DETAILS_QUERY, {"texts": [text for text, _ in top]})
+            }
+            results = []
+            for text, score in top:
+                if text not in details:
+                    continue  # Deleted since it was indexed
+                scores = generator_scores[text]
+                results.append({
+                    **details[text],
+                    "score": round(score, 6),
+                    "text_score": scores.get("text_score"),
+                    "similarity": round(scores["similarity"], 4) if "similarity" in scores else None,
+                })
+            logger.info(f"[HYBRID RETRIEVAL] {len(results)} results for '{query}' "
+                        f"({len(ranked_lists['text_score'])} full-text, {len(ranked_lists['similarity'])} vector candidates).")
+            return results
+        except Exception as e:
+            logger.error(f"[HYBRID RETRIEVAL ERROR] {e}", exc_info=True)
+            return []
@@ -0,0 +1,221 @@
+# Filename: /core/incremental_linker.py
+
+import atexit
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from core.memory_linker import MemoryLinker
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class IncrementalLinker:
+    """
+    Background worker that links only memories stored since its last run.
+
+    Progress is a persisted (created_at, text) watermark on a `Watermark` node, so each pass reads the
+    memories past the watermark in creation order, links each one to its nearest neighbours in the vector
+    index and to recent memories sharing an emotion, then advances the watermark. Linking cost follows the
+    write rate rather than the size of the graph, and a restart resumes where the last pass stopped.
+
+    `created_at` is stamped by the writer before its transaction commits, so a slow write can become
+    visible with a timestamp already behind the watermark. Each pass therefore re-reads the `lag` seconds
+    behind the watermark and links the memories it has not linked yet.
+    """
+
+    WATERMARK_QUERY = """
+    MATCH (w:Watermark {name: $name})
+    RETURN w.created_at AS created_at, w.text AS text
+    """
+
+    ADVANCE_WATERMARK_QUERY = """
+    MERGE (w:Watermark {name: $name})
+    SET w.created_at = $created_at, w.text = $text, w.updated_at = $updated_at
+    """
+
+    NEW_MEMORIES_QUERY = """
+    MATCH (m:Memory)
+    WHERE m.created_at > $created_at OR (m.created_at = $created_at AND m.text > $text)
+    RETURN m.text AS text, m.created_at AS created_at
+    ORDER BY m.created_at, m.text
+    LIMIT $limit
+    """
+
+    LINK_EMOTION_PEERS_QUERY = """
+    UNWIND $texts AS text
+    MATCH (m:Memory {text: text})
+    CALL {
+        WITH m
+        MATCH (recent:Memory)
+        WHERE recent.created_at <= m.created_at AND recent <> m
+        RETURN recent
+        ORDER BY recent.created_at DESC
+        LIMIT $window
+    }
+    MATCH (m)-[:EMOTION_OF]->(e:Emotion)<-[:EMOTION_OF]-(peer:Memory)
+    WHERE peer = recent
+    WITH m, e, peer
+    ORDER BY peer.created_at DESC
+    WITH m, e, collect(peer)[..$peers] AS peers
+    UNWIND peers AS peer
+    MERGE (m)-[r:SHARES_EMOTION]->(peer)
+    ON CREATE SET r.weight = 1, r.created_at = $timestamp, r.emotion = e.name
+    RETURN count(r) AS linked
+    """
+
+    def __init__(self, db, memory_linker: MemoryLinker, name: str = "memory_linking", interval: float = 30.0,
+                 batch_size: int = 500, k: int = 10, similarity_threshold: float = 0.7, emotion_peers: int = 5,
+                 emotion_window: int = 1000, lag: float = 5.0):
+        """
+        Initialize the worker.
+
+        :param db: Connector used for watermark, read and link queries.
+        :param memory_linker: MemoryLinker providing the vector index and the RELATED_TO edge writer.
+        :param name: Watermark name, so independent workers keep independent progress.
+        :param interval: Seconds between passes when running in the background.
+        :param batch_size: Memories consumed per batch; the watermark advances after each batch.
+        :param k: Nearest neighbours linked per new memory.
+        :param similarity_threshold: Minimum cosine similarity for a RELATED_TO link.
+        :param emotion_peers: Most recent same-emotion memories linked per new memory and emotion.
+        :param emotion_window: Memories preceding a new memory, newest first, searched for same-emotion peers.
+        :param lag: Seconds behind the watermark re-read each pass for writes that committed late.
+        """
+        self.db = db
+        self.memory_linker = memory_linker
+        self.name = name
+        self.interval = interval
+        self.batch_size = batch_size
+        self.k = k
+        self.similarity_threshold = similarity_threshold
+        self.emotion_peers = emotion_peers
+        self.emotion_window = emotion_window
+        self.lag = lag
+
+        # text -> created_at of memories linked within the lag window; after a restart the window is linked again,
+        # which the MERGE-based link writes make harmless
+        self._linked_in_lag: Dict[str, str] = {}
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the periodic linking thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="IncrementalLinker")
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def stop(self):
+        """Stop the linking thread after the batch in progress."""
+        self._stop.set()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.interval)
+
+    def watermark(self) -> Tuple[str, str]:
+        """Return the persisted (created_at, text) watermark, or the start of time if none exists."""
+        result = self.db.read_query(self.WATERMARK_QUERY, {"name": self.name})
+        if not result or result[0]["created_at"] is None:
+            return "", ""
+        return result[0]["created_at"], result[0]["text"] or ""
+
+    def run_once(self) -> int:
+        """
+        Link every memory past the watermark, and any late write within the lag window, one batch at a time.
+
+        :return: Number of memories consumed.
+        """
+        if not self._run_lock.acquire(blocking=False):
+            return 0  # A pass is already running
+        consumed = 0
+        try:
+            watermark = self.watermark()
+            created_at, text = self._lag_start(watermark[0]), ""
+            while not self._stop.is_set():
+                batch = self.db.read_query(self.NEW_MEMORIES_QUERY, {
+                    "created_at": created_at,
+                    "text": text,
+                    "limit": self.batch_size,
+                })
+                if not batch:
+                    break
+                fresh = [memory for memory in batch
+                         if (memory["created_at"], memory["text"]) > watermark or memory["text"] not in self._linked_in_lag]
+                if fresh:
+                    self.link_batch([memory["text"] for memory in fresh])
+                    self._linked_in_lag.update((memory["text"], memory["created_at"]) for memory in fresh)
+                created_at, text = batch[-1]["created_at"], batch[-1]["text"]
+                if (created_at, text) > watermark:
+                    watermark = (created_at, text)
+                    self.db.write_query(self.ADVANCE_WATERMARK_QUERY, {
+                        "name": self.name,
+                        "created_at": created_at,
+                        "text": text,
+                        "updated_at": datetime.now().isoformat(),
+                    })
+                consumed += len(fresh)
+                if len(batch) < self.batch_size:
+                    break
+            lag_start = self._lag_start(watermark[0])
+            self._linked_in_lag = {linked: at for linked, at in self._linked_in_lag.items() if at >= lag_start}
+            if consumed:
+                logger.info(f"[INCREMENTAL LINKING] Linked {consumed} new memories; watermark at {watermark[0]}.")
+        except Exception as e:
+            # The watermark only moves after a batch is linked, so the failed batch is retried next pass
+            logger.error(f"[INCREMENTAL LINKING ERROR] {e}", exc_info=True)
+        finally:
+            self._run_lock.release()
+        return consumed
+
+    def _lag_start(self, created_at: str) -> str:
+        """Return the timestamp `lag` seconds before `created_at`, where each pass starts reading."""
+        if not created_at:
+            return ""
+        try:
+            return (datetime.fromisoformat(created_at) - timedelta(seconds=self.lag)).isoformat()
+        except ValueError:
+            return created_at
+
+    def link_batch(self, texts: List[str]) -> Dict[str, int]:
+        """
+        Link a batch of new memories to their nearest neighbours and same-emotion peers.
+
+        :param texts: Texts of the new memories.
+        :return: Counts of RELATED_TO and SHARES_EMOTION edges written.
+        """
+        context_search = self.memory_linker.context_search
+        index = context_search.vector_index
+        missing = [text for text in texts if text not in index]
+        if missing:
+            context_search.index_memories(missing)
+
+        vectors = index.vectors(texts)
+        sources = [text for text in texts if text in vectors]
+        pairs = []
+        if sources:
+            neighbours = index.search_batch(np.stack([vectors[text] for text in sources]), self.k + 1, self.similarity_threshold)
+            seen = set()
+            for source, matches in zip(sources, neighbours):
+                for target, score in matches:
+                    pair = frozenset((source, target))
+                    if target != source and pair not in seen:  # Two new memories are linked once
+                        seen.add(pair)
+                        pairs.append((source, target, round(score, 4)))
+        related = len(self.memory_linker.write_links(pairs))
+
+        result = self.db.write_query(self.LINK_EMOTION_PEERS_QUERY, {
+            "texts": texts,
+            "peers": self.emotion_peers,
+            "window": self.emotion_window,
+            "timestamp": datetime.now().isoformat(),
+        })
+        shared = result[0]["linked"] if result else 0
+        return {"related": related, "shares_emotion": shared}
@@ -56,22 +56,24 @@ def initialize_memories():
         ("I can do all things through Christ who strengthens me.", ["inspired", "hopeful"], "Encouraging Biblical verse", "Scripture", "High", "Gold")
     ]
 
-    # Insert all memories
-    for text, emotions, description, memory_type, importance, color in memories:
-        try:
-            memory_engine.store_memory(
-                text=text,
-                emotions=emotions,
-                extra_properties={
+    # Insert all memories in a single bulk write
+    try:
+        report = memory_engine.store_memories([
+            {
+                "text": text,
+                "emotions": emotions,
+                "extra_properties": {
                     "description": description,
                     "type": memory_type,
                     "importance": importance,
                     "color": color
                 }
-            )
-            logger.info(f"[MEMORY INSERTED] '{text}' stored successfully.")
-        except Exception as e:
-            logger.error(f"[INSERTION FAILED] '{text}' could not be stored: {e}", exc_info=True)
+            }
+            for text, emotions, description, memory_type, importance, color in memories
+        ])
+        logger.info(f"[MEMORY INSERTED] {report['stored']} foundational memories stored ({report['memories_per_second']}/s).")
+    except Exception as e:
+        logger.error(f"[INSERTION FAILED] Foundational memories could not be stored: {e}", exc_info=True)
 
     logger.info("[INITIALIZATION COMPLETE] Foundational memories inserted.")
 
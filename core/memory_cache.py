@@ -0,0 +1,169 @@
+# Filename: /core/memory_cache.py
+
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class MemoryCache:
+    """
+    Size- and TTL-bounded LRU cache of memory search results, with a negative tier for queries that missed.
+
+    Positive entries are indexed by the text of the memory they resolved to, so a write to that memory
+    invalidates every query that returned it. Negative entries remember the query terms, so storing a new
+    memory only drops the misses it could now satisfy.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0, negative_max_size: int = 1024, negative_ttl: float = 60.0):
+        """
+        Initialize the cache.
+
+        :param max_size: Maximum number of positive entries.
+        :param ttl: Seconds a positive entry stays valid.
+        :param negative_max_size: Maximum number of negative entries.
+        :param negative_ttl: Seconds a negative entry stays valid.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_max_size = negative_max_size
+        self.negative_ttl = negative_ttl
+
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._keys_by_text: Dict[str, Set[str]] = {}
+        self._negatives: "OrderedDict[str, Tuple[float, Set[str]]]" = OrderedDict()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _terms(text: str) -> Set[str]:
+        return set(re.findall(r'\w+', text.lower()))
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, count=False) is not None
+
+    def get(self, key: str, count: bool = True) -> Optional[Dict]:
+        """
+        Return the cached memory for a query key, or None if absent or expired.
+
+        :param key: Sanitized query text.
+        :param count: Whether the lookup contributes to hit/miss statistics.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, memory = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    if count:
+                        self.hits += 1
+                    return memory
+                self._drop(key)
+            if count:
+                self.misses += 1
+            return None
+
+    def put(self, key: str, memory: Dict):
+        """
+        Cache the memory a query resolved to, evicting the least recently used entry when full.
+
+        :param key: Sanitized query text.
+        :param memory: Memory record returned by the search.
+        """
+        with self._lock:
+            self._drop(key)
+            self._negatives.pop(key, None)
+            self._entries[key] = (time.monotonic() + self.ttl, memory)
+            self._keys_by_text.setdefault(memory.get("text"), set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            text = entry[1].get("text")
+            keys = self._keys_by_text.get(text)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_text[text]
+
+    def is_negative(self, key: str) -> bool:
+        """
+        Return True if the query recently missed and the miss is still valid.
+
+        :param key: Sanitized query text.
+        """
+        with self._lock:
+            entry = self._negatives.get(key)
+            if entry is None:
+                return False
+            if entry[0] <= time.monotonic():
+                del self._negatives[key]
+                return False
+            self._negatives.move_to_end(key)
+            self.negative_hits += 1
+            return True
+
+    def put_negative(self, key: str):
+        """
+        Remember that a query found no memory.
+
+        :param key: Sanitized query text.
+        """
+        with self._lock:
+            self._negatives[key] = (time.monotonic() + self.negative_ttl, self._terms(key))
+            self._negatives.move_to_end(key)
+            while len(self._negatives) > self.negative_max_size:
+                self._negatives.popitem(last=False)
+
+    def invalidate(self, memory_text: str):
+        """
+        Drop every positive entry that resolved to `memory_text`.
+
+        :param memory_text: Text of the memory that changed.
+        """
+        with self._lock:
+            for key in list(self._keys_by_text.get(memory_text, ())):
+                self._drop(key)
+
+    def invalidate_negatives(self, memory_text: str):
+        """
+        Drop negative entries that share a term with a newly stored memory, since they may now match.
+
+        :param memory_text: Text of the stored memory.
+        """
+        terms = self._terms(memory_text)
+        with self._lock:
+            for key in [k for k, (_, key_terms) in self._negatives.items() if key_terms & terms]:
+                del self._negatives[key]
+
+    def clear(self, negatives: bool = False):
+        """
+        Drop all positive entries, and optionally all negative entries.
+
+        :param negatives: Whether to clear the negative tier as well.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_text.clear()
+            if negatives:
+                self._negatives.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Report cache sizes and hit/miss counters."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "negative_entries": len(self._negatives),
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+            }
@@ -1,9 +1,15 @@
+import atexit
 import logging
+import queue
+import threading
+import time
 from datetime import datetime
 from core.neo4j_connector import Neo4jConnector
+from core.memory_cache import MemoryCache
+from core.retrieval_stats_buffer import RetrievalStatsBuffer
 import emoji # type: ignore
 import re
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional, Tuple
 import numpy as np
 
 logger = logging.getLogger(__name__)
@@ -12,16 +18,99 @@ logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %
 class MemoryEngine:
     DECAY_FACTOR = 0.1
 
-    def __init__(self, db: Neo4jConnector):
+    def __init__(self, db: Neo4jConnector, memory_cache: Optional[MemoryCache] = None, listener_queue_size: int = 1000):
         """
         Initialize MemoryEngine with database connector and setup initial configurations.
 
         :param db: An instance of Neo4jConnector for database operations.
+        :param memory_cache: Optional pre-configured search result cache.
+        :param listener_queue_size: Store notifications queued for the listener thread before writers wait for it.
         """
         self.db = db
-        self.memory_cache: Dict[str, Dict] = {}
+        self.memory_cache = memory_cache or MemoryCache()
+        self.store_listeners: List[Callable[[List[str]], None]] = []
+        self._listener_queue: "queue.Queue[Optional[List[str]]]" = queue.Queue(maxsize=listener_queue_size)
+        self._listener_thread: Optional[threading.Thread] = None
+        self.retriever: Optional[Callable[..., List[Dict]]] = None
+        self.retrieval_stats = RetrievalStatsBuffer(db, on_flush=self._invalidate_cached)
+        self.retrieval_stats.start()
         self._setup_index()
 
+    def _invalidate_cached(self, texts):
+        """Drop cached search results for memories whose stats were just written."""
+        for text in texts:
+            self.memory_cache.invalidate(text)
+
+    def flush_retrieval_stats(self) -> int:
+        """
+        Write buffered retrieval statistics immediately.
+
+        :return: Number of memories updated.
+        """
+        return self.retrieval_stats.flush()
+
+    def close(self):
+        """Run the store notifications still queued, then flush buffered retrieval statistics and stop both threads."""
+        if self._listener_thread and self._listener_thread.is_alive():
+            self._listener_queue.put(None)
+            if self._listener_thread is not threading.current_thread():
+                self._listener_thread.join()
+        self.retrieval_stats.close()
+
+    def add_store_listener(self, listener: Callable[[List[str]], None]):
+        """
+        Register a callback invoked with the sanitized texts of newly stored memories, once per write batch.
+
+        Listeners run on a background thread, in write order, so indexing and similar follow-up work stays
+        off the request path; see `wait_for_store_listeners`.
+
+        :param listener: Callable receiving the list of stored memory texts.
+        """
+        self.store_listeners.append(listener)
+        if self._listener_thread is None:
+            self._listener_thread = threading.Thread(target=self._run_store_listeners, daemon=True, name="StoreListeners")
+            self._listener_thread.start()
+            atexit.register(self.close)
+
+    def wait_for_store_listeners(self):
+        """Block until every store notification queued so far has been handled by the listeners."""
+        self._listener_queue.join()
+
+    def set_retriever(self, retriever: Callable[..., List[Dict]]):
+        """
+        Route `multi_dimensional_search` through a hybrid retriever instead of the full-text index alone.
+
+        :param retriever: Callable taking (query, k, filters, min_text_score=...), e.g. ContextSearchEngine.retrieve.
+        """
+        self.retriever = retriever
+
+    def _notify_store_listeners(self, texts: List[str]):
+        """Queue stored texts for the listener thread; after `close`, listeners are called inline instead."""
+        if not self.store_listeners:
+            return
+        if self._listener_thread and self._listener_thread.is_alive():
+            self._listener_queue.put(list(texts))
+        else:
+            self._call_store_listeners(texts)
+
+    def _run_store_listeners(self):
+        while True:
+            texts = self._listener_queue.get()
+            try:
+                if texts is None:
+                    return
+                self._call_store_listeners(texts)
+            finally:
+                self._listener_queue.task_done()
+
+    def _call_store_listeners(self, texts: List[str]):
+        """Call every registered store listener, isolating failures from each other and from the writer."""
+        for listener in self.store_listeners:
+            try:
+                listener(texts)
+            except Exception as e:
+                logger.error(f"[STORE LISTENER ERROR] {e}", exc_info=True)
+
     def _setup_index(self):
         """Ensure the full-text index and constraint exist in Neo4j."""
         try:
@@ -34,7 +123,28 @@ class MemoryEngine:
             self.db.run_query(
                 "CREATE CONSTRAINT IF NOT EXISTS FOR (t:Theme) REQUIRE t.name IS UNIQUE"
             )
-            logger.info("[INDEX SETUP] Full-text index 'memoryIndex' and constraints on Emotion.name and Theme.name created or already exist.")
+            self.db.run_query(
+                "CREATE INDEX memory_text IF NOT EXISTS FOR (m:Memory) ON (m.text)"
+            )
+            self.db.run_query(
+                "CREATE INDEX memory_retrieval_count IF NOT EXISTS FOR (m:Memory) ON (m.retrieval_count)"
+            )
+            self.db.run_query(
+                "CREATE INDEX memory_created_at IF NOT EXISTS FOR (m:Memory) ON (m.created_at)"
+            )
+            self.db.run_query(
+                "CREATE CONSTRAINT IF NOT EXISTS FOR (d:Day) REQUIRE d.date IS UNIQUE"
+            )
+            self.db.run_query(
+                "CREATE INDEX narrative_shift_timestamp IF NOT EXISTS FOR (s:NarrativeShift) ON (s.timestamp)"
+            )
+            self.db.run_query(
+                "CREATE INDEX memory_theme_similarity IF NOT EXISTS FOR (m:Memory) ON (m.theme, m.theme_similarity)"
+            )
+            self.db.run_query(
+                "CREATE INDEX memory_embedding_pending IF NOT EXISTS FOR (m:Memory) ON (m.embedding_pending)"
+            )
+            logger.info("[INDEX SETUP] Full-text index 'memoryIndex', Memory.text, Memory.retrieval_count, Memory.created_at, Memory(theme, theme_similarity), Memory.embedding_pending and NarrativeShift.timestamp indexes and constraints on Emotion.name, Theme.name and Day.date created or already exist.")
         except Exception as e:
             logger.error(f"[INDEX SETUP FAILED] {e}", exc_info=True)
 
@@ -55,6 +165,42 @@ class MemoryEngine:
         logger.debug(f"[PREPARED QUERY] Wrapped Text: {wrapped_text}")
         return wrapped_text
 
+    def _cached_search(self, sanitized_text: str) -> Tuple[bool, Optional[Dict]]:
+        """
+        Resolve a search from the cache tiers.
+
+        :return: (resolved, memory) where resolved is True for a positive or negative cache hit.
+        """
+        cached = self.memory_cache.get(sanitized_text)
+        if cached is not None:
+            logger.info(f"[CACHE HIT] Memory found in cache: {sanitized_text}")
+            return True, cached
+
+        if self.memory_cache.is_negative(sanitized_text):
+            logger.info(f"[NEGATIVE CACHE HIT] Recent search miss for: {sanitized_text}")
+            return True, None
+        return False, None
+
+    def _cache_stored_miss(self, sanitized_text: str, result: List[Dict]):
+        """
+        Cache what a repeated query will find once its missing memory was stored: the stored memory if the
+        full-text index matches it now, otherwise a negative entry. Either way the repeat issues neither the
+        search nor the store-on-miss write again. Called after the store, whose negative invalidation would
+        otherwise clear the entry at once.
+
+        :param result: SEARCH_MEMORY_QUERY rows for the query, read after the store.
+        """
+        if result:
+            self.memory_cache.put(sanitized_text, result[0])
+        else:
+            self.memory_cache.put_negative(sanitized_text)
+
+    def _record_search_hit(self, sanitized_text: str, memory: Dict) -> Dict:
+        """Cache a search hit and count the retrieval."""
+        self.memory_cache.put(sanitized_text, memory)
+        self.update_retrieval_stats(memory['text'])
+        return memory
+
     def search_memory(self, text: str) -> Optional[Dict]:
         """Search memory with sanitized text and improved similarity handling."""
         sanitized_text = self.clean_text(text.lower())
@@ -63,100 +209,255 @@ class MemoryEngine:
             logger.warning("[EMPTY QUERY] Skipping search for empty sanitized text.")
             return None
     
-        if sanitized_text in self.memory_cache:
-            logger.info(f"[CACHE HIT] Memory found in cache: {sanitized_text}")
-            return self.memory_cache[sanitized_text]
+        resolved, cached = self._cached_search(sanitized_text)
+        if resolved:
+            return cached
     
         try:
-            query = """
-            CALL db.index.fulltext.queryNodes('memoryIndex', $text) YIELD node, score
-            WHERE score >= 0.7
-            RETURN node.text AS text, node.pleasure AS pleasure, node.arousal AS arousal, node.retrieval_count AS retrieval_count, score,
-                   node.emotions AS emotions, node.theme AS theme
-            ORDER BY score DESC LIMIT 1
-            """
             params = {"text": sanitized_text[:900]}  # Truncate to avoid exceeding limits
-            result = self.db.run_query(query, params)
+            result = self.db.read_query(self.SEARCH_MEMORY_QUERY, params)
     
             if result:
-                memory = result[0]
-                self.memory_cache[sanitized_text] = memory
-                self.update_retrieval_stats(memory['text'])
-                return memory
+                return self._record_search_hit(sanitized_text, result[0])
             else:
                 logger.warning(f"[SEARCH MISS] No memory found for: {sanitized_text}")
                 self.store_memory(text)  # Optionally store missing memory
+                self._cache_stored_miss(sanitized_text, self.db.read_query(self.SEARCH_MEMORY_QUERY, params))
                 return None
     
         except Exception as e:
             logger.error(f"[SEARCH ERROR] Unable to search memory '{text}': {e}", exc_info=True)
             return None
 
+    SEARCH_MEMORY_QUERY = """
+    CALL db.index.fulltext.queryNodes('memoryIndex', $text) YIELD node, score
+    WHERE score >= 0.7
+    RETURN node.text AS text, node.pleasure AS pleasure, node.arousal AS arousal, node.retrieval_count AS retrieval_count, score,
+           node.emotions AS emotions, node.theme AS theme
+    ORDER BY score DESC LIMIT 1
+    """
+
+    TOP_RETRIEVED_QUERY = """
+    MATCH (m:Memory)
+    RETURN m.text AS text, m.retrieval_count AS retrieval_count, m.pleasure AS pleasure, m.arousal AS arousal,
+           m.emotions AS emotions, m.theme AS theme
+    ORDER BY m.retrieval_count DESC
+    LIMIT $limit
+    """
+
+    MULTI_DIMENSIONAL_SEARCH_QUERY = """
+    CALL db.index.fulltext.queryNodes('memoryIndex', $text) YIELD node AS m, score
+    WHERE score > 0.5
+      AND ($emotion IS NULL OR $emotion IN m.emotions)
+      AND ($theme IS NULL OR m.theme = $theme)
+    RETURN m.text AS text, m.theme AS theme, m.emotions AS emotions, m.pleasure AS pleasure, m.arousal AS arousal, score
+    ORDER BY score DESC
+    """
+
+    THEME_MEMORIES_QUERY = """
+    MATCH (m:Memory)-[:THEME_OF]->(t:Theme {name: $theme})
+    RETURN m.text AS text, m.pleasure AS pleasure, m.arousal AS arousal, m.retrieval_count AS retrieval_count, m.emotions AS emotions
+    ORDER BY m.retrieval_count DESC
+    LIMIT $limit
+    """
+
+    REFLECTION_QUERY = """
+    MATCH (m:Memory)
+    WHERE m.pleasure > 0.6 OR m.arousal > 0.6 OR m.retrieval_count > 5
+    RETURN m.text AS text, m.pleasure AS pleasure, m.arousal AS arousal,
+           m.retrieval_count AS retrieval_count, m.emotions AS emotions, m.theme AS theme
+    ORDER BY rand() LIMIT 1
+    """
+
+    STORE_MEMORIES_QUERY = """
+    UNWIND $memories AS memory
+    MERGE (m:Memory {text: memory.text})
+    ON CREATE SET
+        m.created_at = $timestamp,
+        m.pleasure = memory.pleasure,
+        m.arousal = memory.arousal,
+        m.retrieval_count = 0,
+        m.emotions = memory.emotions,
+        m.theme = memory.theme,
+        m.embedding_pending = true
+    WITH m, memory, m.created_at = $timestamp AS created
+    MERGE (t:Theme {name: memory.theme})
+    MERGE (m)-[:THEME_OF]->(t)
+    FOREACH (_ IN CASE WHEN created THEN [1] ELSE [] END |
+        MERGE (d:Day {date: substring($timestamp, 0, 10)})
+        ON CREATE SET d.memory_count = 0
+        SET d.memory_count = d.memory_count + 1
+        MERGE (d)-[r:THEME_COUNT]->(t)
+        ON CREATE SET r.count = 0
+        SET r.count = r.count + 1
+    )
+    WITH m, memory, created
+    UNWIND memory.emotions AS emotion
+    MERGE (e:Emotion {name: emotion})
+    MERGE (m)-[:EMOTION_OF]->(e)
+    WITH DISTINCT m, created
+    RETURN m.text AS memory_text, created
+    """
+
+    RETHEME_MEMORY_QUERY = """
+    MATCH (m:Memory {text: $memory_text})
+    WITH m, m.theme AS old_theme
+    SET m.theme = $value
+    WITH m, old_theme
+    WHERE old_theme IS NULL OR old_theme <> $value
+    OPTIONAL MATCH (m)-[old_link:THEME_OF]->(:Theme)
+    DELETE old_link
+    WITH DISTINCT m, old_theme
+    MERGE (t:Theme {name: $value})
+    MERGE (m)-[:THEME_OF]->(t)
+    WITH m, old_theme, t
+    MATCH (d:Day {date: substring(m.created_at, 0, 10)})
+    OPTIONAL MATCH (d)-[old:THEME_COUNT]->(:Theme {name: old_theme})
+    SET old.count = old.count - 1
+    MERGE (d)-[r:THEME_COUNT]->(t)
+    ON CREATE SET r.count = 0
+    SET r.count = r.count + 1
+    """
+
+    RESET_DAY_ROLLUPS_QUERY = """
+    MATCH (d:Day)
+    OPTIONAL MATCH (d)-[r:THEME_COUNT]->()
+    SET d.memory_count = 0, r.count = 0
+    """
+
+    RETIRE_DAY_ROLLUPS_QUERY = """
+    UNWIND $texts AS text
+    MATCH (m:Memory {text: text})
+    WHERE m.created_at IS NOT NULL
+    MATCH (d:Day {date: substring(m.created_at, 0, 10)})
+    SET d.memory_count = d.memory_count - 1
+    WITH d, m
+    OPTIONAL MATCH (d)-[r:THEME_COUNT]->(:Theme {name: m.theme})
+    SET r.count = r.count - 1
+    """
+
+    BUILD_DAY_ROLLUPS_QUERY = """
+    MATCH (m:Memory)
+    WHERE m.created_at IS NOT NULL
+    WITH substring(m.created_at, 0, 10) AS date, m.theme AS theme, count(*) AS count
+    MERGE (d:Day {date: date})
+    ON CREATE SET d.memory_count = 0
+    SET d.memory_count = d.memory_count + count
+    FOREACH (name IN CASE WHEN theme IS NULL THEN [] ELSE [theme] END |
+        MERGE (t:Theme {name: name})
+        MERGE (d)-[r:THEME_COUNT]->(t)
+        SET r.count = count
+    )
+    RETURN count(DISTINCT d) AS days
+    """
+
+    LINK_MEMORIES_QUERY = """
+    MATCH (m1:Memory {text: $text1}), (m2:Memory {text: $text2})
+    MERGE (m1)-[:RELATED_TO]->(m2)
+    """
+
     def store_memory(self, text: str, emotions: Optional[List[str]] = None, extra_properties: Optional[Dict] = None, pleasure: float = 0.5, arousal: float = 0.5):
         """
         Store memory in Neo4j with contextual and emotional data.
         """
-        sanitized_text = self.clean_text(text.lower())
-        emotions = emotions or ["neutral"]
-        timestamp = datetime.now().isoformat()
-        theme = extra_properties.get("theme", "general") if extra_properties else "general"
-    
-        if not sanitized_text:
-            logger.warning(f"[EMPTY QUERY] Skipping storage for empty sanitized text.")
-            return
-    
-        try:
-            query = """
-            MERGE (m:Memory {text: $text})
-            ON CREATE SET 
-                m.created_at = $timestamp,
-                m.pleasure = $pleasure,
-                m.arousal = $arousal,
-                m.retrieval_count = 0,
-                m.emotions = $emotions,
-                m.theme = $theme
-            WITH m
-            UNWIND $emotions AS emotion
-            MERGE (e:Emotion {name: emotion})
-            MERGE (m)-[:EMOTION_OF]->(e)
-            MERGE (t:Theme {name: $theme})
-            MERGE (m)-[:THEME_OF]->(t)
-            RETURN m.text AS memory_text
-            """
-            params = {
+        self.store_memories([{
+            "text": text,
+            "emotions": emotions,
+            "extra_properties": extra_properties,
+            "pleasure": pleasure,
+            "arousal": arousal,
+        }])
+
+    def _normalize_memories(self, batch: List[Any]) -> List[Dict]:
+        """
+        Sanitize and dedup a batch of memories for bulk storage.
+
+        :param batch: Memory texts, or dictionaries with the `store_memory` keyword arguments.
+        :return: One parameter map per distinct sanitized text, first occurrence winning.
+        """
+        memories: Dict[str, Dict] = {}
+        for item in batch:
+            record = {"text": item} if isinstance(item, str) else item
+            sanitized_text = self.clean_text(record.get("text", "").lower())
+            if not sanitized_text:
+                logger.warning(f"[EMPTY QUERY] Skipping storage for empty sanitized text.")
+                continue
+            if sanitized_text in memories:
+                continue
+            extra_properties = record.get("extra_properties") or {}
+            memories[sanitized_text] = {
                 "text": sanitized_text,
-                "timestamp": timestamp,
-                "pleasure": pleasure,
-                "arousal": arousal,
-                "emotions": emotions,
-                "theme": theme,
+                "emotions": list(dict.fromkeys(record.get("emotions") or ["neutral"])),
+                "theme": extra_properties.get("theme", "general"),
+                "pleasure": record.get("pleasure", 0.5),
+                "arousal": record.get("arousal", 0.5),
             }
-    
-            result = self.db.run_query(query, params)
-            if result:
-                logger.info(f"[NEW MEMORY STORED] Memory saved: {sanitized_text}")
-            else:
-                logger.info(f"[MEMORY EXISTS] Memory already exists in Neo4j.")
-    
-        except Exception as e:
-            logger.error(f"[MEMORY STORAGE FAILED] Unable to store memory '{text}': {e}", exc_info=True)
+        return list(memories.values())
+
+    def store_memories(self, batch: List[Any], batch_size: int = 1000) -> Dict[str, float]:
+        """
+        Store many memories with one UNWIND transaction per chunk, including their Emotion and Theme edges
+        and the Day rollup counts of newly created memories.
+
+        :param batch: Memory texts, or dictionaries with the `store_memory` keyword arguments
+                      (text, emotions, extra_properties, pleasure, arousal).
+        :param batch_size: Number of memories written per transaction.
+        :return: Throughput report with counts of submitted, stored and newly created memories.
+        """
+        start = time.perf_counter()
+        memories = self._normalize_memories(batch)
+        stored, created = 0, []
+
+        for offset in range(0, len(memories), batch_size):
+            chunk = memories[offset:offset + batch_size]
+            try:
+                result = self.db.write_query(self.STORE_MEMORIES_QUERY, {
+                    "memories": chunk,
+                    "timestamp": datetime.now().isoformat(),
+                })
+            except Exception as e:
+                logger.error(f"[MEMORY STORAGE FAILED] Unable to store batch of {len(chunk)} memories: {e}", exc_info=True)
+                continue
+
+            stored += len(result)
+            created.extend(self._apply_store_result(result))
+
+        return self._finish_store(len(batch), stored, created, time.perf_counter() - start)
+
+    def _apply_store_result(self, result: List[Dict]) -> List[str]:
+        """Invalidate cache entries for stored memories and return the texts that were newly created."""
+        created = []
+        for row in result:
+            self.memory_cache.invalidate(row["memory_text"])
+            self.memory_cache.invalidate_negatives(row["memory_text"])
+            if row["created"]:
+                created.append(row["memory_text"])
+        return created
+
+    def _finish_store(self, submitted: int, stored: int, created: List[str], elapsed: float) -> Dict[str, float]:
+        """Notify store listeners and build the throughput report for a bulk store."""
+        report = {
+            "submitted": submitted,
+            "stored": stored,
+            "created": len(created),
+            "seconds": round(elapsed, 4),
+            "memories_per_second": round(stored / elapsed, 1) if elapsed > 0 else float(stored),
+        }
+        if created:
+            logger.info(f"[NEW MEMORY STORED] {len(created)} new memories saved.")
+            self._notify_store_listeners(created)
+        if stored > len(created):
+            logger.info(f"[MEMORY EXISTS] {stored - len(created)} memories already existed in Neo4j.")
+        logger.info(f"[BULK STORE] {report}")
+        return report
 
     def update_retrieval_stats(self, text: str):
-        """Update retrieval frequency and adjust pleasure/arousal."""
-        try:
-            query = """
-            MATCH (m:Memory {text: $text})
-            SET m.retrieval_count = COALESCE(m.retrieval_count, 0) + 1,
-                m.pleasure = CASE WHEN m.pleasure + 0.01 < 1 THEN m.pleasure + 0.01 ELSE 1 END,
-                m.arousal = CASE WHEN m.arousal - 0.01 > 0 THEN m.arousal - 0.01 ELSE 0 END
-            RETURN m.text AS updated_text, m.pleasure AS updated_pleasure,
-                m.arousal AS updated_arousal, m.retrieval_count AS updated_retrieval_count
-            """
-            params = {"text": text}
-            self.db.run_query(query, params)
-            logger.info(f"[RETRIEVAL UPDATE] Attributes updated for '{text}'.")
-        except Exception as e:
-            logger.error(f"[ATTRIBUTE UPDATE FAILED] {e}", exc_info=True)
+        """
+        Record a retrieval of a memory. Retrieval count, pleasure and arousal are updated write-behind:
+        increments are aggregated per memory and flushed in one transaction by `retrieval_stats`.
+        """
+        self.retrieval_stats.record(text)
+        logger.debug(f"[RETRIEVAL UPDATE] Retrieval recorded for '{text}'.")
 
     def get_top_retrieved_memories(self, limit: int = 3) -> List[Dict]:
         """
@@ -166,15 +467,8 @@ class MemoryEngine:
         :return: A list of memory dictionaries.
         """
         try:
-            query = """
-            MATCH (m:Memory)
-            RETURN m.text AS text, m.retrieval_count AS retrieval_count, m.pleasure AS pleasure, m.arousal AS arousal,
-                   m.emotions AS emotions, m.theme AS theme
-            ORDER BY m.retrieval_count DESC
-            LIMIT $limit
-            """
             params = {"limit": limit}
-            result = self.db.run_query(query, params)
+            result = self.db.read_query(self.TOP_RETRIEVED_QUERY, params)
 
             logger.info(f"[TOP MEMORIES] Retrieved {len(result)} top memories.")
             return result
@@ -206,31 +500,33 @@ class MemoryEngine:
             logger.error(f"[CLUSTERING ERROR] {e}", exc_info=True)
             return []
 
-    def multi_dimensional_search(self, query_text: str, emotion_filter: str = None, theme_filter: str = None) -> List[Dict]:
+    def multi_dimensional_search(self, query_text: str, emotion_filter: str = None, theme_filter: str = None,
+                                 limit: int = 20) -> List[Dict]:
         """
         Search memories using text, theme, and optional emotion or theme filter.
     
         :param query_text: Text to search for.
         :param emotion_filter: Filter results by emotion if specified.
         :param theme_filter: Filter results by theme if specified.
-        :return: List of matching memories.
+        :param limit: Maximum number of results when a hybrid retriever is set.
+        :return: List of matching memories with a full-text `score` above 0.5. With a hybrid retriever they
+                 are ranked by fused relevance instead of by that score.
         """
+        if self.retriever is not None:
+            results = self.retriever(query_text, limit, {"emotion": emotion_filter, "theme": theme_filter},
+                                     min_text_score=0.5)
+            return [
+                {"text": result["text"], "theme": result["theme"], "emotions": result["emotions"],
+                 "pleasure": result["pleasure"], "arousal": result["arousal"], "score": result["text_score"]}
+                for result in results
+            ]
         try:
-            sanitized_query = self.clean_text(query_text)
-            conditions = []
-            if emotion_filter:
-                conditions.append(f"ANY (e IN m.emotions WHERE e = '{emotion_filter}')")
-            if theme_filter:
-                conditions.append(f"m.theme = '{theme_filter}'")
-            where_clause = " AND ".join(conditions) if conditions else "TRUE"
-
-            query = f"""
-            CALL db.index.fulltext.queryNodes('memoryIndex', '{sanitized_query}') YIELD node AS m, score
-            WHERE score > 0.5 AND {where_clause}
-            RETURN m.text AS text, m.theme AS theme, m.emotions AS emotions, m.pleasure AS pleasure, m.arousal AS arousal, score
-            ORDER BY score DESC
-            """
-            result = self.db.run_query(query)
+            params = {
+                "text": self.clean_text(query_text),
+                "emotion": emotion_filter or None,
+                "theme": theme_filter or None,
+            }
+            result = self.db.read_query(self.MULTI_DIMENSIONAL_SEARCH_QUERY, params)
             logger.info(f"[SEARCH] Found {len(result)} results for query: {query_text}")
             return result
         except Exception as e:
@@ -250,6 +546,7 @@ class MemoryEngine:
                 m.arousal = CASE WHEN m.arousal - ($decay_factor / 2) > 0 THEN m.arousal - ($decay_factor / 2) ELSE 0 END
             """
             self.db.run_query(query, {"decay_factor": self.DECAY_FACTOR})
+            self.memory_cache.clear()
             logger.info(f"[MEMORY DECAY] Applied decay to memories")
         except Exception as e:
             logger.error(f"[MEMORY DECAY ERROR] {e}", exc_info=True)
@@ -263,19 +560,28 @@ class MemoryEngine:
         :return: List of memory dictionaries.
         """
         try:
-            query = """
-            MATCH (m:Memory)-[:THEME_OF]->(t:Theme {name: $theme})
-            RETURN m.text AS text, m.pleasure AS pleasure, m.arousal AS arousal, m.retrieval_count AS retrieval_count, m.emotions AS emotions
-            ORDER BY m.retrieval_count DESC
-            LIMIT $limit
-            """
-            result = self.db.run_query(query, {"theme": theme, "limit": limit})
+            result = self.db.read_query(self.THEME_MEMORIES_QUERY, {"theme": theme, "limit": limit})
             logger.info(f"[THEME RETRIEVAL] Retrieved {len(result)} memories for theme: {theme}")
             return result
         except Exception as e:
             logger.error(f"[THEME RETRIEVAL ERROR] {e}", exc_info=True)
             return []
 
+    @classmethod
+    def _update_memory_query(cls, field: str) -> str:
+        """
+        Build the single-field update query, rejecting field names that are not plain identifiers.
+        Theme updates also move the memory between its day's theme rollups.
+        """
+        if field == "theme":
+            return cls.RETHEME_MEMORY_QUERY
+        if not field.isidentifier():
+            raise ValueError(f"Invalid memory field name: {field!r}")
+        return f"""
+        MATCH (m:Memory {{text: $memory_text}})
+        SET m.{field} = $value
+        """
+
     def update_memory(self, memory_text: str, field: str, value: Any):
         """
         Update a specific field of a memory.
@@ -285,15 +591,44 @@ class MemoryEngine:
         :param value: The new value for the field.
         """
         try:
-            query = f"""
-            MATCH (m:Memory {{text: $memory_text}})
-            SET m.{field} = $value
-            """
-            self.db.run_query(query, {"memory_text": memory_text, "value": value})
+            self.db.run_query(self._update_memory_query(field), {"memory_text": memory_text, "value": value})
+            self.memory_cache.invalidate(memory_text)
+            if field == "theme":
+                self._notify_store_listeners([memory_text])  # Re-themed memories are re-indexed like new ones
             logger.info(f"[MEMORY UPDATE] Updated field '{field}' with value '{value}' for memory: {memory_text}")
         except Exception as e:
             logger.error(f"[MEMORY UPDATE ERROR] {e}", exc_info=True)
 
+    @classmethod
+    def retire_from_day_rollups(cls, tx, texts: List[str]):
+        """
+        Take memories about to be deleted or merged away out of their daily rollups, inside the caller's
+        transaction. Can be passed as DeduplicationEngine's `on_removing` callback.
+
+        :param tx: Open write transaction.
+        :param texts: Texts of the memories being removed.
+        """
+        tx.run(cls.RETIRE_DAY_ROLLUPS_QUERY, {"texts": texts})
+
+    def rebuild_day_rollups(self) -> int:
+        """
+        Recount the daily rollups from every stored memory. Stores and theme updates keep the rollups
+        current, so this is only needed once for graphs created before them, or to repair drift.
+
+        :return: Number of days with memories.
+        """
+        try:
+            _, result = self.db.run_transaction([
+                (self.RESET_DAY_ROLLUPS_QUERY, {}),
+                (self.BUILD_DAY_ROLLUPS_QUERY, {}),
+            ])
+            days = result[0]["days"] if result else 0
+            logger.info(f"[DAY ROLLUPS] Rebuilt rollups for {days} days.")
+            return days
+        except Exception as e:
+            logger.error(f"[DAY ROLLUPS ERROR] {e}", exc_info=True)
+            return 0
+
     def link_memories(self, memory_text1: str, memory_text2: str):
         """
         Link two memories with a relationship to indicate similarity or connection.
@@ -302,11 +637,7 @@ class MemoryEngine:
         :param memory_text2: Text of the second memory.
         """
         try:
-            query = """
-            MATCH (m1:Memory {text: $text1}), (m2:Memory {text: $text2})
-            MERGE (m1)-[:RELATED_TO]->(m2)
-            """
-            self.db.run_query(query, {"text1": memory_text1, "text2": memory_text2})
+            self.db.write_query(self.LINK_MEMORIES_QUERY, {"text1": memory_text1, "text2": memory_text2})
             logger.info(f"[MEMORY LINKING] Linked memories: '{memory_text1}' with '{memory_text2}'")
         except Exception as e:
             logger.error(f"[MEMORY LINKING ERROR] {e}", exc_info=True)
@@ -334,14 +665,7 @@ class MemoryEngine:
         :return: A memory dictionary or None if no suitable memory is found.
         """
         try:
-            query = """
-            MATCH (m:Memory)
-            WHERE m.pleasure > 0.6 OR m.arousal > 0.6 OR m.retrieval_count > 5
-            RETURN m.text AS text, m.pleasure AS pleasure, m.arousal AS arousal, 
-                   m.retrieval_count AS retrieval_count, m.emotions AS emotions, m.theme AS theme
-            ORDER BY rand() LIMIT 1
-            """
-            result = self.db.run_query(query)
+            result = self.db.read_query(self.REFLECTION_QUERY)
             if result:
                 logger.info(f"[REFLECTION] Selected memory for reflection: {result[0]['text']}")
                 return result[0]
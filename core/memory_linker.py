@@ -2,63 +2,207 @@
 
 from datetime import datetime
 import logging
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional, Tuple
 import numpy as np  # For numpy operations if needed
+from core.graph_algorithms import CSRGraph, UnionFind, bounded_cycles, strongly_connected_components
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class MemoryLinker:
-    def __init__(self, neo4j_connector):
+    LINK_PAIRS_QUERY = """
+    UNWIND $pairs AS pair
+    MATCH (m1:Memory {text: pair.source}), (m2:Memory {text: pair.target})
+    MERGE (m1)-[r:RELATED_TO]->(m2)
+    ON CREATE SET r.weight = 1, r.created_at = $timestamp
+    SET r.similarity = pair.similarity
+    RETURN m1.text AS source, m2.text AS target, r.similarity AS similarity, r.weight AS weight
+    """
+
+    RELATED_EDGES_QUERY = """
+    MATCH (m1:Memory)-[:RELATED_TO]->(m2:Memory)
+    RETURN m1.text AS source, m2.text AS target
+    """
+
+    EXPAND_FRONTIER_QUERY = """
+    UNWIND $frontier AS text
+    MATCH (n:Memory {text: text})-[:RELATED_TO|SHARES_EMOTION]->(related:Memory)
+    WITH n, related
+    ORDER BY related.text
+    WITH n, collect(DISTINCT related.text)[..$fanout] AS neighbours
+    RETURN n.text AS source, neighbours
+    """
+
+    REINFORCE_EDGES_QUERY = """
+    UNWIND $edges AS edge
+    MATCH (a:Memory {text: edge.source}), (b:Memory {text: edge.target})
+    MERGE (a)-[r:REINFORCES]->(b)
+    ON CREATE SET r.weight = $weight
+    RETURN count(r) AS linked
+    """
+
+    WRITE_CLUSTERS_QUERY = """
+    UNWIND $clusters AS cluster
+    MERGE (c:MemoryCluster {representative: cluster.representative})
+    SET c.size = size(cluster.members), c.updated_at = $timestamp
+    WITH c, cluster
+    UNWIND cluster.members AS text
+    MATCH (m:Memory {text: text})
+    OPTIONAL MATCH (m)-[old:CONSOLIDATED_INTO]->(other:MemoryCluster)
+    WHERE other <> c
+    DELETE old
+    MERGE (m)-[:CONSOLIDATED_INTO]->(c)
+    WITH collect(DISTINCT m) AS members, collect(DISTINCT other) AS previous
+    CALL {
+        WITH previous
+        UNWIND previous AS other
+        WITH other
+        WHERE NOT (other)<-[:CONSOLIDATED_INTO]-(:Memory)
+        DETACH DELETE other
+        RETURN count(*) AS removed
+    }
+    RETURN size(members) AS members, removed
+    """
+
+    def __init__(self, neo4j_connector, context_search=None):
         """
         Initialize the MemoryLinker with a Neo4j database connector.
 
         :param neo4j_connector: An instance of Neo4jConnector for database operations.
+        :param context_search: ContextSearchEngine whose memory vector index supplies linking candidates.
+                               Created on first use if omitted.
         """
         self.db = neo4j_connector
+        self._context_search = context_search
+
+    @property
+    def context_search(self):
+        if self._context_search is None:
+            from core.context_search import ContextSearchEngine  # Local import, loads the embedding stack
+            self._context_search = ContextSearchEngine(self.db)
+        return self._context_search
+
+    def related_graph(self) -> CSRGraph:
+        """Export the RELATED_TO edges between memories as an in-process CSR snapshot."""
+        edges = self.db.read_query(self.RELATED_EDGES_QUERY)
+        return CSRGraph.from_edges([edge["source"] for edge in edges], [edge["target"] for edge in edges])
+
+    def memory_components(self, graph: Optional[CSRGraph] = None, min_size: int = 2) -> List[List[str]]:
+        """
+        Strongly connected groups of memories: every memory in a group reaches every other via RELATED_TO.
+
+        :param graph: Snapshot to analyse; exported from the database if omitted.
+        :param min_size: Smallest component to report.
+        :return: Components as lists of memory texts, largest first.
+        """
+        graph = graph or self.related_graph()
+        components = [c for c in strongly_connected_components(graph) if len(c) >= min_size]
+        components.sort(key=len, reverse=True)
+        return [[graph.keys[node] for node in component] for component in components]
+
+    def iter_cycles(self, max_length: int = 6, limit: Optional[int] = 1000, graph: Optional[CSRGraph] = None) -> Iterator[Dict]:
+        """
+        Stream RELATED_TO cycles of bounded length from a graph snapshot.
+
+        :param max_length: Longest cycle, in edges, to report.
+        :param limit: Stop after this many cycles (None for no cap).
+        :param graph: Snapshot to analyse; exported from the database if omitted.
+        :return: Iterator of dictionaries with the cycle's memory texts and its length.
+        """
+        graph = graph or self.related_graph()
+        for cycle in bounded_cycles(graph, max_length, limit=limit):
+            yield {"cycle": [graph.keys[node] for node in cycle], "length": len(cycle)}
 
-    def detect_cycles(self) -> List[Dict]:
+    def detect_cycles(self, max_length: int = 6, limit: int = 1000) -> List[Dict]:
         """
         Detect cycles in the memory graph.
 
+        Runs in-process on an exported adjacency snapshot: SCCs bound the search, and enumeration stops at
+        `max_length` edges per cycle and `limit` cycles overall, so the database only serves one edge scan.
+
+        :param max_length: Longest cycle, in edges, to report.
+        :param limit: Maximum number of cycles returned.
         :return: List of dictionaries containing detected cycles and their lengths.
         """
-        query = """
-        MATCH path = (m:Memory)-[:RELATED_TO*]->(m)
-        WHERE length(path) > 0
-        RETURN nodes(path) AS cycle, length(path) AS length
-        """
         try:
-            result = self.db.run_query(query)
-            logger.info(f"[CYCLE DETECTION] Detected {len(result)} memory cycles.")
+            graph = self.related_graph()
+            result = list(self.iter_cycles(max_length, limit, graph))
+            logger.info(f"[CYCLE DETECTION] Detected {len(result)} memory cycles "
+                        f"({len(graph)} memories, {graph.edge_count} edges, cap {limit}).")
             return result
         except Exception as e:
             logger.error(f"[CYCLE DETECTION ERROR] {e}", exc_info=True)
             return []
 
-    def link_memories(self) -> List[Dict]:
+    def candidate_pairs(self, k: int = 10, similarity_threshold: float = 0.7,
+                        block_size: int = 256) -> List[Tuple[str, str, float]]:
         """
-        Link memories based on text similarity and existing relationships.
+        Generate similar memory pairs from each memory's top-k neighbours in the vector index.
 
-        :return: List of dictionaries with details of the linked memories.
+        Each block of memories is scored against the index with one matrix product, so the work is
+        O(N * k) pairs rather than all N^2 combinations.
+
+        :param k: Neighbours considered per memory.
+        :param similarity_threshold: Minimum cosine similarity for a pair.
+        :param block_size: Memories scored per matrix product.
+        :return: Unique (source, target, similarity) tuples, one per unordered pair.
         """
-        query = """
-        MATCH (m1:Memory), (m2:Memory)
-        WHERE m1.text <> m2.text
-        AND gds.alpha.similarity.cosine(m1.vector, m2.vector) > 0.7
-        WITH m1, m2
-        MATCH path = (m1)-[:RELATED_TO*]->(m2)
-        WHERE length(path) > 0
-        MERGE (m1)-[r:RELATED_TO]->(m2)
-        ON CREATE SET r.weight = 1, r.created_at = datetime()
-        ON MATCH SET r.weight = r.weight + CASE WHEN length(path) > 1 THEN 0.5 ELSE 1 END
-        RETURN m1.text, m2.text, r.weight, length(path) AS cycle_length
+        self.context_search.ensure_vector_index()
+        index = self.context_search.vector_index
+
+        keys = index.keys()
+        pairs: Dict[Tuple[str, str], float] = {}
+        for start in range(0, len(keys), block_size):
+            block_vectors = index.vectors(keys[start:start + block_size])
+            block = list(block_vectors)
+            if not block:
+                continue
+            neighbours = index.search_batch(np.stack([block_vectors[key] for key in block]), k + 1, similarity_threshold)
+            for source, matches in zip(block, neighbours):
+                for target, score in matches:
+                    if target != source:
+                        pair = (source, target) if source < target else (target, source)
+                        pairs[pair] = max(score, pairs.get(pair, score))
+        return [(source, target, round(score, 4)) for (source, target), score in pairs.items()]
+
+    def write_links(self, pairs: List[Tuple[str, str, float]], batch_size: int = 1000) -> List[Dict]:
+        """
+        Merge RELATED_TO edges for (source, target, similarity) pairs in UNWIND batches.
+
+        :param pairs: Memory text pairs with their similarity.
+        :param batch_size: Edges written per transaction.
+        :return: One row per edge written.
+        """
+        timestamp = datetime.now().isoformat()
+        linked = []
+        for start in range(0, len(pairs), batch_size):
+            batch = [
+                {"source": source, "target": target, "similarity": similarity}
+                for source, target, similarity in pairs[start:start + batch_size]
+            ]
+            linked.extend(self.db.write_query(self.LINK_PAIRS_QUERY, {"pairs": batch, "timestamp": timestamp}))
+        return linked
+
+    def link_memories(self, k: int = 10, similarity_threshold: float = 0.7, block_size: int = 256,
+                      batch_size: int = 1000) -> List[Dict]:
+        """
+        Link semantically similar memories with RELATED_TO edges.
+
+        Candidates come from the vector index (see `candidate_pairs`) and are written in UNWIND batches,
+        keeping the job near-linear in the number of memories.
+
+        :param k: Neighbours considered per memory.
+        :param similarity_threshold: Minimum cosine similarity for a link.
+        :param block_size: Memories scored per matrix product.
+        :param batch_size: Edges written per transaction.
+        :return: List of dictionaries with details of the linked memories.
         """
         try:
-            result = self.db.run_query(query)
-            logger.info(f"[MEMORY LINKING] Linked {len(result)} memory pairs.")
-            return result
+            pairs = self.candidate_pairs(k, similarity_threshold, block_size)
+            linked = self.write_links(pairs, batch_size)
+            logger.info(f"[MEMORY LINKING] Linked {len(linked)} memory pairs from {len(pairs)} candidates.")
+            return linked
         except Exception as e:
             logger.error(f"[MEMORY LINKING ERROR] {e}", exc_info=True)
             return []
@@ -87,18 +231,17 @@ class MemoryLinker:
 
     def adjust_memory_weight_and_link(self, memory_text: str, adjustment: float) -> List[Dict]:
         """
-        Adjust the weight of a memory and link associated memories if the adjustment is positive.
+        Adjust the weight of a memory.
+
+        Linking is left to IncrementalLinker, which links each memory once when it is stored; re-linking the
+        whole graph here made every positive adjustment cost a full pass over all memories.
 
         :param memory_text: Text of the memory to adjust.
         :param adjustment: Float value to adjust the weight by.
         :return: Result of the weight adjustment.
         """
         try:
-            result = self.adjust_memory_weight(memory_text, adjustment)
-            if adjustment > 0:
-                self.link_memories()
-                self.link_memories_by_emotion()
-            return result
+            return self.adjust_memory_weight(memory_text, adjustment)
         except Exception as e:
             logger.error(f"[ADJUST WEIGHT ERROR] {e}", exc_info=True)
             return []
@@ -135,36 +278,49 @@ class MemoryLinker:
         # schedule.every(1).hour.do(self.detect_cycles)
         logger.info("[SCHEDULER] Periodic tasks scheduling would be implemented here.")
 
-    def recursive_linking(self, start_node_id: str, depth: int = 3):
+    def recursive_linking(self, start_text: str, depth: int = 3, fanout: int = 10, weight: float = 0.5,
+                          batch_size: int = 1000) -> Dict[str, int]:
         """
-        Recursively link nodes based on themes and emotions.
-    
-        :param start_node_id: Starting node ID.
-        :param depth: Depth of recursion.
+        Reinforce the neighbourhood of a memory, breadth first.
+
+        Each level expands the whole frontier with one UNWIND query (up to `fanout` RELATED_TO or
+        SHARES_EMOTION neighbours per memory) and writes its REINFORCES edges in batches. Memories already
+        visited are not expanded again, so the cost follows the edges touched rather than the paths.
+
+        :param start_text: Text of the memory to start from.
+        :param depth: Number of levels to expand.
+        :param fanout: Maximum neighbours followed per memory.
+        :param weight: Weight given to newly created REINFORCES edges.
+        :param batch_size: Edges written per transaction.
+        :return: Counts of memories visited and REINFORCES edges written.
         """
-        if depth <= 0:
-            return
+        visited = {start_text}
+        frontier = [start_text]
+        reinforced = 0
         try:
-            query = f"""
-            MATCH (n:Memory {{id: '{start_node_id}'}})-[:RELATED_TO|:SHARES_EMOTION]->(related:Memory)
-            WITH related LIMIT 10
-            MERGE (n)-[:REINFORCES {{weight: 0.5}}]->(related)
-            WITH related
-            CALL {{ 
-                WITH related
-                MATCH (related)-[:RELATED_TO|:SHARES_EMOTION]->(next:Memory)
-                WHERE NOT (n)-[:REINFORCES]->(next)
-                WITH next LIMIT 10
-                MERGE (related)-[:REINFORCES {{weight: 0.5}}]->(next)
-            }}
-            """
-            self.db.run_query(query)
-            # Recursive call on all newly linked memories
-            for memory in self.db.run_query(f"MATCH (m:Memory {{id: '{start_node_id}'}})-[:REINFORCES]->(related) RETURN related.id"):
-                self.recursive_linking(memory['id'], depth - 1)
-            logger.info(f"[RECURSIVE LINKING] Linked recursively for node {start_node_id}.")
+            for level in range(depth):
+                if not frontier:
+                    break
+                expansions = self.db.read_query(self.EXPAND_FRONTIER_QUERY, {"frontier": frontier, "fanout": fanout})
+                edges, next_frontier = [], []
+                for expansion in expansions:
+                    for neighbour in expansion["neighbours"]:
+                        edges.append({"source": expansion["source"], "target": neighbour})
+                        if neighbour not in visited:
+                            visited.add(neighbour)
+                            next_frontier.append(neighbour)
+
+                for start in range(0, len(edges), batch_size):
+                    result = self.db.write_query(self.REINFORCE_EDGES_QUERY, {
+                        "edges": edges[start:start + batch_size],
+                        "weight": weight,
+                    })
+                    reinforced += result[0]["linked"] if result else 0
+                frontier = next_frontier
+            logger.info(f"[RECURSIVE LINKING] Reinforced {reinforced} edges across {len(visited)} memories from '{start_text}'.")
         except Exception as e:
             logger.error(f"[RECURSIVE LINKING ERROR] {e}", exc_info=True)
+        return {"visited": len(visited), "reinforced": reinforced}
 
     def visualize_thought_process(self, start_node_id: str) -> Optional[Dict]:
         """
@@ -187,20 +343,40 @@ class MemoryLinker:
             logger.error(f"[VISUALIZATION ERROR] {e}", exc_info=True)
             return None
 
-    def consolidate_memories(self):
+    def consolidate_memories(self, similarity_threshold: float = 0.9, k: int = 10, batch_size: int = 500) -> Dict[str, int]:
         """
-        Consolidate similar memories by merging or strengthening connections.
+        Consolidate near-duplicate memories into clusters.
+
+        Candidate pairs above the threshold come from the vector index and are joined with a disjoint-set
+        structure, so transitively similar memories land in one group regardless of edge order. Each group is
+        written as one MemoryCluster (keyed by its lexicographically smallest member) with CONSOLIDATED_INTO
+        edges from its members, in UNWIND batches. A cluster left without members because they moved to a
+        cluster with a new representative is deleted in the same transaction.
+
+        :param similarity_threshold: Minimum cosine similarity for two memories to be consolidated.
+        :param k: Neighbours considered per memory.
+        :param batch_size: Clusters written per transaction.
+        :return: Counts of clusters and memories written, and of emptied clusters removed.
         """
         try:
-            query = """
-            MATCH (m1:Memory)-[r:RELATED_TO]->(m2:Memory)
-            WHERE gds.alpha.similarity.cosine(m1.vector, m2.vector) > 0.9
-            MERGE (m1)-[c:CONSOLIDATED_WITH]->(m2)
-            SET c.weight = CASE WHEN EXISTS(r.weight) THEN r.weight + 1 ELSE 1 END
-            WITH m1, m2, c
-            DETACH DELETE r  # Remove the old relationship if it exists
-            """
-            self.db.run_query(query)
-            logger.info("[MEMORY CONSOLIDATION] Memories consolidation process completed.")
+            groups = UnionFind()
+            for source, target, _ in self.candidate_pairs(k, similarity_threshold):
+                groups.union(source, target)
+            clusters = [{"representative": members[0], "members": members} for members in groups.groups(min_size=2)]
+
+            timestamp = datetime.now().isoformat()
+            consolidated = removed = 0
+            for start in range(0, len(clusters), batch_size):
+                result = self.db.write_query(self.WRITE_CLUSTERS_QUERY, {
+                    "clusters": clusters[start:start + batch_size],
+                    "timestamp": timestamp,
+                })
+                if result:
+                    consolidated += result[0]["members"]
+                    removed += result[0]["removed"]
+            logger.info(f"[MEMORY CONSOLIDATION] Consolidated {consolidated} memories into {len(clusters)} clusters; "
+                        f"removed {removed} emptied clusters.")
+            return {"clusters": len(clusters), "memories": consolidated, "removed": removed}
         except Exception as e:
-            logger.error(f"[MEMORY CONSOLIDATION ERROR] {e}", exc_info=True)
\ No newline at end of file
+            logger.error(f"[MEMORY CONSOLIDATION ERROR] {e}", exc_info=True)
+            return {"clusters": 0, "memories": 0, "removed": 0}
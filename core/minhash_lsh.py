@@ -0,0 +1,115 @@
+# Filename: /core/minhash_lsh.py
+
+import logging
+import re
+import zlib
+from typing import Iterable, Set, Tuple
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+def shingles(text: str, size: int = 5) -> Set[str]:
+    """
+    Character shingles of a whitespace- and case-normalized text.
+
+    :param text: Text to shingle.
+    :param size: Shingle length in characters. Texts shorter than this form a single shingle.
+    """
+    normalized = re.sub(r'\s+', ' ', str(text).lower()).strip()
+    if len(normalized) <= size:
+        return {normalized}
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    """Exact Jaccard similarity of two shingle sets."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+class MinHashLSH:
+    """
+    MinHash signatures with banded locality-sensitive hashing.
+
+    Each document is reduced to `num_perm` 32-bit MinHash values and then to one 64-bit hash per band of
+    `rows` values, so only `bands` integers per document are kept. Documents sharing any band hash are
+    candidate near-duplicates; with Jaccard similarity s, that happens with probability
+    1 - (1 - s^rows)^bands, which rises steeply around (1 / bands)^(1 / rows).
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 16, shingle_size: int = 5, seed: int = 1):
+        """
+        Initialize the hasher.
+
+        :param num_perm: Number of MinHash permutations; must be divisible by `bands`.
+        :param bands: Number of LSH bands.
+        :param shingle_size: Character shingle length.
+        :param seed: Seed for the permutation parameters, fixed so signatures are comparable across runs.
+        """
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands}).")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._band_weights = rng.integers(1, 1 << 62, size=self.rows, dtype=np.uint64) | np.uint64(1)
+
+    @property
+    def threshold(self) -> float:
+        """Approximate Jaccard similarity at which a pair becomes likely to be a candidate."""
+        return (1 / self.bands) ** (1 / self.rows)
+
+    def signature(self, text: str) -> np.ndarray:
+        """Return the MinHash signature (uint64 array of 32-bit values) of a text's shingles."""
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles(text, self.shingle_size)),
+            dtype=np.uint64,
+        )
+        with np.errstate(over="ignore"):  # Wrap-around in the universal hash is intended
+            permuted = ((hashes[:, None] * self._a + self._b) % _MERSENNE_PRIME) & _MAX_HASH
+        return permuted.min(axis=0)
+
+    def band_hashes(self, texts: Iterable[str]) -> np.ndarray:
+        """
+        Reduce texts to their band hashes.
+
+        :return: Array of shape (len(texts), bands).
+        """
+        signatures = [self.signature(text) for text in texts]
+        signatures = np.stack(signatures) if signatures else np.zeros((0, self.num_perm), dtype=np.uint64)
+        banded = signatures.reshape(len(signatures), self.bands, self.rows)
+        with np.errstate(over="ignore"):
+            return (banded * self._band_weights).sum(axis=2, dtype=np.uint64)
+
+    @staticmethod
+    def candidate_pairs(band_hashes: np.ndarray, max_bucket_size: int = 100) -> Set[Tuple[int, int]]:
+        """
+        Pairs of row indices sharing a bucket in at least one band.
+
+        :param band_hashes: Output of `band_hashes` for the whole collection, shape (N, bands).
+        :param max_bucket_size: Buckets larger than this only pair each member with the first one, so a
+                                degenerate bucket (e.g. many empty texts) cannot produce a quadratic blow-up.
+        :return: Set of (i, j) index pairs with i < j.
+        """
+        pairs: Set[Tuple[int, int]] = set()
+        for band in range(band_hashes.shape[1]):
+            order = np.argsort(band_hashes[:, band], kind="stable")
+            values = band_hashes[order, band]
+            boundaries = np.flatnonzero(np.diff(values)) + 1
+            for bucket in np.split(order, boundaries):
+                if len(bucket) < 2:
+                    continue
+                members = sorted(bucket.tolist())
+                if len(members) > max_bucket_size:
+                    pairs.update((members[0], other) for other in members[1:])
+                else:
+                    pairs.update((a, b) for i, a in enumerate(members) for b in members[i + 1:])
+        return pairs
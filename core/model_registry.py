@@ -0,0 +1,159 @@
+# Filename: /core/model_registry.py
+
+import gc
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class ModelRegistry:
+    """
+    Process-wide registry that loads each transformer model at most once, on first use.
+
+    Engines ask the registry for a model every time they need it instead of holding their own copy, so
+    idle models can be evicted when resident memory exceeds the configured budget and transparently
+    reloaded on the next request.
+    """
+
+    def __init__(self, rss_budget_mb: Optional[int] = None, idle_seconds: float = 300.0):
+        """
+        Initialize the registry.
+
+        :param rss_budget_mb: Resident set size, in MB, above which idle models are evicted. None disables eviction.
+        :param idle_seconds: Minimum time since last use before a model may be evicted.
+        """
+        self.rss_budget_mb = rss_budget_mb
+        self.idle_seconds = idle_seconds
+        self._models: Dict[str, Any] = {}
+        self._last_used: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        """
+        Return the shared model registered under `key`, loading it with `loader` on first use.
+
+        :param key: Unique identifier of the model (kind and name).
+        :param loader: Zero-argument callable that loads the model.
+        :return: The shared model instance.
+        """
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._last_used[key] = time.monotonic()
+                return model
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock so unrelated models can load concurrently
+        with key_lock:
+            with self._lock:
+                model = self._models.get(key)
+                if model is not None:
+                    self._last_used[key] = time.monotonic()
+                    return model
+
+            start = time.perf_counter()
+            model = loader()
+            with self._lock:
+                self._models[key] = model
+                self._last_used[key] = time.monotonic()
+                self.loads += 1
+            logger.info(f"[MODEL REGISTRY] Loaded '{key}' in {time.perf_counter() - start:.2f}s.")
+
+        self.enforce_budget(keep=key)
+        return model
+
+    def sentence_transformer(self, name: str):
+        """Return the shared SentenceTransformer for `name`."""
+        def load():
+            from sentence_transformers import SentenceTransformer # type: ignore
+            return SentenceTransformer(name)
+        return self.get(f"sentence-transformer:{name}", load)
+
+    def pipeline(self, task: str, model: str):
+        """Return the shared Hugging Face pipeline for (`task`, `model`)."""
+        def load():
+            from transformers import pipeline
+            return pipeline(task, model=model)
+        return self.get(f"pipeline:{task}:{model}", load)
+
+    def seq2seq(self, name: str) -> Tuple[Any, Any]:
+        """Return the shared (model, tokenizer) pair for a sequence-to-sequence model."""
+        def load():
+            from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+            return AutoModelForSeq2SeqLM.from_pretrained(name), AutoTokenizer.from_pretrained(name)
+        return self.get(f"seq2seq:{name}", load)
+
+    def is_loaded(self, key: str) -> bool:
+        """Return True if `key` is currently resident."""
+        with self._lock:
+            return key in self._models
+
+    def evict(self, key: str) -> bool:
+        """
+        Drop the registry's reference to a model so it can be garbage collected.
+
+        :param key: Identifier of the model to evict.
+        :return: True if the model was resident.
+        """
+        with self._lock:
+            if self._models.pop(key, None) is None:
+                return False
+            self._last_used.pop(key, None)
+            self.evictions += 1
+        gc.collect()
+        logger.info(f"[MODEL REGISTRY] Evicted '{key}'.")
+        return True
+
+    @staticmethod
+    def rss_mb() -> float:
+        """Return the resident set size of this process in MB."""
+        import psutil  # For system monitoring
+        return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+
+    def enforce_budget(self, keep: Optional[str] = None):
+        """
+        Evict least recently used idle models until resident memory is within budget.
+
+        :param keep: Key that must not be evicted (typically the model just requested).
+        """
+        if not self.rss_budget_mb:
+            return
+        while self.rss_mb() > self.rss_budget_mb:
+            now = time.monotonic()
+            with self._lock:
+                idle = [
+                    (last_used, key) for key, last_used in self._last_used.items()
+                    if key != keep and now - last_used >= self.idle_seconds
+                ]
+            if not idle:
+                logger.warning(f"[MODEL REGISTRY] RSS {self.rss_mb():.0f}MB exceeds budget {self.rss_budget_mb}MB but no model is idle.")
+                return
+            self.evict(min(idle)[1])
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report which models are resident and how often models were loaded or evicted.
+
+        :return: Dictionary of registry statistics.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "loaded": {key: round(now - last_used, 1) for key, last_used in self._last_used.items()},
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "rss_budget_mb": self.rss_budget_mb,
+            }
+
+model_registry = ModelRegistry(
+    rss_budget_mb=int(os.getenv("MODEL_RSS_BUDGET_MB", "0")) or None,
+    idle_seconds=float(os.getenv("MODEL_IDLE_SECONDS", "300")),
+)
@@ -1,31 +1,42 @@
 # Filename: neo4j_connector.py
 # Location: core folder
 
-from neo4j import GraphDatabase, exceptions
+from neo4j import GraphDatabase, READ_ACCESS, WRITE_ACCESS, exceptions
 import logging
 import time
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
 # Configure logging to include timestamp and log level
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class Neo4jConnector:
-    def __init__(self, uri: str, user: str, password: str, max_retries: int = 3, retry_delay: float = 3.0):
+    def __init__(self, uri: str, user: str, password: str, max_retries: int = 3, retry_delay: float = 3.0,
+                 max_connection_pool_size: int = 50, connection_acquisition_timeout: float = 60.0,
+                 database: Optional[str] = None):
         """
         Initialize the Neo4j connector with connection details and retry settings.
 
+        Use a `neo4j://` (routing) URI against a cluster so that `read_query`/`execute_read` are served by
+        followers and writes go to the leader.
+
         :param uri: Neo4j database URI
         :param user: Database username
         :param password: Database password
         :param max_retries: Maximum number of connection attempts
         :param retry_delay: Delay in seconds between connection attempts
+        :param max_connection_pool_size: Maximum number of pooled connections per server
+        :param connection_acquisition_timeout: Seconds to wait for a free pooled connection
+        :param database: Default database for sessions, if not the server default
         """
         self.uri = uri
         self.user = user
         self.password = password
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        self.max_connection_pool_size = max_connection_pool_size
+        self.connection_acquisition_timeout = connection_acquisition_timeout
+        self.database = database
         self.driver = self._connect_with_retry()
 
     def _connect_with_retry(self) -> GraphDatabase.driver:
@@ -37,7 +48,12 @@ class Neo4jConnector:
         """
         for attempt in range(self.max_retries):
             try:
-                driver = GraphDatabase.driver(self.uri, auth=(self.user, self.password))
+                driver = GraphDatabase.driver(
+                    self.uri,
+                    auth=(self.user, self.password),
+                    max_connection_pool_size=self.max_connection_pool_size,
+                    connection_acquisition_timeout=self.connection_acquisition_timeout,
+                )
                 with driver.session() as session:
                     session.run("RETURN 1")
                 logger.info("[Neo4j] Connected successfully.")
@@ -66,7 +82,7 @@ class Neo4jConnector:
         parameters = parameters or {}
         for attempt in range(self.max_retries):
             try:
-                with self.driver.session(database=db) if db else self.driver.session() as session:
+                with self.driver.session(database=db or self.database) as session:
                     result = session.run(query, **parameters)
                     data = result.data()
                     logger.info(f"[QUERY SUCCESS] Query: {query[:50]}{'...' if len(query) > 50 else ''}, {len(data)} rows returned.")
@@ -83,6 +99,93 @@ class Neo4jConnector:
                 raise
         return []  # This line should never be reached if exceptions are handled correctly
 
+    @staticmethod
+    def _short(query: str) -> str:
+        return f"{query[:50]}{'...' if len(query) > 50 else ''}"
+
+    def execute_read(self, work: Callable, *args, db: Optional[str] = None, **kwargs) -> Any:
+        """
+        Run a transaction function in a managed read transaction, routed to a follower in a cluster.
+        The driver retries the whole function on transient errors.
+
+        :param work: Callable receiving the transaction as first argument.
+        :param db: Name of the database to use, if not the default
+        :return: Whatever `work` returns.
+        """
+        with self.driver.session(database=db or self.database, default_access_mode=READ_ACCESS) as session:
+            return session.execute_read(work, *args, **kwargs)
+
+    def execute_write(self, work: Callable, *args, db: Optional[str] = None, **kwargs) -> Any:
+        """
+        Run a transaction function in a managed write transaction, routed to the leader in a cluster.
+        The driver retries the whole function on transient errors.
+
+        :param work: Callable receiving the transaction as first argument.
+        :param db: Name of the database to use, if not the default
+        :return: Whatever `work` returns.
+        """
+        with self.driver.session(database=db or self.database, default_access_mode=WRITE_ACCESS) as session:
+            return session.execute_write(work, *args, **kwargs)
+
+    @staticmethod
+    def _run_and_fetch(tx, query: str, parameters: Dict) -> List[Dict]:
+        return tx.run(query, **parameters).data()
+
+    def read_query(self, query: str, parameters: Optional[Dict] = None, db: Optional[str] = None) -> List[Dict]:
+        """
+        Execute a read-only Cypher query as a managed read transaction.
+
+        :param query: Cypher query to execute
+        :param parameters: Dictionary of parameters for the query
+        :param db: Name of the database to use, if not the default
+        :return: List of dictionaries with query results
+        """
+        try:
+            data = self.execute_read(self._run_and_fetch, query, parameters or {}, db=db)
+            logger.info(f"[READ SUCCESS] Query: {self._short(query)}, {len(data)} rows returned.")
+            return data
+        except Exception as e:
+            logger.error(f"[READ FAILED] Error for query '{self._short(query)}': {e}", exc_info=True)
+            raise
+
+    def write_query(self, query: str, parameters: Optional[Dict] = None, db: Optional[str] = None) -> List[Dict]:
+        """
+        Execute a Cypher write query as a managed write transaction.
+
+        :param query: Cypher query to execute
+        :param parameters: Dictionary of parameters for the query
+        :param db: Name of the database to use, if not the default
+        :return: List of dictionaries with query results
+        """
+        try:
+            data = self.execute_write(self._run_and_fetch, query, parameters or {}, db=db)
+            logger.info(f"[WRITE SUCCESS] Query: {self._short(query)}, {len(data)} rows returned.")
+            return data
+        except Exception as e:
+            logger.error(f"[WRITE FAILED] Error for query '{self._short(query)}': {e}", exc_info=True)
+            raise
+
+    def run_transaction(self, statements: Sequence[Tuple[str, Optional[Dict]]], db: Optional[str] = None,
+                        read_only: bool = False) -> List[List[Dict]]:
+        """
+        Execute several statements atomically in one managed transaction.
+
+        :param statements: Sequence of (query, parameters) pairs, run in order.
+        :param db: Name of the database to use, if not the default
+        :param read_only: Run as a read transaction (routable to followers) instead of a write transaction.
+        :return: One result list per statement.
+        """
+        def work(tx):
+            return [tx.run(query, **(parameters or {})).data() for query, parameters in statements]
+
+        try:
+            results = (self.execute_read if read_only else self.execute_write)(work, db=db)
+            logger.info(f"[TRANSACTION SUCCESS] {len(statements)} statements committed.")
+            return results
+        except Exception as e:
+            logger.error(f"[TRANSACTION FAILED] {len(statements)} statements rolled back: {e}", exc_info=True)
+            raise
+
     def close(self):
         """
         Close the Neo4j driver connection.
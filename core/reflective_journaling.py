@@ -3,7 +3,7 @@
 import os
 from dotenv import load_dotenv  # type: ignore
 from datetime import datetime
-from core.neo4j_connector import Neo4jConnection
+from core.neo4j_connector import Neo4jConnector
 import logging
 
 # Configure logging
@@ -13,15 +13,59 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
-# Initialize Neo4j Connection using environment variables
-db = Neo4jConnection(
-    uri=os.getenv("NEO4J_URI"),
-    user=os.getenv("NEO4J_USER"),
-    password=os.getenv("NEO4J_PASSWORD")
-)
-
 class ReflectiveJournaling:
-    def __init__(self):
+    LOG_EVENT_QUERY = """
+    CREATE (j:JournalEntry {
+        title: $title,
+        content: $content,
+        emotional_state: $emotional_state,
+        timestamp: $timestamp
+    })
+    """
+
+    RECENT_ENTRIES_QUERY = """
+    MATCH (j:JournalEntry)
+    RETURN j.title AS title, j.content AS content, j.emotional_state AS emotional_state, j.timestamp AS timestamp
+    ORDER BY j.timestamp DESC LIMIT $limit
+    """
+
+    ENTRY_BY_TITLE_QUERY = """
+    MATCH (j:JournalEntry {title: $title})
+    RETURN j.content AS content, j.emotional_state AS emotional_state, j.timestamp AS timestamp
+    """
+
+    EMOTIONAL_TRENDS_QUERY = """
+    MATCH (j:JournalEntry)
+    RETURN j.emotional_state AS emotion, count(j) AS frequency
+    ORDER BY frequency DESC
+    """
+
+    JOURNAL_STATS_QUERY = """
+    MATCH (j:JournalEntry)
+    RETURN
+        count(j) AS total_entries,
+        min(j.timestamp) AS first_entry,
+        max(j.timestamp) AS last_entry
+    """
+
+    UPDATE_ENTRY_QUERY = """
+    MATCH (j:JournalEntry {title: $title})
+    SET j.content = $new_content,
+        j.emotional_state = COALESCE($new_emotional_state, j.emotional_state)
+    """
+
+    def __init__(self, db=None):
+        """
+        Initialize the journal.
+
+        :param db: Connector exposing `run_query` (Neo4jConnector or EmbeddedGraphConnector). Defaults to a
+                   Neo4jConnector built from the NEO4J_* environment variables.
+        """
+        self.db = db or Neo4jConnector(
+            uri=os.getenv("NEO4J_URI"),
+            user=os.getenv("NEO4J_USER"),
+            password=os.getenv("NEO4J_PASSWORD")
+        )
         self.current_journal_entry = None
 
     def log_event(self, title: str, content: str, emotional_state: str = "neutral"):
@@ -33,21 +77,13 @@ class ReflectiveJournaling:
         :param emotional_state: Emotional state associated with the entry.
         """
         try:
-            query = """
-            CREATE (j:JournalEntry {
-                title: $title, 
-                content: $content, 
-                emotional_state: $emotional_state, 
-                timestamp: $timestamp
-            })
-            """
             parameters = {
                 "title": title,
                 "content": content,
                 "emotional_state": emotional_state,
                 "timestamp": datetime.now().isoformat()
             }
-            db.query(query, parameters)
+            self.db.run_query(self.LOG_EVENT_QUERY, parameters)
             logger.info(f"Logged journal entry: {title}")
             self.current_journal_entry = parameters  # Update current entry
         except Exception as e:
@@ -61,12 +97,7 @@ class ReflectiveJournaling:
         :return: List of dictionaries containing journal entry details.
         """
         try:
-            query = """
-            MATCH (j:JournalEntry)
-            RETURN j.title AS title, j.content AS content, j.emotional_state AS emotional_state, j.timestamp AS timestamp
-            ORDER BY j.timestamp DESC LIMIT $limit
-            """
-            results = db.query(query, {"limit": limit})
+            results = self.db.run_query(self.RECENT_ENTRIES_QUERY, {"limit": limit})
             logger.info(f"Retrieved {len(results)} recent journal entries.")
             return results
         except Exception as e:
@@ -81,11 +112,7 @@ class ReflectiveJournaling:
         :return: Reflection string or error message.
         """
         try:
-            query = """
-            MATCH (j:JournalEntry {title: $title})
-            RETURN j.content AS content, j.emotional_state AS emotional_state, j.timestamp AS timestamp
-            """
-            result = db.query(query, {"title": event_title})
+            result = self.db.run_query(self.ENTRY_BY_TITLE_QUERY, {"title": event_title})
 
             if not result:
                 logger.warning(f"No journal entry found for '{event_title}'.")
@@ -110,12 +137,7 @@ class ReflectiveJournaling:
         :return: Dictionary with emotional states as keys and their frequency as values.
         """
         try:
-            query = """
-            MATCH (j:JournalEntry)
-            RETURN j.emotional_state AS emotion, count(j) AS frequency
-            ORDER BY frequency DESC
-            """
-            results = db.query(query)
+            results = self.db.run_query(self.EMOTIONAL_TRENDS_QUERY)
             trends = {item['emotion']: item['frequency'] for item in results}
             logger.info(f"Emotional trends analyzed: {trends}")
             return trends
@@ -153,21 +175,9 @@ class ReflectiveJournaling:
         :return: Dictionary with various statistics about journal entries.
         """
         try:
-            stats_query = """
-            MATCH (j:JournalEntry)
-            RETURN 
-                count(j) AS total_entries,
-                min(j.timestamp) AS first_entry,
-                max(j.timestamp) AS last_entry
-            """
-            stats = db.query(stats_query)[0]
-
-            emotional_query = """
-            MATCH (j:JournalEntry)
-            RETURN j.emotional_state AS emotion, count(j) AS count
-            """
-            emotions = db.query(emotional_query)
-            emotional_distribution = {entry['emotion']: entry['count'] for entry in emotions}
+            stats = self.db.run_query(self.JOURNAL_STATS_QUERY)[0]
+            emotions = self.db.run_query(self.EMOTIONAL_TRENDS_QUERY)
+            emotional_distribution = {entry['emotion']: entry['frequency'] for entry in emotions}
 
             return {
                 "total_entries": stats['total_entries'],
@@ -188,19 +198,12 @@ class ReflectiveJournaling:
         :param new_emotional_state: New emotional state if it should be updated.
         """
         try:
-            query = """
-            MATCH (j:JournalEntry {title: $title})
-            SET j.content = $new_content
-            """
             parameters = {
                 "title": title,
-                "new_content": new_content
+                "new_content": new_content,
+                "new_emotional_state": new_emotional_state or None
             }
-            if new_emotional_state:
-                query += ", j.emotional_state = $new_emotional_state"
-                parameters["new_emotional_state"] = new_emotional_state
-
-            db.query(query, parameters)
+            self.db.run_query(self.UPDATE_ENTRY_QUERY, parameters)
             logger.info(f"Updated journal entry: {title}")
         except Exception as e:
             logger.error(f"Failed to update journal entry '{title}': {e}")
@@ -0,0 +1,111 @@
+# Filename: /core/retrieval_stats_buffer.py
+
+import atexit
+import logging
+import threading
+from collections import Counter
+from typing import Callable, Iterable, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class RetrievalStatsBuffer:
+    """
+    Write-behind buffer for memory retrieval statistics.
+
+    Retrievals are counted in memory per memory text and written periodically as a single UNWIND
+    transaction, so N retrievals within the flush interval cost one write instead of N.
+    """
+
+    FLUSH_QUERY = """
+    UNWIND $updates AS update
+    MATCH (m:Memory {text: update.text})
+    SET m.retrieval_count = COALESCE(m.retrieval_count, 0) + update.count,
+        m.pleasure = CASE WHEN m.pleasure + $step * update.count < 1 THEN m.pleasure + $step * update.count ELSE 1 END,
+        m.arousal = CASE WHEN m.arousal - $step * update.count > 0 THEN m.arousal - $step * update.count ELSE 0 END
+    RETURN count(m) AS updated
+    """
+
+    def __init__(self, db, flush_interval: float = 5.0, max_pending: int = 1000, step: float = 0.01,
+                 on_flush: Optional[Callable[[Iterable[str]], None]] = None):
+        """
+        Initialize the buffer.
+
+        :param db: Connector used for the flush query.
+        :param flush_interval: Maximum seconds an increment stays unwritten (the staleness window).
+        :param max_pending: Number of distinct memories that triggers an early flush.
+        :param step: Pleasure increase and arousal decrease applied per retrieval.
+        :param on_flush: Callback receiving the memory texts written by each flush.
+        """
+        self.db = db
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.step = step
+        self.on_flush = on_flush
+
+        self._pending: Counter = Counter()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the periodic flush thread and register a final flush at interpreter exit."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="RetrievalStatsFlush")
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def record(self, text: str, count: int = 1):
+        """
+        Count a retrieval of the memory `text`.
+
+        :param text: Text of the retrieved memory.
+        :param count: Number of retrievals to add.
+        """
+        with self._lock:
+            self._pending[text] += count
+            pending = len(self._pending)
+        if pending >= self.max_pending:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Write all pending increments in one transaction.
+
+        :return: Number of memories updated.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                pending, self._pending = self._pending, Counter()
+
+            updates = [{"text": text, "count": count} for text, count in pending.items()]
+            try:
+                self.db.write_query(self.FLUSH_QUERY, {"updates": updates, "step": self.step})
+                logger.info(f"[RETRIEVAL FLUSH] Wrote {sum(pending.values())} retrievals across {len(updates)} memories.")
+            except Exception as e:
+                # Put the increments back so they are retried on the next flush
+                with self._lock:
+                    self._pending.update(pending)
+                logger.error(f"[RETRIEVAL FLUSH FAILED] {e}", exc_info=True)
+                return 0
+
+        if self.on_flush:
+            self.on_flush(pending.keys())
+        return len(updates)
+
+    def close(self):
+        """Stop the flush thread and write any remaining increments."""
+        self._stop.set()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.flush_interval)
+        self.flush()
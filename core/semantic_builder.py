@@ -1,10 +1,13 @@
 # File: /core/semantic_builder.py
 
-from transformers import pipeline
-from sentence_transformers import SentenceTransformer # type: ignore
+import re
+import numpy as np
 import torch
 from sklearn.metrics.pairwise import cosine_similarity
+from core.embedding_store import EmbeddingStore
+from core.model_registry import model_registry
 import logging
+import threading
 from datetime import datetime
 
 # Configure logging
@@ -12,23 +15,68 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 class SemanticBuilder:
+    SIMILARITY_MODEL_ID = 'paraphrase-MiniLM-L6-v2'  # Example model, can be changed
+    IDENTIFIER_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+    SHIFT_CURSOR_NAME = "narrative_shifts"
+
+    SHIFT_CURSOR_QUERY = """
+    MATCH (w:Watermark {name: $name})
+    RETURN w.created_at AS created_at, w.text AS text, w.theme AS theme
+    """
+
+    NEW_THEMED_MEMORIES_QUERY = """
+    MATCH (m:Memory)
+    WHERE m.theme IS NOT NULL AND (m.created_at > $created_at OR (m.created_at = $created_at AND m.text > $text))
+    RETURN m.text AS text, m.theme AS theme, m.created_at AS created_at
+    ORDER BY m.created_at, m.text
+    LIMIT $limit
+    """
+
+    WRITE_SHIFTS_QUERY = """
+    UNWIND $shifts AS shift
+    MERGE (s:NarrativeShift {memory: shift.memory})
+    SET s.description = shift.description, s.old_theme = shift.old_theme,
+        s.new_theme = shift.new_theme, s.timestamp = shift.timestamp
+    """
+
+    ADVANCE_SHIFT_CURSOR_QUERY = """
+    MERGE (w:Watermark {name: $name})
+    SET w.created_at = $created_at, w.text = $text, w.theme = $theme, w.updated_at = $updated_at
+    """
+
+    RECENT_SHIFTS_QUERY = """
+    MATCH (s:NarrativeShift)
+    RETURN s.description AS description, s.old_theme AS old_theme, s.new_theme AS new_theme, s.timestamp AS timestamp
+    ORDER BY s.timestamp DESC
+    LIMIT $limit
+    """
+
     def __init__(self, graph_client, similarity_threshold=0.8, batch_size=1000):
         """
         Initialize SemanticBuilder with necessary components for semantic analysis.
 
         :param graph_client: Client to interact with the graph database.
         :param similarity_threshold: Threshold for considering two nodes similar.
-        :param batch_size: Number of nodes to process in one batch for performance.
+        :param batch_size: Number of relationships written, or memories scanned for shifts, per query.
         """
         self.graph_client = graph_client
         self.similarity_threshold = similarity_threshold
         self.batch_size = batch_size
+        self._shift_lock = threading.Lock()
+        self._shift_rerun = False
 
         # Use SentenceTransformer for potentially better performance in similarity tasks
-        self.similarity_model = SentenceTransformer('paraphrase-MiniLM-L6-v2')  # Example model, can be changed
-        
-        # Additional model for semantic analysis if needed
-        self.semantic_model = pipeline("fill-mask", model="bert-base-uncased")
+        self.embeddings = EmbeddingStore.for_model(self.SIMILARITY_MODEL_ID)
+
+    @property
+    def similarity_model(self):
+        """Shared sentence embedding model used for similarity, loaded on first use."""
+        return model_registry.sentence_transformer(self.SIMILARITY_MODEL_ID)
+
+    @property
+    def semantic_model(self):
+        """Additional fill-mask model for semantic analysis, loaded on first use."""
+        return model_registry.pipeline("fill-mask", "bert-base-uncased")
 
     def compute_similarities(self, texts):
         """
@@ -37,38 +85,92 @@ class SemanticBuilder:
         :param texts: List of text descriptions
         :return: Similarity matrix
         """
-        embeddings = self.similarity_model.encode(texts)
+        embeddings = self.embeddings.encode(texts)
         return cosine_similarity(embeddings)
 
-    def build_relationships(self, label="Emotion", relationship_type="SIMILAR_TO"):
+    @staticmethod
+    def top_k_pairs(embeddings, k=10, threshold=0.8, block_size=1024):
+        """
+        Find each row's top-k most similar other rows above a threshold, one block of rows at a time.
+
+        Only a block_size x N slice of the cosine matrix exists at once, and only k candidates per row are
+        kept, so memory stays O(N * k) beyond the block.
+
+        :param embeddings: Matrix of embeddings, one row per node.
+        :param k: Neighbours kept per row.
+        :param threshold: Similarity a pair must exceed.
+        :param block_size: Rows scored per matrix product.
+        :return: Sorted list of (i, j, similarity) with i < j; a pair found from both ends is kept once.
+        """
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        n = len(vectors)
+        k = min(k, n - 1)
+        pairs = {}
+        if k <= 0:
+            return []
+        for start in range(0, n, block_size):
+            scores = vectors[start:start + block_size] @ vectors.T
+            rows = np.arange(len(scores))
+            scores[rows, rows + start] = -np.inf  # Exclude self-similarity
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            for row, col in zip(*np.nonzero(top_scores > threshold)):
+                i, j = start + int(row), int(top[row, col])
+                pairs[(min(i, j), max(i, j))] = float(top_scores[row, col])
+        return sorted((i, j, score) for (i, j), score in pairs.items())
+
+    def build_relationships(self, label="Emotion", relationship_type="SIMILAR_TO", k=10, block_size=1024):
         """
         Build relationships in the graph based on similarity of node descriptions.
 
+        Each node is linked to at most its k nearest neighbours above the similarity threshold, and the
+        edges are written with one UNWIND query per `batch_size` pairs.
+
         :param label: The label of nodes to analyze
         :param relationship_type: Type of relationship to create based on similarity
+        :param k: Maximum number of similar nodes linked per node
+        :param block_size: Rows per blocked similarity computation
+        :return: Number of relationships written
         """
+        if not self.IDENTIFIER_PATTERN.match(label) or not self.IDENTIFIER_PATTERN.match(relationship_type):
+            raise ValueError(f"Invalid label or relationship type: {label}, {relationship_type}")
         query = f"""
         MATCH (e:{label})
         WHERE e.description IS NOT NULL
         RETURN e.id AS id, e.name AS name, e.description AS description
         """
+        write_query = f"""
+        UNWIND $pairs AS pair
+        MATCH (n1:{label} {{id: pair.source}}), (n2:{label} {{id: pair.target}})
+        MERGE (n1)-[r:{relationship_type}]->(n2)
+        SET r.similarity = pair.similarity
+        RETURN count(r) AS created
+        """
         try:
-            nodes = self.graph_client.run_query(query)
+            nodes = self.graph_client.read_query(query)
             descriptions = [node["description"] for node in nodes]
-            
+
             if not descriptions:
                 logger.warning(f"No descriptions found for label: {label}")
-                return
+                return 0
 
-            similarities = self.compute_similarities(descriptions)
+            embeddings = self.embeddings.encode(descriptions)
+            pairs = [
+                {"source": nodes[i]["id"], "target": nodes[j]["id"], "similarity": round(score, 4)}
+                for i, j, score in self.top_k_pairs(embeddings, k, self.similarity_threshold, block_size)
+            ]
 
-            for i in range(len(similarities)):
-                for j in range(i + 1, len(similarities)):
-                    if similarities[i][j] > self.similarity_threshold:
-                        self.create_relationship(nodes[i]['id'], nodes[j]['id'], relationship_type)
+            created = 0
+            for start in range(0, len(pairs), self.batch_size):
+                result = self.graph_client.write_query(write_query, {"pairs": pairs[start:start + self.batch_size]})
+                created += result[0]["created"] if result else 0
+            logger.info(f"Created {created} {relationship_type} relationships between {len(nodes)} {label} nodes.")
+            return created
 
         except Exception as e:
             logger.error(f"Error building relationships: {e}")
+            return 0
 
     def create_relationship(self, id1, id2, relationship_type):
         """
@@ -89,35 +191,105 @@ class SemanticBuilder:
         except Exception as e:
             logger.error(f"Failed to create relationship between {id1} and {id2}: {e}")
 
-    def detect_narrative_shifts(self):
+    def update_narrative_shifts(self, texts=None):
         """
-        Detect shifts in narrative themes in the graph.
+        Record theme shifts among memories stored since the last update.
 
-        :return: List of detected shifts with additional context.
+        Memories past the persisted (created_at, text) cursor are read in creation order and compared
+        with the theme of the last memory already processed; each change of theme is stored as a
+        NarrativeShift node, and the cursor advances in the same transaction. Can be registered as a
+        MemoryEngine store listener: a call made while an update is running flags it to run again, so
+        memories stored meanwhile are not left for the next notification.
+
+        :param texts: Newly stored memory texts (unused; the cursor finds them).
+        :return: Number of shifts recorded.
+        """
+        self._shift_rerun = True
+        recorded = 0
+        while True:
+            if not self._shift_lock.acquire(blocking=False):
+                return recorded  # The running update sees the flag and goes again
+            try:
+                while self._shift_rerun:
+                    self._shift_rerun = False
+                    recorded += self._record_new_shifts()
+            finally:
+                self._shift_lock.release()
+            if not self._shift_rerun:  # Flagged after our last pass but before the release
+                break
+        if recorded:
+            logger.info(f"[NARRATIVE SHIFTS] Recorded {recorded} new shifts.")
+        return recorded
+
+    def _record_new_shifts(self):
+        recorded = 0
+        try:
+            cursor = self.graph_client.read_query(self.SHIFT_CURSOR_QUERY, {"name": self.SHIFT_CURSOR_NAME})
+            cursor = cursor[0] if cursor and cursor[0]["created_at"] is not None else {"created_at": "", "text": "", "theme": None}
+            created_at, text, theme = cursor["created_at"], cursor["text"] or "", cursor["theme"]
+            while True:
+                memories = self.graph_client.read_query(self.NEW_THEMED_MEMORIES_QUERY, {
+                    "created_at": created_at,
+                    "text": text,
+                    "limit": self.batch_size,
+                })
+                if not memories:
+                    break
+                shifts = []
+                for memory in memories:
+                    if theme is not None and memory["theme"] != theme:
+                        shifts.append({
+                            "memory": memory["text"],
+                            "description": f"Shift from '{theme}' to '{memory['theme']}' at {self._shift_time(memory)}.",
+                            "old_theme": theme,
+                            "new_theme": memory["theme"],
+                            "timestamp": memory["created_at"],
+                        })
+                    theme = memory["theme"]
+                created_at, text = memories[-1]["created_at"], memories[-1]["text"]
+                self.graph_client.run_transaction([
+                    (self.WRITE_SHIFTS_QUERY, {"shifts": shifts}),
+                    (self.ADVANCE_SHIFT_CURSOR_QUERY, {
+                        "name": self.SHIFT_CURSOR_NAME,
+                        "created_at": created_at,
+                        "text": text,
+                        "theme": theme,
+                        "updated_at": datetime.now().isoformat(),
+                    }),
+                ])
+                recorded += len(shifts)
+                if len(memories) < self.batch_size:
+                    break
+        except Exception as e:
+            logger.error(f"[SHIFT UPDATE ERROR] {e}", exc_info=True)
+        return recorded
+
+    @staticmethod
+    def _shift_time(memory):
+        """Format a memory's created_at for a shift description, keeping values that are not ISO-8601 as they are."""
+        try:
+            return datetime.fromisoformat(memory["created_at"]).strftime("%Y-%m-%d %H:%M:%S")
+        except (TypeError, ValueError):
+            logger.warning(f"[NARRATIVE SHIFTS] Memory '{memory['text']}' has a created_at that is not ISO-8601: "
+                           f"{memory['created_at']!r}; it is ordered as a plain string.")
+            return memory["created_at"]
+
+    def detect_narrative_shifts(self, limit=5, refresh=False):
         """
-        query = """
-        MATCH (m:Memory)
-        WHERE m.theme IS NOT NULL AND m.timestamp IS NOT NULL
-        RETURN m.text AS text, m.theme AS theme, m.timestamp AS timestamp
-        ORDER BY m.timestamp
+        Return the most recent shifts in narrative themes from the NarrativeShift store.
+
+        :param limit: Maximum number of shifts to return, newest first.
+        :param refresh: Process memories stored since the last update before reading.
+        :return: List of detected shifts with additional context.
         """
         try:
-            nodes = self.graph_client.run_query(query)
-            shifts = []
-            for i in range(1, len(nodes)):
-                if nodes[i]["theme"] != nodes[i - 1]["theme"]:
-                    timestamp = datetime.strptime(nodes[i]['timestamp'], "%Y-%m-%d %H:%M:%S")  # Adjust format if needed
-                    shift_description = f"Shift from '{nodes[i - 1]['theme']}' to '{nodes[i]['theme']}' at {timestamp}."
-                    shifts.append({
-                        "description": shift_description,
-                        "old_theme": nodes[i - 1]["theme"],
-                        "new_theme": nodes[i]["theme"],
-                        "timestamp": nodes[i]["timestamp"]
-                    })
-            logger.info(f"[NARRATIVE SHIFTS] Detected {len(shifts)} shifts.")
+            if refresh:
+                self.update_narrative_shifts()
+            shifts = self.graph_client.read_query(self.RECENT_SHIFTS_QUERY, {"limit": limit})
+            logger.info(f"[NARRATIVE SHIFTS] Retrieved {len(shifts)} shifts.")
             return shifts
         except Exception as e:
-            logger.error(f"[SHIFT DETECTION ERROR] {e}")
+            logger.error(f"[SHIFT DETECTION ERROR] {e}", exc_info=True)
             return []
 
     def analyze_concept_evolution(self, concept):
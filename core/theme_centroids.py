@@ -0,0 +1,276 @@
+# Filename: /core/theme_centroids.py
+
+import atexit
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class ThemeCentroids:
+    """
+    Persisted per-theme centroid vectors and per-memory similarity-to-theme scores.
+
+    Each Theme node keeps the sum and count of its members' normalized embeddings, so adding or re-theming
+    a memory moves the centroid in O(1). Sums and counts are moved by deltas inside a single Cypher
+    statement, so concurrent writers never overwrite each other's members. A new member is scored against
+    its theme's centroid when it arrives; a theme's existing members are only rescored once its centroid
+    has drifted past `rescore_threshold` from the centroid they were last scored against, and that rescore
+    runs on a background worker (see `start`). Scores live in `m.theme_similarity`, so a thematic search
+    is an indexed read ordered by the stored score.
+    """
+
+    MEMBER_THEMES_QUERY = """
+    UNWIND $texts AS text
+    MATCH (m:Memory {text: text})
+    WHERE m.theme IS NOT NULL
+    RETURN m.text AS text, m.theme AS theme, m.centroid_theme AS centroid_theme
+    """
+
+    THEME_STATE_QUERY = """
+    UNWIND $themes AS name
+    MATCH (t:Theme {name: name})
+    RETURN t.name AS theme, t.centroid AS centroid, t.member_count AS member_count,
+           t.scored_centroid AS scored_centroid
+    """
+
+    THEME_MEMBER_TEXTS_QUERY = """
+    MATCH (m:Memory)
+    WHERE m.theme = $theme
+    RETURN m.text AS text
+    """
+
+    WRITE_THEMES_QUERY = """
+    UNWIND $members AS member
+    MATCH (m:Memory {text: member.text})
+    SET m.centroid_theme = member.theme
+    WITH count(m) AS moved
+    UNWIND $themes AS theme
+    MERGE (t:Theme {name: theme.name})
+    WITH t, theme, coalesce(t.centroid_sum, [x IN theme.delta | 0.0]) AS current,
+         coalesce(t.member_count, 0) + theme.count_delta AS member_count
+    SET t.centroid_sum = [i IN range(0, size(theme.delta) - 1) | current[i] + theme.delta[i]],
+        t.member_count = CASE WHEN member_count > 0 THEN member_count ELSE 0 END,
+        t.centroid_updated_at = $timestamp
+    WITH t, sqrt(reduce(s = 0.0, x IN t.centroid_sum | s + x * x)) AS norm
+    SET t.centroid = CASE WHEN norm > 0 AND t.member_count > 0 THEN [x IN t.centroid_sum | x / norm] END
+    RETURN count(t) AS themes
+    """
+
+    RETIRED_MEMBERS_QUERY = """
+    UNWIND $texts AS text
+    MATCH (m:Memory {text: text})
+    WHERE m.centroid_theme IS NOT NULL
+    WITH m, m.centroid_theme AS centroid_theme
+    REMOVE m.centroid_theme
+    RETURN m.text AS text, centroid_theme
+    """
+
+    WRITE_SCORES_QUERY = """
+    UNWIND $rows AS row
+    MATCH (m:Memory {text: row.text})
+    SET m.theme_similarity = row.similarity, m.centroid_theme = row.theme
+    """
+
+    SCORED_CENTROID_QUERY = """
+    MATCH (t:Theme {name: $theme})
+    SET t.scored_centroid = $centroid
+    """
+
+    def __init__(self, db, context_search, rescore_threshold: float = 0.98, batch_size: int = 1000):
+        """
+        Initialize the maintainer.
+
+        :param db: Connector used for theme state and score queries.
+        :param context_search: ContextSearchEngine whose vector index and embeddings provide memory vectors.
+        :param rescore_threshold: Cosine similarity between the current centroid and the one a theme was last
+                                  scored against, below which all of its members are rescored.
+        :param batch_size: Memories processed per transaction.
+        """
+        self.db = db
+        self.context_search = context_search
+        self.rescore_threshold = rescore_threshold
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+
+        self._pending_rescores: Set[str] = set()
+        self._pending_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the background thread that rescores drifted themes."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="ThemeRescorer")
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            self.rescore_pending()
+
+    def stop(self):
+        """Stop the rescore thread after the theme in progress; unfinished themes stay pending."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def rescore_pending(self) -> int:
+        """
+        Rescore every theme queued since the last pass.
+
+        :return: Number of memories scored.
+        """
+        scored = 0
+        while not (self._stop.is_set() and threading.current_thread() is self._thread):
+            with self._pending_lock:
+                if not self._pending_rescores:
+                    break
+                theme = self._pending_rescores.pop()
+            try:
+                scored += self.rescore_theme(theme)
+            except Exception as e:
+                logger.error(f"[THEME CENTROIDS ERROR] Rescoring '{theme}' failed: {e}", exc_info=True)
+        return scored
+
+    def _queue_rescore(self, themes: List[str]):
+        with self._pending_lock:
+            self._pending_rescores.update(themes)
+        self._wake.set()
+
+    @staticmethod
+    def _unit(vector: np.ndarray) -> np.ndarray:
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _vectors(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        """Normalized embeddings, from the vector index where present and the embedding cache otherwise."""
+        vectors = self.context_search.vector_index.vectors(texts)
+        missing = [text for text in texts if text not in vectors]
+        if missing:
+            encoded = self.context_search.embeddings.encode([text.lower() for text in missing])
+            vectors.update({text: self._unit(np.asarray(vector, dtype=np.float32)) for text, vector in zip(missing, encoded)})
+        return vectors
+
+    def update(self, texts: List[str]) -> int:
+        """
+        Fold stored or re-themed memories into their themes' centroids and score them.
+        Can be registered as a MemoryEngine store listener; drifted themes are queued for the rescore worker.
+
+        :param texts: Memory texts that were stored or had their theme changed.
+        :return: Number of memories scored.
+        """
+        scored = 0
+        with self._lock:
+            try:
+                for start in range(0, len(texts), self.batch_size):
+                    scored += self._update_batch(texts[start:start + self.batch_size])
+            except Exception as e:
+                logger.error(f"[THEME CENTROIDS ERROR] {e}", exc_info=True)
+        return scored
+
+    def _update_batch(self, texts: List[str]) -> int:
+        members = self.db.read_query(self.MEMBER_THEMES_QUERY, {"texts": texts})
+        if not members:
+            return 0
+        vectors = self._vectors([member["text"] for member in members])
+
+        deltas: Dict[str, Dict] = {}
+        moved = []
+        for member in members:
+            vector = vectors.get(member["text"])
+            if vector is None or member["centroid_theme"] == member["theme"]:
+                continue  # Unchanged membership; only its score may need a refresh below
+            for name, sign in ((member["centroid_theme"], -1), (member["theme"], 1)):
+                if name:
+                    delta = deltas.setdefault(name, {"name": name, "delta": np.zeros_like(vector), "count_delta": 0})
+                    delta["delta"] += sign * vector
+                    delta["count_delta"] += sign
+            moved.append({"text": member["text"], "theme": member["theme"]})
+        if moved:
+            self.db.write_query(self.WRITE_THEMES_QUERY, {
+                "members": moved,
+                "themes": [{**delta, "delta": delta["delta"].tolist()} for delta in deltas.values()],
+                "timestamp": datetime.now().isoformat(),
+            })
+
+        names = sorted({member["theme"] for member in members} | set(deltas))
+        centroids, rescore = {}, []
+        for row in self.db.read_query(self.THEME_STATE_QUERY, {"themes": names}):
+            if not row["centroid"]:
+                continue
+            centroid = centroids[row["theme"]] = np.asarray(row["centroid"], dtype=np.float32)
+            scored = row["scored_centroid"]
+            if not scored or float(self._unit(np.asarray(scored, dtype=np.float32)) @ centroid) < self.rescore_threshold:
+                rescore.append(row["theme"])
+
+        rows = [
+            {"text": member["text"], "theme": member["theme"],
+             "similarity": round(float(vectors[member["text"]] @ centroids[member["theme"]]), 4)}
+            for member in members
+            if member["text"] in vectors and member["theme"] in centroids
+        ]
+        self.db.write_query(self.WRITE_SCORES_QUERY, {"rows": rows})
+        if rescore:
+            self._queue_rescore(rescore)
+        return len(rows)
+
+    def retire(self, tx, texts: List[str]) -> int:
+        """
+        Subtract memories about to be deleted or merged away from their themes' centroids, inside the
+        caller's transaction so the sums never count memories that are gone.
+
+        :param tx: Open write transaction.
+        :param texts: Texts of the memories being removed.
+        :return: Number of memories taken out of a centroid.
+        """
+        members = tx.run(self.RETIRED_MEMBERS_QUERY, {"texts": texts}).data()
+        if not members:
+            return 0
+        vectors = self._vectors([member["text"] for member in members])
+        deltas: Dict[str, Dict] = {}
+        for member in members:
+            vector = vectors[member["text"]]
+            delta = deltas.setdefault(member["centroid_theme"], {
+                "name": member["centroid_theme"], "delta": np.zeros_like(vector), "count_delta": 0})
+            delta["delta"] -= vector
+            delta["count_delta"] -= 1
+        tx.run(self.WRITE_THEMES_QUERY, {
+            "members": [],
+            "themes": [{**delta, "delta": delta["delta"].tolist()} for delta in deltas.values()],
+            "timestamp": datetime.now().isoformat(),
+        })
+        return len(members)
+
+    def rescore_theme(self, theme: str) -> int:
+        """
+        Rescore every member of a theme against its current centroid and record that centroid as scored.
+
+        :param theme: Theme name.
+        :return: Number of memories scored.
+        """
+        state = self.db.read_query(self.THEME_STATE_QUERY, {"themes": [theme]})
+        if not state or not state[0]["centroid"]:
+            return 0
+        centroid = np.asarray(state[0]["centroid"], dtype=np.float32)
+        self.db.write_query(self.SCORED_CENTROID_QUERY, {"theme": theme, "centroid": centroid.tolist()})
+        texts = [row["text"] for row in self.db.read_query(self.THEME_MEMBER_TEXTS_QUERY, {"theme": theme})]
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            vectors = self._vectors(batch)
+            self.db.write_query(self.WRITE_SCORES_QUERY, {"rows": [
+                {"text": text, "theme": theme, "similarity": round(float(vectors[text] @ centroid), 4)}
+                for text in batch if text in vectors
+            ]})
+        logger.info(f"[THEME CENTROIDS] Rescored {len(texts)} memories of theme '{theme}'.")
+        return len(texts)
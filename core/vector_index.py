@@ -0,0 +1,351 @@
+# Filename: /core/vector_index.py
+
+import logging
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class VectorIndex:
+    """
+    In-process approximate nearest-neighbour index over a NumPy matrix.
+
+    Vectors are L2-normalized on insert so inner product equals cosine similarity. Small indexes are
+    searched exhaustively; once the index grows past `exact_threshold` rows an IVF layout (k-means
+    coarse quantizer with inverted lists) is trained and only the `nprobe` closest lists are scanned.
+    """
+
+    def __init__(self, dim: Optional[int] = None, nlist: int = 0, nprobe: int = 8,
+                 exact_threshold: int = 20000, kmeans_iterations: int = 10):
+        """
+        Initialize an empty vector index.
+
+        :param dim: Dimension of the stored vectors. Inferred from the first insert if omitted.
+        :param nlist: Number of IVF lists. Defaults to roughly sqrt(N) at training time.
+        :param nprobe: Number of IVF lists scanned per query.
+        :param exact_threshold: Row count below which queries are answered exhaustively.
+        :param kmeans_iterations: Lloyd iterations used to train the coarse quantizer.
+        """
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.exact_threshold = exact_threshold
+        self.kmeans_iterations = kmeans_iterations
+
+        self._lock = threading.RLock()
+        self._vectors = np.zeros((0, dim or 0), dtype=np.float32)
+        self._size = 0
+        self._keys: List[str] = []
+        self._key_to_row: Dict[str, int] = {}
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._positions = np.zeros(0, dtype=np.int64)
+        self._lists: List[np.ndarray] = []
+        self._list_sizes = np.zeros(0, dtype=np.int64)
+        self._trained_size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._key_to_row
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """Return float32 row-normalized copies of the given vectors."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _reserve(self, rows: int):
+        """Grow the backing matrix geometrically so appends stay amortized O(1)."""
+        capacity = self._vectors.shape[0]
+        if self._size + rows <= capacity:
+            return
+        new_capacity = max(self._size + rows, capacity * 2, 1024)
+        vectors = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        assignments = np.zeros(new_capacity, dtype=np.int32)
+        assignments[:self._size] = self._assignments[:self._size]
+        positions = np.zeros(new_capacity, dtype=np.int64)
+        positions[:self._size] = self._positions[:self._size]
+        self._vectors = vectors
+        self._assignments = assignments
+        self._positions = positions
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Return the nearest centroid for each vector."""
+        return np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+
+    def _build_lists(self):
+        """Rebuild the inverted lists from the current row assignments."""
+        assignments = self._assignments[:self._size]
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=len(self._centroids))
+        self._lists = [rows.copy() for rows in np.split(order, np.cumsum(counts)[:-1])]
+        self._list_sizes = counts.astype(np.int64)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        self._positions[order] = np.arange(self._size) - np.repeat(starts, counts)
+
+    def _list_append(self, row: int):
+        """Append `row` to the inverted list of its assigned centroid."""
+        c = self._assignments[row]
+        size = self._list_sizes[c]
+        if size == len(self._lists[c]):
+            grown = np.zeros(max(2 * size, 16), dtype=np.int64)
+            grown[:size] = self._lists[c]
+            self._lists[c] = grown
+        self._lists[c][size] = row
+        self._positions[row] = size
+        self._list_sizes[c] = size + 1
+
+    def _list_remove(self, row: int):
+        """Drop `row` from its inverted list by moving the list's last entry into its slot."""
+        c = self._assignments[row]
+        size = self._list_sizes[c] - 1
+        moved = self._lists[c][size]
+        self._lists[c][self._positions[row]] = moved
+        self._positions[moved] = self._positions[row]
+        self._list_sizes[c] = size
+
+    def _probe_rows(self, probes: np.ndarray) -> np.ndarray:
+        """Return the rows stored in the given inverted lists."""
+        return np.concatenate([self._lists[c][:self._list_sizes[c]] for c in probes])
+
+    def _top_k(self, q: np.ndarray, rows: Optional[np.ndarray], k: int, min_score: Optional[float]) -> List[Tuple[str, float]]:
+        """Score `rows` (every row if None) against a normalized query and return the best k."""
+        scores = self._vectors[:self._size] @ q if rows is None else self._vectors[rows] @ q
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        hits = top if rows is None else rows[top]
+
+        results = []
+        for row, score in zip(hits, scores[top]):
+            if min_score is not None and score < min_score:
+                break
+            results.append((self._keys[row], float(score)))
+        return results
+
+    def add(self, key: str, vector: Sequence[float]):
+        """
+        Insert or replace a single vector.
+
+        :param key: Identifier of the vector (the Memory text).
+        :param vector: Embedding to store.
+        """
+        self.add_batch([key], np.asarray(vector, dtype=np.float32).reshape(1, -1))
+
+    def add_batch(self, keys: Sequence[str], vectors: np.ndarray):
+        """
+        Insert or replace many vectors at once.
+
+        :param keys: Identifiers for each row of `vectors`.
+        :param vectors: Matrix of embeddings, one row per key.
+        """
+        if len(keys) == 0:
+            return
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(np.asarray(vectors).shape[-1])
+                self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+            normalized = self._normalize(vectors)
+            if normalized.shape[1] != self.dim:
+                raise ValueError(f"Expected vectors of dimension {self.dim}, got {normalized.shape[1]}.")
+
+            self._reserve(len(keys))
+            assignments = self._assign(normalized) if self._centroids is not None else None
+            for i, (key, vector) in enumerate(zip(keys, normalized)):
+                row = self._key_to_row.get(key)
+                if row is None:
+                    row = self._size
+                    self._key_to_row[key] = row
+                    self._keys.append(key)
+                    self._size += 1
+                elif assignments is not None:
+                    self._list_remove(row)
+                self._vectors[row] = vector
+                if assignments is not None:
+                    self._assignments[row] = assignments[i]
+                    self._list_append(row)
+
+            if self._size >= self.exact_threshold and self._size >= 2 * max(self._trained_size, 1):
+                self.train()
+
+    def remove(self, key: str) -> bool:
+        """
+        Remove a vector from the index by swapping the last row into its slot.
+
+        :param key: Identifier of the vector to remove.
+        :return: True if the key was present.
+        """
+        with self._lock:
+            row = self._key_to_row.pop(key, None)
+            if row is None:
+                return False
+            if self._centroids is not None:
+                self._list_remove(row)
+            last = self._size - 1
+            if row != last:
+                last_key = self._keys[last]
+                self._vectors[row] = self._vectors[last]
+                self._assignments[row] = self._assignments[last]
+                if self._centroids is not None:
+                    self._positions[row] = self._positions[last]
+                    self._lists[self._assignments[row]][self._positions[row]] = row
+                self._keys[row] = last_key
+                self._key_to_row[last_key] = row
+            self._keys.pop()
+            self._size -= 1
+            return True
+
+    def train(self):
+        """
+        Train the IVF coarse quantizer with k-means on the current vectors and reassign every row.
+        """
+        with self._lock:
+            if self._size == 0:
+                return
+            nlist = self.nlist or max(1, int(np.sqrt(self._size)))
+            nlist = min(nlist, self._size)
+            data = self._vectors[:self._size]
+            rng = np.random.default_rng(0)
+            sample = data[rng.choice(self._size, size=min(self._size, nlist * 64), replace=False)]
+            centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+            for _ in range(self.kmeans_iterations):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                for c in range(nlist):
+                    members = sample[labels == c]
+                    if len(members):
+                        centroids[c] = members.mean(axis=0)
+                centroids = self._normalize(centroids)
+
+            self._centroids = centroids
+            self._assignments[:self._size] = self._assign(data)
+            self._build_lists()
+            self._trained_size = self._size
+            logger.info(f"[VECTOR INDEX] Trained IVF quantizer with {nlist} lists over {self._size} vectors.")
+
+    def search(self, query: Sequence[float], k: int = 10, min_score: Optional[float] = None) -> List[Tuple[str, float]]:
+        """
+        Return the top-k most similar keys to the query vector.
+
+        :param query: Query embedding.
+        :param k: Number of neighbours to return.
+        :param min_score: Optional cosine similarity cut-off.
+        :return: List of (key, similarity) tuples, most similar first.
+        """
+        with self._lock:
+            if self._size == 0 or k <= 0:
+                return []
+            q = self._normalize(query)[0]
+
+            if self._centroids is None or self._size < self.exact_threshold:
+                return self._top_k(q, None, k, min_score)
+            nprobe = min(self.nprobe, len(self._centroids))
+            probes = np.argpartition(-(self._centroids @ q), nprobe - 1)[:nprobe]
+            return self._top_k(q, self._probe_rows(probes), k, min_score)
+
+    def search_batch(self, queries: np.ndarray, k: int = 10, min_score: Optional[float] = None) -> List[List[Tuple[str, float]]]:
+        """
+        Return the top-k most similar keys for each row of a query matrix.
+
+        Exhaustive indexes score the whole block with one matrix product; IVF indexes pick the lists for the
+        whole block with one product against the centroids, then scan each query's lists.
+
+        :param queries: Matrix of query embeddings, one row per query.
+        :param k: Number of neighbours to return per query.
+        :param min_score: Optional cosine similarity cut-off.
+        :return: One list of (key, similarity) tuples per query, most similar first.
+        """
+        with self._lock:
+            queries = self._normalize(queries)
+            if self._size == 0 or k <= 0:
+                return [[] for _ in range(len(queries))]
+            if self._centroids is not None and self._size >= self.exact_threshold:
+                nprobe = min(self.nprobe, len(self._centroids))
+                probes = np.argpartition(-(queries @ self._centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+                return [self._top_k(q, self._probe_rows(query_probes), k, min_score)
+                        for q, query_probes in zip(queries, probes)]
+
+            scores = queries @ self._vectors[:self._size].T
+            k = min(k, self._size)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+            return [
+                [(self._keys[row], float(score)) for row, score in zip(rows, row_scores)
+                 if min_score is None or score >= min_score]
+                for rows, row_scores in zip(top, top_scores)
+            ]
+
+    def keys(self) -> List[str]:
+        """Return the keys currently stored, in row order."""
+        with self._lock:
+            return list(self._keys)
+
+    def vectors(self, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up stored (normalized) vectors by key.
+
+        :param keys: Identifiers to fetch.
+        :return: Dictionary of key to vector for keys present in the index.
+        """
+        with self._lock:
+            return {key: self._vectors[self._key_to_row[key]].copy() for key in keys if key in self._key_to_row}
+
+    def save(self, path: str):
+        """
+        Persist the index to a `.npz` file.
+
+        :param path: Destination file path.
+        """
+        with self._lock:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            np.savez(
+                path,
+                vectors=self._vectors[:self._size],
+                keys=np.array(self._keys, dtype=str),
+                centroids=self._centroids if self._centroids is not None else np.zeros((0, self.dim or 0), dtype=np.float32),
+                assignments=self._assignments[:self._size],
+            )
+            logger.info(f"[VECTOR INDEX] Saved {self._size} vectors to {path}.")
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "VectorIndex":
+        """
+        Load an index previously written with `save`.
+
+        :param path: Source file path.
+        :return: A populated VectorIndex.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            vectors = data["vectors"].astype(np.float32)
+            index = cls(dim=vectors.shape[1], **kwargs)
+            index._vectors = vectors.copy()
+            index._size = len(vectors)
+            index._keys = [str(key) for key in data["keys"]]
+            index._key_to_row = {key: row for row, key in enumerate(index._keys)}
+            index._assignments = data["assignments"].astype(np.int32).copy()
+            index._positions = np.zeros(index._size, dtype=np.int64)
+            if len(data["centroids"]):
+                index._centroids = data["centroids"].astype(np.float32)
+                index._build_lists()
+                index._trained_size = index._size
+        logger.info(f"[VECTOR INDEX] Loaded {index._size} vectors from {path}.")
+        return index
@@ -2,6 +2,7 @@
 import os
 import sys
 import logging
+import mimetypes
 import time
 from threading import Thread
 from functools import lru_cache
@@ -11,6 +12,7 @@ from werkzeug.utils import secure_filename
 from dotenv import load_dotenv  # type: ignore
 from config.settings import CONFIG
 from core.neo4j_connector import Neo4jConnector
+from core.embedded_graph import EmbeddedGraphConnector
 from core.memory_engine import MemoryEngine
 from core.file_parser import FileParser
 from NLP.response_generator import ResponseGenerator
@@ -21,13 +23,16 @@ from core.conversation_engine import ConversationEngine
 from core.dream_engine import DreamEngine
 from core.ethics_engine import EthicsEngine
 from core.memory_linker import MemoryLinker
+from core.incremental_linker import IncrementalLinker
+from core.embedding_enricher import EmbeddingEnricher
 from core.context_search import ContextSearchEngine
 from core.deduplication_engine import DeduplicationEngine
+from core.embedding_store import EmbeddingStore
+from core.model_registry import model_registry
 from NLP.consciousness_engine import ConsciousnessEngine
 from NLP.intent_detector import IntentDetector
 from core.self_initiated_conversation import SelfInitiatedConversation
 from flask_socketio import SocketIO  # type: ignore
-from sentence_transformers import SentenceTransformer # type: ignore
 
 # Load Environment Variables
 load_dotenv()
@@ -57,7 +62,8 @@ app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE_MB * 1024 * 1024  # Convert MB to bytes
 
 socketio = SocketIO(app)
-model = SentenceTransformer("sentence-transformers/all-mpnet-base-v2")
+EMBED_MODEL_ID = "sentence-transformers/all-mpnet-base-v2"
+embedding_store = EmbeddingStore.for_model(EMBED_MODEL_ID)
 
 # Secure Headers Setup
 @app.after_request
@@ -83,23 +89,40 @@ try:
     neo4j_uri = CONFIG.get("NEO4J_URI")
     neo4j_user = CONFIG.get("NEO4J_USER")
     neo4j_password = CONFIG.get("NEO4J_PASSWORD")
-
-    if not neo4j_uri or not neo4j_user or not neo4j_password:
-        logger.critical("Missing Neo4j configuration. Check your .env file.")
-        sys.exit(1)
-
-    neo4j = Neo4jConnector(neo4j_uri, neo4j_user, neo4j_password)
+    embedded_graph = CONFIG["GRAPH_BACKEND"] == "embedded"
+
+    if embedded_graph:
+        # Single-node mode: the graph lives in this process, no Neo4j server needed
+        neo4j = EmbeddedGraphConnector()
+    else:
+        if not neo4j_uri or not neo4j_user or not neo4j_password:
+            logger.critical("Missing Neo4j configuration. Check your .env file.")
+            sys.exit(1)
+
+        neo4j = Neo4jConnector(
+            neo4j_uri, neo4j_user, neo4j_password,
+            max_connection_pool_size=CONFIG["NEO4J_MAX_POOL_SIZE"],
+            connection_acquisition_timeout=CONFIG["NEO4J_ACQUISITION_TIMEOUT"],
+            database=CONFIG.get("NEO4J_DATABASE"),
+        )
     memory_engine = MemoryEngine(neo4j)
     response_gen = ResponseGenerator(memory_engine, neo4j)
     file_parser = FileParser()
     nlp_engine = NLP(memory_engine, response_gen, neo4j)
     emotion_engine = EmotionEngine()
     emotion_fusion_engine = EmotionFusionEngine(memory_engine, nlp_engine)
-    dream_engine = DreamEngine(memory_engine, ContextSearchEngine(neo4j))
-    ethics_engine = EthicsEngine(neo4j)
-    memory_linker = MemoryLinker(neo4j)
     context_search_engine = ContextSearchEngine(neo4j)
-    deduplication_engine = DeduplicationEngine(neo4j_uri, neo4j_user, neo4j_password)
+    memory_engine.add_store_listener(context_search_engine.index_memories)
+    memory_engine.add_store_listener(context_search_engine.update_theme_centroids)
+    memory_engine.add_store_listener(context_search_engine.append_to_embedding_matrix)
+    memory_engine.set_retriever(context_search_engine.retrieve)
+    dream_engine = DreamEngine(memory_engine, context_search_engine)
+    ethics_engine = EthicsEngine(neo4j)
+    memory_linker = MemoryLinker(neo4j, context_search_engine)
+    incremental_linker = IncrementalLinker(neo4j, memory_linker)
+    embedding_enricher = EmbeddingEnricher(neo4j, context_search_engine.embeddings)
+    memory_engine.add_store_listener(embedding_enricher.wake)
+    deduplication_engine = None if embedded_graph else DeduplicationEngine(neo4j_uri, neo4j_user, neo4j_password)
     consciousness_engine = ConsciousnessEngine(memory_engine, emotion_engine)
     intent_detector = IntentDetector(memory_engine)
 
@@ -150,11 +173,11 @@ def embed():
     text = data.get('text')
     if not text:
         return jsonify({'error': 'No text provided'}), 400
-    embedding = model.encode(text).tolist()
+    embedding = embedding_store.encode(text).tolist()
     
     # Continuous learning: Optionally update model here with new text
     # This would typically be done in a separate background process
-    # model.train_on_new_data(text)     embedding = model.encode(text).tolist()
+    # model.train_on_new_data(text)
     
     # Continuous learning: Optionally update model here with new text
     # This would typically be done in a separate background process or thread
@@ -173,7 +196,7 @@ def update_model_with_text(text):
     def train_task(text):
         # Prepare data for training
         # This is a very basic example; in reality, you'd need more data pre-processing
-        tokenized_input = model.tokenize(text)
+        tokenized_input = model_registry.sentence_transformer(EMBED_MODEL_ID).tokenize(text)
         input_ids = tokenized_input["input_ids"]
         # Assuming you have some way to get labels or use the text in pairs
         # model.train_on_new_data(input_ids, label)  # Needs implementation
@@ -218,6 +241,12 @@ def upload_file():
             extra_properties={"source": filename, "type": "advanced_upload" if is_advanced else "upload"}
         )
 
+        # Embed images once, on upload, for multi-modal search
+        mime_type, _ = mimetypes.guess_type(filepath)
+        if mime_type and mime_type.startswith("image"):
+            context_search_engine.store_image_embedding(memory_engine.clean_text(result.lower()),
+                                                        context_search_engine.embed_image(filepath))
+
         # Continuous Learning: Train model on new file content
         train_model_on_file_content(result)
 
@@ -258,6 +287,16 @@ def ask_maia():
         logger.error(f"[ASK MAIA] Error: {e}", exc_info=True)
         return jsonify({"message": "An error occurred.", "status": "error"}), 500
 
+@app.route('/embedding_stats', methods=['GET'])
+def embedding_stats():
+    """Report hit/miss counters for every shared embedding store."""
+    return jsonify({"stores": EmbeddingStore.all_stats()})
+
+@app.route('/model_stats', methods=['GET'])
+def model_stats():
+    """Report which models are resident in the shared model registry."""
+    return jsonify(model_registry.stats())
+
 @app.route('/get_gallery_images', methods=['GET'])
 def get_gallery_images():
     if 'gallery' not in gallery_cache or 'last_update' not in gallery_cache or (time.time() - gallery_cache['last_update']) > 3600:
@@ -270,4 +309,16 @@ def get_gallery_images():
 if __name__ == "__main__":
     logger.info("[START] MAIA Server is starting...")
     self_initiated_conversation.start_scheduler()
-    socketio.run(app, host="0.0.0.0", port=5000, debug=os.getenv("FLASK_DEBUG", "false").lower() == "true")
\ No newline at end of file
+    incremental_linker.start()
+    embedding_enricher.start()
+    context_search_engine.theme_centroids.start()
+    # Catch the embedding matrix up with memories stored while the server was down, off the request path
+    Thread(target=context_search_engine.refresh_embedding_matrix, daemon=True).start()
+    try:
+        socketio.run(app, host="0.0.0.0", port=5000, debug=os.getenv("FLASK_DEBUG", "false").lower() == "true")
+    finally:
+        incremental_linker.stop()
+        embedding_enricher.stop()
+        context_search_engine.theme_centroids.stop()
+        memory_engine.close()  # Flush buffered retrieval statistics before exit
+        context_search_engine.close()
\ No newline at end of file
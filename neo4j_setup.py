@@ -24,20 +24,9 @@ except Exception as e:
     exit(1)
 
 # Define Triggers
+# Memory linking is not a trigger: a whole-graph similarity scan on every write does not scale, so new
+# memories are linked in batches by core.incremental_linker.IncrementalLinker instead.
 triggers = [
-    {
-        "name": "LinkMemoriesOnCreate",
-        "query": """
-        MATCH (m:Memory)
-        WHERE NOT (m)-[:RELATED_TO]->()
-        WITH m
-        MATCH (other:Memory)
-        WHERE m.text <> other.text
-        AND algo.similarity.cosine(m.vector, other.vector) > 0.7
-        MERGE (m)-[r:RELATED_TO]->(other)
-        SET r.weight = coalesce(r.weight, 0) + 1
-        """
-    },
     {
         "name": "UpdateEmotionState",
         "query": """
@@ -0,0 +1,58 @@
+# Filename: /testing/conftest.py
+"""
+Shared fixtures for the unit tests: an embedded in-process graph and a deterministic stand-in for the
+sentence embedding model, so tests run without a Neo4j server or model downloads.
+"""
+
+import zlib
+
+import numpy as np
+import pytest
+
+from core.context_search import ContextSearchEngine
+from core.embedded_graph import EmbeddedGraphConnector
+from core.embedding_store import EmbeddingStore
+from core.memory_engine import MemoryEngine
+
+class HashingEncoder:
+    """Bag-of-words encoder: each token maps to a fixed random vector, so shared words mean similar texts."""
+
+    def __init__(self, dim: int = 64):
+        self.dim = dim
+        self.calls = 0
+
+    def _token(self, token: str) -> np.ndarray:
+        return np.random.default_rng(zlib.crc32(token.encode("utf-8"))).normal(size=self.dim)
+
+    def encode(self, texts, batch_size: int = 64, **kwargs):
+        self.calls += 1
+        single = isinstance(texts, str)
+        vectors = np.stack([
+            np.sum([self._token(token) for token in (text.lower().split() or [""])], axis=0)
+            for text in ([texts] if single else texts)
+        ]).astype(np.float32)
+        return vectors[0] if single else vectors
+
+@pytest.fixture
+def encoder(monkeypatch):
+    """Install an in-memory embedding store backed by HashingEncoder for the context search model."""
+    encoder = HashingEncoder()
+    store = EmbeddingStore(ContextSearchEngine.EMBEDDING_MODEL_ID, encoder, cache_dir=None)
+    monkeypatch.setattr(EmbeddingStore, "_instances", {ContextSearchEngine.EMBEDDING_MODEL_ID: store})
+    return encoder
+
+@pytest.fixture
+def graph():
+    return EmbeddedGraphConnector()
+
+@pytest.fixture
+def memory_engine(graph):
+    engine = MemoryEngine(graph)
+    yield engine
+    engine.close()
+
+@pytest.fixture
+def context_search(graph, encoder, tmp_path):
+    engine = ContextSearchEngine(graph, index_path=str(tmp_path / "index.npz"), matrix_path=str(tmp_path / "matrix" / "memories"))
+    yield engine
+    engine.close()
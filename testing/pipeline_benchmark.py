@@ -0,0 +1,253 @@
+# Filename: /testing/pipeline_benchmark.py
+"""
+Latency benchmark for the /ask_maia conversation pipeline.
+
+Drives the NLP, memory and response stages over a fixed prompt corpus against the embedded in-process
+graph, and reports p50/p95/p99 per stage as JSON so runs from different versions can be compared.
+
+Usage:
+    python -m testing.pipeline_benchmark --iterations 50 --output bench.json
+    python -m testing.pipeline_benchmark --compare bench.json --tolerance 0.2
+"""
+
+import argparse
+import json
+import logging
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from core.embedded_graph import EmbeddedGraphConnector
+from core.memory_engine import MemoryEngine
+from NLP.nlp_engine import NLP
+from NLP.response_generator import ResponseGenerator
+
+logger = logging.getLogger(__name__)
+
+SEED_MEMORIES = [
+    {"text": "I felt grateful walking by the sea this morning", "emotions": ["joy"], "extra_properties": {"theme": "nature"}},
+    {"text": "Work has been stressful and I feel frustrated", "emotions": ["anger"], "extra_properties": {"theme": "work"}},
+    {"text": "Is it right to forgive someone who never apologized", "emotions": ["neutral"], "extra_properties": {"theme": "ethics"}},
+    {"text": "Faith and hope kept me going through a hard year", "emotions": ["joy"], "extra_properties": {"theme": "faith"}},
+    {"text": "I am lonely since my friend moved away", "emotions": ["sadness"], "extra_properties": {"theme": "relationships"}},
+    {"text": "Music helps me think about truth and beauty", "emotions": ["joy"], "extra_properties": {"theme": "art"}},
+    {"text": "Which should I choose, the safe job or the risky dream", "emotions": ["fear"], "extra_properties": {"theme": "work"}},
+    {"text": "Justice and mercy sometimes pull in different directions", "emotions": ["neutral"], "extra_properties": {"theme": "ethics"}},
+]
+
+PROMPTS = [
+    "Hello Maia, how are you today?",
+    "I felt grateful walking by the sea",
+    "Work has been stressful lately and I am frustrated",
+    "Is it right to forgive someone who hurt me?",
+    "Which should I choose, a safe job or my dream?",
+    "Tell me about faith and hope",
+    "I am lonely and sad tonight",
+    "What do you think about justice and mercy?",
+    "I'm okay, just a normal day",
+    "Can music reveal something true about the world?",
+]
+
+STAGES = ["tokenize", "intent", "emotion", "memory_search", "response", "end_to_end"]
+
+def percentile(sorted_samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list of samples."""
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, -(-len(sorted_samples) * pct // 100))  # ceil(n * pct / 100)
+    return sorted_samples[int(rank) - 1]
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Reduce per-call latencies (seconds) to millisecond summary statistics."""
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean_ms": round(1000 * sum(ordered) / len(ordered), 4) if ordered else 0.0,
+        "p50_ms": round(1000 * percentile(ordered, 50), 4),
+        "p95_ms": round(1000 * percentile(ordered, 95), 4),
+        "p99_ms": round(1000 * percentile(ordered, 99), 4),
+        "max_ms": round(1000 * ordered[-1], 4) if ordered else 0.0,
+    }
+
+def git_revision() -> Optional[str]:
+    """Current commit of the working tree, if it is a git checkout."""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+class PipelineBenchmark:
+    """Times each stage of a conversation turn against an embedded graph seeded with a fixed corpus."""
+
+    def __init__(self, prompts: List[str], keep_cache: bool = False, include_conversation: bool = False):
+        """
+        Build the pipeline components.
+
+        :param prompts: Prompts driven through every stage, once per iteration.
+        :param keep_cache: Keep the memory search cache warm between calls instead of clearing it, so
+                           memory_search and response measure cache hits rather than graph reads.
+        :param include_conversation: Also time ConversationEngine.process_user_input (loads embedding models).
+        """
+        self.prompts = prompts
+        self.keep_cache = keep_cache
+        self.db = EmbeddedGraphConnector()
+        self.memory_engine = MemoryEngine(self.db)
+        # Prompts are stored up front so memory_search times a read: a miss would store the prompt, and run
+        # the store listeners, inside the measured call.
+        self.memory_engine.store_memories(SEED_MEMORIES + list(prompts))
+        self.response_generator = ResponseGenerator(self.memory_engine, self.db)
+        self.nlp = NLP(self.memory_engine, self.response_generator, self.db)
+        self.conversation_engine = None
+        if include_conversation:
+            from core.context_search import ContextSearchEngine
+            from core.conversation_engine import ConversationEngine
+            context_search = ContextSearchEngine(self.db)
+            self.memory_engine.add_store_listener(context_search.index_memories)
+            self.conversation_engine = ConversationEngine(self.memory_engine, self.response_generator, context_search)
+        self.samples: Dict[str, List[float]] = {stage: [] for stage in self.stages}
+        self.search_misses = 0
+
+    @property
+    def stages(self) -> List[str]:
+        return STAGES + (["conversation"] if self.conversation_engine else [])
+
+    def _reset_cache(self):
+        if not self.keep_cache:
+            self.memory_engine.memory_cache.clear(negatives=True)
+
+    def _time(self, stage: str, fn: Callable, *args, record: bool = True):
+        start = time.perf_counter()
+        result = fn(*args)
+        if record:
+            self.samples[stage].append(time.perf_counter() - start)
+        return result
+
+    def _tokenize(self, text: str) -> List[Dict[str, str]]:
+        tokens = self.nlp.tokenizer.tokenize(text)
+        self.nlp.sentence_parser.parse(tokens)
+        return tokens
+
+    def run_turn(self, prompt: str, record: bool = True):
+        """Run one prompt through every stage, mirroring the work done by the /ask_maia route."""
+        tokens = self._time("tokenize", self._tokenize, prompt, record=record)
+        intent = self._time("intent", self.nlp.detect_intent, prompt, record=record)
+        emotions = self._time("emotion", self.nlp.analyze_emotions, tokens, record=record)
+
+        self._reset_cache()
+        if self._time("memory_search", self.memory_engine.search_memory, prompt, record=record) is None:
+            self.search_misses += 1
+
+        self._reset_cache()
+        context_data = {"text": prompt, "tokens": tokens, "emotions": emotions}
+        self._time("response", self.response_generator.generate_response, context_data, "User", intent, "general conversation",
+                   record=record)
+
+        self._reset_cache()
+        def ask_maia(text: str):
+            response, _ = self.nlp.process(text)
+            self.memory_engine.store_memory(text=f"Q: {text}\nA: {response}", emotions=["neutral"],
+                                            extra_properties={"type": "conversation"})
+        self._time("end_to_end", ask_maia, prompt, record=record)
+
+        if self.conversation_engine:
+            self._reset_cache()
+            self._time("conversation", self.conversation_engine.process_user_input, prompt, record=record)
+
+    def run(self, iterations: int, warmup: int = 1) -> Dict:
+        """
+        Run the corpus `warmup` times unrecorded, then `iterations` times recorded.
+
+        :return: Machine-readable results with per-stage summaries.
+        """
+        for _ in range(warmup):
+            for prompt in self.prompts:
+                self.run_turn(prompt, record=False)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            for prompt in self.prompts:
+                self.run_turn(prompt)
+        elapsed = time.perf_counter() - started
+        self.memory_engine.close()
+
+        return {
+            "benchmark": "ask_maia_pipeline",
+            "revision": git_revision(),
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "backend": "embedded",
+            "prompts": len(self.prompts),
+            "iterations": iterations,
+            "warmup": warmup,
+            "keep_cache": self.keep_cache,
+            "elapsed_s": round(elapsed, 4),
+            "memory_search_misses": self.search_misses,
+            "stages": {stage: summarize(self.samples[stage]) for stage in self.stages},
+        }
+
+def compare(current: Dict, baseline: Dict, tolerance: float, metric: str = "p95_ms") -> List[Dict]:
+    """
+    Compare per-stage latency against a baseline result file.
+
+    :param tolerance: Allowed relative slowdown before a stage counts as a regression (0.2 = 20%).
+    :return: One row per stage present in both runs, with the relative change and a regression flag.
+    """
+    rows = []
+    for stage, stats in current["stages"].items():
+        base = baseline.get("stages", {}).get(stage)
+        if not base or not base.get(metric):
+            continue
+        change = (stats[metric] - base[metric]) / base[metric]
+        rows.append({
+            "stage": stage,
+            "metric": metric,
+            "baseline": base[metric],
+            "current": stats[metric],
+            "change": round(change, 4),
+            "regression": change > tolerance,
+        })
+    return rows
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark per-stage latency of the /ask_maia pipeline.")
+    parser.add_argument("--iterations", type=int, default=20, help="Recorded passes over the prompt corpus.")
+    parser.add_argument("--warmup", type=int, default=1, help="Unrecorded passes before measuring.")
+    parser.add_argument("--prompts", help="File with one prompt per line, replacing the built-in corpus.")
+    parser.add_argument("--keep-cache", action="store_true", help="Do not clear the memory search cache between calls.")
+    parser.add_argument("--conversation", action="store_true", help="Also time ConversationEngine.process_user_input.")
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout.")
+    parser.add_argument("--compare", help="Baseline JSON results to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Relative p95 slowdown reported as a regression.")
+    parser.add_argument("--verbose", action="store_true", help="Keep INFO logging from the engines (distorts timings).")
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        logging.disable(logging.INFO)
+
+    prompts = PROMPTS
+    if args.prompts:
+        with open(args.prompts, encoding="utf-8") as f:
+            prompts = [line.strip() for line in f if line.strip()]
+
+    benchmark = PipelineBenchmark(prompts, keep_cache=args.keep_cache, include_conversation=args.conversation)
+    results = benchmark.run(args.iterations, args.warmup)
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            results["comparison"] = compare(results, json.load(f), args.tolerance)
+        if any(row["regression"] for row in results["comparison"]):
+            exit_code = 1
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+# Filename: /testing/test_async_memory_engine.py
+
+import asyncio
+
+import pytest
+
+from core.async_memory_engine import AsyncMemoryEngine
+
+class AsyncEmbeddedConnector:
+    """Async facade over the embedded graph that counts overlapping queries."""
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _run(self, query, parameters=None):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            return self.graph.run_query(query, parameters)
+        finally:
+            self.in_flight -= 1
+
+    read_query = write_query = run_query = _run
+
+@pytest.fixture
+def async_engine(graph, memory_engine):
+    return AsyncMemoryEngine(AsyncEmbeddedConnector(graph), memory_engine)
+
+def test_searches_run_concurrently_and_share_the_cache(memory_engine, async_engine):
+    memory_engine.store_memories(["the sea at dawn", "a forest walk", "city lights"])
+
+    results = asyncio.run(async_engine.search_memories(["the sea at dawn", "a forest walk", "city lights"]))
+
+    assert [result["text"] for result in results] == ["the sea at dawn", "a forest walk", "city lights"]
+    assert async_engine.db.max_in_flight == 3
+    assert memory_engine.memory_cache.get("a forest walk")["text"] == "a forest walk"
+
+def test_store_memories_notifies_shared_listeners(memory_engine, async_engine):
+    stored = []
+    memory_engine.add_store_listener(stored.extend)
+
+    report = asyncio.run(async_engine.store_memories(["the sea at dawn", "The sea at dawn", "a forest walk"]))
+    memory_engine.wait_for_store_listeners()
+
+    assert (report["stored"], report["created"]) == (2, 2)
+    assert sorted(stored) == ["a forest walk", "the sea at dawn"]
+
+def test_gather_context_combines_direct_themed_and_top_memories(memory_engine, async_engine):
+    memory_engine.store_memories([{"text": "a forest walk", "extra_properties": {"theme": "nature"}}])
+
+    context = asyncio.run(async_engine.gather_context("a forest walk", theme="nature"))
+
+    assert context["memory"]["text"] == "a forest walk"
+    assert [memory["text"] for memory in context["themed"]] == ["a forest walk"]
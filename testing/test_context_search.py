@@ -0,0 +1,15 @@
+# Filename: /testing/test_context_search.py
+
+def test_dynamic_links_only_connect_existing_memories(graph, memory_engine, context_search):
+    memory_engine.store_memories(["the calm sea at dawn", "waves on the shore"])
+
+    context_search.create_dynamic_links("the calm sea at dawn", [
+        {"memory": "Waves on the shore", "similarity": 0.9},
+        {"memory": "a memory that was never stored", "similarity": 0.8},
+    ])
+
+    store = graph.store
+    source = store.find("Memory", "text", "the calm sea at dawn")
+    assert [store.nodes[n]["text"] for n in store.neighbours(source, "RELATED_TO")] == ["waves on the shore"]
+    assert store.find("Memory", "text", "a memory that was never stored") is None
+    assert len(store.label_nodes("Memory")) == 2
@@ -0,0 +1,164 @@
+# Filename: /testing/test_deduplication_engine.py
+
+import numpy as np
+import pytest
+
+from core import deduplication_engine as dedup_module
+from core.deduplication_engine import DeduplicationEngine
+from core.minhash_lsh import MinHashLSH, jaccard, shingles
+
+NODES = {
+    "e1": "a deep sense of calm after a long walk by the sea",
+    "e2": "a deep sense of calm after a long walk by the sea.",
+    "e3": "A deep sense of calm after a long  walk by the sea!",
+    "e4": "anger at being ignored during the meeting",
+    "e5": "quiet joy when an old friend calls unexpectedly",
+}
+
+class FakeRecord:
+    def __init__(self, row):
+        self.row = row
+
+    def single(self):
+        return self.row
+
+class FakeTransaction:
+    """Runs the merge query by folding each group's existing nodes into its first one."""
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    def run(self, query, **parameters):
+        self.driver.queries.append((query, parameters))
+        merging = "apoc.refactor.mergeNodes" in query
+        merged, removed = 0, []
+        for group in parameters["groups"]:
+            nodes = [key for key in group if key in self.driver.nodes]
+            if len(nodes) > 1:
+                for key in nodes[1:] if merging else ():
+                    del self.driver.nodes[key]
+                merged += 1
+                removed.append(nodes[1:])
+        return FakeRecord({"merged": merged, "removed": removed} if merging else {"removed": removed})
+
+class FakeSession:
+    """Answers the paging and text lookup queries of DeduplicationEngine from a dict of nodes."""
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **parameters):
+        self.driver.queries.append((query, parameters))
+        if "keys" in parameters:
+            return [{"key": key, "text": self.driver.nodes[key]} for key in parameters["keys"] if key in self.driver.nodes]
+        after = parameters["after"]
+        keys = sorted(key for key in self.driver.nodes if after is None or key > after)[:parameters["limit"]]
+        return [{"key": key, "text": self.driver.nodes[key]} for key in keys]
+
+    def execute_write(self, work, *args):
+        self.driver.transactions += 1
+        return work(FakeTransaction(self.driver), *args)
+
+class FakeDriver:
+    def __init__(self, uri, auth=None):
+        self.nodes = dict(NODES)
+        self.queries = []
+        self.transactions = 0
+
+    def session(self):
+        return FakeSession(self)
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setattr(dedup_module.GraphDatabase, "driver", FakeDriver)
+    return DeduplicationEngine("bolt://localhost:7687", "neo4j", "secret")
+
+def test_shingles_normalize_case_and_whitespace():
+    assert shingles("Calm  Sea", size=4) == shingles("calm sea", size=4)
+    assert shingles("sea", size=5) == {"sea"}
+    assert jaccard({"a", "b"}, {"b", "c"}) == pytest.approx(1 / 3)
+
+def test_signature_agreement_estimates_jaccard():
+    lsh = MinHashLSH(num_perm=256, bands=32)
+    a, b = NODES["e1"], NODES["e4"] + " by the sea"
+    exact = jaccard(shingles(a), shingles(b))
+
+    agreement = np.mean(lsh.signature(a) == lsh.signature(b))
+
+    assert abs(agreement - exact) < 0.1
+    assert np.array_equal(lsh.signature(a), MinHashLSH(num_perm=256, bands=32).signature(a))
+
+def test_candidate_pairs_group_near_duplicates_only():
+    lsh = MinHashLSH()
+    hashes = lsh.band_hashes(NODES.values())
+
+    assert lsh.candidate_pairs(hashes) == {(0, 1), (0, 2), (1, 2)}
+    assert lsh.candidate_pairs(hashes, max_bucket_size=2) == {(0, 1), (0, 2)}
+
+def test_candidate_pairs_cap_large_buckets():
+    hashes = np.zeros((5, 1), dtype=np.uint64)
+
+    assert MinHashLSH.candidate_pairs(hashes, max_bucket_size=3) == {(0, 1), (0, 2), (0, 3), (0, 4)}
+
+def test_duplicate_groups_are_streamed_across_pages(engine):
+    groups = list(engine.iter_duplicate_groups(threshold=0.8, page_size=2, verify_batch_size=1))
+
+    assert DeduplicationEngine.close_groups(groups) == [["e1", "e2", "e3"]]
+    page_queries = [parameters for _, parameters in engine.driver.queries if "after" in parameters]
+    assert [parameters["after"] for parameters in page_queries] == [None, "e2", "e4"]
+
+def test_merge_matches_each_group_in_key_order_with_a_subquery(engine):
+    progress = []
+
+    merged = engine.merge_duplicates([["e2", "e1"], ["e3", "e2"], ["e4", "e9"], ["e5", "e5"]], label="Emotion",
+                                     batch_size=1, progress=lambda done, total: progress.append((done, total)))
+
+    query, parameters = engine.driver.queries[0]
+    assert "CALL {" in query and "UNWIND range(0, size(group) - 1) AS i" in query
+    assert "MATCH (n:Emotion {id: group[i]})" in query and "ORDER BY i" in query
+    assert "head([" not in query
+    assert parameters["groups"] == [["e1", "e2", "e3"]]
+    assert (merged, engine.driver.transactions, progress) == (1, 2, [(1, 2), (2, 2)])
+    assert sorted(engine.driver.nodes) == ["e1", "e4", "e5"]
+
+def test_merge_rejects_unsafe_identifiers(engine):
+    with pytest.raises(ValueError):
+        engine.merge_duplicates([["e1", "e2"]], label="Emotion) DETACH DELETE (n")
+
+def test_merge_reports_keys_merged_away(engine):
+    removed = []
+
+    engine.merge_duplicates([["e9", "e2", "e1"], ["e4", "e8"]], label="Emotion", on_removed=removed.append)
+
+    assert removed == [["e2"]]
+    assert sorted(engine.driver.nodes) == ["e1", "e3", "e4", "e5"]
+
+def test_merge_hands_nodes_about_to_be_removed_to_the_transaction(engine):
+    removing = []
+
+    def retire(tx, keys):
+        assert all(key in engine.driver.nodes for key in keys)
+        removing.append((type(tx).__name__, keys))
+
+    engine.merge_duplicates([["e3", "e2", "e1"], ["e4", "e8"]], label="Emotion", on_removing=retire)
+
+    assert removing == [("FakeTransaction", ["e2", "e3"])]
+    assert sorted(engine.driver.nodes) == ["e1", "e4", "e5"]
+
+def test_tfidf_reads_and_merges_on_the_given_properties(engine):
+    assert engine.deduplicate("Memory", method="tfidf", key_property="text", text_property="text") == 1
+
+    page_query = next(query for query, parameters in engine.driver.queries if "after" in parameters)
+    merge_query = next(query for query, _ in engine.driver.queries if "apoc.refactor.mergeNodes" in query)
+    assert "RETURN n.text AS key, n.text AS text" in page_query
+    assert "MATCH (n:Memory {text: group[i]})" in merge_query
+    assert sorted(engine.driver.nodes) == ["e1", "e4", "e5"]
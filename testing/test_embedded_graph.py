@@ -0,0 +1,68 @@
+# Filename: /testing/test_embedded_graph.py
+
+import copy
+
+import pytest
+
+from core.memory_engine import MemoryEngine
+
+def store_statement(text, theme="nature"):
+    memory = {"text": text, "pleasure": 0.5, "arousal": 0.5, "emotions": ["calm"], "theme": theme}
+    return MemoryEngine.STORE_MEMORIES_QUERY, {"memories": [memory], "timestamp": "2024-05-01T10:00:00"}
+
+def state(store):
+    return copy.deepcopy((store.nodes, store.out_edges, store.in_edges, store.labels))
+
+def test_failed_transaction_undoes_every_write(graph, memory_engine):
+    graph.run_transaction([store_statement("the sea at dawn")])
+    before = state(graph.store)
+
+    with pytest.raises(ValueError):
+        graph.run_transaction([
+            store_statement("a forest walk"),
+            ("MATCH (n) DETACH DELETE n", None),
+            ("RETURN 1 / 0 AS x", None),
+        ])
+
+    store = graph.store
+    assert state(store) == before
+    assert store.find("Memory", "text", "a forest walk") is None
+    assert store.find("Memory", "text", "the sea at dawn") is not None  # Through the restored property index
+    assert [row["text"] for row in graph.run_query(
+        "CALL db.index.fulltext.queryNodes('memoryIndex', 'sea') YIELD node RETURN node.text AS text")] == ["the sea at dawn"]
+    day = store.nodes[store.find("Day", "date", "2024-05-01")]
+    assert day["memory_count"] == 1
+
+def test_failed_write_function_restores_the_graph(graph):
+    def work(tx):
+        tx.run(*store_statement("a forest walk"))
+        raise RuntimeError("client failed mid-transaction")
+
+    with pytest.raises(RuntimeError):
+        graph.execute_write(work)
+
+    assert graph.store.find("Memory", "text", "a forest walk") is None
+    assert graph.store.label_nodes("Day") == []
+
+def test_cypher_reads_are_executed(graph, memory_engine):
+    for text, count in [("calm sea", 3), ("forest walk", 1), ("sea breeze", 5)]:
+        graph.run_query("CREATE (m:Memory {text: $text, retrieval_count: $count})", {"text": text, "count": count})
+    graph.run_query("MATCH (m:Memory {text: 'calm sea'}) MERGE (t:Theme {name: 'sea'}) MERGE (m)-[:HAS_THEME]->(t)")
+
+    top = graph.run_query("MATCH (m:Memory) RETURN m.text AS text ORDER BY m.retrieval_count DESC LIMIT 2")
+    assert [row["text"] for row in top] == ["sea breeze", "calm sea"]
+
+    totals = graph.run_query("MATCH (m:Memory) WHERE m.text CONTAINS 'sea' RETURN count(m) AS n, sum(m.retrieval_count) AS total")
+    assert totals == [{"n": 2, "total": 8}]
+
+    themed = graph.run_query("""
+        MATCH (m:Memory) OPTIONAL MATCH (m)-[:HAS_THEME]->(t:Theme)
+        RETURN m.text AS text, t.name AS theme ORDER BY text""")
+    assert themed == [{"text": "calm sea", "theme": "sea"}, {"text": "forest walk", "theme": None},
+                      {"text": "sea breeze", "theme": None}]
+
+def test_unsupported_statements_are_rejected(graph):
+    with pytest.raises(NotImplementedError):
+        graph.run_query("MATCH p = (a)-[*1..3]->(b) RETURN p")
+    with pytest.raises(NotImplementedError):
+        graph.run_query("CALL apoc.periodic.iterate('MATCH (n) RETURN n', 'DETACH DELETE n', {})")
@@ -0,0 +1,49 @@
+# Filename: /testing/test_embedding_enricher.py
+
+import numpy as np
+import pytest
+
+from core.embedding_enricher import EmbeddingEnricher
+
+@pytest.fixture
+def enricher(graph, context_search):
+    return EmbeddingEnricher(graph, context_search.embeddings)
+
+def pending(graph):
+    return sorted(graph.store.nodes[node_id]["text"] for node_id in graph.store.find_all("Memory", "embedding_pending", True))
+
+def test_new_memories_are_flagged_and_enriched_once(graph, memory_engine, enricher):
+    memory_engine.store_memories(["the sea at dawn", "a forest walk"])
+    assert pending(graph) == ["a forest walk", "the sea at dawn"]
+
+    assert enricher.run_once() == 2
+    assert pending(graph) == []
+    memory = graph.store.nodes[graph.store.find("Memory", "text", "a forest walk")]
+    assert memory["vector_model"] == enricher.model_version and len(memory["vector"]) == 64
+    assert enricher.run_once() == 0
+
+def test_requeue_flags_memories_from_another_model(graph, memory_engine, enricher):
+    memory_engine.store_memories(["the sea at dawn", "a forest walk"])
+    enricher.run_once()
+    memory = graph.store.find("Memory", "text", "the sea at dawn")
+    graph.store.set_properties(memory, {"vector_model": "an-older-model"})
+
+    assert enricher.requeue_stale() == 1
+    assert pending(graph) == ["the sea at dawn"]
+    assert enricher.requeue_stale() == 0
+
+def test_context_search_reads_stored_vectors(graph, memory_engine, context_search, encoder):
+    memory_engine.store_memories(["the sea at dawn"])
+    graph.run_query(EmbeddingEnricher.WRITE_VECTORS_QUERY, {
+        "rows": [{"text": "the sea at dawn", "vector": [1.0] * 64}],
+        "model": context_search.embeddings.model_id,
+        "timestamp": "2024-05-01T10:00:00",
+    })
+    calls = encoder.calls
+
+    context_search.build_vector_index()
+    context_search.refresh_embedding_matrix()
+
+    assert encoder.calls == calls
+    expected = np.full(64, 1 / 8, dtype=np.float32)
+    assert np.allclose(context_search.vector_index.vectors(["the sea at dawn"])["the sea at dawn"], expected)
@@ -0,0 +1,113 @@
+# Filename: /testing/test_embedding_matrix.py
+
+import numpy as np
+import pytest
+
+from core.embedding_matrix import MappedEmbeddingMatrix
+
+def unit(*values):
+    return np.array([values], dtype=np.float32)
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "matrix" / "memories")
+
+def test_rows_survive_reopening_and_growth(path):
+    matrix = MappedEmbeddingMatrix(path, "model")
+    keys = [f"m{i}" for i in range(1500)]
+    vectors = np.random.default_rng(0).normal(size=(1500, 4)).astype(np.float32)
+    matrix.append(keys[:1000], vectors[:1000], ("2024-05-01", "m999"))
+    matrix.append(keys[1000:], vectors[1000:], ("2024-05-02", "m1499"))
+
+    reopened = MappedEmbeddingMatrix(path, "model")
+
+    assert len(reopened) == 1500 and reopened.watermark == ("2024-05-02", "m1499")
+    assert reopened.search(vectors[1234], k=1)[0][0] == "m1234"
+    assert len(MappedEmbeddingMatrix(path, "another-model")) == 0
+
+def test_appends_from_another_instance_are_picked_up(path):
+    reader, writer = MappedEmbeddingMatrix(path, "model"), MappedEmbeddingMatrix(path, "model")
+    writer.append(["sea"], unit(1, 0), ("2024-05-01", "sea"))
+
+    assert reader.search(unit(1, 0), k=5) == [("sea", pytest.approx(1.0))]
+
+    reader.append(["forest"], unit(0, 1), ("2024-05-02", "forest"))
+    writer.reload()
+    assert len(writer) == 2 and writer.watermark == ("2024-05-02", "forest")
+    assert [key for key, _ in writer.search(unit(0, 1), k=5)] == ["forest", "sea"]
+
+def test_append_after_a_stale_watermark_is_skipped(path):
+    first, second = MappedEmbeddingMatrix(path, "model"), MappedEmbeddingMatrix(path, "model")
+    seen = first.watermark
+    second.append(["sea"], unit(1, 0), ("2024-05-01", "sea"), after=seen)
+
+    assert first.append(["sea"], unit(1, 0), ("2024-05-01", "sea"), after=seen) == 0
+    assert len(first) == 1 and [key for key, _ in first.search(unit(1, 0), k=5)] == ["sea"]
+
+def test_uncommitted_ids_are_truncated_before_the_next_append(path):
+    matrix = MappedEmbeddingMatrix(path, "model")
+    matrix.append(["sea"], unit(1, 0))
+    with open(f"{path}.ids", "a", encoding="utf-8") as f:
+        f.write('"half-written')  # An append interrupted before its metadata was committed
+
+    matrix.append(["forest"], unit(0, 1))
+
+    reopened = MappedEmbeddingMatrix(path, "model")
+    assert len(reopened) == 2 and reopened.search(unit(0, 1), k=1)[0][0] == "forest"
+
+def test_removed_rows_are_not_served(path):
+    matrix, other = MappedEmbeddingMatrix(path, "model"), MappedEmbeddingMatrix(path, "model")
+    matrix.append(["sea", "shore", "forest"], np.array([[1, 0], [0.9, 0.1], [0, 1]], dtype=np.float32))
+
+    assert matrix.remove(["sea", "missing"]) == 1
+    assert matrix.remove(["sea"]) == 0
+
+    assert [key for key, _ in matrix.search(unit(1, 0), k=3)] == ["shore", "forest"]
+    assert [key for key, _ in other.search(unit(1, 0), k=3)] == ["shore", "forest"]
+    assert [key for key, _ in MappedEmbeddingMatrix(path, "model").search(unit(1, 0), k=1)] == ["shore"]
+
+def test_reset_is_seen_by_other_instances(path):
+    matrix, other = MappedEmbeddingMatrix(path, "model"), MappedEmbeddingMatrix(path, "model")
+    matrix.append(["sea"], unit(1, 0), ("2024-05-01", "sea"))
+    matrix.remove(["sea"])
+
+    other.reset()
+
+    matrix.reload()
+    assert len(matrix) == 0 and matrix.watermark == ("", "") and matrix.search(unit(1, 0)) == []
+    matrix.append(["forest"], unit(0, 1))
+    assert [key for key, _ in other.search(unit(0, 1))] == ["forest"]
+
+def test_matching_reads_the_matrix_refreshed_by_the_store_listener(memory_engine, context_search, encoder):
+    memory_engine.add_store_listener(context_search.append_to_embedding_matrix)
+    memory_engine.store_memories(["the calm sea at dawn", "a walk in the forest"])
+    memory_engine.wait_for_store_listeners()
+    calls = encoder.calls
+
+    matches = context_search.advanced_context_matching("calm sea at dawn", similarity_threshold=0.5)
+
+    assert [match["text"] for match in matches] == ["the calm sea at dawn"]
+    assert encoder.calls == calls + 1  # Only the input text is encoded on the query path
+    assert len(context_search.embedding_matrix) == 2
+
+def test_matching_encodes_the_input_like_the_stored_memories(memory_engine, context_search, encoder):
+    memory_engine.add_store_listener(context_search.append_to_embedding_matrix)
+    memory_engine.store_memories(["the calm sea at dawn"])
+    memory_engine.wait_for_store_listeners()
+    calls = encoder.calls
+
+    matches = context_search.advanced_context_matching("The Calm Sea at Dawn", similarity_threshold=0.0)
+
+    assert matches == [{"text": "the calm sea at dawn", "score": 1.0}]
+    assert encoder.calls == calls  # Lowercased like the memories, so the cached embedding is reused
+
+def test_removed_memories_are_dropped_from_index_and_matrix(memory_engine, context_search):
+    memory_engine.store_memories(["the calm sea at dawn", "the calm sea at dusk"])
+    context_search.build_vector_index()
+    context_search.refresh_embedding_matrix()
+
+    assert context_search.remove_memories(["the calm sea at dusk"]) == 1
+
+    assert "the calm sea at dusk" not in context_search.vector_index
+    matches = context_search.advanced_context_matching("the calm sea", similarity_threshold=0.0)
+    assert [match["text"] for match in matches] == ["the calm sea at dawn"]
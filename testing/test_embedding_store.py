@@ -0,0 +1,79 @@
+# Filename: /testing/test_embedding_store.py
+
+import os
+import threading
+
+import numpy as np
+
+from core.embedding_store import EmbeddingStore
+from testing.conftest import HashingEncoder
+
+def test_encodes_each_text_once(tmp_path):
+    encoder = HashingEncoder()
+    store = EmbeddingStore("test-model", encoder, cache_dir=str(tmp_path))
+
+    first = store.encode(["a red fox", "a  red fox", "blue sky"])
+    second = store.encode("blue sky")
+
+    assert encoder.calls == 1
+    assert np.allclose(first[0], first[1])
+    assert np.allclose(second, first[2])
+    assert store.stats()["misses"] == 2
+
+def test_disk_tier_is_shared_across_instances(tmp_path):
+    EmbeddingStore("test-model", HashingEncoder(), cache_dir=str(tmp_path)).encode(["a red fox", "blue sky"])
+    encoder = HashingEncoder()
+    store = EmbeddingStore("test-model", encoder, cache_dir=str(tmp_path))
+
+    vectors = store.encode(["blue sky", "a red fox"])
+
+    assert encoder.calls == 0
+    assert np.allclose(vectors, HashingEncoder().encode(["blue sky", "a red fox"]))
+
+def test_interrupted_append_does_not_shift_rows(tmp_path):
+    EmbeddingStore("test-model", HashingEncoder(), cache_dir=str(tmp_path)).encode(["a red fox"])
+    directory = os.path.join(str(tmp_path), "test-model")
+    # A writer died after appending its vectors and half a key line
+    with open(os.path.join(directory, "vectors.f32"), "ab") as f:
+        f.write(np.ones((2, 64), dtype=np.float32).tobytes())
+    with open(os.path.join(directory, "keys.txt"), "a") as f:
+        f.write("deadbeef")
+
+    EmbeddingStore("test-model", HashingEncoder(), cache_dir=str(tmp_path)).encode(["blue sky", "green grass"])
+    encoder = HashingEncoder()
+    vectors = EmbeddingStore("test-model", encoder, cache_dir=str(tmp_path)).encode(["a red fox", "blue sky", "green grass"])
+
+    assert encoder.calls == 0
+    assert np.allclose(vectors, HashingEncoder().encode(["a red fox", "blue sky", "green grass"]))
+
+def test_disk_index_refreshed_once_per_batch(tmp_path, monkeypatch):
+    store = EmbeddingStore("test-model", HashingEncoder(), cache_dir=str(tmp_path))
+    refreshes = []
+    original = store._refresh_disk_index
+    monkeypatch.setattr(store, "_refresh_disk_index", lambda: refreshes.append(1) or original())
+
+    store.encode([f"text {i}" for i in range(50)])
+
+    assert len(refreshes) <= 3  # Once for the lookup, and before and after the locked append
+
+def test_cache_hits_do_not_wait_for_a_running_encode(tmp_path):
+    started, release = threading.Event(), threading.Event()
+
+    class SlowEncoder(HashingEncoder):
+        def encode(self, texts, batch_size=64, **kwargs):
+            if "slow text" in texts:
+                started.set()
+                release.wait(5)
+            return super().encode(texts, batch_size, **kwargs)
+
+    store = EmbeddingStore("test-model", SlowEncoder(), cache_dir=str(tmp_path))
+    store.encode("blue sky")
+    worker = threading.Thread(target=store.encode, args=(["slow text"],))
+    worker.start()
+    started.wait(5)
+
+    assert np.allclose(store.encode("blue sky"), HashingEncoder().encode("blue sky"))
+    assert worker.is_alive()  # The hit above was served while the model call was still running
+    release.set()
+    worker.join()
+    assert store.stats()["misses"] == 2
@@ -0,0 +1,59 @@
+# Filename: /testing/test_graph_algorithms.py
+
+from core.graph_algorithms import CSRGraph, UnionFind, bounded_cycles, strongly_connected_components
+from core.memory_linker import MemoryLinker
+
+def component_keys(graph: CSRGraph) -> list:
+    return sorted(sorted(graph.keys[node] for node in component) for component in strongly_connected_components(graph))
+
+def test_csr_snapshot_dedups_edges_and_sorts_neighbours():
+    graph = CSRGraph.from_edges(["a", "a", "b", "a"], ["c", "b", "c", "b"])
+
+    assert graph.keys == ["a", "b", "c"] and graph.edge_count == 3
+    assert [graph.keys[node] for node in graph.neighbours(0)] == ["b", "c"]
+    assert len(graph.neighbours(2)) == 0
+
+def test_tarjan_finds_components_in_reverse_topological_order():
+    graph = CSRGraph.from_edges(["a", "b", "c", "c", "d", "e"], ["b", "c", "a", "d", "e", "d"])
+
+    components = strongly_connected_components(graph)
+
+    assert component_keys(graph) == [["a", "b", "c"], ["d", "e"]]
+    assert sorted(graph.keys[node] for node in components[0]) == ["d", "e"]  # The sink component comes first
+
+def test_tarjan_handles_chains_deeper_than_the_recursion_limit():
+    texts = [f"m{i}" for i in range(5000)]
+    graph = CSRGraph.from_edges(texts, texts[1:] + texts[:1])
+
+    assert [len(component) for component in strongly_connected_components(graph)] == [5000]
+
+def test_bounded_cycles_reports_each_cycle_once_within_length():
+    graph = CSRGraph.from_edges(["a", "b", "b", "c", "d"], ["b", "a", "c", "a", "d"])
+
+    cycles = sorted([graph.keys[node] for node in cycle] for cycle in bounded_cycles(graph, max_length=3))
+
+    assert cycles == [["a", "b"], ["a", "b", "c"], ["d"]]
+    assert sorted(len(cycle) for cycle in bounded_cycles(graph, max_length=2)) == [1, 2]
+    assert len(list(bounded_cycles(graph, max_length=3, limit=1))) == 1
+
+def test_detect_cycles_reads_related_edges_from_the_graph(graph, memory_engine):
+    memory_engine.store_memories(["the sea at dawn", "waves on the shore", "a forest walk"])
+    linker = MemoryLinker(graph)
+    linker.write_links([("the sea at dawn", "waves on the shore", 0.9), ("waves on the shore", "the sea at dawn", 0.9),
+                        ("waves on the shore", "a forest walk", 0.8)])
+
+    assert linker.detect_cycles() == [{"cycle": ["the sea at dawn", "waves on the shore"], "length": 2}]
+    assert [sorted(component) for component in linker.memory_components()] == [["the sea at dawn", "waves on the shore"]]
+
+def test_union_find_groups_do_not_depend_on_union_order():
+    forward, backward = UnionFind(), UnionFind()
+    pairs = [("d", "e"), ("a", "b"), ("b", "c"), ("e", "a")]
+    for a, b in pairs:
+        forward.union(a, b)
+    for a, b in reversed(pairs):
+        backward.union(b, a)
+    forward.find("z")
+
+    assert forward.groups(min_size=2) == backward.groups() == [["a", "b", "c", "d", "e"]]
+    assert forward.groups() == [["a", "b", "c", "d", "e"], ["z"]]
+    assert not forward.union("c", "e")
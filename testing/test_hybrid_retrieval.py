@@ -0,0 +1,66 @@
+# Filename: /testing/test_hybrid_retrieval.py
+
+import threading
+
+import pytest
+
+MEMORIES = ["the calm sea at dawn", "the calm sea at dusk", "waves on the shore",
+            "sea salt on the tax forms and spreadsheets of the quarterly office audit", "a walk in the forest"]
+
+@pytest.fixture
+def retriever(memory_engine, context_search):
+    memory_engine.store_memories(MEMORIES)
+    return context_search.retriever
+
+def test_reciprocal_rank_fusion_sums_ranks_across_generators(retriever, monkeypatch):
+    monkeypatch.setattr(retriever, "_fulltext_candidates", lambda text, filters, min_score: [
+        ("the calm sea at dawn", 3.0), ("the calm sea at dusk", 2.0), ("waves on the shore", 1.0)])
+    monkeypatch.setattr(retriever, "_vector_candidates", lambda embedding, filters, min_score: [
+        ("waves on the shore", 0.9), ("the calm sea at dusk", 0.8), ("a walk in the forest", 0.7)])
+
+    results = retriever.retrieve("sea", k=4)
+
+    assert [result["text"] for result in results] == [
+        "waves on the shore", "the calm sea at dusk", "the calm sea at dawn", "a walk in the forest"]
+    assert results[0]["score"] == round(1 / 63 + 1 / 61, 6) and results[1]["score"] == round(2 / 62, 6)
+    assert (results[2]["text_score"], results[2]["similarity"]) == (3.0, None)
+    assert (results[3]["text_score"], results[3]["similarity"]) == (None, 0.7)
+    assert len(retriever.retrieve("sea", k=2)) == 2
+
+def test_search_related_keeps_the_similarity_floor_for_full_text_candidates(retriever, context_search):
+    unfloored = [result["text"] for result in context_search.retrieve("the calm sea at dawn", k=10)]
+    assert MEMORIES[3] in unfloored  # A full-text match on "sea" that is not semantically close
+
+    related = context_search.search_related("the calm sea at dawn")
+
+    assert related and all(set(result) == {"memory", "weight", "similarity"} for result in related)
+    assert all(result["similarity"] >= 0.7 for result in related)
+    assert MEMORIES[3] not in [result["memory"] for result in related]
+    assert related[0]["memory"] == "the calm sea at dawn"
+
+def test_multi_dimensional_search_keeps_the_full_text_contract(retriever, memory_engine, context_search):
+    memory_engine.set_retriever(context_search.retrieve)
+
+    results = memory_engine.multi_dimensional_search("calm sea at dawn")
+
+    assert [result["text"] for result in results] == ["the calm sea at dawn", "the calm sea at dusk"]
+    assert all(set(result) == {"text", "theme", "emotions", "pleasure", "arousal", "score"} for result in results)
+    assert all(result["score"] > 0.5 for result in results)
+    assert results[0]["score"] == pytest.approx(1.0)
+
+def test_concurrent_requests_do_not_queue_behind_each_other(retriever, monkeypatch):
+    barrier = threading.Barrier(3, timeout=5)
+
+    def fulltext(text, filters, min_score):
+        barrier.wait()  # Only returns once three requests are inside the full-text leg at the same time
+        return []
+
+    monkeypatch.setattr(retriever, "_fulltext_candidates", fulltext)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(retriever.retrieve("calm sea"))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 3 and all(results)
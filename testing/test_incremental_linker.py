@@ -0,0 +1,45 @@
+# Filename: /testing/test_incremental_linker.py
+
+import pytest
+
+from core.incremental_linker import IncrementalLinker
+from core.memory_engine import MemoryEngine
+from core.memory_linker import MemoryLinker
+
+def store(graph, timestamp, *texts, emotion="joy"):
+    memories = [{"text": text, "pleasure": 0.5, "arousal": 0.5, "emotions": [emotion], "theme": "nature"} for text in texts]
+    graph.run_query(MemoryEngine.STORE_MEMORIES_QUERY, {"memories": memories, "timestamp": timestamp})
+
+def emotion_peers(graph, text):
+    memory = graph.store.find("Memory", "text", text)
+    return sorted(graph.store.nodes[peer]["text"] for peer in graph.store.neighbours(memory, "SHARES_EMOTION"))
+
+@pytest.fixture
+def linker(graph, context_search):
+    return IncrementalLinker(graph, MemoryLinker(graph, context_search), emotion_peers=2, emotion_window=3, lag=5)
+
+def test_late_commit_behind_the_watermark_is_linked_once(graph, linker):
+    store(graph, "2024-05-01T10:00:00", "the sea at dawn")
+    store(graph, "2024-05-01T10:00:10", "waves on the shore")
+    assert linker.run_once() == 2
+    assert linker.watermark() == ("2024-05-01T10:00:10", "waves on the shore")
+
+    store(graph, "2024-05-01T10:00:07", "a gull over the harbour")  # Stamped before the watermark, committed after
+    store(graph, "2024-05-01T10:00:01", "outside the lag window")
+
+    assert linker.run_once() == 1
+    assert emotion_peers(graph, "a gull over the harbour") == ["outside the lag window", "the sea at dawn"]
+    assert linker.run_once() == 0
+    assert linker.watermark() == ("2024-05-01T10:00:10", "waves on the shore")
+
+def test_emotion_peers_come_from_the_recent_window(graph, linker):
+    store(graph, "2024-05-01T09:00:00", "an old joyful day")
+    store(graph, "2024-05-01T10:00:00", "calm one", "calm two", "calm three", emotion="calm")
+    store(graph, "2024-05-01T11:00:00", "a joyful reunion")
+
+    linker.link_batch(["a joyful reunion"])
+
+    assert emotion_peers(graph, "a joyful reunion") == []  # The older joyful memory is outside the 3-memory window
+    store(graph, "2024-05-01T12:00:00", "joy again", "more joy")
+    linker.link_batch(["more joy"])
+    assert emotion_peers(graph, "more joy") == ["a joyful reunion", "joy again"]
@@ -0,0 +1,52 @@
+# Filename: /testing/test_memory_cache.py
+
+from core import memory_cache as memory_cache_module
+from core.memory_cache import MemoryCache
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_lru_eviction_and_invalidation_by_memory_text():
+    cache = MemoryCache(max_size=2)
+    cache.put("sea", {"text": "the sea at dawn"})
+    cache.put("dawn", {"text": "the sea at dawn"})
+    cache.get("sea")
+    cache.put("forest", {"text": "a forest walk"})
+
+    assert "dawn" not in cache and "sea" in cache and "forest" in cache
+    cache.invalidate("the sea at dawn")
+    assert "sea" not in cache and "forest" in cache
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(memory_cache_module.time, "monotonic", clock)
+    cache = MemoryCache(ttl=10, negative_ttl=5)
+    cache.put("sea", {"text": "the sea"})
+    cache.put_negative("mountain")
+
+    clock.now += 6
+    assert cache.get("sea") is not None
+    assert not cache.is_negative("mountain")
+    clock.now += 5
+    assert cache.get("sea") is None
+
+def test_negative_entries_dropped_only_by_overlapping_stores():
+    cache = MemoryCache()
+    cache.put_negative("snowy mountain")
+    cache.put_negative("quiet library")
+
+    cache.invalidate_negatives("a mountain hike")
+
+    assert not cache.is_negative("snowy mountain")
+    assert cache.is_negative("quiet library")
+
+def test_search_miss_is_not_negatively_cached_once_stored(memory_engine):
+    assert memory_engine.search_memory("a snowy mountain pass") is None
+
+    found = memory_engine.search_memory("a snowy mountain pass")
+
+    assert found is not None and found["text"] == "a snowy mountain pass"
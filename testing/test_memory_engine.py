@@ -0,0 +1,94 @@
+# Filename: /testing/test_memory_engine.py
+
+import threading
+
+from core.memory_engine import MemoryEngine
+
+def test_store_memories_reports_created_and_existing(graph, memory_engine):
+    stored = []
+    memory_engine.add_store_listener(stored.extend)
+
+    first = memory_engine.store_memories(
+        ["The sea at dawn", {"text": "A forest walk", "emotions": ["joy", "joy"], "extra_properties": {"theme": "nature"}}],
+        batch_size=1,
+    )
+    second = memory_engine.store_memories(["the sea at dawn", "  ", "A new day"])
+    memory_engine.wait_for_store_listeners()
+
+    assert (first["submitted"], first["stored"], first["created"]) == (2, 2, 2)
+    assert (second["submitted"], second["stored"], second["created"]) == (3, 2, 1)
+    assert stored == ["the sea at dawn", "a forest walk", "a new day"]
+
+def test_store_listeners_run_off_the_writer_thread(memory_engine):
+    release, threads, stored = threading.Event(), [], []
+    def slow_listener(texts):
+        release.wait(5)
+        threads.append(threading.current_thread())
+        stored.extend(texts)
+    memory_engine.add_store_listener(slow_listener)
+
+    memory_engine.store_memories(["the sea at dawn"])  # Returns while the listener is still blocked
+    memory_engine.store_memories(["a forest walk"])
+    assert stored == []
+    release.set()
+    memory_engine.close()
+
+    assert stored == ["the sea at dawn", "a forest walk"]
+    assert threads[0] is not threading.current_thread()
+
+def test_store_memories_links_theme_and_emotions(graph, memory_engine):
+    memory_engine.store_memories([{"text": "A forest walk", "emotions": ["joy", "calm"], "extra_properties": {"theme": "nature"}}])
+
+    store = graph.store
+    memory = store.find("Memory", "text", "a forest walk")
+    assert store.nodes[memory]["theme"] == "nature"
+    assert [store.nodes[n]["name"] for n in store.neighbours(memory, "THEME_OF")] == ["nature"]
+    assert sorted(store.nodes[n]["name"] for n in store.neighbours(memory, "EMOTION_OF")) == ["calm", "joy"]
+
+def test_retheming_moves_the_theme_link_and_day_rollup(graph, memory_engine):
+    memory_engine.store_memories([{"text": "A forest walk", "extra_properties": {"theme": "nature"}}])
+
+    memory_engine.update_memory("a forest walk", "theme", "exercise")
+    memory_engine.update_memory("a forest walk", "theme", "exercise")
+
+    store = graph.store
+    memory = store.find("Memory", "text", "a forest walk")
+    assert [store.nodes[n]["name"] for n in store.neighbours(memory, "THEME_OF")] == ["exercise"]
+    assert memory_engine.retrieve_memories_by_theme("nature") == []
+    assert [row["text"] for row in memory_engine.retrieve_memories_by_theme("exercise")] == ["a forest walk"]
+    day = store.label_nodes("Day")[0]
+    counts = {store.nodes[n]["name"]: rel["count"] for n, rel in store.neighbours(day, "THEME_COUNT").items()}
+    assert counts == {"nature": 0, "exercise": 1}
+
+def test_repeated_search_miss_is_served_from_the_cache(graph, memory_engine, monkeypatch):
+    queries, unmatchable = [], {"the and of"}  # Lucene drops stopwords, so this query never matches
+    def counting(original):
+        def run(query, parameters=None):
+            queries.append(query)
+            if query == MemoryEngine.SEARCH_MEMORY_QUERY and parameters["text"] in unmatchable:
+                return []
+            return original(query, parameters)
+        return run
+    for name in ("run_query", "read_query", "write_query"):
+        monkeypatch.setattr(graph, name, counting(getattr(graph, name)))
+
+    for text in ("The and of", "Lost in the archive"):
+        queries.clear()
+        assert memory_engine.search_memory(text) is None
+        assert len(queries) == 3  # The full-text search, the store-on-miss write and one re-check
+
+        first = memory_engine.search_memory(text)
+        second = memory_engine.search_memory(text)
+        assert len(queries) == 3 and first == second
+        assert (first is None) == (text.lower() in unmatchable)
+
+def test_retired_memories_leave_the_day_rollup(graph, memory_engine):
+    memory_engine.store_memories([{"text": text, "extra_properties": {"theme": "nature"}}
+                                  for text in ["A forest walk", "A forest walk at dusk"]])
+
+    graph.execute_write(MemoryEngine.retire_from_day_rollups, ["a forest walk at dusk"])
+
+    store = graph.store
+    day = store.label_nodes("Day")[0]
+    assert store.nodes[day]["memory_count"] == 1
+    assert [rel["count"] for rel in store.neighbours(day, "THEME_COUNT").values()] == [1]
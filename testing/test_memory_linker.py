@@ -0,0 +1,47 @@
+# Filename: /testing/test_memory_linker.py
+
+import pytest
+
+from core.memory_linker import MemoryLinker
+
+def reinforced(graph, text):
+    node = graph.store.find("Memory", "text", text)
+    return sorted(graph.store.nodes[target]["text"] for target in graph.store.neighbours(node, "REINFORCES"))
+
+@pytest.fixture
+def chain(graph, memory_engine):
+    """a -> b -> c -> d, plus a -> c and a cycle back from d to a."""
+    memory_engine.store_memories(["a", "b", "c", "d"])
+    linker = MemoryLinker(graph)
+    linker.write_links([("a", "b", 0.9), ("b", "c", 0.9), ("c", "d", 0.9), ("a", "c", 0.8), ("d", "a", 0.8)])
+    return linker
+
+def test_recursive_linking_expands_breadth_first_to_depth(graph, chain):
+    report = chain.recursive_linking("a", depth=2)
+
+    assert report == {"visited": 4, "reinforced": 4}
+    assert reinforced(graph, "a") == ["b", "c"]
+    assert reinforced(graph, "b") == ["c"] and reinforced(graph, "c") == ["d"]
+    assert reinforced(graph, "d") == []  # d is only reached at the last level, so it is not expanded
+
+def test_recursive_linking_respects_fanout_and_visits_each_memory_once(graph, chain):
+    report = chain.recursive_linking("a", depth=10, fanout=1)
+
+    assert report == {"visited": 4, "reinforced": 4}
+    assert reinforced(graph, "a") == ["b"]
+    assert reinforced(graph, "d") == ["a"]
+
+def test_clusters_emptied_by_a_new_representative_are_removed(graph, chain):
+    def write(*clusters):
+        return graph.run_query(MemoryLinker.WRITE_CLUSTERS_QUERY, {
+            "clusters": [{"representative": members[0], "members": list(members)} for members in clusters],
+            "timestamp": "2024-05-01T10:00:00",
+        })
+
+    write(("b", "c"))
+    assert write(("a", "b", "c")) == [{"members": 3, "removed": 1}]
+
+    clusters = graph.store.label_nodes("MemoryCluster")
+    assert [graph.store.nodes[cluster]["representative"] for cluster in clusters] == ["a"]
+    member = graph.store.find("Memory", "text", "b")
+    assert list(graph.store.neighbours(member, "CONSOLIDATED_INTO")) == clusters
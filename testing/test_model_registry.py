@@ -0,0 +1,85 @@
+# Filename: /testing/test_model_registry.py
+
+import threading
+
+from core.model_registry import ModelRegistry
+
+def test_concurrent_requests_load_once():
+    registry = ModelRegistry()
+    loads = []
+    barrier = threading.Barrier(8)
+
+    def loader():
+        loads.append(1)
+        return object()
+
+    def request(results):
+        barrier.wait()
+        results.append(registry.get("model:a", loader))
+
+    results = []
+    threads = [threading.Thread(target=request, args=(results,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert len({id(model) for model in results}) == 1
+    assert registry.stats()["loads"] == 1
+
+def test_evicted_model_is_reloaded_on_next_use():
+    registry = ModelRegistry()
+    registry.get("model:a", object)
+
+    assert registry.evict("model:a")
+    assert not registry.is_loaded("model:a")
+    registry.get("model:a", object)
+    assert registry.is_loaded("model:a") and registry.stats()["loads"] == 2
+
+def test_budget_evicts_least_recently_used_idle_model(monkeypatch):
+    registry = ModelRegistry(rss_budget_mb=100, idle_seconds=0)
+    rss = iter([50, 50, 150, 50])
+    monkeypatch.setattr(ModelRegistry, "rss_mb", staticmethod(lambda: next(rss)))
+    registry.get("model:old", object)
+    registry.get("model:mid", object)
+
+    registry.get("model:new", object)
+
+    assert not registry.is_loaded("model:old")
+    assert registry.is_loaded("model:mid") and registry.is_loaded("model:new")
+
+def test_consciousness_engine_generates_with_one_model_tokenizer_pair(monkeypatch):
+    from NLP import consciousness_engine as module
+
+    class Tokenizer:
+        def __init__(self, load):
+            self.load = load
+
+        def __call__(self, text, **kwargs):
+            return {"input_ids": self.load}
+
+        def decode(self, output, **kwargs):
+            return f"thought from load {output} decoded by load {self.load}"
+
+    class Model:
+        def __init__(self, load):
+            self.load = load
+
+        def generate(self, input_ids, **kwargs):
+            return [self.load]
+
+    loads = []
+    def seq2seq(name):
+        loads.append(name)  # Every call simulates a reload after an eviction
+        return Model(len(loads)), Tokenizer(len(loads))
+
+    class Memories:
+        def retrieve_all_memories(self):
+            return [{"text": "the sea at dawn"}]
+
+    monkeypatch.setattr(module.model_registry, "seq2seq", seq2seq)
+
+    thoughts = module.ConsciousnessEngine(Memories(), None).introspect()
+
+    assert thoughts == ["thought from load 1 decoded by load 1"] and loads == ["t5-base"]
@@ -0,0 +1,29 @@
+# Filename: /testing/test_multi_modal_search.py
+
+import numpy as np
+import pytest
+
+IMAGE = np.array([1.0, 0.0, 0.0, 0.0], dtype=np.float32)
+
+@pytest.fixture
+def engine(memory_engine, context_search):
+    memory_engine.store_memories(["the calm sea at dawn", "a photo of the calm sea at dawn", "a walk in the forest"])
+    context_search.store_image_embedding("a photo of the calm sea at dawn", [0.6, 0.8, 0.0, 0.0])
+    context_search.store_image_embedding("a walk in the forest", [1.0, 0.0, 0.0, 0.0])
+    return context_search
+
+def test_text_only_memories_are_scored_on_text_alone(engine):
+    matches = {match["text"]: match for match in engine.multi_modal_search("the calm sea at dawn", IMAGE, min_score=0.0)}
+
+    text_only = matches["the calm sea at dawn"]
+    assert text_only["image_score"] is None and text_only["score"] == text_only["text_score"] == pytest.approx(1.0)
+
+    with_image = matches["a photo of the calm sea at dawn"]
+    assert with_image["image_score"] == pytest.approx(0.6)
+    assert with_image["score"] == pytest.approx((with_image["text_score"] + 0.6) / 2, abs=1e-4)
+
+def test_renormalized_weights_let_text_only_memories_pass_high_thresholds(engine):
+    matches = engine.multi_modal_search("the calm sea at dawn", IMAGE, min_score=0.7, text_weight=0.3, image_weight=0.7)
+
+    assert "the calm sea at dawn" in [match["text"] for match in matches]
+    assert all(match["score"] > 0.7 for match in matches)
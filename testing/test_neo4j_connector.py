@@ -0,0 +1,93 @@
+# Filename: /testing/test_neo4j_connector.py
+
+import pytest
+from neo4j import READ_ACCESS, WRITE_ACCESS
+
+from core import neo4j_connector as connector_module
+from core.neo4j_connector import Neo4jConnector
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def data(self):
+        return self.rows
+
+class FakeTransaction:
+    def __init__(self, log):
+        self.log = log
+
+    def run(self, query, **parameters):
+        if "FAIL" in query:
+            raise RuntimeError("statement failed")
+        self.log.append((query, parameters))
+        return FakeResult([{"query": query}])
+
+class FakeSession:
+    def __init__(self, driver, database, default_access_mode):
+        self.driver = driver
+        self.database = database
+        self.mode = default_access_mode
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **parameters):
+        return FakeResult([])
+
+    def _transaction(self, kind, work, *args, **kwargs):
+        statements = []
+        result = work(FakeTransaction(statements), *args, **kwargs)
+        self.driver.transactions.append((kind, self.mode, self.database, statements))  # Committed only on success
+        return result
+
+    def execute_read(self, work, *args, **kwargs):
+        return self._transaction("read", work, *args, **kwargs)
+
+    def execute_write(self, work, *args, **kwargs):
+        return self._transaction("write", work, *args, **kwargs)
+
+class FakeDriver:
+    def __init__(self, uri, **config):
+        self.uri = uri
+        self.config = config
+        self.transactions = []
+
+    def session(self, database=None, default_access_mode=WRITE_ACCESS):
+        return FakeSession(self, database, default_access_mode)
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def connector(monkeypatch):
+    monkeypatch.setattr(connector_module.GraphDatabase, "driver", FakeDriver)
+    return Neo4jConnector("neo4j://cluster:7687", "neo4j", "secret", max_connection_pool_size=7,
+                          connection_acquisition_timeout=2.5, database="memories")
+
+def test_pool_settings_are_passed_to_the_driver(connector):
+    assert connector.driver.config["max_connection_pool_size"] == 7
+    assert connector.driver.config["connection_acquisition_timeout"] == 2.5
+
+def test_reads_and_writes_use_managed_transactions_with_routing(connector):
+    connector.read_query("MATCH (m:Memory) RETURN m", {"limit": 1})
+    connector.write_query("CREATE (m:Memory)")
+
+    (read_kind, read_mode, read_db, _), (write_kind, write_mode, _, _) = connector.driver.transactions
+    assert (read_kind, read_mode, read_db) == ("read", READ_ACCESS, "memories")
+    assert (write_kind, write_mode) == ("write", WRITE_ACCESS)
+
+def test_run_transaction_runs_all_statements_in_one_transaction(connector):
+    results = connector.run_transaction([("CREATE (a)", {"x": 1}), ("CREATE (b)", None)])
+
+    assert len(connector.driver.transactions) == 1
+    assert [query for query, _ in connector.driver.transactions[0][3]] == ["CREATE (a)", "CREATE (b)"]
+    assert results == [[{"query": "CREATE (a)"}], [{"query": "CREATE (b)"}]]
+
+def test_failed_statement_commits_nothing(connector):
+    with pytest.raises(RuntimeError):
+        connector.run_transaction([("CREATE (a)", None), ("FAIL", None)])
+    assert connector.driver.transactions == []
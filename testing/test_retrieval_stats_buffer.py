@@ -0,0 +1,60 @@
+# Filename: /testing/test_retrieval_stats_buffer.py
+
+import pytest
+
+from core.retrieval_stats_buffer import RetrievalStatsBuffer
+
+class RecordingConnector:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.writes = []
+
+    def write_query(self, query, parameters):
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        self.writes.append(parameters)
+        return [{"updated": len(parameters["updates"])}]
+
+def test_retrievals_are_aggregated_into_one_write():
+    db = RecordingConnector()
+    flushed = []
+    buffer = RetrievalStatsBuffer(db, on_flush=lambda texts: flushed.extend(texts))
+    for _ in range(3):
+        buffer.record("the sea")
+    buffer.record("a forest")
+
+    assert buffer.flush() == 2
+    assert len(db.writes) == 1
+    assert sorted((u["text"], u["count"]) for u in db.writes[0]["updates"]) == [("a forest", 1), ("the sea", 3)]
+    assert sorted(flushed) == ["a forest", "the sea"]
+    assert buffer.flush() == 0
+
+def test_max_pending_triggers_early_flush():
+    db = RecordingConnector()
+    buffer = RetrievalStatsBuffer(db, max_pending=2)
+    buffer.record("one")
+    assert not db.writes
+    buffer.record("two")
+    assert len(db.writes) == 1
+
+def test_failed_flush_keeps_increments_for_retry():
+    db = RecordingConnector(fail=True)
+    buffer = RetrievalStatsBuffer(db)
+    buffer.record("the sea", 2)
+
+    assert buffer.flush() == 0
+    db.fail = False
+    buffer.record("the sea")
+    assert buffer.flush() == 1
+    assert db.writes[0]["updates"] == [{"text": "the sea", "count": 3}]
+
+def test_flush_updates_memory_stats(graph, memory_engine):
+    memory_engine.store_memory("the sea at dawn", pleasure=0.5, arousal=0.5)
+    for _ in range(4):
+        memory_engine.update_retrieval_stats("the sea at dawn")
+    memory_engine.flush_retrieval_stats()
+
+    memory = graph.store.nodes[graph.store.find("Memory", "text", "the sea at dawn")]
+    assert memory["retrieval_count"] == 4
+    assert memory["pleasure"] == pytest.approx(0.54)
+    assert memory["arousal"] == pytest.approx(0.46)
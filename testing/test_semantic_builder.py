@@ -0,0 +1,96 @@
+# Filename: /testing/test_semantic_builder.py
+
+import numpy as np
+
+from core.embedding_store import EmbeddingStore
+from core.semantic_builder import SemanticBuilder
+from testing.conftest import HashingEncoder
+
+def brute_force_pairs(vectors: np.ndarray, k: int, threshold: float) -> set:
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized @ normalized.T
+    np.fill_diagonal(scores, -np.inf)
+    pairs = set()
+    for i, row in enumerate(scores):
+        for j in np.argsort(-row)[:k]:
+            if row[j] > threshold:
+                pairs.add((min(i, int(j)), max(i, int(j))))
+    return pairs
+
+def test_top_k_pairs_match_brute_force_for_any_block_size():
+    vectors = np.random.default_rng(3).normal(size=(60, 8)).astype(np.float32)
+    expected = brute_force_pairs(vectors, k=3, threshold=0.3)
+
+    for block_size in (1, 7, 60, 100):
+        pairs = SemanticBuilder.top_k_pairs(vectors, k=3, threshold=0.3, block_size=block_size)
+        assert {(i, j) for i, j, _ in pairs} == expected
+        assert all(i < j and score > 0.3 for i, j, score in pairs)
+
+def test_top_k_pairs_handles_tiny_inputs():
+    assert SemanticBuilder.top_k_pairs(np.ones((1, 4)), k=5) == []
+    assert [(i, j) for i, j, _ in SemanticBuilder.top_k_pairs(np.ones((2, 4)), k=5)] == [(0, 1)]
+
+class RecordingClient:
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self.writes = []
+
+    def read_query(self, query, parameters=None):
+        return self.nodes
+
+    def write_query(self, query, parameters=None):
+        self.writes.append(parameters["pairs"])
+        return [{"created": len(parameters["pairs"])}]
+
+def test_build_relationships_writes_pairs_in_batches(monkeypatch):
+    store = EmbeddingStore(SemanticBuilder.SIMILARITY_MODEL_ID, HashingEncoder(), cache_dir=None)
+    monkeypatch.setattr(EmbeddingStore, "_instances", {SemanticBuilder.SIMILARITY_MODEL_ID: store})
+    client = RecordingClient([
+        {"id": "joy", "name": "joy", "description": "warm bright happy feeling"},
+        {"id": "delight", "name": "delight", "description": "warm bright happy glow"},
+        {"id": "glee", "name": "glee", "description": "bright happy warm laughter"},
+        {"id": "dread", "name": "dread", "description": "cold fear of what comes"},
+    ])
+    builder = SemanticBuilder(client, similarity_threshold=0.5, batch_size=2)
+
+    created = builder.build_relationships(k=2)
+
+    assert created == 3 and [len(batch) for batch in client.writes] == [2, 1]
+    assert {(pair["source"], pair["target"]) for batch in client.writes for pair in batch} == {
+        ("joy", "delight"), ("joy", "glee"), ("delight", "glee")}
+
+def themed(graph, rows):
+    for text, theme, created_at in rows:
+        graph.run_query("CREATE (m:Memory {text: $text, theme: $theme, created_at: $created_at})",
+                        {"text": text, "theme": theme, "created_at": created_at})
+
+def shift_builder(monkeypatch, graph):
+    store = EmbeddingStore(SemanticBuilder.SIMILARITY_MODEL_ID, HashingEncoder(), cache_dir=None)
+    monkeypatch.setattr(EmbeddingStore, "_instances", {SemanticBuilder.SIMILARITY_MODEL_ID: store})
+    return SemanticBuilder(graph, batch_size=2)
+
+def test_notifications_during_an_update_trigger_another_pass(monkeypatch, graph):
+    builder = shift_builder(monkeypatch, graph)
+    themed(graph, [("a walk by the sea", "sea", "2024-05-01T10:00:00"), ("a walk in the forest", "forest", "2024-05-01T11:00:00")])
+    record = builder._record_new_shifts
+
+    def racing_pass():
+        if not graph.store.label_nodes("NarrativeShift"):
+            # A memory stored while this pass runs; its notification finds the update busy
+            themed(graph, [("back at the sea", "sea", "2024-05-01T12:00:00")])
+            assert builder.update_narrative_shifts() == 0
+        return record()
+
+    monkeypatch.setattr(builder, "_record_new_shifts", racing_pass)
+
+    assert builder.update_narrative_shifts() == 2
+    assert [shift["new_theme"] for shift in builder.detect_narrative_shifts()] == ["sea", "forest"]
+
+def test_shifts_of_memories_without_iso_timestamps_are_recorded(monkeypatch, graph, caplog):
+    builder = shift_builder(monkeypatch, graph)
+    themed(graph, [("a walk by the sea", "sea", "2024-05-01T10:00:00"), ("a walk in the forest", "forest", "2024-05-01T10:30 local"),
+                   ("back at the sea", "sea", "2024-05-02T09:00:00")])
+
+    assert builder.update_narrative_shifts() == 2
+    assert "not ISO-8601" in caplog.text
+    assert builder.update_narrative_shifts() == 0
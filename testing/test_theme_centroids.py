@@ -0,0 +1,114 @@
+# Filename: /testing/test_theme_centroids.py
+
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from core.async_memory_engine import AsyncMemoryEngine
+from core.theme_centroids import ThemeCentroids
+from testing.test_async_memory_engine import AsyncEmbeddedConnector
+
+SEA = ["the calm sea at dawn", "waves on the shore", "salt wind over the sea"]
+FOREST = ["a walk in the forest", "moss under old trees"]
+
+def theme(graph, name):
+    return graph.store.nodes[graph.store.find("Theme", "name", name)]
+
+def memory(graph, text):
+    return graph.store.nodes[graph.store.find("Memory", "text", text)]
+
+def store(memory_engine, texts, theme_name):
+    memory_engine.store_memories([{"text": text, "extra_properties": {"theme": theme_name}} for text in texts])
+
+@pytest.fixture
+def centroids(graph, context_search):
+    return ThemeCentroids(graph, context_search)
+
+def unit_sum(centroids, texts):
+    vectors = centroids._vectors(texts)
+    return np.sum([vectors[text] for text in texts], axis=0)
+
+def test_new_members_are_scored_and_rescores_are_left_to_the_worker(graph, memory_engine, centroids):
+    store(memory_engine, SEA[:2], "sea")
+    assert centroids.update(SEA[:2]) == 2
+
+    sea = theme(graph, "sea")
+    assert sea["member_count"] == 2 and sea.get("scored_centroid") is None
+    expected = unit_sum(centroids, SEA[:2])
+    assert np.allclose(sea["centroid"], expected / np.linalg.norm(expected), atol=1e-5)
+    assert memory(graph, SEA[0])["theme_similarity"] == pytest.approx(float(centroids._vectors([SEA[0]])[SEA[0]] @ sea["centroid"]), abs=1e-4)
+
+    store(memory_engine, SEA[2:], "sea")
+    centroids.update(SEA[2:])
+    stale = memory(graph, SEA[0])["theme_similarity"]
+
+    assert centroids.rescore_pending() == 3
+    assert np.allclose(theme(graph, "sea")["scored_centroid"], theme(graph, "sea")["centroid"])
+    assert memory(graph, SEA[0])["theme_similarity"] != stale
+    assert centroids.rescore_pending() == 0
+
+def test_retheming_moves_the_member_between_sums(graph, memory_engine, centroids):
+    store(memory_engine, SEA, "sea")
+    store(memory_engine, FOREST, "forest")
+    centroids.update(SEA + FOREST)
+
+    memory_engine.update_memory(SEA[2], "theme", "forest")
+    centroids.update([SEA[2]])
+
+    assert (theme(graph, "sea")["member_count"], theme(graph, "forest")["member_count"]) == (2, 3)
+    assert np.allclose(theme(graph, "sea")["centroid_sum"], unit_sum(centroids, SEA[:2]), atol=1e-5)
+    assert np.allclose(theme(graph, "forest")["centroid_sum"], unit_sum(centroids, FOREST + SEA[2:]), atol=1e-5)
+    assert memory(graph, SEA[2])["centroid_theme"] == "forest"
+
+def test_concurrent_writers_both_land_in_the_sum(graph, memory_engine, context_search, centroids):
+    store(memory_engine, SEA, "sea")
+    other = ThemeCentroids(graph, context_search)
+    write_query = graph.write_query
+
+    def interleaved(query, parameters=None):
+        if query == ThemeCentroids.WRITE_THEMES_QUERY:
+            graph.write_query = write_query
+            other.update(SEA[1:])  # Another process folds its members between our read and our write
+        return write_query(query, parameters)
+
+    graph.write_query = interleaved
+    centroids.update(SEA[:1])
+    graph.write_query = write_query
+
+    assert theme(graph, "sea")["member_count"] == 3
+    assert np.allclose(theme(graph, "sea")["centroid_sum"], unit_sum(centroids, SEA), atol=1e-5)
+
+def test_worker_rescores_drifted_themes_in_the_background(graph, memory_engine, centroids):
+    centroids.start()
+    try:
+        store(memory_engine, SEA, "sea")
+        centroids.update(SEA)
+        deadline = time.monotonic() + 5
+        while theme(graph, "sea").get("scored_centroid") is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        centroids.stop()
+
+    assert np.allclose(theme(graph, "sea")["scored_centroid"], theme(graph, "sea")["centroid"])
+
+def test_async_retheme_notifies_store_listeners(graph, memory_engine):
+    store(memory_engine, SEA[:1], "sea")
+    notified = []
+    memory_engine.add_store_listener(notified.extend)
+
+    asyncio.run(AsyncMemoryEngine(AsyncEmbeddedConnector(graph), memory_engine).update_memory(SEA[0], "theme", "forest"))
+    memory_engine.wait_for_store_listeners()
+
+    assert notified == [SEA[0]] and memory(graph, SEA[0])["theme"] == "forest"
+
+def test_retired_members_leave_the_sum(graph, memory_engine, context_search, centroids):
+    store(memory_engine, SEA, "sea")
+    centroids.update(SEA)
+
+    assert graph.execute_write(context_search.retire_theme_members, SEA[2:] + ["never stored"]) == 1
+
+    assert theme(graph, "sea")["member_count"] == 2
+    assert np.allclose(theme(graph, "sea")["centroid_sum"], unit_sum(centroids, SEA[:2]), atol=1e-5)
+    assert memory(graph, SEA[2]).get("centroid_theme") is None
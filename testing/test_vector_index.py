@@ -0,0 +1,95 @@
+# Filename: /testing/test_vector_index.py
+
+import numpy as np
+
+from core.context_search import ContextSearchEngine
+from core.vector_index import VectorIndex
+
+def random_vectors(count: int, dim: int = 16, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+
+def test_exact_search_returns_nearest_first():
+    vectors = random_vectors(50)
+    index = VectorIndex()
+    index.add_batch([f"m{i}" for i in range(50)], vectors)
+
+    results = index.search(vectors[7], k=3)
+
+    assert results[0][0] == "m7"
+    assert abs(results[0][1] - 1.0) < 1e-5
+    assert [score for _, score in results] == sorted((score for _, score in results), reverse=True)
+
+def test_min_score_and_remove():
+    vectors = random_vectors(10)
+    index = VectorIndex()
+    index.add_batch([f"m{i}" for i in range(10)], vectors)
+
+    assert index.remove("m3")
+    assert not index.remove("m3")
+    assert "m3" not in index and len(index) == 9
+    assert all(key != "m3" for key, _ in index.search(vectors[3], k=9))
+    assert all(score >= 0.99 for _, score in index.search(vectors[5], k=9, min_score=0.99))
+
+def test_save_and_load_round_trip(tmp_path):
+    vectors = random_vectors(20)
+    index = VectorIndex()
+    index.add_batch([f"m{i}" for i in range(20)], vectors)
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+
+    loaded = VectorIndex.load(path)
+
+    assert loaded.keys() == index.keys()
+    assert loaded.search(vectors[4], k=1)[0][0] == "m4"
+
+def list_contents(index: VectorIndex) -> list:
+    return sorted(int(row) for rows, size in zip(index._lists, index._list_sizes) for row in rows[:size])
+
+def test_ivf_inverted_lists_follow_adds_and_removes():
+    vectors = random_vectors(400)
+    index = VectorIndex(nlist=8, nprobe=8, exact_threshold=100)
+    index.add_batch([f"m{i}" for i in range(200)], vectors[:200])
+    assert index._centroids is not None
+
+    index.add_batch([f"m{i}" for i in range(150, 260)], vectors[150:260] * -1)
+    for i in range(0, 60, 3):
+        assert index.remove(f"m{i}")
+
+    assert list_contents(index) == list(range(len(index)))
+    for c, (rows, size) in enumerate(zip(index._lists, index._list_sizes)):
+        assert all(index._assignments[row] == c for row in rows[:size])
+    assert index.search(-vectors[200], k=1)[0][0] == "m200"
+    assert "m3" not in {key for key, _ in index.search(vectors[3], k=len(index))}
+
+def test_ivf_search_batch_matches_single_queries():
+    vectors = random_vectors(300)
+    index = VectorIndex(nlist=10, nprobe=3, exact_threshold=100)
+    index.add_batch([f"m{i}" for i in range(300)], vectors)
+
+    batched = index.search_batch(vectors[:20], k=5)
+
+    assert batched == [index.search(query, k=5) for query in vectors[:20]]
+    assert all(results[0][0] == f"m{i}" for i, results in enumerate(batched))
+
+def test_close_persists_incremental_writes(graph, memory_engine, context_search):
+    memory_engine.add_store_listener(context_search.index_memories)
+    memory_engine.store_memories(["the sea at dawn", "a quiet forest walk"])
+    memory_engine.wait_for_store_listeners()
+    context_search.close()
+
+    reopened = ContextSearchEngine(graph, index_path=context_search.index_path, matrix_path=context_search.matrix_path)
+
+    assert {"the sea at dawn", "a quiet forest walk"} <= set(reopened.vector_index.keys())
+
+def test_loaded_index_is_reconciled_with_graph(graph, memory_engine, context_search):
+    memory_engine.store_memories(["the sea at dawn", "a quiet forest walk"])
+    context_search.build_vector_index()
+    context_search.vector_index.add("deleted memory", np.ones(64, dtype=np.float32))
+    context_search.save_vector_index()
+    memory_engine.store_memories(["written after the save"])
+
+    reopened = ContextSearchEngine(graph, index_path=context_search.index_path, matrix_path=context_search.matrix_path)
+    results = reopened.search_related_contexts("written after the save", similarity_threshold=0.9)
+
+    assert set(reopened.vector_index.keys()) == {"the sea at dawn", "a quiet forest walk", "written after the save"}
+    assert results[0]["memory"] == "written after the save"
@@ -14,6 +14,8 @@ import logging
 from logging.handlers import RotatingFileHandler
 from NLP.consciousness_engine import ConsciousnessEngine
 from NLP.nlp_engine import NLPEngine
+from core.context_search import ContextSearchEngine
+from core.memory_engine import MemoryEngine
 from core.deduplication_engine import DeduplicationEngine
 from core.attribute_enrichment import AttributeEnrichment
 from core.interactive_learning import InteractiveLearning
@@ -52,6 +54,11 @@ def get_deduplication_engine():
         app.deduplication_engine = DeduplicationEngine(uri=NEO4J_URI, user=NEO4J_USER, password=NEO4J_PASSWORD)
     return app.deduplication_engine
 
+def get_context_search():
+    if not hasattr(app, "context_search"):
+        app.context_search = ContextSearchEngine(neo4j_conn)
+    return app.context_search
+
 def get_attribute_enrichment():
     if not hasattr(app, "attribute_enrichment"):
         app.attribute_enrichment = AttributeEnrichment(graph_client=neo4j_conn)
@@ -73,9 +80,21 @@ def get_feedback_loops():
     return app.feedback_loops
 
 # Route functions
-def deduplicate(label="Emotion"):
+def deduplicate(label="Emotion", method="tfidf"):
     """Perform deduplication on graph nodes with a specific label."""
-    get_deduplication_engine().deduplicate(label)
+    options = {}
+    if label == "Memory":
+        # Memories are keyed by text. Merged-away ones leave the day rollups and theme centroids in the merge
+        # transaction, and the vector index and embedding matrix once it commits
+        context_search = get_context_search()
+
+        def retire_memories(tx, texts):
+            MemoryEngine.retire_from_day_rollups(tx, texts)
+            context_search.retire_theme_members(tx, texts)
+
+        options = {"key_property": "text", "text_property": "text", "on_removing": retire_memories,
+                   "on_removed": context_search.remove_memories}
+    get_deduplication_engine().deduplicate(label, method=method, **options)
     return {"message": f"Deduplication completed for label: {label}"}
 
 def enrich_attributes(label="Emotion", auto=True):
@@ -136,7 +155,8 @@ def dynamic_conversation(user_input):
 def deduplicate_v1():
     try:
         label = request.json.get("label", "Emotion")
-        return jsonify(deduplicate(label)), 200
+        method = request.json.get("method", "tfidf")
+        return jsonify(deduplicate(label, method)), 200
     except Exception as e:
         app.logger.error(f"Deduplication error: {str(e)}")
         return jsonify({"error": "An error occurred during deduplication", "details": str(e)}), 500